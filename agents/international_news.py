@@ -4,6 +4,7 @@ from datetime import datetime
 import re
 import asyncio
 from agents.international_underground_news import InternationalUndergroundNewsAgent
+from src.utils.prompt_builder import PromptBuilder
 
 class InternationalMarketNews:
     def __init__(self):
@@ -243,11 +244,8 @@ class InternationalMarketNews:
         """Get AI-enhanced international market analysis"""
         try:
             # Prepare international news context for AI analysis
-            news_titles = []
-            for news_item in base_news.get('news', []):
-                news_titles.append(f"- {news_item.get('title', '')}")
-            
-            news_context = "\n".join(news_titles[:8])  # Limit to top 8 news
+            # Top-k tiêu đề (đã loại trùng) trong ngân sách token
+            news_context = PromptBuilder('international_analysis').add_news("", base_news.get('news', []), top_k=8).build()
             
             context = f"""
 Phân tích thị trường tài chính quốc tế dựa trên tin tức mới nhất:
@@ -271,7 +269,7 @@ Trả lời ngắn gọn, tập trung vào những điểm quan trọng nhất.
 """
             
             # Get AI analysis
-            ai_result = self.ai_agent.generate_with_fallback(context, 'international_analysis', max_tokens=600)
+            ai_result = self.ai_agent.generate_cached(context, 'international_analysis', max_tokens=600, template_id='international_news_v1')
             
             if ai_result['success']:
                 return {
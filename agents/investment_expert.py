@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 import streamlit as st
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.prompt_builder import PromptBuilder, PRIORITY_CRITICAL, PRIORITY_HIGH, PRIORITY_MEDIUM
 def format_vn_number(value, decimals=2):
     """Format số kiểu VN chuyên nghiệp: 108,000.50 hoặc 6,400.25"""
     try:
@@ -88,19 +89,18 @@ class InvestmentExpert:
             low_52w = float(hist_data['low'].min())
             avg_volume = int(hist_data['volume'].mean())
             
-            # Try to get financial ratios
+            # Chỉ số cơ bản từ fundamentals store (chỉ gọi vendor quanh mùa báo cáo)
             try:
-                ratios = stock_obj.finance.ratio(period='quarter', lang='vi', dropna=True)
-                if not ratios.empty:
-                    latest_ratio = ratios.iloc[-1]
-                    pe = latest_ratio.get('pe', 0)
-                    pb = latest_ratio.get('pb', 0)
-                    eps = latest_ratio.get('eps', 0)
-                    dividend = latest_ratio.get('dividend_per_share', 0)
-                else:
-                    pe = pb = eps = dividend = 0
-            except:
-                pe = pb = eps = dividend = 0
+                from src.data.fundamentals_store import get_fundamentals_store
+                fundamentals = await get_fundamentals_store().get(symbol) or {}
+            except Exception:
+                fundamentals = {}
+            pe = fundamentals.get('pe') or 0
+            pb = fundamentals.get('pb') or 0
+            eps = fundamentals.get('eps') or 0
+            bvps = fundamentals.get('bvps') or 0
+            dividend = fundamentals.get('dividend_per_share') or 0
+            shares = fundamentals.get('shares') or 0
             
             print(f"✅ Got REAL detailed metrics for {symbol}")
             
@@ -109,7 +109,7 @@ class InvestmentExpert:
                 'high': float(hist_data['high'].iloc[-1]),
                 'low': float(hist_data['low'].iloc[-1]),
                 'volume': int(hist_data['volume'].iloc[-1]),
-                'market_cap': current_price * 1000000000,  # Estimate
+                'market_cap': current_price * shares if shares else current_price * 1000000000,  # Estimate khi thiếu số CP
                 'bid_volume': int(hist_data['volume'].iloc[-1] * 0.6),
                 'ask_volume': int(hist_data['volume'].iloc[-1] * 0.4),
                 'high_52w': high_52w,
@@ -123,7 +123,7 @@ class InvestmentExpert:
                 'eps': eps if eps > 0 else random.randint(1500, 4000),
                 'pe': pe if pe > 0 else (current_price / eps * 1000) if eps > 0 else random.uniform(10, 25),
                 'forward_pe': (pe * 0.9) if pe > 0 else random.uniform(8, 20),
-                'bvps': random.randint(15000, 40000),  # Need balance sheet data
+                'bvps': bvps if bvps > 0 else random.randint(15000, 40000),
                 'pb': pb if pb > 0 else random.uniform(1.0, 3.0)
             }
             
@@ -850,10 +850,11 @@ class InvestmentExpert:
         else:
             return 180
     
-    def analyze_stock(self, symbol: str, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 100000000) -> Dict[str, Any]:
+    def analyze_stock(self, symbol: str, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 100000000, use_ai: bool = True) -> Dict[str, Any]:
         """
         Main method to analyze stock with investment recommendation
         Enhanced with investment profile parameters
+        use_ai=False: bỏ qua AI enhancement (MainAgent sẽ làm enrichment gộp)
         """
         try:
             print(f"🚀 Starting investment analysis for {symbol} with profile: {risk_tolerance}% risk, {time_horizon}, {investment_amount:,} VND...")
@@ -887,7 +888,7 @@ class InvestmentExpert:
             
             # Add AI enhancement if available - ALWAYS try to get AI advice
             if not result.get('error'):
-                if self.ai_agent:
+                if self.ai_agent and use_ai:
                     try:
                         ai_enhancement = self.get_ai_enhancement(symbol, result)
                         result.update(ai_enhancement)
@@ -898,7 +899,7 @@ class InvestmentExpert:
                         # Provide fallback advice
                         result['ai_advice'] = f"Khuyến nghị {result.get('recommendation', 'HOLD')} dựa trên phân tích cơ bản"
                         result['ai_reasoning'] = f"Điểm số {result.get('score', 50)}/100 cho thấy {result.get('reason', 'cần thận trọng')}"
-                else:
+                elif not self.ai_agent:
                     # No AI agent available - provide basic advice
                     result['ai_enhanced'] = False
                     result['ai_error'] = 'AI agent not configured'
@@ -1045,17 +1046,16 @@ class InvestmentExpert:
             high_52w = float(hist_data['high'].max())
             low_52w = float(hist_data['low'].min())
             
-            # Get financial ratios
+            # Get financial ratios (fundamentals store, đồng bộ)
             pe_ratio = pb_ratio = eps = dividend_yield = 0
             try:
-                ratios = stock_obj.finance.ratio(period='quarter', lang='vi', dropna=True)
-                if not ratios.empty:
-                    latest = ratios.iloc[-1]
-                    pe_ratio = float(latest.get('pe', 0) or 0)
-                    pb_ratio = float(latest.get('pb', 0) or 0)
-                    eps = float(latest.get('eps', 0) or 0)
-                    dividend = float(latest.get('dividend_per_share', 0) or 0)
-                    dividend_yield = (dividend / current_price * 100) if dividend > 0 else 0
+                from src.data.fundamentals_store import get_fundamentals_store
+                fundamentals = get_fundamentals_store().get_sync(symbol) or {}
+                pe_ratio = float(fundamentals.get('pe') or 0)
+                pb_ratio = float(fundamentals.get('pb') or 0)
+                eps = float(fundamentals.get('eps') or 0)
+                dividend = float(fundamentals.get('dividend_per_share') or 0)
+                dividend_yield = (dividend / current_price * 100) if dividend > 0 else 0
             except Exception:
                 pass
             
@@ -1245,7 +1245,7 @@ class InvestmentExpert:
             # Create diverse context based on profile combination
             context = self._create_diverse_investment_context(symbol, base_analysis, risk_tolerance, time_horizon, investment_amount, risk_profile)
             
-            ai_result = self.ai_agent.generate_with_fallback(context, 'investment_analysis', max_tokens=500)
+            ai_result = self.ai_agent.generate_cached(context, 'investment_analysis', max_tokens=500, template_id='investment_advice_v1')
             
             if ai_result['success']:
                 # Parse AI response for advice and reasoning
@@ -1334,6 +1334,16 @@ class InvestmentExpert:
                 strategy = "phân bổ đều giữa các loại tài sản"
                 concern = "không đạt được mục tiêu tài chính"
         
+        # Dữ liệu hệ thống: chỉ giữ field quan trọng trong ngân sách token
+        metrics = (base_analysis.get('analysis', {}) or {}).get('detailed_metrics', {}) or {}
+        system_data = PromptBuilder('investment_analysis').add_section(f"PHÂN TÍCH HỆ THỐNG {symbol}:", [
+            ("Khuyến nghị", f"{recommendation} (Điểm: {score}/100)", PRIORITY_CRITICAL),
+            ("Lý do", base_analysis.get('reason', 'Phân tích tổng hợp'), PRIORITY_HIGH),
+            ("Giá hiện tại", metrics.get('current_price'), PRIORITY_HIGH),
+            ("P/E", metrics.get('pe'), PRIORITY_MEDIUM),
+            ("P/B", metrics.get('pb'), PRIORITY_MEDIUM)
+        ]).build()
+        
         return f"""
 Bạn là chuyên gia đầu tư cho nhà đầu tư {risk_profile}. Phân tích cổ phiếu {symbol}:
 
@@ -1344,9 +1354,7 @@ HỒ SƠ ĐẦU TƯ CỤ THỂ:
 - Chiến lược: {strategy}
 - Mối quan tâm chính: {concern}
 
-PHÂN TÍCH HỆ THỐNG {symbol}:
-- Khuyến nghị: {recommendation} (Điểm: {score}/100)
-- Lý do: {base_analysis.get('reason', 'Phân tích tổng hợp')}
+{system_data}
 
 TÍNH TOÁN CỤ THỂ:
 - Tỷ trọng tối đa: {max_position*100:.0f}% = {investment_amount * max_position:,.0f} VND
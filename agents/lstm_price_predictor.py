@@ -14,6 +14,26 @@ except ImportError:
     KERAS_AVAILABLE = False
     print("⚠️ TensorFlow/Keras not available. LSTM predictions will use fallback methods.")
 
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.executors import stage, run_stage, WorkloadClass
+from src.data.monte_carlo import interval_bands
+from src.data.symbol_master import get_symbol_master
+from src.data.forecast_path import ForecastPath
+
+# Horizon (ngày) của các mốc dự báo LSTM -> khoảng tin cậy Monte Carlo
+INTERVAL_HORIZONS = (1, 3, 7, 14, 30, 60, 90)
+LSTM_PERIODS = {
+    'short_term': [1, 3, 7],
+    'medium_term': [14, 30],
+    'long_term': [60, 90]
+}
+# Nửa độ rộng khoảng tin cậy khi không có band Monte Carlo
+UNCERTAINTY_FACTORS = {1: 0.05, 3: 0.08, 7: 0.12, 14: 0.18, 30: 0.25, 60: 0.35, 90: 0.45}
+
 class LSTMPricePredictor:
     def __init__(self, vn_api=None):
         self.name = "LSTM Price Predictor Agent"
@@ -140,11 +160,22 @@ class LSTMPricePredictor:
     def predict_with_lstm(self, symbol: str, days_ahead: int = 30):
         """Main LSTM prediction function"""
         try:
-            # Get historical data
+            # Get historical data (HTTP - chạy ở thread gọi, không chiếm model worker)
             price_data = self._get_price_data(symbol)
             if price_data is None or len(price_data) < 100:
                 return self._fallback_prediction(symbol, days_ahead)
             
+            # Train + suy luận trên model-inference worker (model sống lâu, tuần tự)
+            return run_stage(self._lstm_forecast, symbol, price_data, days_ahead)
+            
+        except Exception as e:
+            print(f"❌ LSTM prediction failed: {e}")
+            return self._fallback_prediction(symbol, days_ahead)
+    
+    @stage(WorkloadClass.MODEL)
+    def _lstm_forecast(self, symbol: str, price_data, days_ahead: int):
+        """Fit/nạp LSTM và dự báo từ chuỗi giá đã tải"""
+        try:
             # Prepare data for LSTM
             trainX, trainY, testX, testY, dataset = self.prepare_data(price_data)
             if trainX is None:
@@ -169,8 +200,10 @@ class LSTMPricePredictor:
             train_score = np.sqrt(mean_squared_error(trainY[0], train_predict[:, 0]))
             test_score = np.sqrt(mean_squared_error(testY[0], test_predict[:, 0]))
             
-            # Predict future prices
-            future_predictions = self._predict_future_prices(model, dataset, days_ahead)
+            # Predict future prices (đường dày theo phiên, dict lồng chỉ là view cho response)
+            forecast_path = self._predict_future_prices(model, dataset, days_ahead,
+                                                        self._simulated_bands(symbol, price_data))
+            future_predictions = forecast_path.to_nested(LSTM_PERIODS) if forecast_path else {}
             
             # Calculate confidence based on model performance
             confidence = self._calculate_lstm_confidence(train_score, test_score, price_data)
@@ -185,6 +218,7 @@ class LSTMPricePredictor:
                 'method': 'LSTM Neural Network',
                 'current_price': current_price,
                 'predictions': future_predictions,
+                'forecast_path': forecast_path.to_payload() if forecast_path else None,
                 'trend': trend_direction,  # Add trend determination
                 'model_performance': {
                     'train_rmse': round(train_score, 2),
@@ -255,9 +289,19 @@ class LSTMPricePredictor:
             print(f"⚠️ Failed to get price data for {symbol}: {e}")
             return None
     
-    def _predict_future_prices(self, model, dataset, days_ahead):
-        """Enhanced future price prediction with rolling window approach"""
+    def _simulated_bands(self, symbol: str, price_data):
+        """Band khoảng tin cậy theo horizon từ đường giá Monte Carlo (GARCH, chặn trần/sàn)"""
+        try:
+            exchange = get_symbol_master().exchange_of(symbol) if get_symbol_master().is_vn_symbol(symbol) else None
+            return interval_bands(price_data.values, INTERVAL_HORIZONS, exchange)
+        except Exception as e:
+            print(f"⚠️ Monte Carlo intervals unavailable for {symbol}: {e}")
+            return {}
+
+    def _predict_future_prices(self, model, dataset, days_ahead, bands=None):
+        """Enhanced future price prediction with rolling window approach -> ForecastPath theo phiên"""
         try:
+            bands = bands or {}
             # Get last sequence for prediction (use look_back period)
             last_sequence = dataset[-self.look_back:].copy()
             predictions = []
@@ -274,66 +318,25 @@ class LSTMPricePredictor:
                 x_future = np.append(x_future[:, 1:, :], [[pred[0]]], axis=1)
             
             # Inverse transform predictions
-            predictions = np.array(predictions).reshape(-1, 1)
-            predictions = self.scaler.inverse_transform(predictions)
-            
-            # Format predictions by timeframe with confidence intervals
-            formatted_predictions = {}
-            
-            # Short term (1, 3, 7 days) - higher confidence
-            formatted_predictions['short_term'] = {
-                '1_days': {
-                    'price': round(float(predictions[0]), 2), 
-                    'days': 1,
-                    'confidence_interval': self._calculate_confidence_interval(predictions[0], 0.05)
-                },
-                '3_days': {
-                    'price': round(float(predictions[2]), 2), 
-                    'days': 3,
-                    'confidence_interval': self._calculate_confidence_interval(predictions[2], 0.08)
-                },
-                '7_days': {
-                    'price': round(float(predictions[6]), 2), 
-                    'days': 7,
-                    'confidence_interval': self._calculate_confidence_interval(predictions[6], 0.12)
-                }
-            }
-            
-            # Medium term (14, 30 days)
-            if days_ahead >= 30:
-                formatted_predictions['medium_term'] = {
-                    '14_days': {
-                        'price': round(float(predictions[13]), 2), 
-                        'days': 14,
-                        'confidence_interval': self._calculate_confidence_interval(predictions[13], 0.18)
-                    },
-                    '30_days': {
-                        'price': round(float(predictions[29]), 2), 
-                        'days': 30,
-                        'confidence_interval': self._calculate_confidence_interval(predictions[29], 0.25)
-                    }
-                }
-            
-            # Long term (60, 90 days) - lower confidence
-            if days_ahead >= 90:
-                formatted_predictions['long_term'] = {
-                    '60_days': {
-                        'price': round(float(predictions[59]), 2), 
-                        'days': 60,
-                        'confidence_interval': self._calculate_confidence_interval(predictions[59], 0.35)
-                    },
-                    '90_days': {
-                        'price': round(float(predictions[89]), 2), 
-                        'days': 90,
-                        'confidence_interval': self._calculate_confidence_interval(predictions[89], 0.45)
-                    }
-                }
+            predictions = self.scaler.inverse_transform(np.array(predictions).reshape(-1, 1))[:, 0]
+            current_price = float(self.scaler.inverse_transform(dataset[-1:].reshape(-1, 1))[0, 0])
+            
+            # Khoảng tin cậy cho từng phiên: band Monte Carlo nếu có, không thì hệ số cố định theo horizon
+            steps = np.arange(1, days_ahead + 1)
+            horizons = sorted(bands) if bands else list(UNCERTAINTY_FACTORS)
+            if bands:
+                lower = predictions * np.interp(steps, horizons, [bands[h]['lower'] for h in horizons])
+                upper = predictions * np.interp(steps, horizons, [bands[h]['upper'] for h in horizons])
+            else:
+                factor = np.interp(steps, horizons, [UNCERTAINTY_FACTORS[h] for h in horizons])
+                lower, upper = predictions * (1 - factor), predictions * (1 + factor)
             
-            return formatted_predictions
+            return ForecastPath(datetime.now(), current_price, predictions, lower, upper,
+                                interval_method='monte_carlo' if bands else None)
             
         except Exception as e:
             print(f"❌ Future prediction failed: {e}")
-            return {}
+            return None
     
     def _calculate_lstm_confidence(self, train_rmse, test_rmse, price_data):
         """Calculate confidence based on LSTM model performance"""
@@ -384,23 +387,6 @@ class LSTMPricePredictor:
         except Exception as e:
             return 'neutral'
     
-    def _calculate_confidence_interval(self, prediction, uncertainty_factor):
-        """Calculate confidence interval for predictions"""
-        try:
-            lower_bound = prediction * (1 - uncertainty_factor)
-            upper_bound = prediction * (1 + uncertainty_factor)
-            return {
-                'lower': round(float(lower_bound), 2),
-                'upper': round(float(upper_bound), 2),
-                'uncertainty': round(uncertainty_factor * 100, 1)
-            }
-        except Exception as e:
-            return {
-                'lower': float(prediction),
-                'upper': float(prediction),
-                'uncertainty': 0.0
-            }
-    
     def _fallback_prediction(self, symbol: str, days_ahead: int):
         """Fallback prediction when LSTM fails"""
         try:
@@ -478,7 +464,7 @@ class LSTMPricePredictor:
             return 'neutral'
     
     def predict_with_ai_enhancement(self, symbol: str, days_ahead: int = 30):
-        """LSTM prediction with AI enhancement"""
+        """LSTM prediction with AI enhancement (Gemini gọi ở thread gọi, chỉ LSTM chạy trên model worker)"""
         # Get base LSTM prediction
         lstm_result = self.predict_with_lstm(symbol, days_ahead)
         
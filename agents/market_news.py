@@ -4,6 +4,7 @@ from datetime import datetime
 import re
 import asyncio
 from agents.risk_based_news import RiskBasedNewsAgent
+from src.utils.prompt_builder import PromptBuilder
 
 class MarketNews:
     def __init__(self):
@@ -189,11 +190,8 @@ class MarketNews:
         """Get AI-enhanced market analysis"""
         try:
             # Prepare market news context for AI analysis
-            news_titles = []
-            for news_item in base_news.get('news', []):
-                news_titles.append(f"- {news_item.get('title', '')}")
-            
-            news_context = "\n".join(news_titles[:8])  # Limit to top 8 news
+            # Top-k tiêu đề (đã loại trùng) trong ngân sách token
+            news_context = PromptBuilder('market_analysis').add_news("", base_news.get('news', []), top_k=8).build()
             
             context = f"""
 Phân tích thị trường chứng khoán Việt Nam dựa trên tin tức mới nhất:
@@ -217,7 +215,7 @@ Trả lời ngắn gọn, tập trung vào những điểm quan trọng nhất.
 """
             
             # Get AI analysis
-            ai_result = self.ai_agent.generate_with_fallback(context, 'market_analysis', max_tokens=600)
+            ai_result = self.ai_agent.generate_cached(context, 'market_analysis', max_tokens=600, template_id='market_news_v1')
             
             if ai_result['success']:
                 return {
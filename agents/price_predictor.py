@@ -13,6 +13,106 @@ except ImportError:
     LSTM_AVAILABLE = False
     print("⚠️ LSTM predictor not available. Using traditional methods only.")
 
+# Add project root to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.executors import stage, run_stage, WorkloadClass
+from src.data.prediction_ledger import get_prediction_ledger
+from src.data.forecaster import forecast_grid, stack_indicators, format_predictions
+from src.data.forecast_path import ForecastPath
+from src.data.intraday import get_intraday_buffers, minutes_to_close, SESSION_MINUTES
+from src.utils.trading_calendar import get_trading_calendar
+from src.data.monte_carlo import simulate_paths, bands_from_paths, path_var, apply_band
+from src.data.symbol_master import get_symbol_master
+from src.utils.helpers import risk_metrics_matrix
+
+# Phiên bản thuật toán ghi vào prediction ledger (đổi khi sửa logic dự báo)
+MODEL_VERSIONS = {
+    'traditional': 'heuristic-1',
+    'lstm': 'lstm-2x50-lb60',
+    'intraday': 'intraday-1'
+}
+
+# Khung confidence -> horizon (ngày) dùng để tra độ chính xác thực tế trong ledger
+CONFIDENCE_HORIZONS = {'short_term': 7, 'medium_term': 30, 'long_term': 180}
+
+@stage(WorkloadClass.CPU)
+def compute_advanced_indicators(data):
+    """Tính toán các chỉ báo kỹ thuật nâng cao (CPU stage, chạy được trong process pool)"""
+    try:
+        indicators = {}
+        
+        # Moving Averages
+        indicators['sma_5'] = data['close'].rolling(5).mean().iloc[-1]
+        indicators['sma_20'] = data['close'].rolling(20).mean().iloc[-1]
+        indicators['sma_50'] = data['close'].rolling(50).mean().iloc[-1]
+        indicators['sma_200'] = data['close'].rolling(200).mean().iloc[-1]
+        
+        # Exponential Moving Averages
+        indicators['ema_12'] = data['close'].ewm(span=12).mean().iloc[-1]
+        indicators['ema_26'] = data['close'].ewm(span=26).mean().iloc[-1]
+        
+        # MACD
+        macd_line = indicators['ema_12'] - indicators['ema_26']
+        signal_line = pd.Series([macd_line]).ewm(span=9).mean().iloc[0]
+        indicators['macd'] = macd_line
+        indicators['macd_signal'] = signal_line
+        indicators['macd_histogram'] = macd_line - signal_line
+        
+        # RSI
+        delta = data['close'].diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+        rs = gain / loss
+        indicators['rsi'] = (100 - (100 / (1 + rs))).iloc[-1]
+        
+        # Bollinger Bands
+        sma_20 = data['close'].rolling(20).mean()
+        std_20 = data['close'].rolling(20).std()
+        indicators['bb_upper'] = (sma_20 + (std_20 * 2)).iloc[-1]
+        indicators['bb_middle'] = sma_20.iloc[-1]
+        indicators['bb_lower'] = (sma_20 - (std_20 * 2)).iloc[-1]
+        indicators['bb_position'] = (data['close'].iloc[-1] - indicators['bb_lower']) / (indicators['bb_upper'] - indicators['bb_lower'])
+        
+        # Stochastic Oscillator
+        low_14 = data['low'].rolling(14).min()
+        high_14 = data['high'].rolling(14).max()
+        k_percent = 100 * ((data['close'] - low_14) / (high_14 - low_14))
+        indicators['stoch_k'] = k_percent.iloc[-1]
+        indicators['stoch_d'] = k_percent.rolling(3).mean().iloc[-1]
+        
+        # Williams %R
+        indicators['williams_r'] = -100 * ((high_14.iloc[-1] - data['close'].iloc[-1]) / (high_14.iloc[-1] - low_14.iloc[-1]))
+        
+        # Average True Range (ATR)
+        high_low = data['high'] - data['low']
+        high_close = np.abs(data['high'] - data['close'].shift())
+        low_close = np.abs(data['low'] - data['close'].shift())
+        true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+        indicators['atr'] = true_range.rolling(14).mean().iloc[-1]
+        
+        # Volume indicators
+        if 'volume' in data.columns:
+            indicators['volume_sma'] = data['volume'].rolling(20).mean().iloc[-1]
+            indicators['volume_ratio'] = data['volume'].iloc[-1] / indicators['volume_sma']
+            
+            # On-Balance Volume (OBV)
+            obv = (np.sign(data['close'].diff()) * data['volume']).fillna(0).cumsum()
+            indicators['obv'] = obv.iloc[-1]
+            indicators['obv_trend'] = obv.rolling(10).mean().iloc[-1] - obv.rolling(20).mean().iloc[-1]
+        
+        # Volatility
+        returns = data['close'].pct_change().dropna()
+        indicators['volatility'] = returns.std() * np.sqrt(252) * 100
+        indicators['volatility_percentile'] = (returns.rolling(252).std().iloc[-1] > returns.rolling(252).std().quantile(0.8))
+        
+        return {k: round(float(v), 4) if isinstance(v, (int, float, np.number)) and not (np.isnan(float(v)) if isinstance(v, (int, float, np.number)) else False) else v for k, v in indicators.items()}
+        
+    except Exception as e:
+        return {"error": f"Indicator calculation error: {str(e)}"}
+
+
 class PricePredictor:
     def __init__(self, vn_api=None, stock_info=None):
         self.name = "Advanced Price Predictor Agent with LSTM"
@@ -169,6 +269,9 @@ class PricePredictor:
             # Phân tích rủi ro
             risk_analysis = self._analyze_risk_metrics(hist_data)
             
+            # Khoảng tin cậy + VaR theo đường giá mô phỏng (chặn biên độ theo sàn)
+            self._apply_monte_carlo(hist_data, predictions, risk_analysis, get_symbol_master().exchange_of(symbol))
+            
             result = {
                 "symbol": symbol,
                 "current_price": round(float(current_price), 2),
@@ -178,6 +281,7 @@ class PricePredictor:
                 "technical_indicators": technical_indicators,
                 "trend_analysis": trend_analysis,
                 "predictions": predictions,
+                "forecast_path": self._forecast_path_payload(predictions, current_price),
                 "confidence_scores": confidence_scores,
                 "risk_analysis": risk_analysis,
                 "recommendations": self._generate_recommendations(predictions, confidence_scores, risk_analysis)
@@ -228,6 +332,9 @@ class PricePredictor:
             # Phân tích rủi ro
             risk_analysis = self._analyze_risk_metrics(hist)
             
+            # Khoảng tin cậy + VaR theo đường giá mô phỏng (không có biên độ trần/sàn)
+            self._apply_monte_carlo(hist, predictions, risk_analysis, None)
+            
             return {
                 "symbol": symbol,
                 "current_price": round(float(hist['close'].iloc[-1]), 2),
@@ -237,6 +344,7 @@ class PricePredictor:
                 "technical_indicators": technical_indicators,
                 "trend_analysis": trend_analysis,
                 "predictions": predictions,
+                "forecast_path": self._forecast_path_payload(predictions, hist['close'].iloc[-1]),
                 "confidence_scores": confidence_scores,
                 "risk_analysis": risk_analysis,
                 "recommendations": self._generate_recommendations(predictions, confidence_scores, risk_analysis)
@@ -246,78 +354,8 @@ class PricePredictor:
             return {"error": f"International stock prediction error: {str(e)}"}
 
     def _calculate_advanced_indicators(self, data):
-        """Tính toán các chỉ báo kỹ thuật nâng cao"""
-        try:
-            indicators = {}
-            
-            # Moving Averages
-            indicators['sma_5'] = data['close'].rolling(5).mean().iloc[-1]
-            indicators['sma_20'] = data['close'].rolling(20).mean().iloc[-1]
-            indicators['sma_50'] = data['close'].rolling(50).mean().iloc[-1]
-            indicators['sma_200'] = data['close'].rolling(200).mean().iloc[-1]
-            
-            # Exponential Moving Averages
-            indicators['ema_12'] = data['close'].ewm(span=12).mean().iloc[-1]
-            indicators['ema_26'] = data['close'].ewm(span=26).mean().iloc[-1]
-            
-            # MACD
-            macd_line = indicators['ema_12'] - indicators['ema_26']
-            signal_line = pd.Series([macd_line]).ewm(span=9).mean().iloc[0]
-            indicators['macd'] = macd_line
-            indicators['macd_signal'] = signal_line
-            indicators['macd_histogram'] = macd_line - signal_line
-            
-            # RSI
-            delta = data['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            indicators['rsi'] = (100 - (100 / (1 + rs))).iloc[-1]
-            
-            # Bollinger Bands
-            sma_20 = data['close'].rolling(20).mean()
-            std_20 = data['close'].rolling(20).std()
-            indicators['bb_upper'] = (sma_20 + (std_20 * 2)).iloc[-1]
-            indicators['bb_middle'] = sma_20.iloc[-1]
-            indicators['bb_lower'] = (sma_20 - (std_20 * 2)).iloc[-1]
-            indicators['bb_position'] = (data['close'].iloc[-1] - indicators['bb_lower']) / (indicators['bb_upper'] - indicators['bb_lower'])
-            
-            # Stochastic Oscillator
-            low_14 = data['low'].rolling(14).min()
-            high_14 = data['high'].rolling(14).max()
-            k_percent = 100 * ((data['close'] - low_14) / (high_14 - low_14))
-            indicators['stoch_k'] = k_percent.iloc[-1]
-            indicators['stoch_d'] = k_percent.rolling(3).mean().iloc[-1]
-            
-            # Williams %R
-            indicators['williams_r'] = -100 * ((high_14.iloc[-1] - data['close'].iloc[-1]) / (high_14.iloc[-1] - low_14.iloc[-1]))
-            
-            # Average True Range (ATR)
-            high_low = data['high'] - data['low']
-            high_close = np.abs(data['high'] - data['close'].shift())
-            low_close = np.abs(data['low'] - data['close'].shift())
-            true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-            indicators['atr'] = true_range.rolling(14).mean().iloc[-1]
-            
-            # Volume indicators
-            if 'volume' in data.columns:
-                indicators['volume_sma'] = data['volume'].rolling(20).mean().iloc[-1]
-                indicators['volume_ratio'] = data['volume'].iloc[-1] / indicators['volume_sma']
-                
-                # On-Balance Volume (OBV)
-                obv = (np.sign(data['close'].diff()) * data['volume']).fillna(0).cumsum()
-                indicators['obv'] = obv.iloc[-1]
-                indicators['obv_trend'] = obv.rolling(10).mean().iloc[-1] - obv.rolling(20).mean().iloc[-1]
-            
-            # Volatility
-            returns = data['close'].pct_change().dropna()
-            indicators['volatility'] = returns.std() * np.sqrt(252) * 100
-            indicators['volatility_percentile'] = (returns.rolling(252).std().iloc[-1] > returns.rolling(252).std().quantile(0.8))
-            
-            return {k: round(float(v), 4) if isinstance(v, (int, float, np.number)) and not (np.isnan(float(v)) if isinstance(v, (int, float, np.number)) else False) else v for k, v in indicators.items()}
-            
-        except Exception as e:
-            return {"error": f"Indicator calculation error: {str(e)}"}
+        """Tính toán các chỉ báo kỹ thuật nâng cao (đẩy sang CPU process pool)"""
+        return run_stage(compute_advanced_indicators, data)
     
     def _analyze_market_trend(self, data, predictions=None):
         """Phân tích xu hướng thị trường với logic tối ưu"""
@@ -718,143 +756,20 @@ class PricePredictor:
             return 50
     
     def _generate_multi_timeframe_predictions(self, data, indicators, ml_predictions=None):
-        """Tạo dự đoán theo nhiều khung thời gian"""
+        """Tạo dự đoán theo nhiều khung thời gian (lưới horizon vector hoá trong src/data/forecaster.py)"""
         try:
             current_price = float(data['close'].iloc[-1])
-            predictions = {}
-            
-            # Lấy các yếu tố dự đoán
-            volatility = indicators.get('volatility', 20) / 100
-            rsi = indicators.get('rsi', 50)
-            macd_signal = 1 if indicators.get('macd', 0) > indicators.get('macd_signal', 0) else -1
-            bb_position = indicators.get('bb_position', 0.5)
-            
-            # Tính toán hệ số điều chỉnh dựa trên các chỉ báo
-            trend_multiplier = self._calculate_trend_multiplier(indicators, rsi, bb_position)
             
             # Use ML ensemble prediction if available
-            ml_adjustment = 0
+            ml_adjustment = None
             if ml_predictions and not ml_predictions.get('error'):
                 ensemble_pred = ml_predictions.get('ensemble_prediction', current_price)
-                ml_adjustment = (ensemble_pred - current_price) / current_price
-                # Limit ML adjustment to reasonable range
-                ml_adjustment = max(-0.15, min(0.15, ml_adjustment))
+                ml_adjustment = [(ensemble_pred - current_price) / current_price]
             
-            for period_type, days_list in self.prediction_periods.items():
-                predictions[period_type] = {}
-                
-                for days in days_list:
-                    # Set current prediction days for trend multiplier calculation
-                    self._current_prediction_days = days
-                    # Thuật toán dự đoán kết hợp nhiều yếu tố + ML
-                    base_change = self._calculate_base_change(days, volatility, trend_multiplier)
-                    
-                    # Apply ML adjustment with time decay
-                    time_decay = max(0.1, 1 - (days / 365))  # ML more relevant for shorter periods
-                    ml_contribution = ml_adjustment * time_decay * 0.3  # 30% weight for ML
-                    
-                    # Điều chỉnh dựa trên MACD
-                    macd_adjustment = macd_signal * min(0.02, volatility * 0.1) * (days / 30)
-                    
-                    # Điều chỉnh dựa trên RSI
-                    rsi_adjustment = self._calculate_rsi_adjustment(rsi, days)
-                    
-                    # Điều chỉnh dựa trên Bollinger Bands
-                    bb_adjustment = self._calculate_bb_adjustment(bb_position, days)
-                    
-                    # Tổng hợp các điều chỉnh bao gồm ML
-                    total_change = base_change + ml_contribution + macd_adjustment + rsi_adjustment + bb_adjustment
-                    
-                    # ENHANCED FIX: Ensure meaningful price changes with better logic
-                    min_change = max(0.005, 0.002 * (days / 7))  # Minimum 0.5% or 0.2% per week
-                    
-                    if abs(total_change) < min_change:
-                        # Apply intelligent directional bias
-                        trend_bias = 0
-                        
-                        # RSI-based bias
-                        if rsi > 60:
-                            trend_bias += 0.3
-                        elif rsi > 50:
-                            trend_bias += 0.1
-                        elif rsi < 40:
-                            trend_bias -= 0.3
-                        elif rsi < 50:
-                            trend_bias -= 0.1
-                        
-                        # MACD-based bias
-                        if macd_signal > 0:
-                            trend_bias += 0.2
-                        else:
-                            trend_bias -= 0.2
-                        
-                        # Apply bias with time scaling
-                        if trend_bias > 0:
-                            total_change = min_change * (1 + trend_bias)
-                        elif trend_bias < 0:
-                            total_change = -min_change * (1 + abs(trend_bias))
-                        else:
-                            # Neutral bias - small random movement
-                            total_change = min_change * (1 if np.random.random() > 0.5 else -1) * 0.5
-                    
-                    # Enhanced max change calculation
-                    base_max_change = max(0.03, min(0.4, volatility * 2.5 * (days / 30)))  # Minimum 3% max change
-                    time_adjusted_max = base_max_change * (1 + days / 365)  # Increase with time
-                    max_change = min(0.5, time_adjusted_max)  # Cap at 50%
-                    
-                    total_change = max(-max_change, min(max_change, total_change))
-                    
-                    # FINAL VALIDATION: Ensure total_change is meaningful - FIXED for 1-day predictions
-                    min_meaningful_change = 0.008 if days == 1 else 0.005 if days <= 3 else 0.003  # Higher threshold for short-term
-                    if abs(total_change) < min_meaningful_change:
-                        direction = 1 if (rsi > 50 and macd_signal > 0) else -1
-                        if days == 1:
-                            total_change = 0.012 * direction  # 1.2% minimum for 1-day
-                        elif days <= 3:
-                            total_change = 0.008 * direction  # 0.8% minimum for 2-3 days
-                        else:
-                            total_change = 0.005 * direction * (1 + days / 100)  # Scale with time for longer periods
-                    
-                    predicted_price = current_price * (1 + total_change)
-                    
-                    # Ensure predicted price is meaningfully different - FIXED for 1-day predictions
-                    if days == 1:
-                        min_price_diff = max(0.1, current_price * 0.012)  # Minimum 1.2% or 0.1 VND for 1-day
-                    elif days <= 3:
-                        min_price_diff = max(0.08, current_price * 0.008)  # Minimum 0.8% or 0.08 VND for 2-3 days
-                    else:
-                        min_price_diff = max(0.05, current_price * 0.005)  # Minimum 0.5% or 0.05 VND for longer periods
-                    
-                    if abs(predicted_price - current_price) < min_price_diff:
-                        adjustment = min_price_diff / current_price
-                        predicted_price = current_price * (1 + (adjustment if total_change >= 0 else -adjustment))
-                        total_change = (predicted_price - current_price) / current_price
-                    
-                    # Harmonize with UI logic for consistent display in app.py
-                    predicted_price = self._apply_safe_change_logic(predicted_price, current_price)
-                    total_change = (predicted_price - current_price) / current_price
-                    
-                    # Calculate final values
-                    change_percent = round(total_change * 100, 2)
-                    change_amount = round(predicted_price - current_price, 2)
-                    
-                    # ENHANCED DEBUG: More detailed logging
-                    if hasattr(self, 'debug_mode') and self.debug_mode:
-                        print(f"🔍 {days}d: base={base_change:.4f}, total={total_change:.4f}, price={current_price:.2f}->{predicted_price:.2f}, change={change_percent}%")
-                    
-                    predictions[period_type][f"{days}_days"] = {
-                        "price": round(predicted_price, 2),
-                        "change_percent": change_percent,
-                        "change_amount": change_amount,
-                        "debug_info": {
-                            "base_change": round(base_change, 4),
-                            "total_change": round(total_change, 4),
-                            "trend_multiplier": round(trend_multiplier, 4),
-                            "volatility": round(volatility, 2)
-                        }
-                    }
-            
-            return predictions
+            horizons = [days for days_list in self.prediction_periods.values() for days in days_list]
+            grid = forecast_grid(stack_indicators([indicators]), [current_price], horizons, ml_adjustment)
+            volatility = indicators.get('volatility', 20) / 100
+            return format_predictions(grid, 0, current_price, volatility, self.prediction_periods)
             
         except Exception as e:
             return {"error": f"Prediction generation error: {str(e)}"}
@@ -863,12 +778,17 @@ class PricePredictor:
         """Simple price prediction for backward compatibility"""
         return self.predict_comprehensive(symbol, self.vn_api, self.stock_info)
     
-    def predict_price_enhanced(self, symbol: str, days: int = 30, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 10000000):
-        """Enhanced price prediction with LSTM priority and AI analysis"""
+    def predict_price_enhanced(self, symbol: str, days: int = 30, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 10000000, use_ai: bool = True):
+        """Enhanced price prediction with LSTM priority and AI analysis
+        use_ai=False: bỏ qua AI enrichment (MainAgent sẽ làm enrichment gộp)"""
         # Try LSTM first if available and prioritize it
         if self.lstm_predictor:
             try:
-                lstm_result = self.lstm_predictor.predict_with_ai_enhancement(symbol, days)
+                # Phần fit/suy luận LSTM tự chuyển sang model-inference worker; tải giá + Gemini chạy ở thread này
+                if use_ai:
+                    lstm_result = self.lstm_predictor.predict_with_ai_enhancement(symbol, days)
+                else:
+                    lstm_result = self.lstm_predictor.predict_with_lstm(symbol, days)
                 if not lstm_result.get('error') and lstm_result['model_performance']['confidence'] > 20:
                     # LSTM successful with acceptable confidence - use it as primary
                     combined_result = self._combine_lstm_with_traditional(lstm_result, symbol)
@@ -888,6 +808,7 @@ class PricePredictor:
                         combined_result['trend'] = combined_result.get('trend_analysis', {}).get('direction', 'neutral')
                         combined_result['method_used'] = 'LSTM Primary'
                     
+                    self._record_forecasts(symbol, combined_result, 'lstm')
                     return combined_result
                 else:
                     print(f"⚠️ LSTM confidence too low ({lstm_result.get('model_performance', {}).get('confidence', 0)}%) or error, falling back to traditional")
@@ -923,7 +844,7 @@ class PricePredictor:
         )
         
         # Add AI enhancement if available - ALWAYS try to get AI advice
-        if self.ai_agent:
+        if self.ai_agent and use_ai:
             try:
                 ai_analysis = self._get_ai_price_analysis(symbol, result, days, risk_tolerance, time_horizon)
                 result.update(ai_analysis)
@@ -944,13 +865,28 @@ class PricePredictor:
                 print(f"⚠️ AI analysis failed: {e}")
                 result['ai_enhanced'] = False
                 result['ai_error'] = str(e)
-        else:
+        elif not self.ai_agent:
             # No AI agent available
             result['ai_enhanced'] = False
             result['ai_error'] = 'AI agent not configured'
         
+        self._record_forecasts(symbol, result, 'traditional')
         return result
     
+    def _record_forecasts(self, symbol: str, result: dict, method: str):
+        """Ghi dự báo đã trả vào prediction ledger (chỉ vào buffer, không I/O)"""
+        try:
+            if self.vn_api and not self.vn_api.is_vn_stock(symbol):
+                return  # Ledger chấm bằng bảng nến VN
+            ledger = get_prediction_ledger()
+            if result.get('prediction_type') == 'intraday_close':
+                ledger.record(symbol, 0, result['predicted_close_price'], result['current_price'],
+                              method, MODEL_VERSIONS.get(method))
+            else:
+                ledger.record_result(symbol, result, method, MODEL_VERSIONS.get(method))
+        except Exception as e:
+            print(f"⚠️ Prediction ledger record failed: {e}")
+    
     def _combine_lstm_with_traditional(self, lstm_result: dict, symbol: str):
         """Combine LSTM predictions with traditional technical analysis"""
         try:
@@ -976,6 +912,7 @@ class PricePredictor:
                 
                 # Use LSTM predictions as primary
                 'predictions': lstm_result['predictions'],
+                'forecast_path': lstm_result.get('forecast_path') or traditional_result.get('forecast_path'),
                 'lstm_confidence': lstm_result['model_performance']['confidence'],
                 'lstm_method': lstm_result['method'],
                 
@@ -1018,12 +955,20 @@ class PricePredictor:
                 'lstm_confidence': lstm_confidence,
                 'combined_method': True
             }
+            # Dự báo phục vụ là LSTM -> tra độ chính xác thực tế của LSTM, không phải heuristic
+            self._blend_ledger_confidence(combined_scores, 'lstm')
             
             return combined_scores
             
         except Exception as e:
             return {'short_term': 50, 'medium_term': 50, 'long_term': 50, 'error': str(e)}
     
+    def _blend_ledger_confidence(self, scores: dict, method: str):
+        """Có đủ dự báo đã đáo hạn của method -> trộn tỷ lệ đúng hướng thực tế vào heuristic"""
+        ledger = get_prediction_ledger()
+        for timeframe, horizon in CONFIDENCE_HORIZONS.items():
+            scores[timeframe] = round(max(10, min(95, ledger.blend_confidence(method, horizon, scores[timeframe]))), 1)
+    
     def _generate_combined_recommendations(self, lstm_result: dict, traditional_result: dict):
         """Generate recommendations combining LSTM and traditional analysis"""
         try:
@@ -1274,7 +1219,11 @@ REASONING: [giải thích ngắn]
 """
                     
                     # Use shorter timeout to avoid 503 errors
-                    ai_result = self.ai_agent.generate_with_fallback(context, 'price_prediction', max_tokens=300)
+                    ai_result = self.ai_agent.generate_cached(
+                        context, 'price_prediction', max_tokens=300, template_id='price_advice_v1',
+                        fingerprint={'symbol': symbol, 'price': current_price, 'rsi': rsi, 'trend': trend_direction,
+                                     'risk_tolerance': risk_tolerance, 'time_horizon': time_horizon}
+                    )
                     
                     if ai_result.get('success') and ai_result.get('response'):
                         # Parse AI response for advice and reasoning
@@ -1522,346 +1471,8 @@ REASONING: [giải thích ngắn]
             print(f"⚠️ AI adjustment application failed: {e}")
             return base_predictions
     
-    def _calculate_trend_multiplier(self, indicators, rsi, bb_position):
-        """Tính toán hệ số xu hướng với độ nhạy cao và biến động thực tế"""
-        multiplier = 0.05  # Reduced base positive bias for more realistic results
-        
-        # Enhanced RSI influence with smoother transitions
-        rsi_normalized = (rsi - 50) / 50  # Normalize RSI to -1 to 1 range
-        
-        if rsi > 85:
-            multiplier -= 0.5  # Extremely overbought - strong reversal signal
-        elif rsi > 75:
-            multiplier -= 0.3  # Very overbought
-        elif rsi > 65:
-            multiplier -= 0.1  # Moderately overbought
-        elif rsi > 55:
-            multiplier += 0.2  # Bullish momentum
-        elif rsi > 45:
-            multiplier += 0.1  # Slight bullish bias
-        elif rsi > 35:
-            multiplier -= 0.1  # Slight bearish bias
-        elif rsi > 25:
-            multiplier += 0.2  # Oversold - potential bounce
-        elif rsi > 15:
-            multiplier += 0.4  # Very oversold
-        else:
-            multiplier += 0.6  # Extremely oversold - strong bounce potential
-        
-        # Enhanced Bollinger Bands with momentum consideration
-        bb_momentum = bb_position - 0.5  # -0.5 to 0.5 range
-        
-        if bb_position > 0.95:
-            multiplier -= 0.4  # Extreme upper band - reversal likely
-        elif bb_position > 0.85:
-            multiplier -= 0.2  # Near upper band
-        elif bb_position > 0.65:
-            multiplier += 0.1  # Upper half - bullish but cautious
-        elif bb_position > 0.35:
-            multiplier += 0.05  # Middle range - neutral with slight bias
-        elif bb_position > 0.15:
-            multiplier += 0.15  # Lower half - potential support
-        elif bb_position > 0.05:
-            multiplier += 0.3  # Near lower band - strong support
-        else:
-            multiplier += 0.5  # Extreme lower band - strong bounce potential
-        
-        # Enhanced MACD with histogram consideration
-        macd = indicators.get('macd', 0)
-        macd_signal = indicators.get('macd_signal', 0)
-        macd_histogram = indicators.get('macd_histogram', macd - macd_signal)
-        
-        # MACD line vs signal line
-        if macd > macd_signal:
-            if macd_histogram > 0.02:  # Strong bullish momentum
-                multiplier += 0.25
-            elif macd_histogram > 0.005:  # Moderate bullish
-                multiplier += 0.15
-            else:  # Weak bullish
-                multiplier += 0.08
-        else:
-            if macd_histogram < -0.02:  # Strong bearish momentum
-                multiplier -= 0.25
-            elif macd_histogram < -0.005:  # Moderate bearish
-                multiplier -= 0.15
-            else:  # Weak bearish
-                multiplier -= 0.08
-        
-        # Enhanced moving average analysis with trend strength
-        sma_5 = indicators.get('sma_5', 0)
-        sma_20 = indicators.get('sma_20', 0)
-        sma_50 = indicators.get('sma_50', 0)
-        sma_200 = indicators.get('sma_200', 0)
-        
-        # Calculate trend strength
-        trend_score = 0
-        if sma_5 > sma_20:
-            trend_score += 1
-        if sma_20 > sma_50:
-            trend_score += 1
-        if sma_50 > sma_200:
-            trend_score += 1
-        if sma_5 < sma_20:
-            trend_score -= 1
-        if sma_20 < sma_50:
-            trend_score -= 1
-        if sma_50 < sma_200:
-            trend_score -= 1
-        
-        # Apply trend score
-        if trend_score >= 2:  # Strong uptrend
-            multiplier += 0.2
-        elif trend_score == 1:  # Moderate uptrend
-            multiplier += 0.1
-        elif trend_score <= -2:  # Strong downtrend
-            multiplier -= 0.2
-        elif trend_score == -1:  # Moderate downtrend
-            multiplier -= 0.1
-        
-        # Volume confirmation with more nuanced approach
-        volume_ratio = indicators.get('volume_ratio', 1.0)
-        if volume_ratio > 2.0:  # Extremely high volume
-            multiplier *= 1.4  # Strong confirmation
-        elif volume_ratio > 1.5:  # High volume
-            multiplier *= 1.25
-        elif volume_ratio > 1.2:  # Above average volume
-            multiplier *= 1.1
-        elif volume_ratio < 0.5:  # Very low volume
-            multiplier *= 0.7  # Weak signal
-        elif volume_ratio < 0.8:  # Below average volume
-            multiplier *= 0.85
-        
-        # Add volatility consideration
-        volatility = indicators.get('volatility', 25)
-        if volatility > 40:  # High volatility - amplify signals
-            multiplier *= 1.3
-        elif volatility > 30:
-            multiplier *= 1.15
-        elif volatility < 15:  # Low volatility - dampen signals
-            multiplier *= 0.8
-        elif volatility < 20:
-            multiplier *= 0.9
-        
-        # Ensure multiplier is within enhanced bounds
-        multiplier = max(-1.2, min(1.2, multiplier))
-        
-        # Enhanced minimum threshold to ensure meaningful changes
-        min_threshold = 0.12  # Increased from 0.08 to 0.12 for more meaningful changes
-        if abs(multiplier) < min_threshold:
-            # Determine direction based on multiple factors with enhanced scoring
-            direction_score = 0
-            
-            # RSI scoring with more weight
-            if rsi > 60:
-                direction_score += 2
-            elif rsi > 50:
-                direction_score += 1
-            elif rsi < 40:
-                direction_score -= 2
-            elif rsi < 50:
-                direction_score -= 1
-            
-            # Bollinger Bands scoring
-            if bb_position > 0.6:
-                direction_score += 1
-            elif bb_position < 0.4:
-                direction_score -= 1
-            
-            # MACD scoring with histogram consideration
-            if macd > macd_signal:
-                if macd_histogram > 0.01:
-                    direction_score += 2
-                else:
-                    direction_score += 1
-            else:
-                if macd_histogram < -0.01:
-                    direction_score -= 2
-                else:
-                    direction_score -= 1
-            
-            # Trend score with enhanced weight
-            if trend_score >= 2:
-                direction_score += 2
-            elif trend_score == 1:
-                direction_score += 1
-            elif trend_score <= -2:
-                direction_score -= 2
-            elif trend_score == -1:
-                direction_score -= 1
-            
-            # Apply directional bias with enhanced thresholds
-            if direction_score >= 4:
-                multiplier = min_threshold * 1.2  # Strong bullish
-            elif direction_score >= 2:
-                multiplier = min_threshold  # Moderate bullish
-            elif direction_score <= -4:
-                multiplier = -min_threshold * 1.2  # Strong bearish
-            elif direction_score <= -2:
-                multiplier = -min_threshold  # Moderate bearish
-            else:
-                # Weak signal - use small directional bias
-                multiplier = min_threshold * 0.6 * (1 if direction_score > 0 else -1 if direction_score < 0 else 0.5)
-        
-        # Final validation - ensure multiplier will create meaningful price changes - ENHANCED for short-term
-        min_multiplier = 0.12 if hasattr(self, '_current_prediction_days') and self._current_prediction_days == 1 else 0.08
-        if abs(multiplier) < min_multiplier:
-            multiplier = min_multiplier * (1 if multiplier >= 0 else -1)
-        
-        return multiplier
-    
-    def _calculate_base_change(self, days, volatility, trend_multiplier):
-        """Tính toán thay đổi cơ bản với độ biến động thực tế và meaningful changes"""
-        # Enhanced time factor with more realistic scaling
-        time_factor = np.sqrt(days / 252)  # Use trading days (252) instead of calendar days
-        
-        # Enhanced volatility adjustment with better minimum
-        effective_volatility = max(0.20, volatility / 100)  # Minimum 20% annual volatility for VN stocks
-        
-        # Base change with enhanced trend multiplier impact
-        base_change = trend_multiplier * effective_volatility * time_factor * 1.5  # Amplify base change
-        
-        # Market regime factor with more realistic distribution
-        market_regimes = [0.7, 0.9, 1.0, 1.1, 1.3]  # Bear, weak bear, neutral, weak bull, bull
-        regime_probabilities = [0.15, 0.20, 0.30, 0.20, 0.15]  # More balanced distribution
-        market_regime_factor = np.random.choice(market_regimes, p=regime_probabilities)
-        
-        # Time-specific factors with better scaling
-        if days <= 3:  # Very short-term: high volatility
-            time_multiplier = 2.0
-            random_range = 0.015  # ±1.5% random
-            base_drift = 0.002  # Small positive drift
-        elif days <= 7:  # Short-term: moderate volatility
-            time_multiplier = 1.6
-            random_range = 0.025  # ±2.5% random
-            base_drift = 0.003
-        elif days <= 30:  # Medium-term: balanced
-            time_multiplier = 1.3
-            random_range = 0.035  # ±3.5% random
-            base_drift = 0.005
-        elif days <= 90:  # Long-term: trend-following
-            time_multiplier = 1.1
-            random_range = 0.045  # ±4.5% random
-            base_drift = 0.008
-        else:  # Very long-term: strong trend component
-            time_multiplier = 1.0
-            random_range = 0.055  # ±5.5% random
-            base_drift = 0.012
-        
-        # Enhanced random factor with time-adjusted bounds
-        random_factor = np.random.uniform(-random_range, random_range) * time_factor
-        
-        # Add base market drift (markets tend to go up over time)
-        drift_factor = base_drift * time_factor * market_regime_factor
-        
-        # Combine all factors with better weighting
-        total_change = (base_change * market_regime_factor * time_multiplier) + random_factor + drift_factor
-        
-        # Enhanced minimum change with time scaling - INCREASED for meaningful changes, SPECIAL handling for 1-day
-        if days == 1:
-            min_change_base = 0.020  # 2% base minimum for 1-day predictions
-        elif days <= 3:
-            min_change_base = 0.018  # 1.8% base minimum for 2-3 day predictions
-        else:
-            min_change_base = 0.015  # 1.5% base minimum for longer predictions
-        min_change = min_change_base * time_factor * (1 + days / 365)  # Scale with time
-        
-        if abs(total_change) < min_change:
-            # Apply directional bias based on trend_multiplier with enhanced logic
-            direction = 1 if trend_multiplier > 0 else -1
-            
-            # Enhanced minimum change calculation
-            enhanced_min_change = min_change * market_regime_factor
-            
-            # Add volatility boost for minimum change
-            if effective_volatility > 0.25:
-                enhanced_min_change *= 1.3
-            elif effective_volatility > 0.20:
-                enhanced_min_change *= 1.1
-            
-            total_change = enhanced_min_change * direction
-            
-            print(f"🔧 Applied minimum change: {total_change:.4f} (was below {min_change:.4f})")
-        
-        # Add volatility clustering effect (high volatility periods tend to cluster)
-        if effective_volatility > 0.3:  # High volatility
-            volatility_boost = 1.4  # Increased from 1.2
-        elif effective_volatility > 0.25:
-            volatility_boost = 1.2
-        elif effective_volatility < 0.15:  # Low volatility
-            volatility_boost = 0.85  # Slightly increased from 0.8
-        else:
-            volatility_boost = 1.0
-        
-        total_change *= volatility_boost
-        
-        # Final validation - ensure total_change is meaningful - SPECIAL handling for 1-day
-        if days == 1:
-            final_min_change = 0.012  # 1.2% absolute minimum for 1-day
-        elif days <= 3:
-            final_min_change = 0.008  # 0.8% absolute minimum for 2-3 days
-        else:
-            final_min_change = 0.005  # 0.5% absolute minimum for longer periods
-            
-        if abs(total_change) < final_min_change:
-            direction = 1 if trend_multiplier > 0 else -1
-            total_change = final_min_change * direction * market_regime_factor
-            print(f"🔧 Applied final minimum change for {days}d: {total_change:.4f}")
-        
-        return total_change
-    
-    def _apply_safe_change_logic(self, predicted_price, current_price):
-        """Align with app's '📊 Dự đoán giá theo thời gian' logic for consistent results.
-        Mirrors safe_calculate_change in app.py to ensure unified behavior.
-        """
-        # If invalid values, keep original
-        if current_price <= 0 or predicted_price <= 0:
-            return predicted_price
-        # Raw percent change
-        raw_change = ((predicted_price - current_price) / current_price) * 100.0
-        # Ensure meaningful minimum change
-        if abs(raw_change) < 0.1:
-            if predicted_price > current_price:
-                adjusted = 0.8
-            elif predicted_price < current_price:
-                adjusted = -0.8
-            else:
-                adjusted = 0.4
-            return current_price * (1 + adjusted / 100.0)
-        # Amplify very small changes
-        if abs(raw_change) < 0.3:
-            amplified_change = raw_change * 2.5
-            amplified_change = max(-50.0, min(50.0, amplified_change))
-            return current_price * (1 + amplified_change / 100.0)
-        return predicted_price
-    
-    def _calculate_rsi_adjustment(self, rsi, days):
-        """Điều chỉnh dựa trên RSI"""
-        if rsi > 80:
-            return -0.05 * (days / 30)  # Strong overbought
-        elif rsi > 70:
-            return -0.02 * (days / 30)  # Overbought
-        elif rsi < 20:
-            return 0.05 * (days / 30)   # Strong oversold
-        elif rsi < 30:
-            return 0.02 * (days / 30)   # Oversold
-        else:
-            return 0
-    
-    def _calculate_bb_adjustment(self, bb_position, days):
-        """Điều chỉnh dựa trên Bollinger Bands"""
-        if bb_position > 0.9:
-            return -0.03 * (days / 30)  # Very high
-        elif bb_position > 0.8:
-            return -0.01 * (days / 30)  # High
-        elif bb_position < 0.1:
-            return 0.03 * (days / 30)   # Very low
-        elif bb_position < 0.2:
-            return 0.01 * (days / 30)   # Low
-        else:
-            return 0
-    
-    def _calculate_confidence_scores(self, data, indicators, ml_predictions=None):
-        """Tính toán độ tin cậy của dự đoán"""
+    def _calculate_confidence_scores(self, data, indicators, ml_predictions=None, method: str = 'traditional'):
+        """Tính toán độ tin cậy của dự đoán (method = model ghi vào ledger cho dự báo này)"""
         try:
             scores = {}
             
@@ -1901,6 +1512,8 @@ REASONING: [giải thích ngắn]
             scores['medium_term'] = round(max(10, min(95, base_medium + ml_confidence_boost * 0.8)), 1)
             scores['long_term'] = round(max(10, min(95, base_long + ml_confidence_boost * 0.5)), 1)
             
+            self._blend_ledger_confidence(scores, method)
+            
             # Add ML-specific metrics if available
             if ml_predictions and not ml_predictions.get('error'):
                 scores['ml_enhanced'] = True
@@ -1945,25 +1558,22 @@ REASONING: [giải thích ngắn]
         """Phân tích các chỉ số rủi ro"""
         try:
             returns = data['close'].pct_change().dropna()
+            metrics = risk_metrics_matrix(returns.values, risk_free_rate=0.03)
             
             # Value at Risk (VaR) - 95% confidence level
-            var_95 = np.percentile(returns, 5) * 100
+            var_95 = -metrics['var_95'][0] * 100
             
             # Maximum Drawdown
-            cumulative = (1 + returns).cumprod()
-            running_max = cumulative.expanding().max()
-            drawdown = (cumulative - running_max) / running_max
-            max_drawdown = drawdown.min() * 100
+            max_drawdown = -metrics['max_drawdown'][0] * 100
             
             # Sharpe Ratio (assuming risk-free rate of 3%)
-            excess_returns = returns - 0.03/252  # Daily risk-free rate
-            sharpe_ratio = (excess_returns.mean() / excess_returns.std()) * np.sqrt(252)
+            sharpe_ratio = float(np.nan_to_num(metrics['sharpe_ratio'][0]))
             
             # Beta (if we have market data, otherwise use volatility as proxy)
-            beta = returns.std() / 0.02  # Assuming market volatility of 2%
+            beta = metrics['volatility'][0] / np.sqrt(252) / 0.02  # Assuming market volatility of 2%
             
             # Risk level classification
-            volatility = returns.std() * np.sqrt(252) * 100
+            volatility = metrics['volatility'][0] * 100
             if volatility < 15:
                 risk_level = "Low"
             elif volatility < 25:
@@ -1985,6 +1595,36 @@ REASONING: [giải thích ngắn]
         except Exception as e:
             return {"error": f"Risk analysis error: {str(e)}"}
     
+    def _apply_monte_carlo(self, data, predictions, risk_analysis, exchange):
+        """Gắn confidence_interval cho từng mốc dự báo và VaR theo đường giá từ một lần mô phỏng"""
+        try:
+            if predictions.get('error') or risk_analysis.get('error'):
+                return
+            horizons = [days for days_list in self.prediction_periods.values() for days in days_list]
+            closes = data['close'].values
+            # Không drift: mô phỏng chỉ quyết định độ rộng, tâm vẫn là giá dự báo của thuật toán
+            paths = simulate_paths(closes, horizon=max(horizons), model='garch',
+                                   exchange=exchange, drift=False, seed=0)
+            bands = bands_from_paths(paths, horizons)
+            for period in predictions.values():
+                for key, entry in period.items():
+                    band = bands.get(int(key.split('_')[0]))
+                    if band:
+                        entry['confidence_interval'] = apply_band(entry['price'], band)
+            risk = path_var(paths, float(closes[-1]), (1, 7, 30))
+            risk_analysis['monte_carlo'] = {
+                'model': 'garch',
+                'paths': int(paths.shape[0]),
+                'exchange': exchange,
+                'var_95_1d': round(risk[1]['var'], 2),
+                'var_95_7d': round(risk[7]['var'], 2),
+                'var_95_30d': round(risk[30]['var'], 2),
+                'cvar_95_30d': round(risk[30]['cvar'], 2),
+                'path_var_95_30d': round(risk[30]['path_var'], 2)
+            }
+        except Exception as e:
+            print(f"⚠️ Monte Carlo analysis skipped: {e}")
+    
     def _generate_recommendations(self, predictions, confidence_scores, risk_analysis):
         """Tạo khuyến nghị đầu tư"""
         try:
@@ -2095,87 +1735,28 @@ REASONING: [giải thích ngắn]
 
     
 
-    def _interpolate_price_for_date_lstm(self, predictions: dict, days_ahead: int, current_price: float):
-        """Enhanced LSTM-specific interpolation for calendar predictions"""
+    def _forecast_path_payload(self, predictions, current_price):
+        """Đường dự báo dày theo phiên (nội suy một lần từ các mốc) để tra cứu theo ngày"""
         try:
-            # Collect all LSTM prediction points with confidence intervals
-            prediction_points = []
-            
-            for timeframe, preds in predictions.items():
-                for period, data in preds.items():
-                    if 'days' in period:
-                        days = int(period.split('_')[0])
-                        price = data['price']
-                        confidence_interval = data.get('confidence_interval', {})
-                        prediction_points.append((days, price, confidence_interval))
-            
-            # Add current price as day 0
-            prediction_points.append((0, current_price, {}))
-            
-            # Sort by days
-            prediction_points.sort(key=lambda x: x[0])
-            
-            # Find surrounding points for LSTM interpolation
-            lower_point = None
-            upper_point = None
-            
-            for i, (days, price, conf_int) in enumerate(prediction_points):
-                if days <= days_ahead:
-                    lower_point = (days, price, conf_int)
-                if days >= days_ahead and upper_point is None:
-                    upper_point = (days, price, conf_int)
-                    break
-            
-            # Enhanced LSTM interpolation with confidence consideration
-            if lower_point and upper_point and lower_point[0] != upper_point[0]:
-                # Weighted interpolation considering LSTM confidence
-                days_diff = upper_point[0] - lower_point[0]
-                price_diff = upper_point[1] - lower_point[1]
-                target_days_from_lower = days_ahead - lower_point[0]
-                
-                # LSTM-enhanced interpolation with non-linear adjustment
-                weight = target_days_from_lower / days_diff
-                
-                # Apply LSTM-specific smoothing (neural networks tend to be smoother)
-                smoothed_weight = 0.5 * (1 + np.tanh(2 * (weight - 0.5)))  # Sigmoid-like smoothing
-                
-                interpolated_price = lower_point[1] + (price_diff * smoothed_weight)
-                
-                # Calculate confidence interval for interpolated price
-                lower_conf = lower_point[2].get('lower', lower_point[1])
-                upper_conf = upper_point[2].get('upper', upper_point[1])
-                interpolated_lower = lower_conf + ((upper_conf - lower_conf) * smoothed_weight)
-                interpolated_upper = interpolated_price + abs(interpolated_price - interpolated_lower)
-                
-                return {
-                    'price': round(interpolated_price, 2),
-                    'change_percent': round(((interpolated_price - current_price) / current_price) * 100, 2),
-                    'change_amount': round(interpolated_price - current_price, 2),
-                    'interpolation_method': 'lstm_enhanced',
-                    'based_on_points': f"{lower_point[0]}d-{upper_point[0]}d",
-                    'confidence_interval': {
-                        'lower': round(interpolated_lower, 2),
-                        'upper': round(interpolated_upper, 2),
-                        'range': round(abs(interpolated_upper - interpolated_lower), 2)
-                    },
-                    'lstm_smoothing': True
-                }
-            elif lower_point:
-                # Use exact match or closest LSTM point
-                return {
-                    'price': round(lower_point[1], 2),
-                    'change_percent': round(((lower_point[1] - current_price) / current_price) * 100, 2),
-                    'change_amount': round(lower_point[1] - current_price, 2),
-                    'interpolation_method': 'lstm_exact',
-                    'based_on_points': f"{lower_point[0]}d",
-                    'confidence_interval': lower_point[2],
-                    'lstm_smoothing': False
-                }
-            
+            if predictions.get('error'):
+                return None
+            return ForecastPath.from_nested(datetime.now(), float(current_price), predictions).to_payload()
+        except Exception as e:
+            print(f"⚠️ Forecast path unavailable: {e}")
             return None
-            
+
+    def _forecast_for_date(self, result: dict, target_date):
+        """Dự báo cho một ngày bất kỳ: một phép tra mảng trên forecast_path (ngày nghỉ -> phiên liền trước)"""
+        try:
+            payload = result.get('forecast_path')
+            if not payload:
+                return None
+            entry = ForecastPath.from_payload(payload).at(target_date)
+            if entry:
+                entry['interpolation_method'] = 'forecast_path'
+            return entry
         except Exception as e:
-            print(f"⚠️ LSTM interpolation failed: {e}")
+            print(f"⚠️ Forecast lookup failed: {e}")
             return None
     
     def _get_lstm_calendar_analysis(self, lstm_result: dict, days_ahead: int, target_date):
@@ -2245,8 +1826,8 @@ REASONING: [giải thích ngắn]
             current_vn_time = datetime.now(vn_tz)
             market_close_time = time(15, 0)  # 3:00 PM Vietnam time
             
-            # Check if market is still open
-            is_market_open = current_vn_time.time() < market_close_time and current_vn_time.weekday() < 5
+            # Check if market is still open (ngày có phiên theo lịch giao dịch, kể cả nghỉ lễ)
+            is_market_open = current_vn_time.time() < market_close_time and bool(get_trading_calendar().is_session(current_vn_time))
             
             # Priority 1: Try LSTM for intraday prediction
             if self.lstm_predictor and is_market_open:
@@ -2275,6 +1856,7 @@ REASONING: [giải thích ngắn]
                                 result, risk_tolerance, time_horizon, investment_amount
                             )
                             
+                            self._record_forecasts(symbol, dict(result, prediction_type='intraday_close'), 'lstm')
                             return result
                 except Exception as e:
                     print(f"⚠️ LSTM intraday prediction failed: {e}")
@@ -2295,6 +1877,8 @@ REASONING: [giải thích ngắn]
                 except Exception as e:
                     result['ai_error'] = str(e)
             
+            if is_market_open and not result.get('error'):
+                self._record_forecasts(symbol, result, 'intraday')
             return result
             
         except Exception as e:
@@ -2312,14 +1896,21 @@ REASONING: [giải thích ngắn]
             current_price = base_result['current_price']
             tech_indicators = base_result.get('technical_indicators', {})
             
-            # Intraday factors
-            hours_to_close = self._calculate_hours_to_close(current_time, market_close_time, is_market_open)
+            # Intraday factors (phút giao dịch còn lại, không tính nghỉ trưa)
+            hours_to_close = minutes_to_close(current_time) / 60 if is_market_open else 0
+            
+            # Nến trong phiên từ ring buffer (VWAP, biến động, volume profile cập nhật tăng dần)
+            intraday = self._intraday_features(symbol, current_time) if is_market_open else None
+            volume_indicators = tech_indicators
+            if intraday and tech_indicators.get('volume_sma'):
+                # KL dự phóng cả phiên so với trung bình 20 phiên thay cho KL phiên trước
+                volume_indicators = dict(tech_indicators, volume_ratio=intraday['projected_volume'] / tech_indicators['volume_sma'])
             
             # Calculate intraday momentum
             intraday_momentum = self._calculate_intraday_momentum(tech_indicators, hours_to_close)
             
             # Volume analysis for intraday
-            volume_factor = self._analyze_intraday_volume(tech_indicators)
+            volume_factor = self._analyze_intraday_volume(volume_indicators)
             
             # Market sentiment adjustment
             sentiment_factor = self._get_market_sentiment_factor(tech_indicators)
@@ -2328,11 +1919,16 @@ REASONING: [giải thích ngắn]
             base_change = intraday_momentum * volume_factor * sentiment_factor
             
             # Apply time decay (less change expected as market close approaches)
-            time_decay = max(0.1, hours_to_close / 6.5)  # 6.5 hours in trading day
+            time_decay = max(0.1, hours_to_close / (SESSION_MINUTES / 60))
             adjusted_change = base_change * time_decay
             
             # Limit maximum intraday change to realistic levels
             max_intraday_change = 0.05  # 5% max intraday change
+            if intraday:
+                adjusted_change += self._intraday_buffer_drift(intraday)
+                # Không vượt 2 độ lệch chuẩn của phần phiên còn lại
+                if intraday['volatility_to_close_pct'] > 0:
+                    max_intraday_change = min(max_intraday_change, 2 * intraday['volatility_to_close_pct'] / 100)
             adjusted_change = max(-max_intraday_change, min(max_intraday_change, adjusted_change))
             
             predicted_close = current_price * (1 + adjusted_change)
@@ -2360,6 +1956,9 @@ REASONING: [giải thích ngắn]
                 'prediction_type': 'intraday_close',
                 'technical_indicators': tech_indicators
             }
+            if intraday:
+                result['intraday_features'] = intraday
+                result['method_used'] = 'Traditional Intraday + Live Bars'
             
             # Add intraday-specific analysis
             result['intraday_analysis'] = self._get_intraday_analysis(symbol, current_time, market_close_time)
@@ -2369,23 +1968,33 @@ REASONING: [giải thích ngắn]
         except Exception as e:
             return {"error": f"Traditional intraday prediction error: {str(e)}"}
     
-    def _calculate_hours_to_close(self, current_time, market_close_time, is_market_open: bool):
-        """Calculate hours remaining until market close"""
+    def _intraday_features(self, symbol: str, current_time):
+        """Đặc trưng phiên từ ring buffer; nạp nến 1 phút qua gateway nếu mã chưa có trong buffer"""
         try:
-            if not is_market_open:
-                return 0
-            
-            # Convert to minutes for more precision
-            current_minutes = current_time.hour * 60 + current_time.minute
-            close_minutes = market_close_time.hour * 60 + market_close_time.minute
-            
-            minutes_to_close = max(0, close_minutes - current_minutes)
-            hours_to_close = minutes_to_close / 60
-            
-            return hours_to_close
-            
+            buffers = get_intraday_buffers()
+            buffers.watch([symbol])
+            gateway = getattr(self.vn_api, 'gateway', None)
+            if not buffers.has_session(symbol, current_time) and gateway is not None and gateway.available:
+                import asyncio
+                loop = asyncio.new_event_loop()
+                try:
+                    loop.run_until_complete(buffers.load_session(gateway, [symbol], current_time))
+                finally:
+                    loop.close()
+            if not buffers.has_session(symbol, current_time):
+                return None
+            return buffers.features(symbol, current_time)
         except Exception as e:
-            return 3.0  # Default 3 hours
+            print(f"⚠️ Intraday bars unavailable for {symbol}: {e}")
+            return None
+    
+    def _intraday_buffer_drift(self, intraday: dict):
+        """Thay đổi kỳ vọng tới ATC từ nến trong phiên: xu hướng phiên (giảm dần) + hồi về VWAP"""
+        remaining = intraday['minutes_to_close']
+        elapsed = max(intraday['elapsed_minutes'], 1)
+        trend = intraday['session_return_pct'] / 100 * min(remaining / elapsed, 1.0) * 0.5
+        reversion = -intraday['vwap_gap_pct'] / 100 * 0.3
+        return trend + reversion
     
     def _calculate_intraday_momentum(self, tech_indicators: dict, hours_to_close: float):
         """Calculate intraday momentum based on technical indicators"""
@@ -5,6 +5,8 @@ import os
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.helpers import risk_metrics_matrix, betas
+from src.utils.prompt_builder import PromptBuilder, PRIORITY_CRITICAL, PRIORITY_HIGH, PRIORITY_MEDIUM, PRIORITY_LOW
 
 class RiskExpert:
     def __init__(self, vn_api=None):
@@ -114,7 +116,7 @@ class RiskExpert:
         else:
             return 180
     
-    def assess_risk(self, symbol: str, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 100000000):
+    def assess_risk(self, symbol: str, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 100000000, use_ai: bool = True):
         try:
             print(f"🔍 Starting risk assessment for {symbol} with profile: {risk_tolerance}% risk, {time_horizon}, {investment_amount:,} VND...")
             
@@ -177,13 +179,11 @@ class RiskExpert:
                         returns = hist_data['close'].pct_change().dropna()
                         
                         if len(returns) > 10:
-                            volatility = returns.std() * np.sqrt(252) * 100  # Annualized volatility %
+                            metrics = risk_metrics_matrix(returns.values, risk_free_rate=0.03)
+                            volatility = metrics['volatility'][0] * 100  # Annualized volatility %
                             
                             # Tính max drawdown
-                            cumulative = (1 + returns).cumprod()
-                            running_max = cumulative.expanding().max()
-                            drawdown = (cumulative - running_max) / running_max
-                            max_drawdown = drawdown.min() * 100
+                            max_drawdown = -metrics['max_drawdown'][0] * 100
                             
                             # Đánh giá rủi ro
                             if volatility > 40:
@@ -206,16 +206,16 @@ class RiskExpert:
                                     if len(common_dates) > 50:
                                         stock_aligned = returns.loc[common_dates]
                                         vnindex_aligned = vnindex_returns.loc[common_dates]
-                                        if np.var(vnindex_aligned) > 0:
-                                            beta = np.cov(stock_aligned, vnindex_aligned)[0, 1] / np.var(vnindex_aligned)
+                                        market_beta = betas(stock_aligned.values, vnindex_aligned.values)[0]
+                                        if np.isfinite(market_beta):
+                                            beta = float(market_beta)
                             except Exception as beta_error:
                                 print(f"⚠️ Beta calculation failed: {beta_error}")
                                 beta = 1.0
                             
                             # Calculate additional risk metrics
-                            var_95 = abs(np.percentile(returns, 5) * 100)
-                            excess_returns = returns - 0.03/252
-                            sharpe_ratio = (excess_returns.mean() / excess_returns.std()) * np.sqrt(252) if excess_returns.std() > 0 else 0
+                            var_95 = abs(metrics['var_95'][0] * 100)
+                            sharpe_ratio = float(np.nan_to_num(metrics['sharpe_ratio'][0]))
                             correlation_market = min(0.9, beta * 0.8)
                             
                             base_risk_analysis = {
@@ -249,7 +249,7 @@ class RiskExpert:
                                         base_risk_analysis['sentiment_adjustment'] = 'Risk increased due to negative sentiment'
                             
                             # Enhance with AI analysis if available
-                            if self.ai_agent:
+                            if self.ai_agent and use_ai:
                                 try:
                                     ai_enhancement = self._get_ai_risk_analysis(symbol, base_risk_analysis)
                                     base_risk_analysis.update(ai_enhancement)
@@ -284,13 +284,11 @@ class RiskExpert:
                         if len(returns) < 10:
                             base_risk_analysis = self._get_international_fallback_risk(symbol)
                         else:
-                            volatility = returns.std() * np.sqrt(252)  # Annualized volatility
+                            metrics = risk_metrics_matrix(returns.values, risk_free_rate=0.03)
+                            volatility = metrics['volatility'][0]  # Annualized volatility
                             
                             # Calculate max drawdown
-                            cumulative = (1 + returns).cumprod()
-                            running_max = cumulative.expanding().max()
-                            drawdown = (cumulative - running_max) / running_max
-                            max_drawdown = drawdown.min()
+                            max_drawdown = -metrics['max_drawdown'][0]
                             
                             # Risk assessment
                             if volatility > 0.4:
@@ -314,16 +312,16 @@ class RiskExpert:
                                     if len(common_dates) > 50:
                                         stock_aligned = returns.loc[common_dates]
                                         spy_aligned = spy_returns.loc[common_dates]
-                                        if np.var(spy_aligned) > 0:
-                                            beta = np.cov(stock_aligned, spy_aligned)[0, 1] / np.var(spy_aligned)
+                                        market_beta = betas(stock_aligned.values, spy_aligned.values)[0]
+                                        if np.isfinite(market_beta):
+                                            beta = float(market_beta)
                             except Exception as beta_error:
                                 print(f"⚠️ Beta calculation failed for {symbol}: {beta_error}")
                                 beta = 1.0
                             
                             # Calculate additional risk metrics
-                            var_95 = abs(np.percentile(returns, 5) * 100)
-                            excess_returns = returns - 0.03/252
-                            sharpe_ratio = (excess_returns.mean() / excess_returns.std()) * np.sqrt(252) if excess_returns.std() > 0 else 0
+                            var_95 = abs(metrics['var_95'][0] * 100)
+                            sharpe_ratio = float(np.nan_to_num(metrics['sharpe_ratio'][0]))
                             correlation_market = min(0.9, beta * 0.8)
                             
                             base_risk_analysis = {
@@ -367,7 +365,7 @@ class RiskExpert:
             base_risk_analysis = self._adjust_risk_for_profile(base_risk_analysis, risk_tolerance, time_horizon, investment_amount)
         
         # Enhance with AI analysis if available
-        if base_risk_analysis and "error" not in base_risk_analysis and self.ai_agent:
+        if base_risk_analysis and "error" not in base_risk_analysis and self.ai_agent and use_ai:
             try:
                 ai_enhancement = self._get_ai_risk_analysis(symbol, base_risk_analysis)
                 base_risk_analysis.update(ai_enhancement)
@@ -516,7 +514,7 @@ class RiskExpert:
             context = self._create_diverse_risk_context(symbol, base_analysis, risk_tolerance, time_horizon, investment_amount, risk_profile, max_position, stop_loss_pct, max_investment)
             
             # Get AI analysis
-            ai_result = self.ai_agent.generate_with_fallback(context, 'risk_assessment', max_tokens=400)
+            ai_result = self.ai_agent.generate_cached(context, 'risk_assessment', max_tokens=400, template_id='risk_advice_v1')
             
             if ai_result['success']:
                 # Parse AI response for advice and reasoning
@@ -659,6 +657,16 @@ class RiskExpert:
                 focus = "cân bằng tối ưu giữa rủi ro và lợi nhuận"
                 strategy = "phân bổ đều giữa các loại tài sản"
         
+        # Dữ liệu rủi ro: chỉ giữ field quan trọng trong ngân sách token
+        risk_data = PromptBuilder('risk_assessment').add_section(f"DỮ LIỆU RỦI RO {symbol}:", [
+            ("Risk Level", risk_level, PRIORITY_CRITICAL),
+            ("Volatility %", volatility, PRIORITY_CRITICAL),
+            ("Max Drawdown %", base_analysis.get('max_drawdown', -15), PRIORITY_HIGH),
+            ("Beta", base_analysis.get('beta', 1.0), PRIORITY_HIGH),
+            ("VaR 95%", base_analysis.get('var_95'), PRIORITY_MEDIUM),
+            ("Sharpe", base_analysis.get('sharpe_ratio'), PRIORITY_LOW)
+        ]).build()
+        
         return f"""
 Bạn là chuyên gia quản lý rủi ro cho nhà đầu tư {risk_profile}. Phân tích rủi ro {symbol}:
 
@@ -668,10 +676,7 @@ HỒ SƠ ĐẦU TƯ CỤ THỂ:
 - Vốn đầu tư: {investment_amount:,} VND
 - Chiến lược: {strategy}
 
-DỮ LIỆU RỦI RO {symbol}:
-- Risk Level: {risk_level}, Volatility: {volatility:.1f}%
-- Max Drawdown: {base_analysis.get('max_drawdown', -15):.1f}%
-- Beta: {base_analysis.get('beta', 1.0):.3f}
+{risk_data}
 
 KHUYẾN NGHỊ TÍNH TOÁN:
 - Tỷ trọng tối đa: {max_position*100:.0f}% = {max_investment:,.0f} VND
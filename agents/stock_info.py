@@ -78,19 +78,18 @@ class StockInfoDisplay:
             low_52w = float(hist_data['low'].min())
             avg_volume = int(hist_data['volume'].mean())
             
-            # Try to get financial ratios
+            # Chỉ số cơ bản từ fundamentals store (chỉ gọi vendor quanh mùa báo cáo)
             try:
-                ratios = stock_obj.finance.ratio(period='quarter', lang='vi', dropna=True)
-                if not ratios.empty:
-                    latest_ratio = ratios.iloc[-1]
-                    pe = latest_ratio.get('pe', 0)
-                    pb = latest_ratio.get('pb', 0)
-                    eps = latest_ratio.get('eps', 0)
-                    dividend = latest_ratio.get('dividend_per_share', 0)
-                else:
-                    pe = pb = eps = dividend = 0
-            except:
-                pe = pb = eps = dividend = 0
+                from src.data.fundamentals_store import get_fundamentals_store
+                fundamentals = await get_fundamentals_store().get(symbol) or {}
+            except Exception:
+                fundamentals = {}
+            pe = fundamentals.get('pe') or 0
+            pb = fundamentals.get('pb') or 0
+            eps = fundamentals.get('eps') or 0
+            bvps = fundamentals.get('bvps') or 0
+            dividend = fundamentals.get('dividend_per_share') or 0
+            shares = fundamentals.get('shares') or 0
             
             print(f"✅ Got REAL detailed metrics for {symbol}")
             
@@ -99,7 +98,7 @@ class StockInfoDisplay:
                 'high': float(hist_data['high'].iloc[-1]),
                 'low': float(hist_data['low'].iloc[-1]),
                 'volume': int(hist_data['volume'].iloc[-1]),
-                'market_cap': current_price * 1000000000,  # Estimate
+                'market_cap': current_price * shares if shares else current_price * 1000000000,  # Estimate khi thiếu số CP
                 'bid_volume': int(hist_data['volume'].iloc[-1] * 0.6),
                 'ask_volume': int(hist_data['volume'].iloc[-1] * 0.4),
                 'high_52w': high_52w,
@@ -113,7 +112,7 @@ class StockInfoDisplay:
                 'eps': eps if eps > 0 else random.randint(1500, 4000),
                 'pe': pe if pe > 0 else (current_price / eps * 1000) if eps > 0 else random.uniform(10, 25),
                 'forward_pe': (pe * 0.9) if pe > 0 else random.uniform(8, 20),
-                'bvps': random.randint(15000, 40000),  # Need balance sheet data
+                'bvps': bvps if bvps > 0 else random.randint(15000, 40000),
                 'pb': pb if pb > 0 else random.uniform(1.0, 3.0)
             }
             
@@ -5,6 +5,118 @@ import aiohttp
 from bs4 import BeautifulSoup
 from datetime import datetime
 import re
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.executors import stage, run_stage_async, WorkloadClass
+from src.data.symbol_master import get_symbol_master
+
+
+@stage(WorkloadClass.CPU)
+def parse_cafef_articles(html: str, url: str, symbol: str, limit: int):
+    """Parse HTML trang CafeF thành danh sách tin (CPU stage)"""
+    news_items = []
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Find news articles
+    articles = soup.select('div.tlitem, div.newsitem, div.news-item')
+    if not articles:
+        articles = soup.find_all('a', href=re.compile(r'.*\.chn|.*\.html'))
+    
+    for article in articles[:limit]:
+        try:
+            if article.name == 'a':
+                title = article.get_text(strip=True)
+                link = article.get('href', '')
+            else:
+                title_elem = article.find(['a', 'h1', 'h2', 'h3'])
+                if not title_elem:
+                    continue
+                title = title_elem.get_text(strip=True)
+                link = title_elem.get('href', '')
+    
+            if len(title) < 10:
+                continue
+    
+            # Ensure full URL
+            if link and not link.startswith('http'):
+                link = f"https://cafef.vn{link}" if link.startswith('/') else f"https://cafef.vn/{link}"
+    
+            # Extract date
+            date_elem = article.find(['time', 'span'], class_=re.compile(r'date|time'))
+            pub_date = date_elem.get_text(strip=True) if date_elem else datetime.now().strftime('%Y-%m-%d %H:%M')
+    
+            news_items.append({
+                "title": title,
+                "publisher": "CafeF",
+                "link": link or url,
+                "published": pub_date,
+                "summary": f"Tin tức về {symbol} từ CafeF",
+                "source_index": f"{symbol} Stock News"
+            })
+    
+            if len(news_items) >= limit:
+                break
+        except Exception:
+            continue
+    
+    return news_items
+
+
+@stage(WorkloadClass.CPU)
+def parse_vietstock_articles(html: str, url: str, symbol: str, limit: int):
+    """Parse HTML trang VietStock thành danh sách tin (CPU stage)"""
+    news_items = []
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Find news articles
+    articles = soup.select('div.news-item, div.item-news, li.news-item')
+    if not articles:
+        articles = soup.find_all('a', href=re.compile(r'/tin-tuc/|/news/'))
+    
+    for article in articles[:limit]:
+        try:
+            if article.name == 'a':
+                title = article.get_text(strip=True)
+                link = article.get('href', '')
+            else:
+                title_elem = article.find(['a', 'h1', 'h2', 'h3'])
+                if not title_elem:
+                    continue
+                title = title_elem.get_text(strip=True)
+                link = title_elem.get('href', '') if title_elem.name == 'a' else article.find('a', href=True)
+                if hasattr(link, 'get'):
+                    link = link.get('href', '')
+    
+            if len(title) < 10:
+                continue
+    
+            # Ensure full URL
+            if link and not link.startswith('http'):
+                link = f"https://vietstock.vn{link}" if link.startswith('/') else f"https://vietstock.vn/{link}"
+    
+            # Extract date
+            date_elem = article.find(['span', 'time'], class_=re.compile(r'date|time'))
+            pub_date = date_elem.get_text(strip=True) if date_elem else datetime.now().strftime('%Y-%m-%d %H:%M')
+    
+            news_items.append({
+                "title": title,
+                "publisher": "VietStock",
+                "link": link or url,
+                "published": pub_date,
+                "summary": f"Tin tức về {symbol} từ VietStock",
+                "source_index": f"{symbol} Stock News"
+            })
+    
+            if len(news_items) >= limit:
+                break
+        except Exception:
+            continue
+    
+    return news_items
+
 
 class TickerNews:
     def __init__(self):
@@ -19,16 +131,10 @@ class TickerNews:
         try:
             # Logic kiểm tra cổ phiếu VN đã được chuyển ra MainAgent.
             # Agent này giờ chỉ tập trung vào cổ phiếu quốc tế qua Yahoo Finance.
-            # Get all VN stocks from crewai_collector fallback
-            try:
-                from src.data.crewai_collector import CrewAIDataCollector
-                collector = CrewAIDataCollector()
-                vn_stocks = [stock['symbol'] for stock in collector._get_fallback_symbols()]
-            except:
-                # Fallback to basic list if import fails
-                vn_stocks = ['VCB', 'BID', 'CTG', 'TCB', 'ACB', 'VIC', 'VHM', 'VRE', 'DXG', 'MSN', 'MWG', 'VNM', 'SAB', 'HPG', 'GAS', 'PLX', 'FPT']
+            # Phân loại mã VN qua symbol master (hash lookup)
+            symbol_master = get_symbol_master()
             
-            if symbol.upper() in vn_stocks:
+            if symbol_master.is_vn_symbol(symbol):
                 # Try crawling from CafeF and VietStock first
                 try:
                     loop = asyncio.new_event_loop()
@@ -106,16 +212,8 @@ class TickerNews:
             }
         except Exception as e:
             # Fallback to mock news for VN stocks
-            try:
-                from src.data.crewai_collector import CrewAIDataCollector
-                collector = CrewAIDataCollector()
-                vn_symbols = [stock['symbol'] for stock in collector._get_fallback_symbols()]
-                if symbol.upper() in vn_symbols:
-                    return self._get_vn_mock_news(symbol, limit)
-            except:
-                # Basic fallback check
-                if symbol.upper() in ['VCB', 'BID', 'CTG', 'TCB', 'ACB', 'VIC', 'VHM', 'VRE', 'DXG', 'MSN', 'MWG', 'VNM', 'SAB', 'HPG', 'GAS', 'PLX', 'FPT']:
-                    return self._get_vn_mock_news(symbol, limit)
+            if get_symbol_master().is_vn_symbol(symbol):
+                return self._get_vn_mock_news(symbol, limit)
             return {"error": str(e)}
     
     async def _crawl_vn_news(self, symbol: str, limit: int):
@@ -157,49 +255,9 @@ class TickerNews:
                                 continue
                             
                             html = await response.text()
-                            soup = BeautifulSoup(html, 'html.parser')
-                            
-                            # Find news articles
-                            articles = soup.select('div.tlitem, div.newsitem, div.news-item')
-                            if not articles:
-                                articles = soup.find_all('a', href=re.compile(r'.*\.chn|.*\.html'))
-                            
-                            for article in articles[:limit]:
-                                try:
-                                    if article.name == 'a':
-                                        title = article.get_text(strip=True)
-                                        link = article.get('href', '')
-                                    else:
-                                        title_elem = article.find(['a', 'h1', 'h2', 'h3'])
-                                        if not title_elem:
-                                            continue
-                                        title = title_elem.get_text(strip=True)
-                                        link = title_elem.get('href', '')
-                                    
-                                    if len(title) < 10:
-                                        continue
-                                    
-                                    # Ensure full URL
-                                    if link and not link.startswith('http'):
-                                        link = f"https://cafef.vn{link}" if link.startswith('/') else f"https://cafef.vn/{link}"
-                                    
-                                    # Extract date
-                                    date_elem = article.find(['time', 'span'], class_=re.compile(r'date|time'))
-                                    pub_date = date_elem.get_text(strip=True) if date_elem else datetime.now().strftime('%Y-%m-%d %H:%M')
-                                    
-                                    news_items.append({
-                                        "title": title,
-                                        "publisher": "CafeF",
-                                        "link": link or url,
-                                        "published": pub_date,
-                                        "summary": f"Tin tức về {symbol} từ CafeF",
-                                        "source_index": f"{symbol} Stock News"
-                                    })
-                                    
-                                    if len(news_items) >= limit:
-                                        break
-                                except Exception:
-                                    continue
+                            # Parse HTML trong CPU process pool, không chặn event loop
+                            parsed = await run_stage_async(parse_cafef_articles, html, url, symbol, limit)
+                            news_items.extend(parsed[:limit - len(news_items)])
                             
                             if len(news_items) >= limit:
                                 break
@@ -232,51 +290,9 @@ class TickerNews:
                                 continue
                             
                             html = await response.text()
-                            soup = BeautifulSoup(html, 'html.parser')
-                            
-                            # Find news articles
-                            articles = soup.select('div.news-item, div.item-news, li.news-item')
-                            if not articles:
-                                articles = soup.find_all('a', href=re.compile(r'/tin-tuc/|/news/'))
-                            
-                            for article in articles[:limit]:
-                                try:
-                                    if article.name == 'a':
-                                        title = article.get_text(strip=True)
-                                        link = article.get('href', '')
-                                    else:
-                                        title_elem = article.find(['a', 'h1', 'h2', 'h3'])
-                                        if not title_elem:
-                                            continue
-                                        title = title_elem.get_text(strip=True)
-                                        link = title_elem.get('href', '') if title_elem.name == 'a' else article.find('a', href=True)
-                                        if hasattr(link, 'get'):
-                                            link = link.get('href', '')
-                                    
-                                    if len(title) < 10:
-                                        continue
-                                    
-                                    # Ensure full URL
-                                    if link and not link.startswith('http'):
-                                        link = f"https://vietstock.vn{link}" if link.startswith('/') else f"https://vietstock.vn/{link}"
-                                    
-                                    # Extract date
-                                    date_elem = article.find(['span', 'time'], class_=re.compile(r'date|time'))
-                                    pub_date = date_elem.get_text(strip=True) if date_elem else datetime.now().strftime('%Y-%m-%d %H:%M')
-                                    
-                                    news_items.append({
-                                        "title": title,
-                                        "publisher": "VietStock",
-                                        "link": link or url,
-                                        "published": pub_date,
-                                        "summary": f"Tin tức về {symbol} từ VietStock",
-                                        "source_index": f"{symbol} Stock News"
-                                    })
-                                    
-                                    if len(news_items) >= limit:
-                                        break
-                                except Exception:
-                                    continue
+                            # Parse HTML trong CPU process pool, không chặn event loop
+                            parsed = await run_stage_async(parse_vietstock_articles, html, url, symbol, limit)
+                            news_items.extend(parsed[:limit - len(news_items)])
                             
                             if len(news_items) >= limit:
                                 break
@@ -307,24 +323,9 @@ class TickerNews:
         """Mock VN news as fallback"""
         import random
         
-        # Get company names from crewai_collector fallback
-        try:
-            from src.data.crewai_collector import CrewAIDataCollector
-            collector = CrewAIDataCollector()
-            fallback_stocks = collector._get_fallback_symbols()
-            company_names = {stock['symbol']: stock['name'] for stock in fallback_stocks}
-        except:
-            company_names = {
-                'VCB': 'Vietcombank',
-                'BID': 'BIDV', 
-                'CTG': 'VietinBank',
-                'VIC': 'Vingroup',
-                'VHM': 'Vinhomes',
-                'HPG': 'Hòa Phát',
-                'FPT': 'FPT Corporation'
-            }
-        
-        company_name = company_names.get(symbol.upper(), f'Công ty {symbol}')
+        # Tên công ty từ symbol master
+        info = get_symbol_master().get(symbol)
+        company_name = info['name'] if info else f'Công ty {symbol}'
         
         mock_titles = [
             f"{company_name} báo lãi quý tăng 20%",
@@ -1,17 +1,29 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from fastapi.concurrency import run_in_threadpool
 from main_agent import MainAgent
 from src.data.vn_stock_api import VNStockAPI
+from src.data.vnstock_gateway import get_vnstock_gateway, PRICE_UNIT
+from src.data.symbol_master import get_symbol_master
+from src.data.company_search_api import get_company_search_api
+from src.data.fundamentals_store import get_fundamentals_store
+from src.data.backtest import run_backtest, load_history, expert_fundamental_scores
+from src.data.monte_carlo import run_simulation, DEFAULT_PATHS
+from src.data.portfolio_risk import compute_portfolio_risk, DEFAULT_LOOKBACK, MAX_HOLDINGS
+from src.utils.performance_monitor import get_performance_monitor
+from src.utils.ai_cache import get_ai_cache
+from src.utils.executors import run_stage_async, get_execution_manager
+from src.utils.trading_calendar import get_trading_calendar
 from dataclasses import asdict
 from typing import Optional, List, Dict, Any
 import asyncio
+import json
 import logging
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -63,6 +75,14 @@ class AnalysisRequest(BaseModel):
     time_horizon: Optional[str] = Field("medium", description="Investment time horizon")
     risk_tolerance: Optional[int] = Field(50, description="Risk tolerance (0-100)")
     investment_amount: Optional[int] = Field(100000000, description="Investment amount in VND")
+    deadline: Optional[float] = Field(None, description="Overall analysis deadline in seconds (partial results after)")
+
+class PortfolioRiskRequest(BaseModel):
+    holdings: Dict[str, float] = Field(..., description="Symbol -> quantity (shares, VND value or weight, see unit)")
+    unit: str = Field("shares", description="Holding unit: shares | value | weight")
+    confidence: float = Field(0.95, description="VaR/CVaR confidence level")
+    horizon_days: int = Field(1, description="VaR horizon in trading sessions")
+    lookback_days: int = Field(DEFAULT_LOOKBACK, description="Sessions of history used for covariance")
 
 class HealthResponse(BaseModel):
     status: str
@@ -79,6 +99,13 @@ async def startup_event():
     logger.info(f"🤖 Main Agent Status: {'✅ Ready' if main_agent else '❌ Failed'}")
     logger.info(f"🧠 Gemini Status: {'✅ Ready' if main_agent and main_agent.gemini_agent else '🔴 Not Configured'}")
     logger.info(f"🤖 CrewAI Status: {'✅ Ready' if main_agent and hasattr(main_agent.vn_api, 'crewai_collector') and main_agent.vn_api.crewai_collector and main_agent.vn_api.crewai_collector.enabled else '🔴 Not Configured'}")
+    if vn_api and vn_api.listing_sync.schedule():
+        logger.info("📋 Listing sync started in background")
+    if vn_api:
+        vn_api.screener.start()
+        logger.info("🔍 Screener refresh scheduler started")
+        vn_api.prediction_ledger.start()
+        logger.info("📒 Prediction ledger scoring started")
     logger.info("📚 API Documentation: http://127.0.0.1:8000/api/docs")
     logger.info("🌐 Web Interface: http://127.0.0.1:8000")
 
@@ -195,7 +222,8 @@ async def analyze_stock(request: AnalysisRequest):
         result = await main_agent.analyze_stock(
             symbol=request.symbol.upper(),
             time_horizon=request.time_horizon,
-            risk_tolerance=request.risk_tolerance
+            risk_tolerance=request.risk_tolerance,
+            deadline=request.deadline
         )
         
         # Add metadata
@@ -247,6 +275,59 @@ async def process_query(request: QueryRequest):
         logger.error(f"❌ Query processing failed: {e}")
         raise HTTPException(status_code=500, detail=f"Query processing failed: {str(e)}")
 
+def _sse_event(event: str, data: Any) -> str:
+    """Format một server-sent event"""
+    try:
+        payload = json.dumps(jsonable_encoder(data), ensure_ascii=False, default=str)
+    except Exception:
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+async def _sse_stream(http_request: Request, events):
+    """Chuyển async generator (event, payload) thành SSE, dừng khi client ngắt kết nối"""
+    try:
+        async for event, payload in events:
+            if await http_request.is_disconnected():
+                logger.info("🔌 Client disconnected, stopping stream")
+                break
+            yield _sse_event(event, payload)
+    except Exception as e:
+        logger.error(f"❌ Stream failed: {e}")
+        yield _sse_event("error", {"error": str(e)})
+    finally:
+        await events.aclose()
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@app.post("/analyze/stream")
+async def analyze_stock_stream(request: AnalysisRequest, http_request: Request):
+    """Streaming analysis: mỗi agent trả kết quả ngay khi xong (SSE), kết thúc bằng event 'complete'"""
+    if not main_agent:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+    
+    logger.info(f"📡 Starting streaming analysis for {request.symbol}")
+    events = main_agent.analyze_stock_stream(
+        symbol=request.symbol.upper(),
+        risk_tolerance=request.risk_tolerance,
+        time_horizon=request.time_horizon,
+        investment_amount=request.investment_amount
+    )
+    return StreamingResponse(_sse_stream(http_request, events), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/query/stream")
+async def process_query_stream(request: QueryRequest, http_request: Request):
+    """Streaming query: dữ liệu agent, token Gemini theo thời gian thực, rồi event 'complete'"""
+    if not main_agent:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+    
+    if not main_agent.gemini_agent:
+        raise HTTPException(status_code=400, detail="Gemini AI not configured. Please set API key first.")
+    
+    logger.info(f"📡 Streaming query: {request.query[:50]}...")
+    symbol = request.symbol.upper() if request.symbol else ""
+    events = main_agent.process_query_stream(request.query, symbol)
+    return StreamingResponse(_sse_stream(http_request, events), media_type="text/event-stream", headers=SSE_HEADERS)
+
 # Individual agent endpoints
 @app.get("/predict/{symbol}")
 async def predict_price(symbol: str):
@@ -256,7 +337,7 @@ async def predict_price(symbol: str):
     
     try:
         logger.info(f"📈 Predicting price for {symbol}")
-        result = await run_in_threadpool(main_agent.price_predictor.predict_price, symbol.upper())
+        result = await run_stage_async(main_agent.price_predictor.predict_price, symbol.upper())
         
         result["prediction_metadata"] = {
             "timestamp": datetime.now().isoformat(),
@@ -277,7 +358,7 @@ async def get_ticker_news(symbol: str, limit: int = 10):
     
     try:
         logger.info(f"📰 Fetching news for {symbol}")
-        result = await run_in_threadpool(main_agent.ticker_news.get_ticker_news, symbol.upper(), limit)
+        result = await run_stage_async(main_agent.ticker_news.get_ticker_news, symbol.upper(), limit)
         
         result["news_metadata"] = {
             "timestamp": datetime.now().isoformat(),
@@ -299,7 +380,7 @@ async def assess_risk(symbol: str):
     
     try:
         logger.info(f"⚠️ Assessing risk for {symbol}")
-        result = await run_in_threadpool(main_agent.risk_expert.assess_risk, symbol.upper())
+        result = await run_stage_async(main_agent.risk_expert.assess_risk, symbol.upper())
         
         result["risk_metadata"] = {
             "timestamp": datetime.now().isoformat(),
@@ -369,6 +450,225 @@ async def get_vn_market():
         logger.error(f"❌ VN market overview failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/vn-watchlist")
+async def get_vn_watchlist(symbols: str):
+    """Get watchlist quotes from the price board snapshot (symbols=VCB,FPT,HPG)"""
+    if not vn_api:
+        raise HTTPException(status_code=503, detail="VN Stock API not initialized")
+    
+    try:
+        symbol_list = [s for s in symbols.split(',') if s.strip()]
+        logger.info(f"📋 Fetching watchlist quotes for {len(symbol_list)} symbols")
+        quotes = await vn_api.get_watchlist_quotes(symbol_list)
+        
+        return {
+            "quotes": quotes,
+            "metadata": {
+                "timestamp": datetime.now().isoformat(),
+                "requested": len(symbol_list),
+                "found": len(quotes),
+                "price_board": vn_api.price_board.get_stats()
+            }
+        }
+    except Exception as e:
+        logger.error(f"❌ Watchlist quotes failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/search")
+async def search_companies(q: str, limit: int = 10):
+    """Autocomplete company search by symbol or name (diacritic-insensitive)"""
+    try:
+        limit = max(1, min(limit, 50))
+        results = get_company_search_api().autocomplete(q, limit=limit)
+        
+        return {
+            "query": q,
+            "results": results,
+            "metadata": {
+                "timestamp": datetime.now().isoformat(),
+                "count": len(results)
+            }
+        }
+    except Exception as e:
+        logger.error(f"❌ Company search failed for '{q}': {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/fundamentals/invalidate")
+async def invalidate_fundamentals(symbol: Optional[str] = None):
+    """Force fundamentals (ratios, EPS, BVPS, shares) to reload on next read"""
+    try:
+        logger.info(f"🔄 Invalidating fundamentals for {symbol or 'all symbols'}")
+        get_fundamentals_store().invalidate(symbol)
+        return {
+            "invalidated": symbol.upper() if symbol else "all",
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"❌ Fundamentals invalidation failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/screen")
+async def screen_stocks(where: str = "", sort: Optional[str] = None, limit: int = 50, columns: Optional[str] = None):
+    """Screen the whole universe, e.g. where=exchange==HOSE and rsi_14<30 and pe<10 and volume_ratio_20>1.5"""
+    if not vn_api:
+        raise HTTPException(status_code=503, detail="VN Stock API not initialized")
+    
+    try:
+        logger.info(f"🔍 Screening: {where or 'all'} (sort={sort})")
+        result = vn_api.screener.screen(
+            where, sort=sort, limit=max(1, min(limit, 500)),
+            columns=[c.strip() for c in columns.split(',')] if columns else None
+        )
+        result["metadata"] = {
+            "timestamp": datetime.now().isoformat(),
+            "where": where,
+            "sort": sort
+        }
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Screen failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/backtest")
+async def backtest_signals(symbols: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                           strategy: str = "predictor", horizon: str = "short_term",
+                           max_positions: int = 10, capital: float = 1e9):
+    """Replay PricePredictor/InvestmentExpert signals over history with HOSE fills (tick, lot 100, T+2)"""
+    if not vn_api:
+        raise HTTPException(status_code=503, detail="VN Stock API not initialized")
+
+    try:
+        universe = [s.strip().upper() for s in symbols.split(',') if s.strip()] if symbols else \
+            [r['symbol'] for r in get_symbol_master().records()]
+        end = end or datetime.now().strftime('%Y-%m-%d')
+        start = start or (datetime.now() - timedelta(days=3 * 365)).strftime('%Y-%m-%d')
+        logger.info(f"📈 Backtesting {strategy} on {len(universe)} symbols ({start} → {end})")
+
+        panels = await load_history(vn_api.gateway, universe, start, end)
+        if panels['close'].empty:
+            raise HTTPException(status_code=404, detail="No historical data for requested symbols")
+        fundamental_scores = None
+        if strategy == "expert" and main_agent:
+            fundamental_scores = expert_fundamental_scores(
+                main_agent.investment_expert, list(panels['close'].columns),
+                get_fundamentals_store(), panels['close'].ffill().iloc[-1] * PRICE_UNIT
+            )
+        exchanges = {s: get_symbol_master().exchange_of(s) for s in panels['close'].columns}
+        result = await run_stage_async(
+            run_backtest, panels['close'], panels['volume'], panels['open'],
+            strategy=strategy, horizon=horizon, exchanges=exchanges, fundamental_scores=fundamental_scores,
+            capital=capital, max_positions=max(1, min(max_positions, 50))
+        )
+        result["metadata"] = {
+            "timestamp": datetime.now().isoformat(),
+            "requested_symbols": len(universe),
+            "fundamentals": "latest snapshot" if fundamental_scores is not None else None
+        }
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Backtest failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/simulate/{symbol}")
+async def simulate_price_paths(symbol: str, model: str = "garch", paths: int = DEFAULT_PATHS, days: int = 250,
+                               stop_loss: Optional[float] = None, take_profit: Optional[float] = None,
+                               var_level: float = 0.95):
+    """Monte Carlo price paths (GBM/bootstrap/GARCH, VN price limits): quantiles, SL/TP hit odds, path VaR"""
+    if not vn_api:
+        raise HTTPException(status_code=503, detail="VN Stock API not initialized")
+
+    try:
+        symbol = symbol.upper()
+        logger.info(f"🎲 Simulating {paths} {model} paths for {symbol} ({days} sessions)")
+        end = datetime.now().strftime('%Y-%m-%d')
+        start = (datetime.now() - timedelta(days=3 * 365)).strftime('%Y-%m-%d')
+        panels = await load_history(vn_api.gateway, [symbol], start, end)
+        if panels['close'].empty:
+            raise HTTPException(status_code=404, detail=f"No historical data for {symbol}")
+        closes = panels['close'][symbol].dropna().to_numpy() * PRICE_UNIT
+        exchange = get_symbol_master().exchange_of(symbol)
+        result = await run_stage_async(
+            run_simulation, closes, model=model, exchange=exchange, n_paths=paths, horizon=days,
+            stop_loss=stop_loss, take_profit=take_profit, var_level=var_level
+        )
+        result["symbol"] = symbol
+        result["metadata"] = {
+            "timestamp": datetime.now().isoformat(),
+            "history_sessions": len(closes),
+            "history_start": start
+        }
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Simulation failed for {symbol}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/portfolio/risk")
+async def portfolio_risk(request: PortfolioRiskRequest):
+    """Portfolio volatility, historical/parametric VaR & CVaR, risk contributions and correlation (shrinkage covariance)"""
+    if not vn_api:
+        raise HTTPException(status_code=503, detail="VN Stock API not initialized")
+
+    try:
+        holdings = {s.strip().upper(): float(q) for s, q in request.holdings.items() if s.strip() and float(q) > 0}
+        if not holdings:
+            raise ValueError("holdings must contain at least one positive position")
+        if len(holdings) > MAX_HOLDINGS:
+            raise ValueError(f"At most {MAX_HOLDINGS} holdings per request")
+        logger.info(f"🧮 Portfolio risk for {len(holdings)} holdings ({request.unit})")
+
+        end = datetime.now().strftime('%Y-%m-%d')
+        # Lùi đúng số phiên theo lịch giao dịch (+ đệm cho phiên tạm ngừng giao dịch)
+        start = str(get_trading_calendar().add_sessions(datetime.now(), -(request.lookback_days + 10)))
+        panels = await load_history(vn_api.gateway, list(holdings), start, end)
+        if panels['close'].empty:
+            raise HTTPException(status_code=404, detail="No historical data for requested holdings")
+        result = await run_stage_async(
+            compute_portfolio_risk, panels['close'] * PRICE_UNIT, holdings, unit=request.unit,
+            level=request.confidence, horizon=request.horizon_days, lookback=request.lookback_days
+        )
+        result["metadata"] = {
+            "timestamp": datetime.now().isoformat(),
+            "history_start": start,
+            "history_end": end
+        }
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Portfolio risk failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/predictions/accuracy")
+async def get_prediction_accuracy(method: Optional[str] = None, horizon: Optional[int] = None):
+    """Rolling accuracy and interval calibration of served forecasts, per method and horizon"""
+    if not vn_api:
+        raise HTTPException(status_code=503, detail="VN Stock API not initialized")
+    
+    try:
+        ledger = vn_api.prediction_ledger
+        return {
+            "accuracy": ledger.get_accuracy(method, horizon),
+            "metadata": {
+                "timestamp": datetime.now().isoformat(),
+                "ledger": ledger.get_stats()
+            }
+        }
+    except Exception as e:
+        logger.error(f"❌ Prediction accuracy failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/vn-symbols")
 async def get_vn_symbols():
     """Get available Vietnamese stock symbols"""
@@ -405,7 +705,7 @@ async def get_market_news():
     
     try:
         logger.info("🌍 Fetching market news")
-        result = await run_in_threadpool(main_agent.market_news.get_market_news)
+        result = await run_stage_async(main_agent.market_news.get_market_news)
         
         result["news_metadata"] = {
             "timestamp": datetime.now().isoformat(),
@@ -501,7 +801,18 @@ async def get_system_status():
             "ai_chatbot": main_agent and main_agent.gemini_agent is not None,
             "real_news": main_agent and hasattr(main_agent.vn_api, 'crewai_collector') and main_agent.vn_api.crewai_collector and main_agent.vn_api.crewai_collector.enabled,
             "company_analysis": main_agent and hasattr(main_agent.vn_api, 'crewai_collector') and main_agent.vn_api.crewai_collector and main_agent.vn_api.crewai_collector.enabled
-        }
+        },
+        "ai_usage": {
+            "prompt_tokens": get_performance_monitor().get_prompt_token_stats(),
+            "response_cache": get_ai_cache().get_stats()
+        },
+        "executors": get_execution_manager().get_stats(),
+        "data_sources": get_vnstock_gateway().get_stats(),
+        "symbol_master": get_symbol_master().get_stats(),
+        "listing_sync": vn_api.listing_sync.get_stats() if vn_api else None,
+        "fundamentals": get_fundamentals_store().get_stats(),
+        "screener": vn_api.screener.get_stats() if vn_api else None,
+        "prediction_ledger": vn_api.prediction_ledger.get_stats() if vn_api else None
     }
 
 # Error handlers
@@ -514,8 +825,8 @@ async def not_found_handler(request, exc):
             "message": "The requested endpoint does not exist",
             "timestamp": datetime.now().isoformat(),
             "available_endpoints": [
-                "/health", "/analyze", "/query", "/predict/{symbol}",
-                "/news/{symbol}", "/risk/{symbol}", "/vn-market", "/vn-symbols"
+                "/health", "/analyze", "/analyze/stream", "/query", "/query/stream", "/predict/{symbol}",
+                "/news/{symbol}", "/risk/{symbol}", "/vn-market", "/vn-watchlist", "/vn-symbols", "/search", "/screen", "/backtest", "/simulate/{symbol}", "/portfolio/risk", "/predictions/accuracy"
             ]
         }
     )
@@ -3,7 +3,7 @@ import asyncio
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 from main_agent import MainAgent
 from src.data.vn_stock_api import VNStockAPI
 from src.ui.styles import load_custom_css
@@ -241,7 +241,7 @@ def display_price_prediction(pred, investment_amount=10000000, risk_tolerance=50
     st.markdown("### 📊 Dự đoán giá theo thời gian")
     
     # Compute target dates based on analysis time
-    from datetime import datetime, timedelta
+    from datetime import datetime
     analysis_ts = pred.get('analysis_date')
     try:
         analysis_dt = datetime.strptime(analysis_ts, '%Y-%m-%d %H:%M:%S') if analysis_ts else datetime.now()
@@ -249,40 +249,41 @@ def display_price_prediction(pred, investment_amount=10000000, risk_tolerance=50
         analysis_dt = datetime.now()
     date_fmt = '%d/%m/%Y'
     
-    # Adjust to previous trading day if falls on weekend (Sat=5, Sun=6)
-    def adjust_to_trading_day(d: datetime) -> datetime:
-        while d.weekday() >= 5:  # 5=Saturday, 6=Sunday
-            d -= timedelta(days=1)
-        return d
-    
     # Format date with Vietnamese weekday
     VN_WEEKDAYS = ['Thứ Hai', 'Thứ Ba', 'Thứ Tư', 'Thứ Năm', 'Thứ Sáu', 'Thứ Bảy', 'Chủ Nhật']
     def format_vn_date(d: datetime) -> str:
         return f"{VN_WEEKDAYS[d.weekday()]}, {d.strftime(date_fmt)}"
     
-    date_1d = format_vn_date(analysis_dt + timedelta(days=1))
-    date_1w = format_vn_date(analysis_dt + timedelta(days=7))
-    date_1m = format_vn_date(analysis_dt + timedelta(days=30))
-    date_3m = format_vn_date(analysis_dt + timedelta(days=90))
-    
-    # Helper: weekend-adjusted price (keep weekend date, use Friday's price)
-    def weekend_adjusted_price(days: int, base_price: float, bucket: str) -> float:
-        raw_date = analysis_dt + timedelta(days=days)
-        wd = raw_date.weekday()
-        weekend_delta = 1 if wd == 5 else 2 if wd == 6 else 0  # Sat=5, Sun=6
-        if weekend_delta == 0:
-            return base_price
-        adjusted_days = max(days - weekend_delta, 0)
-        if adjusted_days == 0:
-            return current_price
-        alt = predictions.get(bucket, {}).get(f"{adjusted_days}_days", {}).get('price')
-        return alt if alt else base_price
-    
-    # Weekend-aware display targets for top cards
-    target_1d_disp = weekend_adjusted_price(1, target_1d, 'short_term')
-    target_1w_disp = weekend_adjusted_price(7, target_1w, 'short_term')
-    target_1m_disp = weekend_adjusted_price(30, target_1m, 'medium_term')
-    target_3m_disp = weekend_adjusted_price(90, target_3m, 'long_term')
+    # Mốc 'N_days' là N phiên giao dịch kể từ ngày phân tích -> ngày hiển thị là phiên thứ N
+    from src.utils.trading_calendar import get_trading_calendar
+    trading_calendar = get_trading_calendar()
+    def session_date(days: int):
+        return trading_calendar.add_sessions(analysis_dt, days).astype(object)
+    
+    date_1d = format_vn_date(session_date(1))
+    date_1w = format_vn_date(session_date(7))
+    date_1m = format_vn_date(session_date(30))
+    date_3m = format_vn_date(session_date(90))
+    
+    # Đường dự báo theo phiên: giá của mốc N phiên là một phép tra mảng
+    forecast_path = None
+    if pred.get('forecast_path'):
+        try:
+            from src.data.forecast_path import ForecastPath
+            forecast_path = ForecastPath.from_payload(pred['forecast_path'])
+        except Exception as e:
+            print(f"⚠️ Forecast path unreadable: {e}")
+    
+    def session_price(days: int, base_price: float) -> float:
+        if forecast_path is not None and days <= forecast_path.horizon:
+            return forecast_path.entry(days)['price']
+        return base_price
+    
+    # Giá hiển thị trên các thẻ = đúng mốc phiên của API ('30_days' -> phiên thứ 30)
+    target_1d_disp = session_price(1, target_1d)
+    target_1w_disp = session_price(7, target_1w)
+    target_1m_disp = session_price(30, target_1m)
+    target_3m_disp = session_price(90, target_3m)
     
     # Calculate percentage changes - ENHANCED with validation and consistency
     def safe_calculate_change(predicted_price, current_price):
@@ -617,23 +618,8 @@ def display_price_prediction(pred, investment_amount=10000000, risk_tolerance=50
                                 predicted_price = values.get('price', 0)
                                 stored_change_percent = values.get('change_percent', 0)
 
-                                # Determine period days and weekend adjustment for display price
-                                try:
-                                    days_count_calc = int(period.split('_')[0]) if period.endswith('_days') else None
-                                except Exception:
-                                    days_count_calc = None
-                                weekend_delta = 0
-                                if days_count_calc is not None:
-                                    raw_dt = analysis_dt + timedelta(days=days_count_calc)
-                                    wd = raw_dt.weekday()
-                                    weekend_delta = 1 if wd == 5 else 2 if wd == 6 else 0
-                                
-                                # Use Friday's price for weekend display (keep weekend date)
+                                # Mốc theo phiên giao dịch -> không rơi vào cuối tuần, hiển thị đúng giá của mốc
                                 display_price = predicted_price
-                                if weekend_delta > 0 and days_count_calc is not None:
-                                    adjusted_days = max(days_count_calc - weekend_delta, 0)
-                                    alt_price = data.get(f"{adjusted_days}_days", {}).get('price') if adjusted_days > 0 else current_price
-                                    display_price = alt_price if alt_price else predicted_price
                                 
                                 # Recompute display change with safety and scaling
                                 if current_price > 0:
@@ -641,8 +627,8 @@ def display_price_prediction(pred, investment_amount=10000000, risk_tolerance=50
                                 else:
                                     recalc_change = 0
                                 
-                                # Prefer recomputed change if stored is too small or weekend-adjusted
-                                if abs(stored_change_percent) < 0.1 or weekend_delta > 0:
+                                # Prefer recomputed change if stored is too small
+                                if abs(stored_change_percent) < 0.1:
                                     if abs(recalc_change) < 0.1:
                                         base_change = 0.8 if display_price > current_price else -0.8 if display_price < current_price else 0.4
                                         if '1_days' in period:
@@ -676,8 +662,7 @@ def display_price_prediction(pred, investment_amount=10000000, risk_tolerance=50
                                 except Exception:
                                     days_count = None
                                 if days_count:
-                                    raw_target_dt = analysis_dt + timedelta(days=days_count)
-                                    st.caption(f"📅 {format_vn_date(raw_target_dt)}")
+                                    st.caption(f"📅 {format_vn_date(session_date(days_count))}")
                                 
                                 # Show confidence interval if available (for LSTM)
                                 conf_int = values.get('confidence_interval', {})
@@ -1361,7 +1346,7 @@ with st.sidebar:
                 st.error('❌ Cần khóa API Gemini!')
     
     # Force refresh button
-    if st.button("🔄 Làm mới dữ liệu", use_container_width=True, help="Xóa cache và tải lại symbols từ CrewAI"):
+    if st.button("🔄 Làm mới dữ liệu", use_container_width=True, help="Xóa cache và đồng bộ lại listing mã cổ phiếu"):
         main_agent.vn_api.clear_symbols_cache()
         st.success('✅ Đã xóa cache - Reload trang để lấy dữ liệu mới!')
         st.rerun()
@@ -1445,30 +1430,23 @@ with st.sidebar:
     # Stock Selection
     st.subheader("📈 Chọn cổ phiếu")
     
-    # Load symbols with CrewAI priority
+    # Load symbols từ symbol master (listing sync chạy nền, không chờ)
     with st.spinner("Đang tải danh sách mã cổ phiếu..."):
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         
-        # Get symbols from VN API (which handles CrewAI internally)
         symbols = loop.run_until_complete(vn_api.get_available_symbols())
         
         # Check data source from symbols metadata
         data_source = 'Static'  # Default
         if symbols and len(symbols) > 0:
             first_symbol = symbols[0]
-            if first_symbol.get('data_source') == 'CrewAI':
-                data_source = 'CrewAI'
-                st.success(f'✅ {len(symbols)} mã cổ phiếu từ CrewAI (Real Data)')
+            if first_symbol.get('data_source') == 'Listing':
+                data_source = 'Listing'
+                st.success(f'✅ {len(symbols)} mã cổ phiếu từ listing sàn (Real Data)')
             else:
                 data_source = 'Static'
-                st.info(f'📋 {len(symbols)} mã cổ phiếu tĩnh (Fallback)')
-                
-                # Show why CrewAI is not working
-                if not main_agent.gemini_agent:
-                    st.warning("⚠️ **Để lấy dữ liệu thật**: Cấu hình Gemini API key trong sidebar")
-                elif not (main_agent.vn_api.crewai_collector and main_agent.vn_api.crewai_collector.enabled):
-                    st.warning("⚠️ **CrewAI chưa khả dụng**: Kiểm tra cấu hình API keys")
+                st.info(f'📋 {len(symbols)} mã cổ phiếu tĩnh (đang đồng bộ listing nền)')
         else:
             st.error("❌ Không thể tải danh sách cổ phiếu")
         
@@ -1483,8 +1461,8 @@ with st.sidebar:
         sectors[sector].append(stock)
     
     # Show data source status
-    if data_source == 'CrewAI':
-        st.markdown("🤖 **Nguồn dữ liệu**: CrewAI Real-time Data")
+    if data_source == 'Listing':
+        st.markdown("📡 **Nguồn dữ liệu**: Listing HOSE/HNX/UPCOM (vnstock)")
     else:
         st.markdown("📋 **Nguồn dữ liệu**: Static Fallback Data")
         
@@ -1963,9 +1941,9 @@ with tab3:
     st.subheader("📋 Danh sách cổ phiếu")
     
     # Enhanced data source display
-    if data_source == 'CrewAI':
-        st.success(f"✅ Hiển thị {len(symbols)} cổ phiếu từ CrewAI (Real-time)")
-        st.markdown("🔄 **Dữ liệu được cập nhật từ**: Gemini AI + Real Market Data")
+    if data_source == 'Listing':
+        st.success(f"✅ Hiển thị {len(symbols)} cổ phiếu từ listing sàn")
+        st.markdown("🔄 **Dữ liệu được cập nhật từ**: vnstock Listing (đồng bộ hằng ngày)")
     else:
         st.info(f"📋 Hiển thị {len(symbols)} cổ phiếu tĩnh (Fallback)")
         
@@ -2012,9 +1990,9 @@ with tab3:
             for i, stock in enumerate(stocks):
                 with cols[i % 3]:
                     # Enhanced stock card with data source indicator
-                    card_color = "#e8f5e8" if data_source == 'CrewAI' else "#f0f0f0"
-                    border_color = "#4caf50" if data_source == 'CrewAI' else "#2196f3"
-                    icon = "🟢" if data_source == 'CrewAI' else "📋"
+                    card_color = "#e8f5e8" if data_source == 'Listing' else "#f0f0f0"
+                    border_color = "#4caf50" if data_source == 'Listing' else "#2196f3"
+                    icon = "🟢" if data_source == 'Listing' else "📋"
                     
                     st.markdown(f"""
                     <div style="
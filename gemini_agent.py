@@ -6,6 +6,10 @@ import asyncio
 import json
 import time
 from datetime import datetime
+from src.utils.ai_cache import get_ai_cache
+from src.utils.prompt_builder import (
+    PromptBuilder, PRIORITY_CRITICAL, PRIORITY_HIGH, PRIORITY_MEDIUM, PRIORITY_LOW, record_prompt_tokens
+)
 
 logger = logging.getLogger(__name__)
 
@@ -116,10 +120,14 @@ class UnifiedAIAgent:
             logger.error(f"Error generating with {model_name}: {str(e)}")
             raise
     
-    def generate_with_fallback(self, prompt: str, task_type: str, max_tokens: int = 1000) -> Dict[str, Any]:
+    def generate_with_fallback(self, prompt: str, task_type: str, max_tokens: int = 1000,
+                               record_tokens: bool = True) -> Dict[str, Any]:
         """
         Generate response with automatic fallback to offline mode if primary fails
+        record_tokens=False: caller đã ghi token của prompt này (vd. stream lỗi rồi fallback)
         """
+        if record_tokens:
+            record_prompt_tokens(task_type, prompt)
         try:
             response = self.generate_with_model(prompt, 'gemini', max_tokens)
             return {
@@ -142,6 +150,65 @@ class UnifiedAIAgent:
                     'error': str(e)
                 }
     
+    def generate_cached(self, prompt: str, task_type: str, max_tokens: int = 1000,
+                        template_id: str = None, fingerprint: Any = None) -> Dict[str, Any]:
+        """
+        generate_with_fallback + content-addressed cache.
+        Key = template id + fingerprint đã lượng tử hóa (mặc định: prompt đã chuẩn hóa)
+        """
+        template_id = template_id or task_type
+        if fingerprint is None:
+            fingerprint = prompt
+
+        cache = get_ai_cache()
+        cached = cache.get(template_id, fingerprint)
+        if cached is not None:
+            logger.info(f"AI cache hit: {template_id}")
+            return cached
+
+        result = self.generate_with_fallback(prompt, task_type, max_tokens)
+        cache.set(template_id, fingerprint, result)
+        return result
+    
+    def generate_stream(self, prompt: str, task_type: str, max_tokens: int = 1000,
+                        template_id: str = None):
+        """
+        Stream response chunks từ Gemini.
+        Yield {'type': 'token', 'text': ...}, cuối cùng {'type': 'done', 'result': {...}} (cùng format generate_with_fallback)
+        """
+        template_id = template_id or task_type
+        cache = get_ai_cache()
+        cached = cache.get(template_id, prompt)
+        if cached is not None:
+            yield {'type': 'token', 'text': cached.get('response', '')}
+            yield {'type': 'done', 'result': cached}
+            return
+        
+        record_prompt_tokens(task_type, prompt)
+        chunks = []
+        try:
+            if 'gemini' not in self.available_models:
+                raise ValueError("Model gemini not available.")
+            for chunk in self.available_models['gemini'].generate_content(prompt, stream=True):
+                text = getattr(chunk, 'text', '') or ''
+                if text:
+                    chunks.append(text)
+                    yield {'type': 'token', 'text': text}
+            result = {'response': ''.join(chunks), 'model_used': 'gemini', 'success': True}
+            cache.set(template_id, prompt, result)
+        except Exception as e:
+            logger.error(f"Gemini streaming failed: {str(e)}")
+            if chunks:
+                # Đã stream một phần - giữ phần đã có
+                result = {'response': ''.join(chunks), 'model_used': 'gemini', 'success': True, 'truncated': True}
+            else:
+                result = self.generate_with_fallback(prompt, task_type, max_tokens, record_tokens=False)
+                cache.set(template_id, prompt, result)
+                if result.get('success'):
+                    yield {'type': 'token', 'text': result.get('response', '')}
+        
+        yield {'type': 'done', 'result': result}
+    
     def _generate_offline_fallback(self, prompt: str, task_type: str) -> Dict[str, Any]:
         """
         Generate offline fallback response when API quota is exhausted
@@ -262,6 +329,25 @@ Xin lỗi, Gemini API đã hết quota nên tôi không thể phân tích chi ti
         if not symbol and query_type == "general":
             return self.generate_general_response(query)
         
+        context = self._build_expert_context(query, symbol, data)
+        
+        # Use the new unified AI system with fallback
+        try:
+            result = self.generate_cached(context, 'financial_advice', max_tokens=2048, template_id='expert_advice')
+            return self._format_expert_result(result)
+        except Exception as e:
+            logger.error(f"Critical error in generate_expert_advice: {str(e)}")
+            return {
+                "expert_advice": f"❌ **LỖI NGHIÊM TRỌNG:**\n{str(e)}\n\n⚠️ Hệ thống AI tạm thời không khả dụng.",
+                "recommendations": [
+                    "Thử lại sau 5-10 phút",
+                    "Kiểm tra kết nối internet",
+                    "Liên hệ hỗ trợ kỹ thuật"
+                ]
+            }
+    
+    def _build_expert_context(self, query: str, symbol: str = None, data: dict = None) -> str:
+        """Build prompt for expert advice (dùng chung cho bản thường và bản streaming)"""
         # Build comprehensive context for stock analysis
         context = f"""
 Bạn là một chuyên gia tài chính hàng đầu với 20 năm kinh nghiệm đầu tư chứng khoán tại Việt Nam và quốc tế.
@@ -299,48 +385,60 @@ CẢNH BÁO RỦI RO:
 
 Lưu ý: Trả lời bằng tiếng Việt, dựa trên dữ liệu thực tế, không đưa lời khuyên tuyệt đối.
 """
-        
-        # Use the new unified AI system with fallback
-        try:
-            result = self.generate_with_fallback(context, 'financial_advice', max_tokens=2048)
+        return context
+    
+    def _format_expert_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert raw AI result into expert advice response"""
+        if result['success']:
+            parsed_response = self._parse_response(result['response'])
             
-            if result['success']:
+            # Add model info to response
+            if result.get('fallback'):
+                parsed_response['expert_advice'] += f"\n\n🤖 **AI Model:** {result['model_used']} (fallback)"
+            else:
+                parsed_response['expert_advice'] += f"\n\n🤖 **AI Model:** {result['model_used']}"
+            
+            return parsed_response
+        else:
+            # Check if quota exceeded
+            if result.get('quota_exceeded'):
                 parsed_response = self._parse_response(result['response'])
-                
-                # Add model info to response
-                if result.get('fallback'):
-                    parsed_response['expert_advice'] += f"\n\n🤖 **AI Model:** {result['model_used']} (fallback)"
-                else:
-                    parsed_response['expert_advice'] += f"\n\n🤖 **AI Model:** {result['model_used']}"
-                
+                parsed_response['expert_advice'] += "\n\n🤖 **AI Model:** Offline Fallback (Quota Exceeded)"
                 return parsed_response
             else:
-                # Check if quota exceeded
-                if result.get('quota_exceeded'):
-                    parsed_response = self._parse_response(result['response'])
-                    parsed_response['expert_advice'] += "\n\n🤖 **AI Model:** Offline Fallback (Quota Exceeded)"
-                    return parsed_response
-                else:
-                    return {
-                        "expert_advice": f"❌ **LỖI AI SYSTEM:**\n{result.get('response', 'Không thể kết nối với AI models')}\n\n⚠️ **GỢI Ý:**\n- Kiểm tra API keys\n- Thử lại sau vài phút\n- Liên hệ hỗ trợ nếu vấn đề tiếp tục",
-                        "recommendations": [
-                            "Kiểm tra Gemini API key",
-                            "Thử lại sau vài phút", 
-                            "Liên hệ hỗ trợ kỹ thuật",
-                            "Sử dụng chế độ offline"
-                        ]
-                    }
-                
-        except Exception as e:
-            logger.error(f"Critical error in generate_expert_advice: {str(e)}")
-            return {
-                "expert_advice": f"❌ **LỖI NGHIÊM TRỌNG:**\n{str(e)}\n\n⚠️ Hệ thống AI tạm thời không khả dụng.",
-                "recommendations": [
-                    "Thử lại sau 5-10 phút",
-                    "Kiểm tra kết nối internet",
-                    "Liên hệ hỗ trợ kỹ thuật"
-                ]
-            }
+                return {
+                    "expert_advice": f"❌ **LỖI AI SYSTEM:**\n{result.get('response', 'Không thể kết nối với AI models')}\n\n⚠️ **GỢI Ý:**\n- Kiểm tra API keys\n- Thử lại sau vài phút\n- Liên hệ hỗ trợ nếu vấn đề tiếp tục",
+                    "recommendations": [
+                        "Kiểm tra Gemini API key",
+                        "Thử lại sau vài phút", 
+                        "Liên hệ hỗ trợ kỹ thuật",
+                        "Sử dụng chế độ offline"
+                    ]
+                }
+    
+    def stream_expert_advice(self, query: str, symbol: str = None, data: dict = None):
+        """
+        Streaming version of generate_expert_advice.
+        Yield {'type': 'token', 'text': ...} theo từng chunk, cuối cùng {'type': 'result', 'data': ...}
+        """
+        query_type = self.detect_query_type(query)
+        if not symbol and query_type == "general":
+            yield {'type': 'result', 'data': self.generate_general_response(query)}
+            return
+        
+        context = self._build_expert_context(query, symbol, data)
+        chunks = []
+        result = None
+        for event in self.generate_stream(context, 'financial_advice', max_tokens=2048, template_id='expert_advice'):
+            if event['type'] == 'token':
+                chunks.append(event['text'])
+                yield event
+            else:
+                result = event['result']
+        
+        yield {'type': 'result', 'data': self._format_expert_result(result or {
+            'response': ''.join(chunks), 'model_used': 'gemini', 'success': bool(chunks)
+        })}
     
     def _parse_response(self, response_text: str):
         """Parse enhanced Gemini response"""
@@ -421,51 +519,68 @@ Lưu ý: Trả lời bằng tiếng Việt, dựa trên dữ liệu thực tế,
                 ]
             }
     
-    def _format_data_for_ai(self, data: dict) -> str:
-        """Format data for AI analysis"""
+    def _format_data_for_ai(self, data: dict, task_type: str = 'financial_advice') -> str:
+        """Format data for AI analysis (compact, token-budgeted)"""
         if not data:
             return "Không có dữ liệu cụ thể"
         
-        formatted = []
+        builder = PromptBuilder(task_type)
         
         # VN Stock Data
-        if 'vn_stock_data' in data and data['vn_stock_data']:
-            vn_data = data['vn_stock_data']
-            formatted.append(f"📈 THÔNG TIN CỔ PHIẾU:")
-            formatted.append(f"- Giá hiện tại: {vn_data.price:,} VND")
-            formatted.append(f"- Thay đổi: {vn_data.change:+,} VND ({vn_data.change_percent:+.2f}%)")
-            formatted.append(f"- Khối lượng: {vn_data.volume:,}")
-            formatted.append(f"- Vốn hóa: {vn_data.market_cap:,} tỷ VND")
-            formatted.append(f"- P/E: {vn_data.pe_ratio}, P/B: {vn_data.pb_ratio}")
-            formatted.append(f"- Ngành: {vn_data.sector}, Sàn: {vn_data.exchange}")
+        vn_data = data.get('vn_stock_data')
+        if vn_data and not isinstance(vn_data, dict):
+            builder.add_section("📈 THÔNG TIN CỔ PHIẾU:", [
+                ("Giá hiện tại (VND)", getattr(vn_data, 'price', None), PRIORITY_CRITICAL),
+                ("Thay đổi %", getattr(vn_data, 'change_percent', None), PRIORITY_CRITICAL),
+                ("Khối lượng", getattr(vn_data, 'volume', None), PRIORITY_MEDIUM),
+                ("Vốn hóa (tỷ VND)", getattr(vn_data, 'market_cap', None), PRIORITY_MEDIUM),
+                ("P/E", getattr(vn_data, 'pe_ratio', None), PRIORITY_HIGH),
+                ("P/B", getattr(vn_data, 'pb_ratio', None), PRIORITY_HIGH),
+                ("Ngành", getattr(vn_data, 'sector', None), PRIORITY_LOW),
+                ("Sàn", getattr(vn_data, 'exchange', None), PRIORITY_LOW)
+            ])
         
         # Price Prediction
-        if 'price_prediction' in data and data['price_prediction']:
-            pred = data['price_prediction']
-            formatted.append(f"\n🔮 DỰ ĐOÁN GIÁ:")
-            formatted.append(f"- Xu hướng: {pred.get('trend', 'N/A')}")
-            formatted.append(f"- Giá dự đoán: {pred.get('predicted_price', 'N/A')}")
-            formatted.append(f"- Độ tin cậy: {pred.get('confidence', 'N/A')}")
+        pred = data.get('price_prediction')
+        if isinstance(pred, dict) and not pred.get('error'):
+            builder.add_section("🔮 DỰ ĐOÁN GIÁ:", [
+                ("Xu hướng", pred.get('trend'), PRIORITY_CRITICAL),
+                ("Giá dự đoán", pred.get('predicted_price'), PRIORITY_CRITICAL),
+                ("Thay đổi dự kiến %", pred.get('change_percent'), PRIORITY_HIGH),
+                ("Độ tin cậy", pred.get('confidence'), PRIORITY_HIGH),
+                ("RSI", (pred.get('technical_indicators') or {}).get('rsi'), PRIORITY_MEDIUM)
+            ])
         
         # Risk Assessment
-        if 'risk_assessment' in data and data['risk_assessment']:
-            risk = data['risk_assessment']
-            formatted.append(f"\n⚠️ ĐÁNH GIÁ RỦI RO:")
-            formatted.append(f"- Mức rủi ro: {risk.get('risk_level', 'N/A')}")
-            formatted.append(f"- Độ biến động: {risk.get('volatility', 'N/A')}%")
-            formatted.append(f"- Beta: {risk.get('beta', 'N/A')}")
-            formatted.append(f"- Max Drawdown: {risk.get('max_drawdown', 'N/A')}%")
+        risk = data.get('risk_assessment')
+        if isinstance(risk, dict) and not risk.get('error'):
+            builder.add_section("⚠️ ĐÁNH GIÁ RỦI RO:", [
+                ("Mức rủi ro", risk.get('risk_level'), PRIORITY_CRITICAL),
+                ("Độ biến động %", risk.get('volatility'), PRIORITY_HIGH),
+                ("Beta", risk.get('beta'), PRIORITY_MEDIUM),
+                ("Max Drawdown %", risk.get('max_drawdown'), PRIORITY_HIGH),
+                ("VaR 95%", risk.get('var_95'), PRIORITY_MEDIUM),
+                ("Sharpe", risk.get('sharpe_ratio'), PRIORITY_LOW)
+            ])
         
         # Investment Analysis
-        if 'investment_analysis' in data and data['investment_analysis']:
-            inv = data['investment_analysis']
-            formatted.append(f"\n💼 PHÂN TÍCH ĐẦU TƯ:")
-            formatted.append(f"- Khuyến nghị: {inv.get('recommendation', 'N/A')}")
-            formatted.append(f"- Lý do: {inv.get('reason', 'N/A')}")
-            formatted.append(f"- Cổ tức: {inv.get('dividend_yield', 'N/A')}%")
-            formatted.append(f"- Giá mục tiêu: {inv.get('target_price', 'N/A')}")
-        
-        return "\n".join(formatted) if formatted else "Dữ liệu không đầy đủ để phân tích"
+        inv = data.get('investment_analysis')
+        if isinstance(inv, dict) and not inv.get('error'):
+            builder.add_section("💼 PHÂN TÍCH ĐẦU TƯ:", [
+                ("Khuyến nghị", inv.get('recommendation'), PRIORITY_CRITICAL),
+                ("Điểm", inv.get('score'), PRIORITY_HIGH),
+                ("Lý do", inv.get('reason'), PRIORITY_HIGH),
+                ("Cổ tức %", inv.get('dividend_yield'), PRIORITY_LOW),
+                ("Giá mục tiêu", inv.get('target_price'), PRIORITY_MEDIUM)
+            ])
+        
+        # Ticker News - chỉ giữ top-k tiêu đề
+        news = data.get('ticker_news')
+        if isinstance(news, dict) and news.get('news'):
+            builder.add_news("📰 TIN TỨC:", news['news'], top_k=5)
+        
+        formatted = builder.build()
+        return formatted if formatted else "Dữ liệu không đầy đủ để phân tích"
     
     def generate_general_response(self, query: str) -> dict:
         """Generate response for general questions using best available AI model"""
@@ -8,13 +8,23 @@ from agents.international_news import InternationalMarketNews
 from gemini_agent import UnifiedAIAgent
 from src.data.vn_stock_api import VNStockAPI
 from src.utils.error_handler import handle_async_errors, AgentErrorHandler, validate_symbol
-from fastapi.concurrency import run_in_threadpool
+from src.utils.config_manager import config
+from src.utils.market_schedule import market_schedule
+from src.utils.executors import get_execution_manager
 import asyncio
+import copy
+import json
 import logging
+import re
+import threading
+import time
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Số kết quả chạy nền giữ lại tối đa (mục cũ nhất bị bỏ trước)
+BACKGROUND_RESULTS_MAX = 128
+
 class MainAgent:
     def __init__(self, vn_api: VNStockAPI, gemini_api_key: str = None, serper_api_key: str = None):
         self.vn_api = vn_api
@@ -25,6 +35,10 @@ class MainAgent:
         self.investment_expert = InvestmentExpert(vn_api)
         self.risk_expert = RiskExpert(vn_api)
         self.international_news = InternationalMarketNews()
+        # Kết quả agent hoàn thành sau deadline (dùng cho request tiếp theo)
+        self._background_results = {}
+        # Executor theo loại workload: agent I/O chạy trên IO pool, stage CPU/LSTM tự chuyển pool
+        self.executor = get_execution_manager()
         
         # Initialize Unified AI Agent with user-provided API key
         self.gemini_agent = None
@@ -132,65 +146,37 @@ class MainAgent:
             return False
     
     @handle_async_errors(default_return={"error": "Lỗi hệ thống khi phân tích cổ phiếu"})
-    async def analyze_stock(self, symbol: str, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 100000000):
-        """Phân tích toàn diện một mã cổ phiếu với hồ sơ đầu tư"""
+    async def analyze_stock(self, symbol: str, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 100000000, deadline: float = None):
+        """Phân tích toàn diện một mã cổ phiếu với hồ sơ đầu tư
+        deadline: tổng thời gian tối đa (giây), agent quá hạn trả về kết quả partial"""
         if not symbol or not validate_symbol(symbol):
             return {"error": "Mã cổ phiếu không hợp lệ"}
             
         symbol = symbol.upper().strip()
         logger.info(f"Starting comprehensive analysis for {symbol} with profile: {risk_tolerance}% risk, {time_horizon}, {investment_amount:,} VND")
         
-        tasks = {}
         results = {"symbol": symbol}
+        # Có AI: các agent bỏ qua AI riêng lẻ, gộp thành 1 prompt ở bước enrichment
+        fused_ai = self.gemini_agent is not None
 
         try:
-            # Check if VN stock first
-            if self.vn_api.is_vn_stock(symbol):
-                logger.info(f"{symbol} is Vietnamese stock, using VN API")
-                tasks['vn_stock_data'] = self.vn_api.get_stock_data(symbol)
-                tasks['ticker_news'] = self.vn_api.get_news_sentiment(symbol)
-                tasks['detailed_stock_info'] = self.stock_info.get_detailed_stock_data(symbol)
-                market_type = 'Vietnam'
-            else:
-                # Kiểm tra xem có phải là mã hợp lệ cho international market không
-                if self._is_valid_international_symbol(symbol):
-                    logger.info(f"{symbol} is international stock, using international APIs")
-                    tasks['ticker_news'] = run_in_threadpool(self._safe_get_ticker_news, symbol)
-                    tasks['investment_analysis'] = run_in_threadpool(self._safe_get_investment_analysis, symbol, risk_tolerance, time_horizon, investment_amount)
-                    market_type = 'International'
-                else:
-                    logger.warning(f"{symbol} is not a valid stock symbol")
-                    return {"error": f"Mã {symbol} không hợp lệ hoặc không được hỗ trợ"}
-
-            # Các tác vụ chung cho cả hai thị trường với investment profile
-            tasks['price_prediction'] = run_in_threadpool(self._safe_get_price_prediction, symbol)
-            tasks['risk_assessment'] = run_in_threadpool(self._safe_get_risk_assessment, symbol, risk_tolerance, time_horizon, investment_amount)
-            
-            # Add investment analysis for VN stocks too
-            if market_type == 'Vietnam':
-                tasks['investment_analysis'] = run_in_threadpool(self._safe_get_investment_analysis, symbol, risk_tolerance, time_horizon, investment_amount)
+            tasks, market_type = self._build_analysis_tasks(symbol, risk_tolerance, time_horizon, investment_amount, not fused_ai)
+            if market_type is None:
+                logger.warning(f"{symbol} is not a valid stock symbol")
+                return {"error": f"Mã {symbol} không hợp lệ hoặc không được hỗ trợ"}
 
-            # Thực thi tất cả các tác vụ song song
-            task_results = await asyncio.gather(*tasks.values(), return_exceptions=True)
-
-            # Ánh xạ kết quả với error handling
-            for key, result in zip(tasks.keys(), task_results):
-                if isinstance(result, Exception):
-                    logger.error(f"Error in {key} for {symbol}: {result}")
-                    results[key] = self._get_error_fallback(key, symbol, result)
-                else:
-                    results[key] = result
-            
-            # Add investment profile to results
-            results['investment_profile'] = {
-                'risk_tolerance': risk_tolerance,
-                'time_horizon': time_horizon,
-                'investment_amount': investment_amount,
-                'risk_profile': self._get_risk_profile_name(risk_tolerance)
-            }
+            # Thực thi song song với deadline từng agent + tổng thể
+            deadline = deadline or config.system.analysis_timeout
+            started = time.time()
+            profile_key = f"{symbol}:{risk_tolerance}:{time_horizon}:{investment_amount}:{not fused_ai}"
+            timed_out = []
+            async for key, result, is_timeout in self._iter_agent_results(symbol, tasks, profile_key, deadline):
+                results[key] = result
+                if is_timeout:
+                    timed_out.append(key)
             
-            results['market_type'] = market_type
-            results['analysis_timestamp'] = asyncio.get_event_loop().time()
+            remaining = deadline - (time.time() - started)
+            await self._finalize_analysis(symbol, results, market_type, risk_tolerance, time_horizon, investment_amount, fused_ai, remaining, timed_out)
             
             logger.info(f"Completed analysis for {symbol}")
             return results
@@ -199,6 +185,202 @@ class MainAgent:
             logger.error(f"Critical error in analyze_stock for {symbol}: {e}")
             return {"error": f"Lỗi nghiêm trọng khi phân tích {symbol}: {str(e)}"}
     
+    async def analyze_stock_stream(self, symbol: str, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 100000000):
+        """Streaming analyze_stock: yield (event, payload) ngay khi từng agent hoàn thành"""
+        if not symbol or not validate_symbol(symbol):
+            yield 'error', {"error": "Mã cổ phiếu không hợp lệ"}
+            return
+        
+        symbol = symbol.upper().strip()
+        results = {"symbol": symbol}
+        fused_ai = self.gemini_agent is not None
+        
+        tasks, market_type = self._build_analysis_tasks(symbol, risk_tolerance, time_horizon, investment_amount, not fused_ai)
+        if market_type is None:
+            yield 'error', {"error": f"Mã {symbol} không hợp lệ hoặc không được hỗ trợ"}
+            return
+        
+        yield 'start', {"symbol": symbol, "market_type": market_type, "agents": list(tasks.keys())}
+        
+        deadline = config.system.analysis_timeout
+        started = time.time()
+        profile_key = f"{symbol}:{risk_tolerance}:{time_horizon}:{investment_amount}:{not fused_ai}"
+        timed_out = []
+        agent_results = self._iter_agent_results(symbol, tasks, profile_key, deadline)
+        try:
+            async for key, result, is_timeout in agent_results:
+                results[key] = result
+                if is_timeout:
+                    timed_out.append(key)
+                yield 'agent_result', {"agent": key, "data": result, "timed_out": is_timeout}
+        finally:
+            # Client hủy sớm -> hủy các task còn lại
+            await agent_results.aclose()
+        
+        remaining = deadline - (time.time() - started)
+        await self._finalize_analysis(symbol, results, market_type, risk_tolerance, time_horizon, investment_amount, fused_ai, remaining, timed_out)
+        yield 'complete', results
+    
+    def _build_analysis_tasks(self, symbol: str, risk_tolerance: int, time_horizon: str, investment_amount: int, use_ai: bool = True):
+        """Tạo dict tác vụ agent cho analyze_stock. Trả về (tasks, market_type), market_type=None nếu mã không hợp lệ"""
+        tasks = {}
+        
+        # Check if VN stock first
+        if self.vn_api.is_vn_stock(symbol):
+            logger.info(f"{symbol} is Vietnamese stock, using VN API")
+            tasks['vn_stock_data'] = self.vn_api.get_stock_data(symbol)
+            tasks['ticker_news'] = self.vn_api.get_news_sentiment(symbol)
+            tasks['detailed_stock_info'] = self.stock_info.get_detailed_stock_data(symbol)
+            market_type = 'Vietnam'
+        elif self._is_valid_international_symbol(symbol):
+            # Kiểm tra xem có phải là mã hợp lệ cho international market không
+            logger.info(f"{symbol} is international stock, using international APIs")
+            tasks['ticker_news'] = self.executor.run_stage_async(self._safe_get_ticker_news, symbol)
+            tasks['investment_analysis'] = self.executor.run_stage_async(self._safe_get_investment_analysis, symbol, risk_tolerance, time_horizon, investment_amount, use_ai)
+            market_type = 'International'
+        else:
+            return tasks, None
+        
+        # Các tác vụ chung cho cả hai thị trường với investment profile
+        tasks['price_prediction'] = self.executor.run_stage_async(self._safe_get_price_prediction, symbol, use_ai)
+        tasks['risk_assessment'] = self.executor.run_stage_async(self._safe_get_risk_assessment, symbol, risk_tolerance, time_horizon, investment_amount, use_ai)
+        
+        # Add investment analysis for VN stocks too
+        if market_type == 'Vietnam':
+            tasks['investment_analysis'] = self.executor.run_stage_async(self._safe_get_investment_analysis, symbol, risk_tolerance, time_horizon, investment_amount, use_ai)
+        
+        return tasks, market_type
+    
+    async def _iter_agent_results(self, symbol: str, tasks: dict, profile_key: str, deadline: float):
+        """Yield (key, result, timed_out) khi từng agent xong, áp deadline từng agent và tổng thể.
+        Agent quá hạn tiếp tục chạy nền, kết quả được cache cho request tiếp theo."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        futures, waiters, ready = {}, {}, []
+        backgrounded = set()
+        
+        for key, coro in tasks.items():
+            cached = self._get_background_result(f"{key}:{profile_key}")
+            if cached is not None:
+                coro.close()
+                ready.append((key, cached))
+                continue
+            futures[key] = asyncio.ensure_future(coro)
+            waiter = asyncio.ensure_future(asyncio.wait_for(asyncio.shield(futures[key]), config.get_agent_timeout(key)))
+            waiters[waiter] = key
+        
+        try:
+            for key, cached in ready:
+                logger.info(f"Using background-completed {key} for {symbol}")
+                yield key, cached, False
+            
+            pending = set(waiters)
+            while pending:
+                remaining = deadline - (loop.time() - started)
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in done:
+                    key = waiters[waiter]
+                    try:
+                        yield key, waiter.result(), False
+                    except asyncio.TimeoutError:
+                        backgrounded.add(key)
+                        yield key, self._get_timeout_fallback(key, symbol, profile_key, futures[key], config.get_agent_timeout(key)), True
+                    except Exception as e:
+                        logger.error(f"Error in {key} for {symbol}: {e}")
+                        yield key, self._get_error_fallback(key, symbol, e), False
+            
+            # Quá deadline tổng thể
+            for waiter in pending:
+                waiter.cancel()
+                key = waiters[waiter]
+                backgrounded.add(key)
+                yield key, self._get_timeout_fallback(key, symbol, profile_key, futures[key], deadline), True
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+            for key, future in futures.items():
+                if key not in backgrounded and not future.done():
+                    future.cancel()
+    
+    def _get_timeout_fallback(self, key: str, symbol: str, profile_key: str, future, timeout: float):
+        """Kết quả cho agent quá hạn + cho task chạy nền để cache kết quả"""
+        logger.warning(f"{key} for {symbol} exceeded {timeout:g}s deadline, completing in background")
+        cache_key = f"{key}:{profile_key}"
+        
+        def _store(done_future):
+            if done_future.cancelled() or done_future.exception() is not None:
+                return
+            self._store_background_result(cache_key, done_future.result())
+            logger.info(f"Background completion cached: {cache_key}")
+        
+        future.add_done_callback(_store)
+        # Quá BACKGROUND_TIMEOUT thì bỏ kết quả. Thread executor không dừng được giữa chừng:
+        # agent tự kết thúc theo timeout HTTP của nó, số thread bị chiếm tối đa = kích thước IO pool
+        asyncio.get_running_loop().call_later(config.system.background_timeout, future.cancel)
+        
+        fallback = self._get_error_fallback(key, symbol, asyncio.TimeoutError(f"vượt quá deadline {timeout:g}s"))
+        if isinstance(fallback, dict):
+            fallback = dict(fallback, timed_out=True)
+        return fallback
+    
+    @staticmethod
+    def _background_ttl() -> float:
+        return market_schedule.get_data_freshness_expectation().get('cache_duration', 300)
+    
+    def _store_background_result(self, cache_key: str, data):
+        """Cache kết quả chạy nền; dọn mục hết hạn và giới hạn số mục"""
+        now = time.time()
+        ttl = self._background_ttl()
+        for key in [k for k, entry in self._background_results.items() if now - entry['timestamp'] > ttl]:
+            del self._background_results[key]
+        self._background_results.pop(cache_key, None)
+        self._background_results[cache_key] = {'data': data, 'timestamp': now}
+        while len(self._background_results) > BACKGROUND_RESULTS_MAX:
+            del self._background_results[next(iter(self._background_results))]
+    
+    def _get_background_result(self, cache_key: str):
+        """Lấy kết quả chạy nền còn hạn (TTL theo phiên thị trường)"""
+        entry = self._background_results.get(cache_key)
+        if not entry:
+            return None
+        if time.time() - entry['timestamp'] > self._background_ttl():
+            self._background_results.pop(cache_key, None)
+            return None
+        return copy.deepcopy(entry['data'])
+    
+    async def _finalize_analysis(self, symbol: str, results: dict, market_type: str, risk_tolerance: int, time_horizon: str, investment_amount: int, fused_ai: bool, remaining: float = None, timed_out: list = None):
+        """Thêm investment profile, AI enrichment gộp và metadata vào kết quả"""
+        timed_out = list(timed_out or [])
+        # Add investment profile to results
+        results['investment_profile'] = {
+            'risk_tolerance': risk_tolerance,
+            'time_horizon': time_horizon,
+            'investment_amount': investment_amount,
+            'risk_profile': self._get_risk_profile_name(risk_tolerance)
+        }
+        
+        # Enrichment AI gộp: 1 lần gọi Gemini cho price + risk + investment
+        if fused_ai:
+            # Enrichment chạy trên bản sao để không sửa kết quả sau khi đã trả về (nếu quá hạn)
+            enriched = copy.deepcopy(results)
+            try:
+                timeout = max(remaining, 1.0) if remaining is not None else None
+                await asyncio.wait_for(self.executor.run_stage_async(self._run_fused_ai_enrichment, symbol, enriched), timeout)
+                for key in self.FUSED_SECTIONS:
+                    if key in enriched:
+                        results[key] = enriched[key]
+            except asyncio.TimeoutError:
+                logger.warning(f"AI enrichment for {symbol} exceeded deadline")
+                timed_out.append('ai_enrichment')
+        
+        results['market_type'] = market_type
+        results['analysis_timestamp'] = asyncio.get_event_loop().time()
+        results['partial'] = bool(timed_out)
+        results['timed_out_agents'] = timed_out
+        return results
+    
     @handle_async_errors(default_return={"error": "Lỗi khi lấy tổng quan thị trường"})
     async def get_market_overview(self):
         """Lấy tổng quan thị trường"""
@@ -206,7 +388,7 @@ class MainAgent:
         
         try:
             # Chạy tác vụ đồng bộ và bất đồng bộ song song với error handling
-            international_task = run_in_threadpool(self._safe_get_international_market_news)
+            international_task = self.executor.run_stage_async(self._safe_get_international_market_news)
             vietnam_task = self.vn_api.get_market_overview()
 
             international_result, vietnam_result = await asyncio.gather(
@@ -248,50 +430,12 @@ class MainAgent:
         
         try:
             # Get comprehensive data for AI analysis
-            data = None
-            if symbol and validate_symbol(symbol):
-                if self.vn_api.is_vn_stock(symbol):
-                    logger.info(f"Getting comprehensive VN data for {symbol}")
-                    # Get all available data for comprehensive analysis
-                    tasks = [
-                        self.vn_api.get_stock_data(symbol),
-                        run_in_threadpool(self._safe_get_price_prediction, symbol),
-                        run_in_threadpool(self._safe_get_risk_assessment, symbol, 50, "Trung hạn", 100000000),
-                        run_in_threadpool(self._safe_get_investment_analysis, symbol, 50, "Trung hạn", 100000000),
-                        self.get_detailed_stock_info(symbol),
-                        run_in_threadpool(self._safe_get_ticker_news, symbol, 5)
-                    ]
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
-                    
-                    data = {
-                        "vn_stock_data": results[0] if not isinstance(results[0], Exception) else None,
-                        "price_prediction": results[1] if not isinstance(results[1], Exception) else None,
-                        "risk_assessment": results[2] if not isinstance(results[2], Exception) else None,
-                        "investment_analysis": results[3] if not isinstance(results[3], Exception) else None,
-                        "detailed_stock_info": results[4] if not isinstance(results[4], Exception) else None,
-                        "ticker_news": results[5] if not isinstance(results[5], Exception) else None
-                    }
-                else:
-                    logger.info(f"Getting comprehensive international data for {symbol}")
-                    tasks = [
-                        run_in_threadpool(self._safe_get_price_prediction, symbol),
-                        run_in_threadpool(self._safe_get_investment_analysis, symbol, 50, "Trung hạn", 100000000),
-                        run_in_threadpool(self._safe_get_risk_assessment, symbol, 50, "Trung hạn", 100000000),
-                        run_in_threadpool(self._safe_get_ticker_news, symbol, 5)
-                    ]
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
-                    
-                    data = {
-                        "price_prediction": results[0] if not isinstance(results[0], Exception) else None,
-                        "investment_analysis": results[1] if not isinstance(results[1], Exception) else None,
-                        "risk_assessment": results[2] if not isinstance(results[2], Exception) else None,
-                        "ticker_news": results[3] if not isinstance(results[3], Exception) else None
-                    }
+            data = await self._gather_query_data(symbol)
             
             # Use Gemini to generate expert advice
             if self.gemini_agent:
                 try:
-                    gemini_response = await run_in_threadpool(
+                    gemini_response = await self.executor.run_stage_async(
                         self.gemini_agent.generate_expert_advice, query, symbol, data
                     )
                 except Exception as e:
@@ -324,13 +468,128 @@ class MainAgent:
             return {"error": f"Lỗi nghiêm trọng khi xử lý truy vấn: {str(e)}"}
 
     
+    async def _gather_query_data(self, symbol: str):
+        """Thu thập dữ liệu agent cho process_query (không AI enrichment riêng lẻ)"""
+        data = None
+        if symbol and validate_symbol(symbol):
+            if self.vn_api.is_vn_stock(symbol):
+                logger.info(f"Getting comprehensive VN data for {symbol}")
+                # Get all available data for comprehensive analysis
+                # Chat chỉ cần số liệu của agent, AI enrichment riêng lẻ là thừa (generate_expert_advice tự gọi AI)
+                tasks = [
+                    self.vn_api.get_stock_data(symbol),
+                    self.executor.run_stage_async(self._safe_get_price_prediction, symbol, False),
+                    self.executor.run_stage_async(self._safe_get_risk_assessment, symbol, 50, "Trung hạn", 100000000, False),
+                    self.executor.run_stage_async(self._safe_get_investment_analysis, symbol, 50, "Trung hạn", 100000000, False),
+                    self.get_detailed_stock_info(symbol),
+                    self.executor.run_stage_async(self._safe_get_ticker_news, symbol, 5)
+                ]
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+                
+                data = {
+                    "vn_stock_data": results[0] if not isinstance(results[0], Exception) else None,
+                    "price_prediction": results[1] if not isinstance(results[1], Exception) else None,
+                    "risk_assessment": results[2] if not isinstance(results[2], Exception) else None,
+                    "investment_analysis": results[3] if not isinstance(results[3], Exception) else None,
+                    "detailed_stock_info": results[4] if not isinstance(results[4], Exception) else None,
+                    "ticker_news": results[5] if not isinstance(results[5], Exception) else None
+                }
+            else:
+                logger.info(f"Getting comprehensive international data for {symbol}")
+                tasks = [
+                    self.executor.run_stage_async(self._safe_get_price_prediction, symbol, False),
+                    self.executor.run_stage_async(self._safe_get_investment_analysis, symbol, 50, "Trung hạn", 100000000, False),
+                    self.executor.run_stage_async(self._safe_get_risk_assessment, symbol, 50, "Trung hạn", 100000000, False),
+                    self.executor.run_stage_async(self._safe_get_ticker_news, symbol, 5)
+                ]
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+                
+                data = {
+                    "price_prediction": results[0] if not isinstance(results[0], Exception) else None,
+                    "investment_analysis": results[1] if not isinstance(results[1], Exception) else None,
+                    "risk_assessment": results[2] if not isinstance(results[2], Exception) else None,
+                    "ticker_news": results[3] if not isinstance(results[3], Exception) else None
+                }
+        return data
+    
+    async def process_query_stream(self, query: str, symbol: str = ""):
+        """Streaming process_query: yield dữ liệu agent, token Gemini, rồi kết quả tổng hợp"""
+        if not query or not query.strip():
+            yield 'error', {"error": "Vui lòng nhập câu hỏi"}
+            return
+        
+        query = query.strip()
+        symbol = symbol.strip().upper() if symbol else ""
+        
+        data = await self._gather_query_data(symbol)
+        yield 'data', {"symbol": symbol, "data": data}
+        
+        gemini_response = None
+        if self.gemini_agent:
+            try:
+                async for event in self._iterate_in_thread(self.gemini_agent.stream_expert_advice, query, symbol, data):
+                    if event['type'] == 'token':
+                        yield 'token', {"text": event['text']}
+                    else:
+                        gemini_response = event['data']
+            except Exception as e:
+                logger.error(f"Gemini streaming error: {e}")
+                gemini_response = {
+                    "expert_advice": f"Lỗi Gemini AI: {str(e)}",
+                    "recommendations": ["Thử lại sau", "Kiểm tra API key"]
+                }
+        gemini_response = gemini_response or {
+            "expert_advice": "Gemini AI chưa được khởi tạo. Vui lòng nhập API key.",
+            "recommendations": ["Nhập Google API key để sử dụng Gemini AI"]
+        }
+        
+        yield 'complete', {
+            "query": query,
+            "symbol": symbol,
+            "response_type": "conversational",
+            "expert_advice": gemini_response.get("expert_advice", "Không có phân tích từ chuyên gia."),
+            "recommendations": gemini_response.get("recommendations", []),
+            "data": data,
+            "timestamp": asyncio.get_event_loop().time()
+        }
+    
+    async def _iterate_in_thread(self, gen_func, *args):
+        """Chạy generator đồng bộ (blocking I/O) trong thread pool, yield từng phần tử về event loop"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        sentinel = object()
+        stop = threading.Event()
+        
+        def worker():
+            try:
+                for item in gen_func(*args):
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, sentinel)
+        
+        asyncio.ensure_future(self.executor.run_stage_async(worker))
+        try:
+            while True:
+                item = await queue.get()
+                if item is sentinel:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+    
     # Helper methods với error handling
-    def _safe_get_price_prediction(self, symbol: str):
+    def _safe_get_price_prediction(self, symbol: str, use_ai: bool = True):
         """Safely get price prediction with LSTM enhancement"""
         try:
             # Use LSTM-enhanced prediction if available
             if hasattr(self.price_predictor, 'lstm_predictor') and self.price_predictor.lstm_predictor:
-                return self.price_predictor.predict_price_enhanced(symbol)
+                return self.price_predictor.predict_price_enhanced(symbol, use_ai=use_ai)
             else:
                 return self.price_predictor.predict_price(symbol)
         except Exception as e:
@@ -347,23 +606,23 @@ class MainAgent:
     async def get_ticker_news_enhanced(self, symbol: str, limit: int = 15):
         """Get enhanced ticker news with detailed stats"""
         try:
-            result = await run_in_threadpool(self._safe_get_ticker_news, symbol, limit)
+            result = await self.executor.run_stage_async(self._safe_get_ticker_news, symbol, limit)
             return result
         except Exception as e:
             logger.error(f"Ticker news enhanced error: {e}")
             return {"error": f"Lỗi lấy tin tức cổ phiếu {symbol}: {str(e)}"}
     
-    def _safe_get_investment_analysis(self, symbol: str, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 100000000):
+    def _safe_get_investment_analysis(self, symbol: str, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 100000000, use_ai: bool = True):
         """Safely get investment analysis with profile parameters"""
         try:
-            return self.investment_expert.analyze_stock(symbol, risk_tolerance, time_horizon, investment_amount)
+            return self.investment_expert.analyze_stock(symbol, risk_tolerance, time_horizon, investment_amount, use_ai=use_ai)
         except Exception as e:
             return {"error": f"Lỗi phân tích đầu tư cho {symbol}: {str(e)}"}
     
-    def _safe_get_risk_assessment(self, symbol: str, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 100000000):
+    def _safe_get_risk_assessment(self, symbol: str, risk_tolerance: int = 50, time_horizon: str = "Trung hạn", investment_amount: int = 100000000, use_ai: bool = True):
         """Safely get risk assessment with profile parameters"""
         try:
-            return self.risk_expert.assess_risk(symbol, risk_tolerance, time_horizon, investment_amount)
+            return self.risk_expert.assess_risk(symbol, risk_tolerance, time_horizon, investment_amount, use_ai=use_ai)
         except Exception as e:
             return AgentErrorHandler.handle_risk_error(symbol, e)
     
@@ -387,23 +646,199 @@ class MainAgent:
     async def get_international_news(self):
         """Get international market news"""
         try:
-            result = await run_in_threadpool(self._safe_get_international_market_news)
+            result = await self.executor.run_stage_async(self._safe_get_international_market_news)
             return result
         except Exception as e:
             logger.error(f"International news async error: {e}")
             return {"error": f"Lỗi lấy tin tức thị trường quốc tế: {str(e)}"}
     
+    # ===== Fused AI enrichment =====
+    
+    FUSED_SECTIONS = ('price_prediction', 'risk_assessment', 'investment_analysis')
+    RISK_LEVELS = ('LOW', 'MEDIUM', 'HIGH', 'VERY_HIGH')
+    
+    def _run_fused_ai_enrichment(self, symbol: str, results: dict):
+        """Gộp AI enrichment của price/risk/investment thành 1 prompt, phân phối kết quả về từng agent"""
+        sections = {
+            key: results[key] for key in self.FUSED_SECTIONS
+            if isinstance(results.get(key), dict) and not results[key].get('error')
+        }
+        if not sections:
+            return
+        
+        profile = results.get('investment_profile', {})
+        parsed, ai_result = None, {}
+        try:
+            context = self._build_fused_ai_context(symbol, sections, profile)
+            ai_result = self.gemini_agent.generate_cached(
+                context, 'comprehensive_analysis', max_tokens=900, template_id='fused_enrichment_v1'
+            )
+            if ai_result.get('success'):
+                parsed = self._parse_fused_ai_response(ai_result.get('response', ''))
+        except Exception as e:
+            logger.warning(f"Fused AI enrichment failed for {symbol}: {e}")
+        
+        parsed = parsed or {}
+        model_used = ai_result.get('model_used', 'gemini')
+        for key, base in sections.items():
+            section = parsed.get(key)
+            try:
+                if self._is_valid_fused_section(section):
+                    self._dispatch_fused_section(key, base, section, model_used)
+                else:
+                    # Thiếu section -> dùng lại enrichment riêng của agent (có cache)
+                    self._fallback_agent_enrichment(key, symbol, base, profile)
+            except Exception as e:
+                logger.warning(f"AI enrichment dispatch failed for {symbol}/{key}: {e}")
+                base['ai_enhanced'] = False
+                base['ai_error'] = str(e)
+    
+    def _build_fused_ai_context(self, symbol: str, sections: dict, profile: dict) -> str:
+        """Prompt gộp: hồ sơ đầu tư chỉ ghi 1 lần, mỗi agent chỉ gửi các chỉ số cốt lõi"""
+        risk_tolerance = profile.get('risk_tolerance', 50)
+        time_horizon = profile.get('time_horizon', 'Trung hạn')
+        investment_amount = profile.get('investment_amount', 100000000)
+        
+        lines = [
+            f"Bạn là chuyên gia đầu tư chứng khoán. Phân tích {symbol} cho nhà đầu tư "
+            f"{profile.get('risk_profile', self._get_risk_profile_name(risk_tolerance))} "
+            f"({risk_tolerance}% rủi ro, {time_horizon}, vốn {investment_amount:,} VND).",
+            ""
+        ]
+        
+        pred = sections.get('price_prediction')
+        if pred:
+            indicators = pred.get('technical_indicators', {}) or {}
+            trend = pred.get('trend_analysis', {}) or {}
+            lines.append("[GIÁ]")
+            lines.append(f"Giá: {pred.get('current_price', 'N/A')}, dự đoán: {pred.get('predicted_price', 'N/A')} "
+                         f"({pred.get('change_percent', 0) or 0:+.1f}%), xu hướng: {pred.get('trend', trend.get('direction', 'N/A'))}, "
+                         f"RSI: {indicators.get('rsi', 'N/A')}, tin cậy: {pred.get('confidence', 'N/A')}")
+        
+        risk = sections.get('risk_assessment')
+        if risk:
+            lines.append("[RỦI RO]")
+            lines.append(f"Mức: {risk.get('risk_level', 'N/A')}, volatility: {risk.get('volatility', 'N/A')}%, "
+                         f"max drawdown: {risk.get('max_drawdown', 'N/A')}%, beta: {risk.get('beta', 'N/A')}, "
+                         f"VaR95: {risk.get('var_95', 'N/A')}%, sharpe: {risk.get('sharpe_ratio', 'N/A')}")
+        
+        inv = sections.get('investment_analysis')
+        if inv:
+            lines.append("[ĐẦU TƯ]")
+            lines.append(f"Khuyến nghị: {inv.get('recommendation', 'N/A')} (điểm {inv.get('score', 'N/A')}/100), "
+                         f"lý do: {str(inv.get('reason', 'N/A'))[:200]}")
+        
+        schema = {
+            'price_prediction': {'advice': '...', 'reasoning': '...', 'trend': 'bullish|bearish|neutral'},
+            'risk_assessment': {'advice': '...', 'reasoning': '...', 'risk_level': 'LOW|MEDIUM|HIGH|VERY_HIGH',
+                                'risk_score': '1-10', 'position_size_pct': 0, 'stop_loss_pct': 0,
+                                'volatility_adjustment_pct': 0, 'var_adjustment_pct': 0},
+            'investment_analysis': {'advice': '...', 'reasoning': '...'}
+        }
+        schema = {k: v for k, v in schema.items() if k in sections}
+        
+        lines.append("")
+        lines.append("Trả lời bằng tiếng Việt, CHỈ một JSON object đúng schema sau (không markdown):")
+        lines.append(json.dumps(schema, ensure_ascii=False))
+        return "\n".join(lines)
+    
+    def _parse_fused_ai_response(self, response: str):
+        """Parse JSON từ phản hồi AI (chấp nhận ```json fence)"""
+        if not response:
+            return None
+        text = re.sub(r'```(?:json)?', '', response).strip()
+        start, end = text.find('{'), text.rfind('}')
+        if start < 0 or end <= start:
+            return None
+        try:
+            parsed = json.loads(text[start:end + 1])
+            return parsed if isinstance(parsed, dict) else None
+        except ValueError:
+            return None
+    
+    def _is_valid_fused_section(self, section) -> bool:
+        return isinstance(section, dict) and len(str(section.get('advice', ''))) > 10
+    
+    def _dispatch_fused_section(self, key: str, base: dict, section: dict, model_used: str):
+        """Ghi kết quả section AI vào kết quả của agent tương ứng (cùng field như enrichment riêng)"""
+        ai_fields = {
+            'ai_enhanced': True,
+            'ai_model_used': model_used,
+            'ai_advice': str(section.get('advice', '')).strip(),
+            'ai_reasoning': str(section.get('reasoning', '')).strip(),
+            'ai_fused': True
+        }
+        
+        if key == 'price_prediction':
+            base.update(ai_fields)
+            base['ai_analysis'] = json.dumps(section, ensure_ascii=False)
+            trend = str(section.get('trend', '')).lower()
+            if trend in ('bullish', 'bearish', 'neutral') and isinstance(base.get('trend_analysis'), dict):
+                base['trend_analysis']['ai_direction'] = trend
+        
+        elif key == 'risk_assessment':
+            # Mức rủi ro ngoài tập hợp lệ (vd. model chép lại placeholder của schema) -> giữ mức của agent
+            risk_level = str(section.get('risk_level', '')).strip().upper()
+            if risk_level not in self.RISK_LEVELS:
+                risk_level = base.get('risk_level', 'MEDIUM')
+            adjustments = {
+                'risk_level': risk_level,
+                'volatility_adj': self._to_float(section.get('volatility_adjustment_pct'), 0),
+                'var_adj': self._to_float(section.get('var_adjustment_pct'), 0),
+                'sharpe_ratio': base.get('sharpe_ratio'),
+                'risk_score': self._to_float(section.get('risk_score'), base.get('risk_score', 5)),
+                'position_size': self._to_float(section.get('position_size_pct'), 10),
+                'stop_loss': self._to_float(section.get('stop_loss_pct'), 10),
+                'reason': ai_fields['ai_reasoning']
+            }
+            adjusted = self.risk_expert._apply_ai_risk_adjustments(base, adjustments)
+            base.update(ai_fields)
+            base.update({
+                'ai_risk_analysis': json.dumps(section, ensure_ascii=False),
+                'ai_adjustments': adjustments,
+                'enhanced_risk_level': adjustments['risk_level'],
+                'ai_volatility': adjusted.get('ai_volatility', base.get('volatility')),
+                'ai_var_95': adjusted.get('ai_var_95', base.get('var_95')),
+                'ai_sharpe_ratio': adjustments['sharpe_ratio'],
+                'ai_risk_score': adjustments['risk_score'],
+                'position_size_recommendation': adjustments['position_size'],
+                'stop_loss_recommendation': adjustments['stop_loss']
+            })
+        
+        elif key == 'investment_analysis':
+            base.update(ai_fields)
+            base['ai_investment_analysis'] = json.dumps(section, ensure_ascii=False)
+    
+    def _fallback_agent_enrichment(self, key: str, symbol: str, base: dict, profile: dict):
+        """Enrichment riêng của từng agent khi prompt gộp không trả về section hợp lệ"""
+        if key == 'price_prediction':
+            base.update(self.price_predictor._get_ai_price_analysis(
+                symbol, base, 30, profile.get('risk_tolerance', 50), profile.get('time_horizon', 'Trung hạn')
+            ))
+        elif key == 'risk_assessment':
+            base.update(self.risk_expert._get_ai_risk_analysis(symbol, base))
+        elif key == 'investment_analysis':
+            base.update(self.investment_expert.get_ai_enhancement(symbol, base))
+    
+    @staticmethod
+    def _to_float(value, default):
+        try:
+            return float(str(value).replace('%', '').strip())
+        except (TypeError, ValueError):
+            return default
+    
     def _get_error_fallback(self, task_name: str, symbol: str, error: Exception):
         """Get appropriate error fallback based on task type"""
         fallbacks = {
-            'price_prediction': AgentErrorHandler.handle_prediction_error(symbol, error),
-            'ticker_news': AgentErrorHandler.handle_news_error(symbol, error),
-            'risk_assessment': AgentErrorHandler.handle_risk_error(symbol, error),
-            'investment_analysis': {"error": f"Lỗi phân tích đầu tư: {str(error)}"},
-            'vn_stock_data': {"error": f"Lỗi dữ liệu VN: {str(error)}"},
-            'detailed_stock_info': {"error": f"Lỗi thông tin chi tiết: {str(error)}"}
+            'price_prediction': lambda: AgentErrorHandler.handle_prediction_error(symbol, error),
+            'ticker_news': lambda: AgentErrorHandler.handle_news_error(symbol, error),
+            'risk_assessment': lambda: AgentErrorHandler.handle_risk_error(symbol, error),
+            'investment_analysis': lambda: {"error": f"Lỗi phân tích đầu tư: {str(error)}"},
+            'vn_stock_data': lambda: {"error": f"Lỗi dữ liệu VN: {str(error)}"},
+            'detailed_stock_info': lambda: {"error": f"Lỗi thông tin chi tiết: {str(error)}"}
         }
-        return fallbacks.get(task_name, {"error": f"Lỗi {task_name}: {str(error)}"})
+        fallback = fallbacks.get(task_name)
+        return fallback() if fallback else {"error": f"Lỗi {task_name}: {str(error)}"}
     
     def _is_valid_international_symbol(self, symbol: str) -> bool:
         """Kiểm tra xem có phải là mã international hợp lệ không"""
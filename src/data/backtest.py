@@ -0,0 +1,425 @@
+# src/data/backtest.py
+"""
+Vectorized Backtester
+Tính tín hiệu PricePredictor / InvestmentExpert cho mọi ngày lịch sử cùng lúc (ma trận ngày x mã),
+rồi mô phỏng khớp lệnh theo quy tắc HOSE: bước giá, lô 100, biên độ trần/sàn, thanh toán T+2.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.utils.executors import stage, WorkloadClass
+from src.utils.trading_calendar import get_trading_calendar
+from .screener import NIGHTLY_CONCURRENCY
+from .vnstock_gateway import PRICE_UNIT
+from .forecaster import forecast_grid, INDICATOR_FIELDS
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+LOT_SIZE = 100
+SETTLEMENT_DAYS = 2              # T+2: CP và tiền về sau 2 phiên
+COMMISSION = 0.0015              # phí môi giới mỗi chiều
+SELL_TAX = 0.001                 # thuế TNCN 0.1% trên giá trị bán
+
+# Biên độ giao động theo sàn
+PRICE_LIMITS = {'HOSE': 0.07, 'HNX': 0.10, 'UPCOM': 0.15}
+
+# Khung dự đoán của PricePredictor._generate_recommendations:
+# (số ngày, ngưỡng confidence, ngưỡng Strong, ngưỡng Buy/Sell) theo %
+PREDICTOR_HORIZONS = {
+    'short_term': (7, 70, 5, 2),
+    'medium_term': (30, 60, 10, 5),
+    'long_term': (180, 50, 20, 10)
+}
+
+STRATEGIES = ('predictor', 'expert')
+
+
+# ---- quy tắc sàn ----
+def tick_size(prices: np.ndarray, exchange: str = 'HOSE') -> np.ndarray:
+    """Bước giá (VND): HOSE 10 / 50 / 100 theo vùng giá, HNX/UPCoM 100"""
+    prices = np.asarray(prices, dtype='float64')
+    if exchange != 'HOSE':
+        return np.full(prices.shape, 100.0)
+    return np.where(prices < 10_000, 10.0, np.where(prices < 50_000, 50.0, 100.0))
+
+
+def round_to_tick(prices: np.ndarray, ticks: np.ndarray, side: str) -> np.ndarray:
+    """Mua làm tròn lên, bán làm tròn xuống (giả định bất lợi)"""
+    rounder = np.ceil if side == 'buy' else np.floor
+    with np.errstate(invalid='ignore'):
+        return rounder(prices / ticks) * ticks
+
+
+# ---- tín hiệu ----
+def compute_signal_panel(closes: pd.DataFrame, volumes: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Chỉ báo của compute_advanced_indicators cho mọi phiên (không chỉ phiên cuối)"""
+    close = closes.ffill()
+    returns = close.pct_change(fill_method=None)
+
+    panel = {'close': close}
+    for n in (5, 20, 50, 200):
+        panel[f'sma_{n}'] = close.rolling(n).mean()
+
+    macd = close.ewm(span=12).mean() - close.ewm(span=26).mean()
+    panel['macd'] = macd
+    panel['macd_signal'] = macd.ewm(span=9).mean()
+    panel['macd_histogram'] = macd - panel['macd_signal']
+
+    delta = close.diff()
+    gain = delta.clip(lower=0).rolling(14).mean()
+    loss = (-delta.clip(upper=0)).rolling(14).mean()
+    panel['rsi'] = 100 - 100 / (1 + gain / loss)
+
+    std_20 = close.rolling(20).std()
+    panel['bb_position'] = (close - (panel['sma_20'] - 2 * std_20)) / (4 * std_20)
+
+    panel['volume_ratio'] = volumes / volumes.rolling(20).mean()
+    panel['volatility'] = returns.rolling(TRADING_DAYS, min_periods=20).std() * np.sqrt(TRADING_DAYS) * 100
+
+    # _calculate_trend_consistency: số phiên cùng xu hướng (giá/SMA5/SMA20) trong 15 phiên
+    sma_5, sma_20 = panel['sma_5'], panel['sma_20']
+    consistent = ((close > sma_5) & (sma_5 > sma_20)) | ((close < sma_5) & (sma_5 < sma_20))
+    panel['trend_consistency'] = consistent.astype('float64').rolling(15, min_periods=1).sum() / 15 * 100
+    panel['observations'] = closes.notna().cumsum()
+    return panel
+
+
+def predicted_change(panel: Dict[str, pd.DataFrame], days, rows=None) -> np.ndarray:
+    """% thay đổi kỳ vọng sau `days` phiên của forecaster đang phục vụ (forecast_grid, deterministic=True)
+    cho mọi phiên x mã. days là một số -> (phiên, mã); danh sách horizon -> thêm trục cuối.
+    rows: chỉ dự báo tại các phiên này (vd. origin của walk-forward)"""
+    horizons = np.atleast_1d(days)
+    close = panel['close'].to_numpy(dtype='float64')
+    index = slice(None) if rows is None else list(rows)
+    shape = close[index].shape
+    indicators = {field: panel[field].to_numpy(dtype='float64')[index].ravel()
+                  for field in INDICATOR_FIELDS if field in panel}
+    grid = forecast_grid(indicators, close[index].ravel(), horizons, deterministic=True)
+    change = grid['change'].reshape(shape + (len(horizons),)) * 100
+    return change if np.ndim(days) else change[..., 0]
+
+
+def confidence_scores(panel: Dict[str, pd.DataFrame]) -> Dict[str, np.ndarray]:
+    """PricePredictor._calculate_confidence_scores (không có ML boost)"""
+    quality = np.minimum(100, panel['observations'].to_numpy() / TRADING_DAYS * 100)
+    volatility_score = np.maximum(0, 100 - panel['volatility'].fillna(20).to_numpy() * 2)
+    consistency = panel['trend_consistency'].fillna(50).to_numpy()
+    ratio = panel['volume_ratio'].to_numpy()
+    with np.errstate(invalid='ignore'):
+        volume_score = np.select(
+            [np.isnan(ratio), (ratio >= 0.8) & (ratio <= 1.5), (ratio >= 0.5) & (ratio <= 2.0)], [50, 80, 60], 30
+        )
+    return {
+        'short_term': np.clip(quality * 0.2 + volatility_score * 0.3 + consistency * 0.3 + volume_score * 0.2, 10, 95),
+        'medium_term': np.clip(quality * 0.3 + volatility_score * 0.2 + consistency * 0.4 + volume_score * 0.1, 10, 95),
+        'long_term': np.clip(quality * 0.4 + volatility_score * 0.1 + consistency * 0.5, 10, 95)
+    }
+
+
+def predictor_signals(panel: Dict[str, pd.DataFrame], horizon: str = 'short_term') -> Dict[str, np.ndarray]:
+    """Khuyến nghị _generate_recommendations cho mọi phiên.
+    code: 2 Strong Buy, 1 Buy, 0 Hold/Caution, -1 Sell, -2 Strong Sell"""
+    if horizon not in PREDICTOR_HORIZONS:
+        raise ValueError(f"Unknown horizon '{horizon}'")
+    days, min_confidence, strong, normal = PREDICTOR_HORIZONS[horizon]
+    change = predicted_change(panel, days)
+    confident = confidence_scores(panel)[horizon] > min_confidence
+    code = np.select([change > strong, change > normal, change > -normal, change > -strong], [2, 1, 0, -1], -2)
+    # Phiên chưa có giá (mã chưa niêm yết) -> Hold
+    return {'code': np.where(confident & np.isfinite(change), code, 0).astype(np.int8), 'score': change}
+
+
+def expert_signals(panel: Dict[str, pd.DataFrame], volumes: pd.DataFrame,
+                   fundamental_scores: pd.DataFrame = None, benchmark: pd.Series = None) -> Dict[str, np.ndarray]:
+    """InvestmentExpert: tài chính 40% + kỹ thuật 30% + định giá 30% -> _make_investment_recommendation.
+    Phần kỹ thuật (vị trí giá 52 tuần, khối lượng, beta) tính theo từng phiên;
+    fundamental_scores (cột financial/valuation theo mã) là ảnh chụp hiện tại, thiếu -> 50"""
+    close = panel['close']
+    high, low = close.rolling(TRADING_DAYS, min_periods=20).max(), close.rolling(TRADING_DAYS, min_periods=20).min()
+    position = ((close - low) / (high - low) * 100).to_numpy()
+    with np.errstate(invalid='ignore'):
+        price_score = np.select(
+            [~(high > low).to_numpy(), position < 20, position < 40, position < 60, position < 80], [50, 90, 80, 60, 40], 20
+        )
+        volume_ratio = (volumes / volumes.rolling(TRADING_DAYS, min_periods=20).mean()).to_numpy()
+        volume_score = np.select(
+            [~(volume_ratio >= 0), volume_ratio > 2, volume_ratio > 1.5, volume_ratio > 0.8], [50, 90, 80, 60], 40
+        )
+
+    # Beta 1 năm so với benchmark (mặc định: trung bình cộng toàn universe)
+    returns = close.pct_change(fill_method=None)
+    market = benchmark.reindex(close.index).ffill().pct_change(fill_method=None) if benchmark is not None else returns.mean(axis=1)
+    window = dict(window=TRADING_DAYS, min_periods=60)
+    beta = (returns.rolling(**window).cov(market) / market.rolling(**window).var().to_numpy()[:, None]).fillna(1.0).to_numpy()
+    beta_score = np.select([beta < 0.8, beta < 1.2], [80, 70], 50)
+    technical = price_score * 0.4 + volume_score * 0.3 + beta_score * 0.3
+
+    scores = pd.DataFrame(index=close.columns, columns=['financial', 'valuation'], dtype='float64')
+    if fundamental_scores is not None:
+        scores.update(fundamental_scores.reindex(close.columns))
+    scores = scores.fillna(50).to_numpy()
+    total = scores[:, 0] * 0.4 + technical * 0.3 + scores[:, 1] * 0.3
+    # BUY/STRONG BUY -> 2, WEAK BUY -> 1, HOLD -> 0, WEAK SELL -> -1, SELL -> -2
+    code = np.select([total >= 70, total >= 60, total >= 50, total >= 40], [2, 1, 0, -1], -2)
+    return {'code': code.astype(np.int8), 'score': total}
+
+
+def expert_fundamental_scores(expert, symbols: List[str], fundamentals, prices: pd.Series = None) -> pd.DataFrame:
+    """Điểm tài chính + định giá của InvestmentExpert từ fundamentals đã cache (không gọi vendor)"""
+    rows = {}
+    for symbol in symbols:
+        entry = fundamentals.get_cached(symbol)
+        if not entry:
+            continue
+        price = float(prices.get(symbol, 0)) if prices is not None else 0
+        metrics = {
+            'pe': entry.get('pe') or 0,
+            'pb': entry.get('pb') or 0,
+            'eps': entry.get('eps') or 0,
+            'dividend_yield': entry.get('dividend_yield') or 0,
+            'dividend': entry.get('dividend_per_share') or 0,
+            'market_cap': (entry.get('shares') or 0) * price
+        }
+        rows[symbol] = {
+            'financial': expert._analyze_financial_metrics(metrics)['total_score'],
+            'valuation': expert._analyze_valuation(metrics)['total_score']
+        }
+    return pd.DataFrame.from_dict(rows, orient='index', columns=['financial', 'valuation'])
+
+
+# ---- mô phỏng khớp lệnh ----
+def simulate(signals: Dict[str, np.ndarray], closes: pd.DataFrame, opens: pd.DataFrame = None,
+             exchanges: Dict[str, str] = None, capital: float = 1e9, max_positions: int = 10) -> Dict[str, Any]:
+    """Long-only, tỷ trọng đều. Tín hiệu lúc đóng cửa phiên t, khớp giá mở cửa phiên t+1.
+    Mã giữ vị thế khi tín hiệu Hold; thoát khi Sell; CP mua chỉ bán được sau T+2,
+    tiền bán về sau T+2; không mua khi trần (trắng bên bán), không bán khi sàn.
+    closes/opens theo đơn vị nến (nghìn đồng), khớp lệnh tính bằng VND"""
+    dates = closes.index
+    symbols = list(closes.columns)
+    n_days, n_symbols = closes.shape
+    close = closes.to_numpy(dtype='float64') * PRICE_UNIT
+    fill = opens.reindex(index=dates, columns=symbols).to_numpy(dtype='float64') * PRICE_UNIT if opens is not None else close
+    mark = pd.DataFrame(close).ffill().to_numpy()
+
+    exchanges = exchanges or {}
+    exchange = [exchanges.get(s, 'HOSE') for s in symbols]
+    limits = np.array([PRICE_LIMITS.get(e, PRICE_LIMITS['HOSE']) for e in exchange])
+    hose = np.array([e == 'HOSE' for e in exchange])
+    ticks = np.where(hose, tick_size(fill), 100.0)
+    buy_price = round_to_tick(fill, ticks, 'buy')
+    sell_price = round_to_tick(fill, ticks, 'sell')
+
+    previous = np.vstack([np.full(n_symbols, np.nan), mark[:-1]])
+    with np.errstate(invalid='ignore'):
+        at_ceiling = close >= round_to_tick(previous * (1 + limits), ticks, 'sell')
+        at_floor = close <= round_to_tick(previous * (1 - limits), ticks, 'buy')
+        tradable = np.isfinite(fill) & (fill > 0)
+
+    # Vị thế mong muốn: Buy -> 1, Sell -> 0, Hold -> giữ trạng thái trước
+    code = signals['code']
+    desired = pd.DataFrame(np.where(code >= 1, 1.0, np.where(code <= -1, 0.0, np.nan))).ffill().fillna(0).to_numpy()
+    rank = np.nan_to_num(signals['score'], nan=-np.inf)
+
+    cash = float(capital)
+    holdings = np.zeros(n_symbols)
+    sellable = np.zeros(n_symbols)
+    pending_shares = np.zeros((SETTLEMENT_DAYS, n_symbols))
+    pending_cash = np.zeros(SETTLEMENT_DAYS)
+    equity = np.full(n_days, float(capital))
+    invested = np.zeros(n_days)
+    traded = fees = 0.0
+    trades = 0
+
+    for t in range(1, n_days):
+        slot = t % SETTLEMENT_DAYS
+        sellable += pending_shares[slot]
+        cash += pending_cash[slot]
+        pending_shares[slot] = 0
+        pending_cash[slot] = 0
+
+        # Bán: chỉ phần CP đã về tài khoản
+        sell = (desired[t - 1] == 0) & (sellable > 0) & tradable[t] & ~at_floor[t]
+        if sell.any():
+            gross = sellable[sell] * sell_price[t, sell]
+            cost = gross.sum() * (COMMISSION + SELL_TAX)
+            pending_cash[slot] += gross.sum() - cost
+            holdings[sell] -= sellable[sell]
+            sellable[sell] = 0
+            traded += gross.sum()
+            fees += cost
+            trades += int(sell.sum())
+
+        # Mua: ưu tiên điểm tín hiệu cao, mỗi mã 1/max_positions vốn
+        free = max_positions - int((holdings > 0).sum())
+        candidates = np.flatnonzero((desired[t - 1] == 1) & (holdings == 0) & tradable[t] & ~at_ceiling[t])
+        if free > 0 and len(candidates):
+            chosen = candidates[np.argsort(-rank[t - 1, candidates], kind='stable')[:free]]
+            price = buy_price[t, chosen]
+            budget = equity[t - 1] / max_positions
+            quantity = np.floor(budget / (price * (1 + COMMISSION)) / LOT_SIZE) * LOT_SIZE
+            cost = quantity * price * (1 + COMMISSION)
+            affordable = np.cumsum(cost) <= cash
+            quantity, cost = quantity * affordable, cost * affordable
+            if quantity.any():
+                cash -= cost.sum()
+                holdings[chosen] += quantity
+                pending_shares[slot, chosen] += quantity
+                traded += (quantity * price).sum()
+                fees += (cost - quantity * price).sum()
+                trades += int((quantity > 0).sum())
+
+        positions = np.nansum(holdings * mark[t])
+        invested[t] = positions
+        equity[t] = cash + pending_cash.sum() + positions
+
+    return {
+        'equity': pd.Series(equity, index=dates),
+        'invested': pd.Series(invested, index=dates),
+        'traded_value': traded,
+        'fees': fees,
+        'trades': trades,
+        'open_positions': int((holdings > 0).sum())
+    }
+
+
+def performance_metrics(equity: pd.Series, traded_value: float = 0.0, invested: pd.Series = None) -> Dict[str, Any]:
+    """Lợi nhuận, drawdown, Sharpe, vòng quay vốn (một chiều, theo năm)"""
+    values = equity.to_numpy(dtype='float64')
+    if len(values) < 2 or values[0] <= 0:
+        return {}
+    returns = np.diff(values) / values[:-1]
+    years = len(returns) / TRADING_DAYS
+    drawdown = values / np.maximum.accumulate(values) - 1
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    metrics = {
+        'total_return': values[-1] / values[0] - 1,
+        'annual_return': (values[-1] / values[0]) ** (1 / years) - 1 if years > 0 and values[-1] > 0 else None,
+        'annual_volatility': std * np.sqrt(TRADING_DAYS),
+        'sharpe': returns.mean() / std * np.sqrt(TRADING_DAYS) if std > 0 else None,
+        'max_drawdown': drawdown.min(),
+        'max_drawdown_date': equity.index[int(drawdown.argmin())].date().isoformat(),
+        'turnover': traded_value / 2 / values.mean() / years if years > 0 else None
+    }
+    if invested is not None:
+        metrics['exposure'] = float(np.mean(invested.to_numpy() / values))
+    return {k: round(float(v), 4) if isinstance(v, (float, np.floating)) else v for k, v in metrics.items()}
+
+
+# ---- entry point ----
+@stage(WorkloadClass.CPU)
+def run_backtest(closes: pd.DataFrame, volumes: pd.DataFrame, opens: pd.DataFrame = None,
+                 strategy: str = 'predictor', horizon: str = 'short_term', exchanges: Dict[str, str] = None,
+                 fundamental_scores: pd.DataFrame = None, capital: float = 1e9, max_positions: int = 10,
+                 warmup: int = 60) -> Dict[str, Any]:
+    """Backtest một chiến lược trên ma trận nến (ngày x mã), CPU stage chạy được trong process pool"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}', expected one of {STRATEGIES}")
+    started = time.perf_counter()
+    closes = closes.sort_index()
+    volumes = volumes.reindex(index=closes.index, columns=closes.columns)
+
+    panel = compute_signal_panel(closes, volumes)
+    if strategy == 'predictor':
+        signals = predictor_signals(panel, horizon)
+    else:
+        signals = expert_signals(panel, volumes, fundamental_scores)
+    signal_ms = (time.perf_counter() - started) * 1000
+
+    # Bỏ giai đoạn warm-up của chỉ báo (SMA/RSI chưa đủ dữ liệu)
+    warmup = min(warmup, max(len(closes) - 2, 0))
+    live = {k: v[warmup:] for k, v in signals.items()}
+    window = closes.iloc[warmup:]
+    result = simulate(live, window, opens.iloc[warmup:] if opens is not None else None,
+                      exchanges, capital=capital, max_positions=max_positions)
+
+    mark = window.ffill()
+    benchmark = (mark.iloc[-1] / mark.bfill().iloc[0] - 1).mean() if len(mark) else None
+    codes = live['code']
+    return {
+        'strategy': strategy,
+        'horizon': horizon if strategy == 'predictor' else None,
+        'start': window.index[0].date().isoformat() if len(window) else None,
+        'end': window.index[-1].date().isoformat() if len(window) else None,
+        'symbols': int(closes.shape[1]),
+        'sessions': int(len(window)),
+        'metrics': dict(
+            performance_metrics(result['equity'], result['traded_value'], result['invested']),
+            trades=result['trades'],
+            fees=round(result['fees']),
+            final_equity=round(float(result['equity'].iloc[-1])) if len(window) else capital,
+            open_positions=result['open_positions'],
+            equal_weight_buy_hold=round(float(benchmark), 4) if benchmark == benchmark and benchmark is not None else None
+        ),
+        'signal_counts': {
+            'buy': int((codes >= 1).sum()),
+            'hold': int((codes == 0).sum()),
+            'sell': int((codes <= -1).sum())
+        },
+        'equity_curve': [
+            {'date': d.date().isoformat(), 'equity': round(float(v))} for d, v in result['equity'].items()
+        ],
+        'elapsed_ms': {
+            'signals': round(signal_ms, 1),
+            'total': round((time.perf_counter() - started) * 1000, 1)
+        }
+    }
+
+
+def build_panels(bars_by_symbol: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Nến từng mã (schema normalize_bars) -> ma trận open/close/volume (ngày x mã).
+    Nến rơi vào ngày không có phiên (cuối tuần/nghỉ lễ, dữ liệu nguồn lỗi) bị loại."""
+    calendar = get_trading_calendar()
+    frames = {'open': {}, 'close': {}, 'volume': {}}
+    for symbol, bars in bars_by_symbol.items():
+        if bars is None or bars.empty:
+            continue
+        index = pd.DatetimeIndex(bars.index).normalize()
+        session = calendar.is_session(index)
+        for column, columns in frames.items():
+            columns[symbol] = pd.Series(bars[column].to_numpy(dtype='float64')[session], index=index[session])
+    return {
+        column: pd.DataFrame(columns).sort_index().groupby(level=0).last() if columns else pd.DataFrame(dtype='float64')
+        for column, columns in frames.items()
+    }
+
+
+async def load_history(gateway, symbols: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+    """Tải nến ngày cho cả universe qua gateway (song song có giới hạn)"""
+    limit = asyncio.Semaphore(NIGHTLY_CONCURRENCY)
+
+    async def load(symbol):
+        async with limit:
+            try:
+                return symbol, await gateway.fetch_history(symbol, start, end)
+            except Exception as e:
+                logger.debug(f"Backtest history failed for {symbol}: {e}")
+                return symbol, None
+
+    results = await asyncio.gather(*(load(s) for s in symbols))
+    return build_panels(dict(results))
+
+
+__all__ = [
+    'LOT_SIZE',
+    'PREDICTOR_HORIZONS',
+    'PRICE_LIMITS',
+    'STRATEGIES',
+    'build_panels',
+    'compute_signal_panel',
+    'expert_fundamental_scores',
+    'expert_signals',
+    'load_history',
+    'performance_metrics',
+    'predictor_signals',
+    'round_to_tick',
+    'run_backtest',
+    'simulate',
+    'tick_size'
+]
@@ -12,6 +12,9 @@ from datetime import datetime
 import requests
 from bs4 import BeautifulSoup
 
+from .search_index import CompanySearchIndex
+from .symbol_master import get_symbol_master
+
 logger = logging.getLogger(__name__)
 
 class CompanySearchAPI:
@@ -124,6 +127,52 @@ class CompanySearchAPI:
                 'exchange': 'NASDAQ'
             }
         }
+        
+        # Search index (build lúc khởi động, rebuild khi symbol master đổi)
+        self._index = None
+        self._index_version = None
+        self._get_index()
+    
+    def _get_index(self) -> CompanySearchIndex:
+        """Index hiện tại; build lại nếu danh mục mã đã được sync"""
+        master = get_symbol_master()
+        if self._index is None or self._index_version != master.version:
+            index = CompanySearchIndex()
+            for record in master.records():
+                index.add({
+                    'symbol': record['symbol'],
+                    'name': record.get('name'),
+                    'full_name': record.get('name'),
+                    'sector': record.get('sector'),
+                    'exchange': record.get('exchange'),
+                    'market': 'Vietnam'
+                })
+            for market, companies in (('Vietnam', self.vn_companies), ('International', self.international_companies)):
+                for key, company in companies.items():
+                    index.add(dict(company, name=company['full_name'], market=market), aliases=[key])
+            index.build()
+            self._index, self._index_version = index, master.version
+            logger.info(f"🔎 Company search index built: {len(index)} companies")
+        return self._index
+    
+    @staticmethod
+    def _company_info(hit: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in hit.items() if k not in ('name', 'score', 'match')}
+    
+    def autocomplete(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Gợi ý theo từng phím gõ: mã / tên công ty (không dấu vẫn khớp)"""
+        return [
+            {
+                'symbol': hit['symbol'],
+                'name': hit.get('full_name') or hit.get('name'),
+                'exchange': hit.get('exchange'),
+                'sector': hit.get('sector'),
+                'market': hit.get('market'),
+                'score': hit['score'],
+                'match': hit['match']
+            }
+            for hit in self._get_index().search(query, limit=limit)
+        ]
     
     async def search_company(self, company_name: str) -> Dict[str, Any]:
         """
@@ -190,75 +239,49 @@ class CompanySearchAPI:
                 "timestamp": datetime.now().isoformat()
             }
     
+    def _search_market(self, query: str, market: str) -> Optional[Dict[str, Any]]:
+        """Kết quả tốt nhất theo mã / prefix tên trong một thị trường"""
+        for hit in self._get_index().search(query, limit=5, market=market):
+            if hit['match'] != 'fuzzy':
+                return self._company_info(hit)
+        return None
+    
     def _search_vn_companies(self, query: str) -> Optional[Dict[str, Any]]:
         """Tìm kiếm trong database công ty VN"""
-        for key, company in self.vn_companies.items():
-            if (query in key or 
-                query in company['full_name'].lower() or
-                query in company['symbol'].lower()):
-                return company
-        return None
+        return self._search_market(query, 'Vietnam')
     
     def _search_international_companies(self, query: str) -> Optional[Dict[str, Any]]:
         """Tìm kiếm trong database công ty quốc tế"""
-        for key, company in self.international_companies.items():
-            if (query in key or 
-                query in company['full_name'].lower() or
-                query in company['symbol'].lower()):
-                return company
-        return None
+        return self._search_market(query, 'International')
     
     def _fuzzy_search(self, query: str) -> Optional[Dict[str, Any]]:
-        """Tìm kiếm mờ"""
-        all_companies = {**self.vn_companies, **self.international_companies}
-        
-        for key, company in all_companies.items():
-            # Check partial matches
-            if (any(word in key for word in query.split()) or
-                any(word in company['full_name'].lower() for word in query.split())):
-                company['market'] = 'Vietnam' if key in self.vn_companies else 'International'
-                return company
-        
-        return None
+        """Tìm kiếm mờ (trigram)"""
+        hits = self._get_index().search(query, limit=1)
+        return self._company_info(hits[0]) if hits else None
     
     def _get_suggestions(self, query: str) -> List[str]:
         """Đưa ra gợi ý tìm kiếm"""
-        suggestions = []
-        all_companies = {**self.vn_companies, **self.international_companies}
-        
-        for key, company in all_companies.items():
-            if len(suggestions) >= 5:
-                break
-            suggestions.append(f"{company['full_name']} ({company['symbol']})")
-        
-        return suggestions[:5]
+        hits = self._get_index().search(query, limit=5, min_similarity=0.1)
+        if not hits:
+            companies = list(self.vn_companies.values()) + list(self.international_companies.values())
+            hits = [dict(company, market=None) for company in companies[:5]]
+        return [f"{hit['full_name']} ({hit['symbol']})" for hit in hits]
     
     async def get_company_by_symbol(self, symbol: str) -> Dict[str, Any]:
         """Lấy thông tin công ty theo mã cổ phiếu"""
         try:
             symbol = symbol.upper().strip()
             
-            # Search VN companies
-            for company in self.vn_companies.values():
-                if company['symbol'] == symbol:
-                    return {
-                        "symbol": symbol,
-                        "found": True,
-                        "market": "Vietnam",
-                        "company_info": company,
-                        "data_source": "VN_Database"
-                    }
-            
-            # Search international companies
-            for company in self.international_companies.values():
-                if company['symbol'] == symbol:
-                    return {
-                        "symbol": symbol,
-                        "found": True,
-                        "market": "International", 
-                        "company_info": company,
-                        "data_source": "International_Database"
-                    }
+            hit = self._get_index().get(symbol)
+            if hit:
+                market = hit.get('market', 'Vietnam')
+                return {
+                    "symbol": symbol,
+                    "found": True,
+                    "market": market,
+                    "company_info": self._company_info(hit),
+                    "data_source": "VN_Database" if market == 'Vietnam' else "International_Database"
+                }
             
             return {
                 "symbol": symbol,
@@ -0,0 +1,167 @@
+# src/data/forecast_path.py
+"""
+Forecast Path
+Đường dự báo dày theo phiên: mảng float32 giá + cận dưới/trên, đánh chỉ số theo số phiên giao dịch
+kể từ ngày phân tích. Tra cứu theo ngày là một phép lấy phần tử mảng; dict lồng '7_days' chỉ
+dựng khi trả response.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.utils.trading_calendar import get_trading_calendar, to_day
+
+logger = logging.getLogger(__name__)
+
+PRICE_DTYPE = np.float32
+PAYLOAD_DECIMALS = 2
+
+
+class ForecastPath:
+    """Đường giá dự báo theo phiên (offset 0 = giá hiện tại)"""
+
+    def __init__(self, origin, current_price: float, prices, lower=None, upper=None,
+                 interval_method: Optional[str] = None):
+        prices = np.asarray(prices, dtype=PRICE_DTYPE)
+        self.origin = to_day(origin)
+        self.current_price = float(current_price)
+        self.prices = np.concatenate([np.array([current_price], dtype=PRICE_DTYPE), prices])
+        self.lower = self._with_origin(lower)
+        self.upper = self._with_origin(upper)
+        self.interval_method = interval_method
+        self.sessions = get_trading_calendar().session_dates(self.origin, len(self.prices))
+        # Ngày lịch -> offset phiên gần nhất <= ngày đó (cuối tuần/nghỉ lễ dùng giá phiên trước)
+        span = int((self.sessions[-1] - self.origin).astype(int)) + 1
+        days = self.origin + np.arange(max(span, 1))
+        self._day_offsets = np.maximum(np.searchsorted(self.sessions, days, side='right') - 1, 0).astype(np.int32)
+
+    def _with_origin(self, values) -> np.ndarray:
+        if values is None:
+            return self.prices
+        return np.concatenate([np.array([self.current_price], dtype=PRICE_DTYPE),
+                               np.asarray(values, dtype=PRICE_DTYPE)])
+
+    @property
+    def horizon(self) -> int:
+        """Số phiên dự báo"""
+        return len(self.prices) - 1
+
+    # ---------------- Construction ----------------
+
+    @classmethod
+    def from_points(cls, origin, current_price: float, days: Iterable[int], prices: Iterable[float],
+                    lower: Iterable[float] = None, upper: Iterable[float] = None,
+                    horizon: int = None, interval_method: Optional[str] = None) -> 'ForecastPath':
+        """Nội suy một lần từ các mốc (offset phiên, giá) thành đường dày theo phiên"""
+        days = np.asarray(list(days), dtype='float64')
+        order = np.argsort(days)
+        days = days[order]
+        horizon = int(horizon or days[-1])
+        grid = np.arange(1, horizon + 1)
+        knots = np.concatenate([[0.0], days])
+
+        def interp(values):
+            if values is None:
+                return None
+            values = np.asarray(list(values), dtype='float64')[order]
+            return np.interp(grid, knots, np.concatenate([[current_price], values]))
+
+        return cls(origin, current_price, interp(prices), interp(lower), interp(upper), interval_method)
+
+    @classmethod
+    def from_nested(cls, origin, current_price: float, predictions: Dict[str, Dict[str, Any]]) -> 'ForecastPath':
+        """Đường dày từ dict lồng {'short_term': {'7_days': {...}}} (mốc = số phiên)"""
+        points, methods = [], set()
+        for period in predictions.values():
+            if not isinstance(period, dict):
+                continue
+            for key, entry in period.items():
+                if key.endswith('_days') and isinstance(entry, dict) and 'price' in entry:
+                    interval = entry.get('confidence_interval') or {}
+                    methods.add(interval.get('method'))
+                    points.append((int(key.split('_')[0]), float(entry['price']),
+                                   float(interval.get('lower', entry['price'])),
+                                   float(interval.get('upper', entry['price']))))
+        if not points:
+            raise ValueError("No forecast points to build a path from")
+        days, prices, lower, upper = zip(*points)
+        return cls.from_points(origin, current_price, days, prices, lower, upper,
+                               interval_method='monte_carlo' if 'monte_carlo' in methods else None)
+
+    # ---------------- Lookup ----------------
+
+    def offset_of(self, date) -> Optional[int]:
+        """Offset phiên cho một ngày lịch; None nếu ngoài đường dự báo"""
+        delta = int((to_day(date) - self.origin).astype(int))
+        if delta < 0 or delta >= len(self._day_offsets):
+            return None
+        return int(self._day_offsets[delta])
+
+    def price_at(self, date, default: float = None) -> Optional[float]:
+        """Giá dự báo tại một ngày (ngày nghỉ -> giá phiên liền trước)"""
+        offset = self.offset_of(date)
+        return default if offset is None else float(self.prices[offset])
+
+    def at(self, date) -> Optional[Dict[str, Any]]:
+        """Giá + khoảng tin cậy + phiên tương ứng của một ngày"""
+        offset = self.offset_of(date)
+        if offset is None:
+            return None
+        entry = self.entry(offset)
+        entry['session'] = str(self.sessions[offset])
+        return entry
+
+    def entry(self, offset: int) -> Dict[str, Any]:
+        """Một mốc dự báo theo định dạng response"""
+        price = float(self.prices[offset])
+        lower, upper = float(self.lower[offset]), float(self.upper[offset])
+        interval = {
+            'lower': round(lower, 2),
+            'upper': round(upper, 2),
+            'uncertainty': round((upper - lower) / (2 * price) * 100, 1) if price else 0.0
+        }
+        if self.interval_method:
+            interval['method'] = self.interval_method
+        return {
+            'price': round(price, 2),
+            'change_percent': round((price - self.current_price) / self.current_price * 100, 2) if self.current_price else 0.0,
+            'change_amount': round(price - self.current_price, 2),
+            'days': int(offset),
+            'confidence_interval': interval
+        }
+
+    # ---------------- Views ----------------
+
+    def to_nested(self, periods: Dict[str, List[int]]) -> Dict[str, Dict[str, Any]]:
+        """Dict lồng theo khung cho response; bỏ khung có mốc vượt quá đường dự báo"""
+        return {
+            period_type: {f"{days}_days": self.entry(days) for days in days_list}
+            for period_type, days_list in periods.items()
+            if days_list and max(days_list) <= self.horizon
+        }
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Dạng JSON gọn (mảng theo phiên, không lặp key) để gửi kèm response"""
+        payload = {
+            'origin': str(self.origin),
+            'current_price': round(self.current_price, PAYLOAD_DECIMALS),
+            'prices': np.round(self.prices[1:].astype('float64'), PAYLOAD_DECIMALS).tolist()
+        }
+        if self.lower is not self.prices:
+            payload['lower'] = np.round(self.lower[1:].astype('float64'), PAYLOAD_DECIMALS).tolist()
+            payload['upper'] = np.round(self.upper[1:].astype('float64'), PAYLOAD_DECIMALS).tolist()
+        if self.interval_method:
+            payload['interval_method'] = self.interval_method
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> 'ForecastPath':
+        return cls(payload['origin'], payload['current_price'], payload['prices'],
+                   payload.get('lower'), payload.get('upper'), payload.get('interval_method'))
+
+
+__all__ = [
+    'ForecastPath'
+]
@@ -0,0 +1,296 @@
+# src/data/forecaster.py
+"""
+Vectorized Heuristic Forecaster
+Thuật toán dự báo đa khung của PricePredictor viết thành phép toán mảng trên lưới (mã x horizon): một lần gọi cho cả universe, không trạng thái tạm trên instance.
+"""
+
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.utils.executors import stage, WorkloadClass
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+
+# Khung dự báo mặc định (giống PricePredictor.prediction_periods)
+PREDICTION_PERIODS = {
+    'short_term': [1, 3, 7],
+    'medium_term': [14, 30, 60],
+    'long_term': [90, 180, 365]
+}
+
+# Giá trị mặc định khi thiếu chỉ báo
+INDICATOR_DEFAULTS = {
+    'rsi': 50.0, 'bb_position': 0.5, 'macd': 0.0, 'macd_signal': 0.0,
+    'sma_5': 0.0, 'sma_20': 0.0, 'sma_50': 0.0, 'sma_200': 0.0, 'volume_ratio': 1.0
+}
+INDICATOR_FIELDS = list(INDICATOR_DEFAULTS) + ['macd_histogram', 'volatility']
+
+# Regime thị trường cho thành phần base change (chọn ngẫu nhiên theo xác suất)
+MARKET_REGIMES = np.array([0.7, 0.9, 1.0, 1.1, 1.3])
+REGIME_PROBABILITIES = np.array([0.15, 0.20, 0.30, 0.20, 0.15])
+
+
+def stack_indicators(records: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """List dict chỉ báo (mỗi mã một dict) -> dict mảng theo mã; thiếu = NaN"""
+    def value(record, field):
+        try:
+            return float(record.get(field, np.nan))
+        except (TypeError, ValueError):
+            return np.nan
+    return {field: np.array([value(r, field) for r in records]) for field in INDICATOR_FIELDS}
+
+
+def _field(indicators: Dict[str, np.ndarray], name: str, default: float) -> np.ndarray:
+    values = np.asarray(indicators.get(name, default), dtype='float64')
+    return np.where(np.isnan(values), default, values)
+
+
+def trend_multipliers(indicators: Dict[str, np.ndarray], days=None) -> np.ndarray:
+    """Hệ số xu hướng (RSI / BB / MACD / SMA / volume / volatility) cho mảng chỉ báo bất kỳ shape.
+
+    days=None: ngưỡng tối thiểu 0.08 (shape giữ nguyên); days là mảng horizon:
+    kết quả thêm trục cuối theo horizon, ngưỡng 0.12 cho dự báo 1 ngày.
+    """
+    rsi = _field(indicators, 'rsi', 50.0)
+    bb = _field(indicators, 'bb_position', 0.5)
+    macd = _field(indicators, 'macd', 0.0)
+    signal = _field(indicators, 'macd_signal', 0.0)
+    hist = np.asarray(indicators.get('macd_histogram', np.nan), dtype='float64')
+    hist = np.where(np.isnan(hist), macd - signal, hist)
+
+    m = 0.05 + np.select(
+        [rsi > 85, rsi > 75, rsi > 65, rsi > 55, rsi > 45, rsi > 35, rsi > 25, rsi > 15],
+        [-0.5, -0.3, -0.1, 0.2, 0.1, -0.1, 0.2, 0.4], 0.6
+    )
+    m += np.select(
+        [bb > 0.95, bb > 0.85, bb > 0.65, bb > 0.35, bb > 0.15, bb > 0.05],
+        [-0.4, -0.2, 0.1, 0.05, 0.15, 0.3], 0.5
+    )
+    bullish = macd > signal
+    m += np.where(
+        bullish,
+        np.select([hist > 0.02, hist > 0.005], [0.25, 0.15], 0.08),
+        -np.select([hist < -0.02, hist < -0.005], [0.25, 0.15], 0.08)
+    )
+
+    def above(a, b):
+        # SMA thiếu (NaN) -> cả hai phép so sánh đều False
+        a = np.asarray(indicators.get(a, 0.0), dtype='float64')
+        b = np.asarray(indicators.get(b, 0.0), dtype='float64')
+        with np.errstate(invalid='ignore'):
+            return (a > b).astype(int) - (a < b).astype(int)
+
+    trend = above('sma_5', 'sma_20') + above('sma_20', 'sma_50') + above('sma_50', 'sma_200')
+    m += np.select([trend >= 2, trend == 1, trend <= -2, trend == -1], [0.2, 0.1, -0.2, -0.1], 0)
+
+    volume = _field(indicators, 'volume_ratio', 1.0)
+    m *= np.select([volume > 2.0, volume > 1.5, volume > 1.2, volume < 0.5, volume < 0.8],
+                   [1.4, 1.25, 1.1, 0.7, 0.85], 1.0)
+    volatility = _field(indicators, 'volatility', 25.0)
+    m *= np.select([volatility > 40, volatility > 30, volatility < 15, volatility < 20],
+                   [1.3, 1.15, 0.8, 0.9], 1.0)
+    m = np.clip(m, -1.2, 1.2)
+
+    # Tín hiệu yếu -> chấm điểm hướng
+    direction = (np.select([rsi > 60, rsi > 50, rsi < 40, rsi < 50], [2, 1, -2, -1], 0)
+                 + np.select([bb > 0.6, bb < 0.4], [1, -1], 0)
+                 + np.where(bullish, np.where(hist > 0.01, 2, 1), np.where(hist < -0.01, -2, -1))
+                 + np.select([trend >= 2, trend == 1, trend <= -2, trend == -1], [2, 1, -2, -1], 0))
+    weak = np.select([direction >= 4, direction >= 2, direction <= -4, direction <= -2],
+                     [0.144, 0.12, -0.144, -0.12], 0.072 * np.sign(direction) + 0.036 * (direction == 0))
+    m = np.where(np.abs(m) < 0.12, weak, m)
+
+    if days is None:
+        floor = 0.08
+    else:
+        m = m[..., None]
+        floor = np.where(np.asarray(days) == 1, 0.12, 0.08)
+    return np.where(np.abs(m) < floor, np.where(m >= 0, floor, -floor), m)
+
+
+def _horizon_table(days: np.ndarray) -> Dict[str, np.ndarray]:
+    """Hệ số theo bucket số ngày dự báo"""
+    buckets = [days <= 3, days <= 7, days <= 30, days <= 90]
+    return {
+        'time_multiplier': np.select(buckets, [2.0, 1.6, 1.3, 1.1], 1.0),
+        'random_range': np.select(buckets, [0.015, 0.025, 0.035, 0.045], 0.055),
+        'base_drift': np.select(buckets, [0.002, 0.003, 0.005, 0.008], 0.012),
+        'min_change_base': np.select([days == 1, days <= 3], [0.020, 0.018], 0.015),
+        'final_min_change': np.select([days == 1, days <= 3], [0.012, 0.008], 0.005),
+        'min_meaningful': np.select([days == 1, days <= 3], [0.008, 0.005], 0.003),
+        'fallback_change': np.select([days == 1, days <= 3], [0.012, 0.008], 0.005 * (1 + days / 100)),
+        'min_price_pct': np.select([days == 1, days <= 3], [0.012, 0.008], 0.005),
+        'min_price_abs': np.select([days == 1, days <= 3], [0.1, 0.08], 0.05)
+    }
+
+
+def forecast_grid(indicators: Dict[str, np.ndarray], current_price, horizons: Iterable[int],
+                  ml_adjustment=None, rng: np.random.Generator = None,
+                  deterministic: bool = False) -> Dict[str, np.ndarray]:
+    """Dự báo cho lưới (mã x horizon) trong một lượt.
+
+    indicators: dict mảng (S,) theo tên chỉ báo của compute_advanced_indicators.
+    deterministic=True bỏ regime ngẫu nhiên và nhiễu (regime = 1, nhiễu = 0) để tái lập được.
+    Trả về dict mảng (S, H): price, change (tỉ lệ), base_change, trend_multiplier.
+    """
+    price = np.atleast_1d(np.asarray(current_price, dtype='float64'))
+    days = np.asarray(list(horizons), dtype='float64')
+    shape = (len(price), len(days))
+    table = _horizon_table(days)
+    rng = rng or np.random.default_rng()
+
+    volatility = _field(indicators, 'volatility', 20.0)[:, None] / 100
+    rsi = _field(indicators, 'rsi', 50.0)[:, None]
+    bb = _field(indicators, 'bb_position', 0.5)[:, None]
+    macd_sign = np.where(_field(indicators, 'macd', 0.0) > _field(indicators, 'macd_signal', 0.0), 1, -1)[:, None]
+    multiplier = trend_multipliers(indicators, days)
+
+    # ---- base change ----
+    time_factor = np.sqrt(days / TRADING_DAYS)
+    # volatility đã là tỉ lệ nhưng vẫn chia 100 như thuật toán gốc -> sàn 20% gần như luôn áp dụng;
+    # giữ nguyên để dự báo không đổi so với các bản đã phục vụ (ledger). Backtest / walk-forward
+    # gọi chính hàm này (deterministic=True) nên đánh giá đúng mô hình đang phục vụ
+    effective = np.maximum(0.20, volatility / 100)
+    if deterministic:
+        regime = np.ones(shape)
+        noise = np.zeros(shape)
+    else:
+        regime = rng.choice(MARKET_REGIMES, size=shape, p=REGIME_PROBABILITIES)
+        noise = rng.uniform(-1.0, 1.0, size=shape) * table['random_range']
+    base_change = multiplier * effective * time_factor * 1.5
+    change = base_change * regime * table['time_multiplier'] + noise * time_factor \
+        + table['base_drift'] * time_factor * regime
+
+    direction = np.where(multiplier > 0, 1.0, -1.0)
+    min_change = table['min_change_base'] * time_factor * (1 + days / 365)
+    volatility_boost = np.select([effective > 0.25, effective > 0.20], [1.3, 1.1], 1.0)
+    change = np.where(np.abs(change) < min_change, min_change * regime * volatility_boost * direction, change)
+    change *= np.select([effective > 0.3, effective > 0.25, effective < 0.15], [1.4, 1.2, 0.85], 1.0)
+    change = np.where(np.abs(change) < table['final_min_change'],
+                      table['final_min_change'] * direction * regime, change)
+    base = change
+
+    # ---- điều chỉnh ML / MACD / RSI / BB ----
+    scale = days / 30
+    if ml_adjustment is not None:
+        ml = np.clip(np.nan_to_num(np.asarray(ml_adjustment, dtype='float64')), -0.15, 0.15)[:, None]
+        change = change + ml * np.maximum(0.1, 1 - days / 365) * 0.3
+    change = change + macd_sign * np.minimum(0.02, volatility * 0.1) * scale
+    change = change + np.select([rsi > 80, rsi > 70, rsi < 20, rsi < 30], [-0.05, -0.02, 0.05, 0.02], 0) * scale
+    change = change + np.select([bb > 0.9, bb > 0.8, bb < 0.1, bb < 0.2], [-0.03, -0.01, 0.03, 0.01], 0) * scale
+
+    # Thay đổi quá nhỏ -> thiên hướng theo RSI + MACD
+    floor = np.maximum(0.005, 0.002 * (days / 7))
+    bias = np.select([rsi > 60, rsi > 50, rsi < 40, rsi < 50], [0.3, 0.1, -0.3, -0.1], 0) + 0.2 * macd_sign
+    if deterministic:
+        coin = np.ones(shape)
+    else:
+        coin = np.where(rng.random(shape) > 0.5, 1.0, -1.0)
+    biased = np.select([bias > 0, bias < 0], [floor * (1 + bias), -floor * (1 + np.abs(bias))], floor * coin * 0.5)
+    change = np.where(np.abs(change) < floor, biased, change)
+
+    max_change = np.minimum(0.5, np.maximum(0.03, np.minimum(0.4, volatility * 2.5 * scale)) * (1 + days / 365))
+    change = np.clip(change, -max_change, max_change)
+
+    trend_direction = np.where((rsi > 50) & (macd_sign > 0), 1.0, -1.0)
+    change = np.where(np.abs(change) < table['min_meaningful'], table['fallback_change'] * trend_direction, change)
+
+    # ---- giá dự báo + ràng buộc chênh lệch tối thiểu ----
+    current = price[:, None]
+    predicted = current * (1 + change)
+    min_diff = np.maximum(table['min_price_abs'], current * table['min_price_pct'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pushed = current * (1 + np.where(change >= 0, 1, -1) * min_diff / current)
+    predicted = np.where(np.abs(predicted - current) < min_diff, pushed, predicted)
+
+    # Ràng buộc an toàn, đồng bộ với safe_calculate_change của app.py
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw = (predicted - current) / current * 100
+    valid = (current > 0) & (predicted > 0)
+    tiny = np.select([predicted > current, predicted < current], [0.8, -0.8], 0.4)
+    safe = np.select([np.abs(raw) < 0.1, np.abs(raw) < 0.3],
+                     [current * (1 + tiny / 100), current * (1 + np.clip(raw * 2.5, -50, 50) / 100)], predicted)
+    predicted = np.where(valid, safe, predicted)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = (predicted - current) / current
+    return {
+        'price': predicted,
+        'change': total,
+        'base_change': base,
+        'trend_multiplier': multiplier,
+        'horizons': days.astype(int)
+    }
+
+
+def format_predictions(grid: Dict[str, np.ndarray], row: int, current_price: float, volatility: float,
+                       periods: Dict[str, List[int]] = None) -> Dict[str, Dict[str, Any]]:
+    """Dict lồng theo khung ('short_term' -> '7_days' -> {...}) cho một mã, dùng cho response"""
+    periods = periods or PREDICTION_PERIODS
+    column = {int(d): j for j, d in enumerate(grid['horizons'])}
+    predictions = {}
+    for period_type, days_list in periods.items():
+        predictions[period_type] = {}
+        for days in days_list:
+            j = column[int(days)]
+            predicted_price = float(grid['price'][row, j])
+            total_change = float(grid['change'][row, j])
+            predictions[period_type][f"{days}_days"] = {
+                "price": round(predicted_price, 2),
+                "change_percent": round(total_change * 100, 2),
+                "change_amount": round(predicted_price - current_price, 2),
+                "debug_info": {
+                    "base_change": round(float(grid['base_change'][row, j]), 4),
+                    "total_change": round(total_change, 4),
+                    "trend_multiplier": round(float(grid['trend_multiplier'][row, j]), 4),
+                    "volatility": round(volatility, 2)
+                }
+            }
+    return predictions
+
+
+def latest_indicators(panel: Dict[str, pd.DataFrame]) -> Dict[str, np.ndarray]:
+    """Hàng cuối của signal panel (backtest.compute_signal_panel) -> mảng chỉ báo theo mã"""
+    return {field: panel[field].iloc[-1].to_numpy(dtype='float64') for field in INDICATOR_FIELDS if field in panel}
+
+
+@stage(WorkloadClass.CPU)
+def forecast_universe(closes: pd.DataFrame, volumes: pd.DataFrame, horizons: Iterable[int] = None,
+                      deterministic: bool = True, seed: int = None) -> Dict[str, Any]:
+    """Dự báo heuristic cho toàn bộ universe (ma trận nến ngày x mã) trong một lượt"""
+    from .backtest import compute_signal_panel
+
+    started = time.perf_counter()
+    horizons = list(horizons or [d for days in PREDICTION_PERIODS.values() for d in days])
+    panel = compute_signal_panel(closes, volumes)
+    current = panel['close'].iloc[-1].to_numpy(dtype='float64')
+    grid = forecast_grid(latest_indicators(panel), current, horizons,
+                         rng=np.random.default_rng(seed), deterministic=deterministic)
+    symbols = list(closes.columns)
+    elapsed = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"🔮 Forecast grid: {len(symbols)} symbols x {len(horizons)} horizons in {elapsed}ms")
+    return {
+        'symbols': symbols,
+        'horizons': horizons,
+        'current_price': current,
+        'price': pd.DataFrame(grid['price'], index=symbols, columns=horizons),
+        'change_percent': pd.DataFrame(grid['change'] * 100, index=symbols, columns=horizons),
+        'elapsed_ms': elapsed
+    }
+
+
+__all__ = [
+    'PREDICTION_PERIODS',
+    'forecast_grid',
+    'forecast_universe',
+    'format_predictions',
+    'latest_indicators',
+    'stack_indicators',
+    'trend_multipliers'
+]
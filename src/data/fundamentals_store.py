@@ -0,0 +1,285 @@
+# src/data/fundamentals_store.py
+"""
+Fundamentals Store
+Chỉ số cơ bản theo mã (P/E, P/B, EPS, BVPS, ROE, cổ tức, số CP lưu hành) lưu bền + phục vụ từ memory.
+Chỉ tải lại quanh mùa báo cáo (lịch công bố BCTC của VN) hoặc khi invalidate thủ công.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .search_index import fold_text
+
+logger = logging.getLogger(__name__)
+
+FUNDAMENTALS_PATH = os.getenv('FUNDAMENTALS_PATH', os.path.join('.cache', 'fundamentals.json'))
+
+# BCTC quý: công bố trong 20-45 ngày sau khi kết thúc quý -> cửa sổ từ ngày 15 đến ngày 50
+SEASON_OFFSET_DAYS = 15
+SEASON_LENGTH_DAYS = 35
+SEASON_REFRESH = 86400           # trong mùa báo cáo, kỳ mới chưa có -> thử lại mỗi ngày
+AUDIT_REFRESH = 3 * 86400        # BCTC kiểm toán năm / soát xét bán niên (số liệu điều chỉnh)
+MAX_AGE = 120 * 86400            # chặn trên phòng lịch bị lệch
+SAVE_INTERVAL = 60               # ghi file tối đa 1 lần/phút; refresh hàng loạt gọi flush() khi xong
+
+# Tên cột ratio (sau khi bỏ dấu + bỏ khoảng trắng) -> field
+_RATIO_FIELDS = {
+    'pe': ['pe'],
+    'pb': ['pb'],
+    'ps': ['ps'],
+    'eps': ['epsvnd', 'eps'],
+    'bvps': ['bvpsvnd', 'bvps'],
+    'roe': ['roe'],
+    'roa': ['roa'],
+    'dividend_yield': ['tysuatcotuc', 'dividendyield'],
+    'dividend_per_share': ['dividendpershare', 'cotuctienmat'],
+    'shares_mn': ['socpluuhanhtrieucp', 'outstandingsharemillionshares'],
+    'year': ['nam', 'year', 'yearreport'],
+    'quarter': ['ky', 'quarter', 'lengthreport']
+}
+
+
+def _column_key(column) -> str:
+    # MultiIndex ('Chỉ tiêu định giá', 'P/E') -> 'pe'
+    name = column[-1] if isinstance(column, tuple) else column
+    return fold_text(name).replace(' ', '')
+
+
+def _number(value) -> Optional[float]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value == value else None
+
+
+def parse_fundamentals(ratios=None, overview=None) -> Dict[str, Any]:
+    """Lấy kỳ mới nhất từ finance.ratio + số CP từ company.overview"""
+    result: Dict[str, Any] = {}
+    if ratios is not None and not isinstance(ratios, Exception) and len(ratios):
+        keys = {}
+        for column in ratios.columns:
+            keys.setdefault(_column_key(column), column)
+        columns = {field: next((keys[c] for c in candidates if c in keys), None)
+                   for field, candidates in _RATIO_FIELDS.items()}
+
+        rows = ratios
+        if columns['year'] is not None:
+            order = [columns['year']] + ([columns['quarter']] if columns['quarter'] is not None else [])
+            rows = ratios.sort_values(order)
+        latest = rows.iloc[-1]
+
+        for field, column in columns.items():
+            if column is not None:
+                result[field] = _number(latest[column])
+        if result.get('year'):
+            result['period'] = f"{int(result['year'])}-Q{int(result.get('quarter') or 4)}"
+        shares_mn = result.pop('shares_mn', None)
+        if shares_mn:
+            result['shares'] = shares_mn * 1_000_000
+        result.pop('year', None)
+        result.pop('quarter', None)
+
+    if overview is not None and not isinstance(overview, Exception) and len(overview):
+        row = overview.iloc[0]
+        shares = _number(row.get('issue_share')) or _number(row.get('outstanding_share'))
+        if shares:
+            result['shares'] = shares
+    return {k: v for k, v in result.items() if v is not None}
+
+
+# ---- lịch công bố BCTC ----
+def _quarter_end(year: int, quarter: int) -> datetime:
+    month = quarter * 3
+    next_month = datetime(year + (month == 12), month % 12 + 1, 1)
+    return next_month - timedelta(days=1)
+
+
+def reporting_windows(now: datetime) -> List[Tuple[datetime, datetime, Optional[str], int]]:
+    """Các cửa sổ công bố quanh now: (bắt đầu, kết thúc, kỳ kỳ vọng, chu kỳ refresh)"""
+    windows = []
+    for year in (now.year - 1, now.year):
+        for quarter in (1, 2, 3, 4):
+            start = _quarter_end(year, quarter) + timedelta(days=SEASON_OFFSET_DAYS)
+            windows.append((start, start + timedelta(days=SEASON_LENGTH_DAYS), f"{year}-Q{quarter}", SEASON_REFRESH))
+        # BCTC năm kiểm toán (hạn 90 ngày) + bán niên soát xét (hạn 45 ngày)
+        windows.append((datetime(year + 1, 3, 20), datetime(year + 1, 4, 5), None, AUDIT_REFRESH))
+        windows.append((datetime(year, 8, 1), datetime(year, 8, 20), None, AUDIT_REFRESH))
+    return sorted(w for w in windows if w[0] <= now)
+
+
+def is_stale(entry: Optional[Dict[str, Any]], now: datetime = None) -> bool:
+    """Cần tải lại khi: mùa báo cáo mới bắt đầu sau lần tải trước,
+    hoặc đang trong mùa mà kỳ kỳ vọng chưa có và đã quá chu kỳ refresh"""
+    if not entry:
+        return True
+    now = now or datetime.now()
+    fetched_at = datetime.fromtimestamp(entry.get('fetched_at', 0))
+    if (now - fetched_at).total_seconds() > MAX_AGE:
+        return True
+    windows = reporting_windows(now)
+    if not windows:
+        return False
+    start, end, expected, refresh = windows[-1]
+    if fetched_at < start:
+        return True
+    if now >= end:
+        return False
+    if expected and _period_key(entry.get('period')) >= _period_key(expected):
+        return False
+    return (now - fetched_at).total_seconds() > refresh
+
+
+def _period_key(period: Optional[str]) -> Tuple[int, int]:
+    try:
+        year, quarter = period.split('-Q')
+        return int(year), int(quarter)
+    except (AttributeError, ValueError):
+        return (0, 0)
+
+
+class FundamentalsStore:
+    """Cache chỉ số cơ bản theo mã, dùng chung cho mọi agent"""
+
+    def __init__(self, gateway, path: str = None):
+        self.gateway = gateway
+        self.path = path or FUNDAMENTALS_PATH
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'refreshes': 0, 'errors': 0, 'saves': 0}
+        self._dirty = False
+        self._last_save = 0.0
+        self.load()
+
+    # ---- read ----
+    def get_cached(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Bản trong memory (kể cả đã cũ), không gọi vendor"""
+        return self._entries.get((symbol or '').upper().strip())
+
+    async def get(self, symbol: str, force_refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Chỉ số cơ bản; chỉ gọi ratio + overview khi đến mùa báo cáo / invalidate"""
+        symbol = symbol.upper().strip()
+        entry = self._entries.get(symbol)
+        if not force_refresh and not is_stale(entry):
+            self.stats['hits'] += 1
+            return entry
+        ratios, overview = await asyncio.gather(
+            self.gateway.ratio(symbol), self.gateway.overview(symbol), return_exceptions=True
+        )
+        return self._update(symbol, ratios, overview)
+
+    def get_sync(self, symbol: str, force_refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Phiên bản đồng bộ cho code chạy ngoài event loop"""
+        symbol = symbol.upper().strip()
+        entry = self._entries.get(symbol)
+        if not force_refresh and not is_stale(entry):
+            self.stats['hits'] += 1
+            return entry
+        results = []
+        for fn in (self.gateway._ratio, self.gateway._overview):
+            try:
+                results.append(self.gateway.call('VCI', fn, symbol, 'VCI'))
+            except Exception as e:
+                results.append(e)
+        return self._update(symbol, *results)
+
+    def _update(self, symbol: str, ratios, overview) -> Optional[Dict[str, Any]]:
+        previous = self._entries.get(symbol)
+        try:
+            data = parse_fundamentals(ratios, overview)
+        except Exception as e:
+            logger.debug(f"Fundamentals parse failed for {symbol}: {e}")
+            data = {}
+        if not data:
+            # Vendor lỗi -> dùng bản cũ (nếu có) thay vì trả rỗng
+            self.stats['errors'] += 1
+            for error in (ratios, overview):
+                if isinstance(error, Exception):
+                    logger.debug(f"Fundamentals fetch failed for {symbol}: {error}")
+            return previous
+
+        if previous and 'shares' not in data and previous.get('shares'):
+            data['shares'] = previous['shares']
+        entry = dict(data, symbol=symbol, fetched_at=time.time())
+        with self._lock:
+            self._entries[symbol] = entry
+            self._dirty = True
+        self.stats['refreshes'] += 1
+        if time.time() - self._last_save >= SAVE_INTERVAL:
+            self.save()
+        return entry
+
+    # ---- invalidation ----
+    def invalidate(self, symbol: str = None):
+        """Buộc tải lại một mã (hoặc tất cả) ở lần đọc sau"""
+        with self._lock:
+            targets = [symbol.upper().strip()] if symbol else list(self._entries)
+            for key in targets:
+                if key in self._entries:
+                    self._entries[key] = dict(self._entries[key], fetched_at=0)
+        logger.info(f"🔄 Fundamentals invalidated: {symbol or 'all'}")
+
+    # ---- persistence ----
+    def load(self) -> bool:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self._entries = {k: v for k, v in (payload.get('symbols') or {}).items() if isinstance(v, dict)}
+        logger.info(f"📚 Fundamentals loaded: {len(self._entries)} symbols")
+        return True
+
+    def flush(self):
+        """Ghi xuống đĩa nếu có thay đổi chưa lưu (cuối mỗi lượt refresh hàng loạt)"""
+        if self._dirty:
+            self.save()
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with self._lock:
+                payload = {'symbols': dict(self._entries)}
+                self._dirty = False
+            self._last_save = time.time()
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._dirty = True
+            logger.warning(f"Fundamentals save failed: {e}")
+            return
+        self.stats['saves'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, symbols=len(self._entries))
+
+
+# Singleton instance
+_fundamentals_store = None
+_fundamentals_store_lock = threading.Lock()
+
+def get_fundamentals_store() -> FundamentalsStore:
+    global _fundamentals_store
+    if _fundamentals_store is None:
+        with _fundamentals_store_lock:
+            if _fundamentals_store is None:
+                from .vnstock_gateway import get_vnstock_gateway
+                _fundamentals_store = FundamentalsStore(get_vnstock_gateway())
+    return _fundamentals_store
+
+
+__all__ = [
+    'FundamentalsStore',
+    'get_fundamentals_store',
+    'is_stale',
+    'parse_fundamentals',
+    'reporting_windows'
+]
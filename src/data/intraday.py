@@ -0,0 +1,382 @@
+# src/data/intraday.py
+"""
+Intraday Bar Buffers
+Nến 1 phút / 5 phút của watchlist trong ring buffer NumPy cấp phát sẵn theo mã.
+VWAP phiên, biến động trong phiên và volume profile được cập nhật tăng dần theo từng nến
+(không tính lại cả phiên), nguồn là nến vendor hoặc snapshot bảng giá.
+"""
+
+import os
+import math
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.utils.trading_calendar import get_trading_calendar
+
+logger = logging.getLogger(__name__)
+
+INTERVALS = {'1m': 1, '5m': 5}
+
+# Khối giao dịch HOSE/HNX (phút trong ngày): 9:00-11:30, 13:00-14:45 (gồm ATO/ATC)
+SESSION_BLOCKS = ((9 * 60, 11 * 60 + 30), (13 * 60, 14 * 60 + 45))
+SESSION_MINUTES = sum(end - start for start, end in SESSION_BLOCKS)
+
+MAX_SYMBOLS = int(os.getenv('INTRADAY_MAX_SYMBOLS', 500))
+WATCHLIST = [s.strip().upper() for s in os.getenv('INTRADAY_WATCHLIST', '').split(',') if s.strip()]
+
+# Volume profile: bin 0.5% quanh giá tham chiếu, phủ ±15% (biên độ UPCOM)
+PROFILE_STEP = 0.005
+PROFILE_RANGE = 0.15
+PROFILE_BINS = int(round(2 * PROFILE_RANGE / PROFILE_STEP)) + 1
+VALUE_AREA = 0.70
+
+
+def _minute_tables():
+    """Bảng tra theo phút trong ngày: số phút giao dịch đã qua (<= phút đó) và chỉ số phút giao dịch"""
+    trading = np.zeros(24 * 60, dtype=bool)
+    for start, end in SESSION_BLOCKS:
+        trading[start:end] = True
+    elapsed = np.cumsum(trading).astype(np.int16)
+    # Giờ nghỉ trưa / sau ATC dồn về phút giao dịch trước đó; trước giờ mở cửa = -1
+    index = (elapsed - 1).astype(np.int16)
+    return elapsed, index
+
+
+_ELAPSED, _MINUTE_INDEX = _minute_tables()
+
+
+def elapsed_minutes(ts: datetime) -> int:
+    """Số phút giao dịch đã qua trong phiên tại thời điểm ts (bỏ giờ nghỉ trưa)"""
+    return int(_ELAPSED[ts.hour * 60 + ts.minute])
+
+
+def minutes_to_close(ts: datetime) -> int:
+    """Số phút giao dịch còn lại tới hết ATC (0 nếu ngày không có phiên)"""
+    if not get_trading_calendar().is_session(ts):
+        return 0
+    return SESSION_MINUTES - elapsed_minutes(ts)
+
+
+class IntradayBuffers:
+    """Ring buffer nến trong phiên cho tối đa max_symbols mã + đặc trưng tăng dần"""
+
+    def __init__(self, interval: str = '1m', max_symbols: int = MAX_SYMBOLS, capacity: int = None):
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown interval '{interval}', expected one of {list(INTERVALS)}")
+        self.interval = interval
+        self.minutes = INTERVALS[interval]
+        self.max_symbols = max_symbols
+        # Mặc định đủ chứa trọn một phiên
+        self.capacity = capacity or -(-SESSION_MINUTES // self.minutes)
+        self.rows: Dict[str, int] = {}
+        self.watchlist = set(WATCHLIST)
+        self._lock = threading.Lock()
+
+        shape = (max_symbols, self.capacity)
+        self.keys = np.full(shape, -1, dtype=np.int16)   # chỉ số nến trong phiên
+        self.open = np.zeros(shape, dtype=np.float32)
+        self.high = np.zeros(shape, dtype=np.float32)
+        self.low = np.zeros(shape, dtype=np.float32)
+        self.close = np.zeros(shape, dtype=np.float32)
+        self.volume = np.zeros(shape, dtype=np.float32)
+        self.profile = np.zeros((max_symbols, PROFILE_BINS), dtype=np.float32)
+
+        # Trạng thái phiên theo mã (float64 để tổng lũy kế không mất chính xác)
+        self.session = np.zeros(max_symbols, dtype=np.int32)     # date.toordinal()
+        self.count = np.zeros(max_symbols, dtype=np.int32)
+        self.ref = np.zeros(max_symbols, dtype=np.float64)
+        self.session_open = np.zeros(max_symbols, dtype=np.float64)
+        self.session_high = np.zeros(max_symbols, dtype=np.float64)
+        self.session_low = np.zeros(max_symbols, dtype=np.float64)
+        self.cum_volume = np.zeros(max_symbols, dtype=np.float64)
+        self.cum_pv = np.zeros(max_symbols, dtype=np.float64)
+        self.n_returns = np.zeros(max_symbols, dtype=np.float64)
+        self.sum_returns = np.zeros(max_symbols, dtype=np.float64)
+        self.sum_squares = np.zeros(max_symbols, dtype=np.float64)
+        self.board_volume = np.zeros(max_symbols, dtype=np.float64)  # KL lũy kế snapshot gần nhất
+        self.last_time = [None] * max_symbols
+
+        self.stats = {'bars': 0, 'replaced': 0, 'out_of_order': 0, 'sessions_reset': 0, 'rejected_symbols': 0}
+
+    # ---- watchlist ----
+    def watch(self, symbols: Iterable[str]):
+        """Thêm mã vào watchlist (snapshot bảng giá chỉ ghi cho mã đang theo dõi)"""
+        for symbol in symbols:
+            self.watchlist.add(symbol.upper())
+
+    def _row(self, symbol: str) -> Optional[int]:
+        row = self.rows.get(symbol)
+        if row is None:
+            if len(self.rows) >= self.max_symbols:
+                self.stats['rejected_symbols'] += 1
+                return None
+            row = self.rows[symbol] = len(self.rows)
+        return row
+
+    def _reset(self, row: int, day: int, ref: float):
+        self.session[row] = day
+        self.count[row] = 0
+        self.keys[row] = -1
+        self.profile[row] = 0
+        self.ref[row] = ref
+        self.session_high[row] = -math.inf
+        self.session_low[row] = math.inf
+        self.cum_volume[row] = self.cum_pv[row] = 0.0
+        self.n_returns[row] = self.sum_returns[row] = self.sum_squares[row] = 0.0
+        self.board_volume[row] = 0.0
+        self.stats['sessions_reset'] += 1
+
+    def _bin(self, row: int, price: float) -> int:
+        position = int((price / self.ref[row] - 1 + PROFILE_RANGE) / PROFILE_STEP + 0.5)
+        return min(max(position, 0), PROFILE_BINS - 1)
+
+    def _account(self, row: int, bar, previous: float, sign: float):
+        """Cộng (sign=1) hoặc trừ (sign=-1) đóng góp của một nến vào các tổng lũy kế"""
+        high, low, close, volume = bar
+        self.cum_volume[row] += sign * volume
+        self.cum_pv[row] += sign * volume * (high + low + close) / 3
+        self.profile[row, self._bin(row, close)] += sign * volume
+        if previous > 0:
+            r = math.log(close / previous)
+            self.n_returns[row] += sign
+            self.sum_returns[row] += sign * r
+            self.sum_squares[row] += sign * r * r
+
+    # ---- ingest ----
+    def update_bar(self, symbol: str, ts: datetime, open_: float, high: float, low: float, close: float,
+                   volume: float, ref_price: float = None) -> bool:
+        """Ghi một nến (nến cùng khung với nến cuối = bản cập nhật của nến đang chạy)"""
+        minute = _MINUTE_INDEX[ts.hour * 60 + ts.minute]
+        if minute < 0 or close <= 0:
+            return False
+        key = int(minute) // self.minutes
+        day = ts.toordinal()
+        with self._lock:
+            row = self._row(symbol.upper())
+            if row is None:
+                return False
+            if self.session[row] != day:
+                self._reset(row, day, ref_price or open_ or close)
+            count = int(self.count[row])
+            last = (count - 1) % self.capacity
+            if count and key < self.keys[row, last]:
+                self.stats['out_of_order'] += 1
+                return False
+            if count and key == self.keys[row, last]:
+                # Bản cập nhật của nến đang chạy: bỏ đóng góp cũ rồi ghi đè
+                slot = last
+                previous = float(self.close[row, (slot - 1) % self.capacity]) if count >= 2 else 0.0
+                old = (float(self.high[row, slot]), float(self.low[row, slot]),
+                       float(self.close[row, slot]), float(self.volume[row, slot]))
+                self._account(row, old, previous, -1.0)
+                self.stats['replaced'] += 1
+            else:
+                slot = count % self.capacity
+                previous = float(self.close[row, last]) if count else 0.0
+                self.count[row] = count = count + 1
+                self.stats['bars'] += 1
+            self.keys[row, slot] = key
+            self.open[row, slot] = open_
+            self.high[row, slot] = high
+            self.low[row, slot] = low
+            self.close[row, slot] = close
+            self.volume[row, slot] = volume
+            self._account(row, (high, low, close, volume), previous, 1.0)
+            if count == 1:
+                self.session_open[row] = open_
+            if high > self.session_high[row]:
+                self.session_high[row] = high
+            if low < self.session_low[row]:
+                self.session_low[row] = low
+            self.last_time[row] = ts
+        return True
+
+    def update_tick(self, symbol: str, ts: datetime, price: float, cumulative_volume: float,
+                    ref_price: float = None) -> bool:
+        """Giá khớp + KL lũy kế (snapshot bảng giá) -> gộp vào nến đang chạy.
+        Giá theo đơn vị nến (nghìn đồng) như normalize_bars / normalize_board"""
+        row = self.rows.get(symbol.upper())
+        day = ts.toordinal()
+        fresh = row is None or self.session[row] != day
+        delta = cumulative_volume if fresh else max(cumulative_volume - self.board_volume[row], 0.0)
+        minute = _MINUTE_INDEX[ts.hour * 60 + ts.minute]
+        key = int(minute) // self.minutes if minute >= 0 else -1
+        if not fresh and self.count[row] and key == self.keys[row, (self.count[row] - 1) % self.capacity]:
+            slot = (self.count[row] - 1) % self.capacity
+            bar = (float(self.open[row, slot]), max(float(self.high[row, slot]), price),
+                   min(float(self.low[row, slot]), price), price, float(self.volume[row, slot]) + delta)
+        else:
+            bar = (price, price, price, price, delta)
+        if not self.update_bar(symbol, ts, *bar, ref_price=ref_price):
+            return False
+        self.board_volume[self.rows[symbol.upper()]] = cumulative_volume
+        return True
+
+    def update_from_board(self, board, as_of: datetime = None):
+        """Subscriber bảng giá (đã qua normalize_board): giá khớp + KL lũy kế của mã trong watchlist"""
+        if board is None or board.empty or not self.watchlist:
+            return
+        ts = as_of or datetime.now()
+        watched = board[board.index.isin(self.watchlist) & (board['last'] > 0)]
+        for symbol, last, volume, ref in zip(watched.index, watched['last'].to_numpy(dtype='float64'),
+                                             watched['volume'].fillna(0).to_numpy(dtype='float64'),
+                                             watched['ref_price'].fillna(0).to_numpy(dtype='float64')):
+            self.update_tick(symbol, ts, float(last), float(volume), float(ref) or None)
+
+    def ingest_bars(self, symbol: str, bars, ref_price: float = None) -> int:
+        """Nạp nến đã chuẩn hóa (normalize_bars) của phiên hôm nay"""
+        written = 0
+        for ts, o, h, l, c, v in zip(bars.index, bars['open'].to_numpy(dtype='float64'),
+                                     bars['high'].to_numpy(dtype='float64'), bars['low'].to_numpy(dtype='float64'),
+                                     bars['close'].to_numpy(dtype='float64'), bars['volume'].to_numpy(dtype='float64')):
+            written += self.update_bar(symbol, ts.to_pydatetime(), o, h, l, c, v, ref_price)
+        if written:
+            # KL đã nạp từ nến là mốc cho snapshot bảng giá kế tiếp (delta = lũy kế - mốc)
+            with self._lock:
+                row = self.rows[symbol.upper()]
+                self.board_volume[row] = max(self.board_volume[row], self.cum_volume[row])
+        return written
+
+    async def load_session(self, gateway, symbols: List[str], day: datetime = None) -> Dict[str, int]:
+        """Tải nến trong phiên từ gateway cho danh sách mã (dùng khi khởi động giữa phiên)"""
+        day = (day or datetime.now()).strftime('%Y-%m-%d')
+        self.watch(symbols)
+
+        async def load(symbol):
+            try:
+                bars = await gateway.fetch_history(symbol, day, day, interval=self.interval)
+                return symbol, self.ingest_bars(symbol, bars[bars.index.strftime('%Y-%m-%d') == day])
+            except Exception as e:
+                logger.debug(f"Intraday bars failed for {symbol}: {e}")
+                return symbol, 0
+
+        return dict(await asyncio.gather(*(load(s) for s in symbols)))
+
+    # ---- read ----
+    def has_session(self, symbol: str, day: datetime = None) -> bool:
+        row = self.rows.get(symbol.upper())
+        return row is not None and self.count[row] > 0 and self.session[row] == (day or datetime.now()).toordinal()
+
+    def bars(self, symbol: str):
+        """Nến trong ring buffer theo thứ tự thời gian (DataFrame)"""
+        import pandas as pd
+
+        row = self.rows.get(symbol.upper())
+        if row is None or not self.count[row]:
+            return pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'])
+        with self._lock:
+            count = int(self.count[row])
+            order = (np.arange(max(0, count - self.capacity), count)) % self.capacity
+            day = datetime.fromordinal(int(self.session[row]))
+            minutes = self.keys[row, order].astype(np.int64) * self.minutes
+            frame = pd.DataFrame({
+                'open': self.open[row, order], 'high': self.high[row, order], 'low': self.low[row, order],
+                'close': self.close[row, order], 'volume': self.volume[row, order]
+            })
+        # Phút giao dịch -> giờ đồng hồ (cộng giờ nghỉ trưa cho nến buổi chiều)
+        morning = SESSION_BLOCKS[0][1] - SESSION_BLOCKS[0][0]
+        clock = np.where(minutes < morning, SESSION_BLOCKS[0][0] + minutes,
+                         SESSION_BLOCKS[1][0] + minutes - morning)
+        frame.index = pd.DatetimeIndex([day + timedelta(minutes=int(m)) for m in clock], name='time')
+        return frame
+
+    def features(self, symbol: str, now: datetime = None) -> Optional[Dict[str, Any]]:
+        """Đặc trưng phiên hiện tại (O(1) từ tổng lũy kế, profile O(số bin))"""
+        row = self.rows.get(symbol.upper())
+        if row is None or not self.count[row]:
+            return None
+        now = now or self.last_time[row]
+        with self._lock:
+            last = float(self.close[row, (self.count[row] - 1) % self.capacity])
+            volume = float(self.cum_volume[row])
+            vwap = float(self.cum_pv[row] / volume) if volume > 0 else last
+            n = float(self.n_returns[row])
+            if n >= 2:
+                variance = max((self.sum_squares[row] - self.sum_returns[row] ** 2 / n) / (n - 1), 0.0)
+            else:
+                variance = 0.0
+            profile = self.profile[row].astype(np.float64)
+            ref = float(self.ref[row])
+            bars = int(self.count[row])
+            session_open, high, low = float(self.session_open[row]), float(self.session_high[row]), float(self.session_low[row])
+
+        bin_prices = ref * (1 - PROFILE_RANGE + PROFILE_STEP * np.arange(PROFILE_BINS))
+        poc = value_low = value_high = last
+        if profile.sum() > 0:
+            order = np.argsort(profile)[::-1]
+            covered = np.searchsorted(np.cumsum(profile[order]), VALUE_AREA * profile.sum()) + 1
+            area = order[:covered]
+            poc = float(bin_prices[order[0]])
+            value_low, value_high = float(bin_prices[area.min()]), float(bin_prices[area.max()])
+
+        elapsed = max(elapsed_minutes(now), 1)
+        remaining = minutes_to_close(now)
+        bar_volatility = math.sqrt(variance)
+        return {
+            'interval': self.interval,
+            'bars': bars,
+            'last': round(last, 4),
+            'open': round(session_open, 4),
+            'high': round(high, 4),
+            'low': round(low, 4),
+            'ref_price': round(ref, 4),
+            'vwap': round(vwap, 4),
+            'vwap_gap_pct': round((last / vwap - 1) * 100, 3) if vwap else 0.0,
+            'session_return_pct': round((last / session_open - 1) * 100, 3) if session_open else 0.0,
+            'change_from_ref_pct': round((last / ref - 1) * 100, 3) if ref else 0.0,
+            'volatility_per_bar_pct': round(bar_volatility * 100, 4),
+            # Độ lệch chuẩn lợi suất còn lại tới ATC (random walk theo số nến còn lại)
+            'volatility_to_close_pct': round(bar_volatility * math.sqrt(remaining / self.minutes) * 100, 3),
+            'volume': volume,
+            'volume_pace': round(volume / elapsed, 2),
+            'projected_volume': round(volume * SESSION_MINUTES / elapsed, 0),
+            'poc': round(poc, 4),
+            'value_area_low': round(value_low, 4),
+            'value_area_high': round(value_high, 4),
+            'elapsed_minutes': elapsed,
+            'minutes_to_close': remaining,
+            'last_bar_time': self.last_time[row].strftime('%H:%M') if self.last_time[row] else None
+        }
+
+    def memory_bytes(self) -> int:
+        arrays = [self.keys, self.open, self.high, self.low, self.close, self.volume, self.profile,
+                  self.session, self.count, self.ref, self.session_open, self.session_high, self.session_low,
+                  self.cum_volume, self.cum_pv, self.n_returns, self.sum_returns, self.sum_squares, self.board_volume]
+        return int(sum(a.nbytes for a in arrays))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'interval': self.interval,
+            'symbols': len(self.rows),
+            'watchlist': len(self.watchlist),
+            'capacity': self.capacity,
+            'memory_mb': round(self.memory_bytes() / 1e6, 2)
+        }
+
+
+# Singleton instance
+_intraday_buffers = None
+_intraday_lock = threading.Lock()
+
+def get_intraday_buffers() -> IntradayBuffers:
+    global _intraday_buffers
+    with _intraday_lock:
+        if _intraday_buffers is None:
+            _intraday_buffers = IntradayBuffers(os.getenv('INTRADAY_INTERVAL', '1m'))
+    return _intraday_buffers
+
+
+__all__ = [
+    'INTERVALS',
+    'IntradayBuffers',
+    'SESSION_MINUTES',
+    'elapsed_minutes',
+    'get_intraday_buffers',
+    'minutes_to_close'
+]
@@ -0,0 +1,233 @@
+# src/data/listing_sync.py
+"""
+Listing Sync
+Đồng bộ danh mục mã niêm yết: lấy bulk danh sách theo sàn + ngành ICB từ vnstock Listing,
+so sánh với symbol master và lưu lại. Chạy nền, không nằm trên đường request.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+try:
+    from vnstock import Listing
+except ImportError:
+    Listing = None
+
+from .symbol_master import COMPLETE_UNIVERSE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Danh mục niêm yết thay đổi chậm -> sync mỗi ngày là đủ
+LISTING_SYNC_INTERVAL = int(os.getenv('LISTING_SYNC_INTERVAL', 86400))
+
+# Cho phép CrewAI bổ sung mã khi vnstock Listing không truy cập được (mặc định tắt)
+LISTING_SYNC_LLM = os.getenv('LISTING_SYNC_LLM', '').lower() in ('1', 'true', 'yes')
+
+_EXCHANGES = {'HSX': 'HOSE', 'HOSE': 'HOSE', 'HNX': 'HNX', 'UPCOM': 'UPCOM'}
+
+# ICB cấp 2 -> ngành dùng trong app (mã đã có trong master giữ ngành cũ)
+_ICB_SECTORS = {
+    'Banks': 'Banking',
+    'Real Estate': 'Real Estate',
+    'Technology': 'Technology',
+    'Financial Services': 'Financial Services',
+    'Insurance': 'Insurance',
+    'Food & Beverage': 'Food & Beverage',
+    'Personal & Household Goods': 'Consumer',
+    'Retail': 'Consumer',
+    'Travel & Leisure': 'Consumer',
+    'Media': 'Consumer',
+    'Automobiles & Parts': 'Consumer',
+    'Health Care': 'Healthcare',
+    'Utilities': 'Utilities',
+    'Oil & Gas': 'Oil & Gas',
+    'Telecommunications': 'Telecommunications',
+    'Basic Resources': 'Industrial & Materials',
+    'Chemicals': 'Industrial & Materials',
+    'Construction & Materials': 'Industrial & Materials',
+    'Industrial Goods & Services': 'Industrial'
+}
+
+
+def _column(frame, *names):
+    for name in names:
+        if name in frame.columns:
+            return frame[name]
+    return None
+
+
+def parse_listing(by_exchange, by_industry=None) -> List[Dict[str, Any]]:
+    """Gộp symbols_by_exchange + symbols_by_industries thành record cho symbol master (chỉ cổ phiếu)"""
+    frame = by_exchange.copy()
+    frame.columns = [str(col).lower() for col in frame.columns]
+    symbols = _column(frame, 'symbol', 'ticker')
+    if symbols is None:
+        raise ValueError("Listing missing symbol column")
+
+    kinds = _column(frame, 'type', 'com_type_code')
+    exchanges = _column(frame, 'exchange', 'board', 'com_group_code')
+    names = _column(frame, 'organ_name', 'company_name', 'organ_short_name')
+
+    industries = {}
+    if by_industry is not None and len(by_industry):
+        industry = by_industry.copy()
+        industry.columns = [str(col).lower() for col in industry.columns]
+        icb = _column(industry, 'en_icb_name2', 'icb_name2')
+        if icb is not None and 'symbol' in industry.columns:
+            industries = dict(zip(industry['symbol'].astype(str).str.upper(), icb.astype(str)))
+
+    records = {}
+    for i, symbol in enumerate(symbols.astype(str).str.upper().str.strip()):
+        if kinds is not None and str(kinds.iloc[i]).upper() not in ('STOCK', 'CP', 'NAN'):
+            continue
+        exchange = _EXCHANGES.get(str(exchanges.iloc[i]).upper()) if exchanges is not None else 'HOSE'
+        if not symbol or exchange is None:
+            continue
+        icb_name = industries.get(symbol)
+        records[symbol] = {
+            'symbol': symbol,
+            'name': str(names.iloc[i]) if names is not None and names.iloc[i] == names.iloc[i] else symbol,
+            'exchange': exchange,
+            'sector': _ICB_SECTORS.get(icb_name, icb_name or 'Unknown'),
+            'market': 'VN'
+        }
+    return list(records.values())
+
+
+def diff_listing(current: List[Dict[str, Any]], incoming: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Mã thêm / bỏ / đổi tên / chuyển sàn giữa master hiện tại và listing mới"""
+    old = {r['symbol']: r for r in current}
+    new = {r['symbol']: r for r in incoming}
+    common = old.keys() & new.keys()
+    return {
+        'added': sorted(new.keys() - old.keys()),
+        'removed': sorted(old.keys() - new.keys()),
+        'renamed': sorted(s for s in common if new[s]['name'] != old[s]['name']),
+        'moved': sorted(s for s in common if new[s]['exchange'] != old[s]['exchange'])
+    }
+
+
+class ListingSync:
+    """Đồng bộ symbol master với listing của sàn (nền, single-flight)"""
+
+    def __init__(self, gateway, master, llm_collector_provider=None):
+        self.gateway = gateway
+        self.master = master
+        # Callable trả về CrewAI collector (chỉ dùng khi bật LISTING_SYNC_LLM)
+        self.llm_collector_provider = llm_collector_provider
+        self._running = threading.Lock()
+        self.last_diff = None
+        self.last_error = None
+        self.last_attempt = 0.0
+
+    def is_stale(self) -> bool:
+        if self.master.source != 'Listing' or not self.master.updated_at:
+            return True
+        return time.time() - self.master.updated_at > LISTING_SYNC_INTERVAL
+
+    def _fetch_listing(self) -> List[Dict[str, Any]]:
+        if Listing is None:
+            raise RuntimeError("vnstock Listing not available")
+        listing = Listing(source='VCI')
+        by_exchange = self.gateway.call('VCI', listing.symbols_by_exchange)
+        try:
+            by_industry = self.gateway.call('VCI', listing.symbols_by_industries)
+        except Exception as e:
+            logger.warning(f"Listing industries unavailable, keeping known sectors: {e}")
+            by_industry = None
+        return parse_listing(by_exchange, by_industry)
+
+    def _merge(self, incoming: List[Dict[str, Any]], drop_missing: bool) -> List[Dict[str, Any]]:
+        """Giữ metadata đã biết (ngành tự đặt, shares, ISIN) cho mã đã có"""
+        merged = {}
+        for record in incoming:
+            known = self.master.get(record['symbol'])
+            if known:
+                record = dict(record)
+                if known['sector'] != 'Unknown':
+                    record['sector'] = known['sector']
+                record['shares'] = known.get('shares')
+                record['isin'] = known.get('isin')
+            merged[record['symbol']] = record
+        if not drop_missing:
+            for record in self.master.records():
+                merged.setdefault(record['symbol'], record)
+        return list(merged.values())
+
+    def sync(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """Chạy sync (chặn); None nếu không cần hoặc đang có lần sync khác"""
+        if not force and not self.is_stale():
+            return None
+        if not self._running.acquire(blocking=False):
+            return None
+        try:
+            self.last_attempt = time.time()
+            source = 'Listing'
+            try:
+                incoming = self._fetch_listing()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"⚠️ Listing sync failed: {e}")
+                incoming = self._discover_with_llm()
+                source = 'CrewAI'
+                if not incoming:
+                    return None
+
+            # Listing thiếu (lỗi một phần) -> chỉ bổ sung, không xóa mã
+            complete = source == 'Listing' and len(incoming) >= COMPLETE_UNIVERSE_SIZE
+            records = self._merge(incoming, drop_missing=complete)
+            diff = diff_listing(self.master.records(), records)
+            if complete or any(diff.values()):
+                self.master.replace(records, source='Listing' if complete else self.master.source)
+            self.last_diff = {key: len(value) for key, value in diff.items()}
+            self.last_error = None
+            logger.info(f"📋 Listing sync ({source}): " + ", ".join(f"{k}={v}" for k, v in self.last_diff.items()))
+            return diff
+        finally:
+            self._running.release()
+
+    def _discover_with_llm(self) -> List[Dict[str, Any]]:
+        """Tuỳ chọn: CrewAI tìm thêm mã khi không có listing (chỉ bổ sung)"""
+        if not LISTING_SYNC_LLM or not self.llm_collector_provider:
+            return []
+        collector = self.llm_collector_provider()
+        if not (collector and collector.enabled):
+            return []
+        try:
+            return asyncio.run(collector.discover_symbols())
+        except Exception as e:
+            logger.warning(f"CrewAI symbol discovery failed: {e}")
+            return []
+
+    def schedule(self, force: bool = False) -> bool:
+        """Chạy sync trên thread nền nếu danh mục đã cũ; trả về ngay"""
+        if not force and not self.is_stale():
+            return False
+        # Không thử lại liên tục khi nguồn đang lỗi
+        if not force and time.time() - self.last_attempt < min(LISTING_SYNC_INTERVAL, 900):
+            return False
+        if self._running.locked():
+            return False
+        self.last_attempt = time.time()
+        threading.Thread(target=self.sync, kwargs={'force': True}, name='listing-sync', daemon=True).start()
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'running': self._running.locked(),
+            'stale': self.is_stale(),
+            'last_diff': self.last_diff,
+            'last_error': self.last_error
+        }
+
+
+__all__ = [
+    'LISTING_SYNC_INTERVAL',
+    'ListingSync',
+    'diff_listing',
+    'parse_listing'
+]
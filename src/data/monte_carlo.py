@@ -0,0 +1,301 @@
+# src/data/monte_carlo.py
+"""
+Monte Carlo Price Paths
+Sinh N x H đường giá cho một mã trong một lần gọi NumPy (GBM, bootstrap lợi suất lịch sử
+hoặc biến động kiểu GARCH(1,1)), có chặn biên độ trần/sàn theo sàn niêm yết.
+Dùng cho khoảng tin cậy dự báo, xác suất chạm cắt lỗ / chốt lời và VaR theo đường giá.
+"""
+
+import time
+import logging
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from src.utils.executors import stage, WorkloadClass
+from .backtest import PRICE_LIMITS, TRADING_DAYS
+
+logger = logging.getLogger(__name__)
+
+MODELS = ('gbm', 'bootstrap', 'garch')
+DEFAULT_PATHS = 10000
+DEFAULT_HORIZON = 250
+MAX_PATHS = 50000
+MAX_HORIZON = 500
+MIN_HISTORY = 30                 # tối thiểu 30 lợi suất để ước lượng
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+REPORT_HORIZONS = (1, 3, 7, 14, 30, 60, 90, 180, 250)
+INTERVAL_LEVEL = 0.90            # khoảng tin cậy 5% - 95% cho dự báo
+
+# Lưới tham số GARCH(1,1) (variance targeting: omega = var * (1 - alpha - beta))
+GARCH_ALPHAS = np.array([0.03, 0.05, 0.08, 0.12, 0.16, 0.20])
+GARCH_BETAS = np.array([0.70, 0.78, 0.85, 0.90, 0.94, 0.97])
+
+
+def log_returns(closes) -> np.ndarray:
+    """Lợi suất log theo ngày từ chuỗi giá đóng cửa (bỏ giá thiếu / <= 0)"""
+    prices = np.asarray(closes, dtype='float64').ravel()
+    prices = prices[np.isfinite(prices) & (prices > 0)]
+    returns = np.diff(np.log(prices))
+    return returns[np.isfinite(returns)]
+
+
+def price_limit(exchange: Optional[str]) -> Optional[float]:
+    """Biên độ ngày theo sàn; None = không chặn (CP quốc tế)"""
+    if not exchange:
+        return None
+    return PRICE_LIMITS.get(exchange.upper(), PRICE_LIMITS['HOSE'])
+
+
+def fit_garch(returns: np.ndarray) -> Dict[str, float]:
+    """Ước lượng GARCH(1,1) bằng lưới alpha x beta, tính likelihood cho cả lưới cùng lúc"""
+    eps = returns - returns.mean()
+    target = float(eps.var()) or 1e-8
+    alpha, beta = np.meshgrid(GARCH_ALPHAS, GARCH_BETAS, indexing='ij')
+    alpha, beta = alpha.ravel(), beta.ravel()
+    valid = alpha + beta < 0.995
+    alpha, beta = alpha[valid], beta[valid]
+    omega = target * (1 - alpha - beta)
+
+    var = np.full(alpha.shape, target)
+    loglik = np.zeros(alpha.shape)
+    squared = eps ** 2
+    for e2 in squared:
+        loglik -= np.log(var) + e2 / var
+        var = omega + alpha * e2 + beta * var
+    best = int(np.argmax(loglik))
+    return {
+        'omega': float(omega[best]),
+        'alpha': float(alpha[best]),
+        'beta': float(beta[best]),
+        'last_variance': float(var[best]),
+        'long_run_variance': target
+    }
+
+
+def simulate_returns(returns: np.ndarray, n_paths: int, horizon: int, model: str = 'gbm',
+                     drift: bool = True, rng: np.random.Generator = None) -> np.ndarray:
+    """Ma trận lợi suất log (n_paths x horizon) theo mô hình"""
+    rng = rng or np.random.default_rng()
+    mu = float(returns.mean()) if drift else 0.0
+
+    if model == 'gbm':
+        sigma = float(returns.std(ddof=1))
+        out = rng.standard_normal((n_paths, horizon))
+        out *= sigma
+        out += mu - 0.5 * sigma ** 2
+        return out
+
+    if model == 'bootstrap':
+        sample = returns if drift else returns - returns.mean()
+        return sample[rng.integers(0, len(sample), size=(n_paths, horizon))]
+
+    if model == 'garch':
+        params = fit_garch(returns)
+        # Sinh theo (ngày x đường) để mỗi bước đệ quy đọc một hàng liên tục
+        shocks = rng.standard_normal((horizon, n_paths))
+        var = np.full(n_paths, params['last_variance'])
+        for row in shocks:
+            row *= np.sqrt(var)
+            var = params['omega'] + params['alpha'] * row ** 2 + params['beta'] * var
+        shocks += mu
+        return np.ascontiguousarray(shocks.T)
+
+    raise ValueError(f"Unknown model '{model}', expected one of {MODELS}")
+
+
+def simulate_paths(closes, n_paths: int = DEFAULT_PATHS, horizon: int = DEFAULT_HORIZON,
+                   model: str = 'gbm', exchange: Optional[str] = 'HOSE', drift: bool = True,
+                   seed: Optional[int] = None) -> np.ndarray:
+    """Đường giá (n_paths x horizon) bắt đầu từ giá đóng cửa cuối, lợi suất ngày bị chặn trần/sàn"""
+    prices = np.asarray(closes, dtype='float64').ravel()
+    prices = prices[np.isfinite(prices) & (prices > 0)]
+    returns = log_returns(prices)
+    if len(returns) < MIN_HISTORY:
+        raise ValueError(f"Need at least {MIN_HISTORY} daily returns, got {len(returns)}")
+
+    rng = np.random.default_rng(seed)
+    paths = simulate_returns(returns, n_paths, horizon, model, drift, rng)
+    # Đổi sang lợi suất đơn rồi chặn theo biên độ phiên (tại chỗ, không cấp phát thêm)
+    np.expm1(paths, out=paths)
+    limit = price_limit(exchange)
+    if limit is not None:
+        np.clip(paths, -limit, limit, out=paths)
+    paths += 1.0
+    np.cumprod(paths, axis=1, out=paths)
+    paths *= prices[-1]
+    return paths
+
+
+def _horizon_index(horizons: Iterable[int], horizon: int) -> np.ndarray:
+    days = np.array(sorted({int(h) for h in horizons if 0 < int(h) <= horizon}), dtype=int)
+    return days
+
+
+def horizon_quantiles(paths: np.ndarray, horizons: Iterable[int] = REPORT_HORIZONS,
+                      quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[int, Dict[str, float]]:
+    """Phân vị giá tại từng horizon (ngày giao dịch)"""
+    days = _horizon_index(horizons, paths.shape[1])
+    if not len(days):
+        return {}
+    values = np.quantile(paths[:, days - 1], quantiles, axis=0)
+    means = paths[:, days - 1].mean(axis=0)
+    return {
+        int(d): dict({f"p{int(round(q * 100))}": float(values[i, j]) for i, q in enumerate(quantiles)},
+                     mean=float(means[j]))
+        for j, d in enumerate(days)
+    }
+
+
+def hit_probabilities(paths: np.ndarray, stop_loss: Optional[float] = None,
+                      take_profit: Optional[float] = None) -> Dict[str, Any]:
+    """Xác suất chạm cắt lỗ / chốt lời trong horizon và ngưỡng nào chạm trước"""
+    n_paths, horizon = paths.shape
+    never = horizon + 1
+    result = {
+        'stop_loss': None if stop_loss is None else float(stop_loss),
+        'take_profit': None if take_profit is None else float(take_profit)
+    }
+
+    def first_hit(mask):
+        hit = mask.any(axis=1)
+        return hit, np.where(hit, mask.argmax(axis=1) + 1, never)
+
+    sl_day = tp_day = np.full(n_paths, never)
+    if stop_loss is not None:
+        hit, sl_day = first_hit(paths <= stop_loss)
+        result['p_stop_loss'] = float(hit.mean())
+        result['median_days_to_stop_loss'] = float(np.median(sl_day[hit])) if hit.any() else None
+    if take_profit is not None:
+        hit, tp_day = first_hit(paths >= take_profit)
+        result['p_take_profit'] = float(hit.mean())
+        result['median_days_to_take_profit'] = float(np.median(tp_day[hit])) if hit.any() else None
+    if stop_loss is not None and take_profit is not None:
+        result['p_take_profit_first'] = float((tp_day < sl_day).mean())
+        result['p_stop_loss_first'] = float((sl_day < tp_day).mean())
+    return result
+
+
+def path_var(paths: np.ndarray, spot: float, horizons: Iterable[int] = REPORT_HORIZONS,
+             level: float = 0.95) -> Dict[int, Dict[str, float]]:
+    """VaR/CVaR theo % giá hiện tại: tại cuối horizon và theo điểm thấp nhất trên đường giá"""
+    days = _horizon_index(horizons, paths.shape[1])
+    if not len(days):
+        return {}
+    terminal = paths[:, days - 1] / spot - 1
+    worst = np.minimum.accumulate(paths, axis=1)[:, days - 1] / spot - 1
+    tail = 1 - level
+
+    def var_cvar(returns):
+        cutoff = np.quantile(returns, tail, axis=0)
+        in_tail = returns <= cutoff
+        cvar = (returns * in_tail).sum(axis=0) / np.maximum(in_tail.sum(axis=0), 1)
+        return -cutoff * 100, -cvar * 100
+
+    var, cvar = var_cvar(terminal)
+    path_var_, path_cvar = var_cvar(worst)
+    return {
+        int(d): {
+            'var': float(var[j]),
+            'cvar': float(cvar[j]),
+            'path_var': float(path_var_[j]),
+            'path_cvar': float(path_cvar[j])
+        }
+        for j, d in enumerate(days)
+    }
+
+
+def bands_from_paths(paths: np.ndarray, horizons: Iterable[int],
+                     level: float = INTERVAL_LEVEL) -> Dict[int, Dict[str, float]]:
+    """Độ rộng khoảng tin cậy tương đối theo horizon, để bọc quanh giá dự báo của model
+
+    Trả về {days: {'lower': tỉ lệ, 'upper': tỉ lệ, 'uncertainty': % nửa độ rộng}} so với trung vị.
+    """
+    days = _horizon_index(horizons, paths.shape[1])
+    if not len(days):
+        return {}
+    tail = (1 - level) / 2
+    low, mid, high = np.quantile(paths[:, days - 1], [tail, 0.5, 1 - tail], axis=0)
+    return {
+        int(d): {
+            'lower': float(low[j] / mid[j]),
+            'upper': float(high[j] / mid[j]),
+            'uncertainty': float((high[j] - low[j]) / (2 * mid[j]) * 100)
+        }
+        for j, d in enumerate(days)
+    }
+
+
+def interval_bands(closes, horizons: Iterable[int], exchange: Optional[str] = 'HOSE',
+                   model: str = 'garch', n_paths: int = DEFAULT_PATHS,
+                   level: float = INTERVAL_LEVEL, seed: Optional[int] = 0) -> Dict[int, Dict[str, float]]:
+    """Mô phỏng không drift (chỉ lấy độ rộng) rồi tính band cho các horizon"""
+    horizons = [int(h) for h in horizons if int(h) > 0]
+    if not horizons:
+        return {}
+    paths = simulate_paths(closes, n_paths, max(horizons), model, exchange, drift=False, seed=seed)
+    return bands_from_paths(paths, horizons, level)
+
+
+def apply_band(price: float, band: Dict[str, float]) -> Dict[str, float]:
+    """Khoảng tin cậy cho một giá dự báo theo band của interval_bands"""
+    return {
+        'lower': round(float(price * band['lower']), 2),
+        'upper': round(float(price * band['upper']), 2),
+        'uncertainty': round(band['uncertainty'], 1),
+        'method': 'monte_carlo'
+    }
+
+
+@stage(WorkloadClass.CPU)
+def run_simulation(closes, model: str = 'gbm', exchange: Optional[str] = 'HOSE',
+                   n_paths: int = DEFAULT_PATHS, horizon: int = DEFAULT_HORIZON,
+                   stop_loss: Optional[float] = None, take_profit: Optional[float] = None,
+                   var_level: float = 0.95, seed: Optional[int] = None) -> Dict[str, Any]:
+    """Mô phỏng đầy đủ cho endpoint: phân vị theo horizon, xác suất SL/TP, VaR theo đường giá"""
+    if model not in MODELS:
+        raise ValueError(f"Unknown model '{model}', expected one of {MODELS}")
+    n_paths = max(100, min(int(n_paths), MAX_PATHS))
+    horizon = max(1, min(int(horizon), MAX_HORIZON))
+
+    started = time.perf_counter()
+    paths = simulate_paths(closes, n_paths, horizon, model, exchange, seed=seed)
+    prices = np.asarray(closes, dtype='float64').ravel()
+    spot = float(prices[np.isfinite(prices) & (prices > 0)][-1])
+    horizons = tuple(h for h in REPORT_HORIZONS if h < horizon) + (horizon,)
+    returns = log_returns(prices)
+    result = {
+        'model': model,
+        'exchange': exchange,
+        'price_limit': price_limit(exchange),
+        'spot': spot,
+        'n_paths': n_paths,
+        'horizon': horizon,
+        'historical_volatility': float(returns.std(ddof=1) * np.sqrt(TRADING_DAYS) * 100),
+        'quantiles': horizon_quantiles(paths, horizons),
+        'risk': path_var(paths, spot, horizons, var_level),
+        'var_level': var_level
+    }
+    if stop_loss is not None or take_profit is not None:
+        result['hit_probabilities'] = hit_probabilities(paths, stop_loss, take_profit)
+    if model == 'garch':
+        result['garch'] = fit_garch(returns)
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+__all__ = [
+    'DEFAULT_PATHS',
+    'MODELS',
+    'apply_band',
+    'bands_from_paths',
+    'fit_garch',
+    'hit_probabilities',
+    'horizon_quantiles',
+    'interval_bands',
+    'log_returns',
+    'path_var',
+    'run_simulation',
+    'simulate_paths',
+    'simulate_returns'
+]
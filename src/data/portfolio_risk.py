@@ -0,0 +1,204 @@
+# src/data/portfolio_risk.py
+"""
+Portfolio Risk Engine
+Rủi ro cấp danh mục (20-60 mã) bằng phép toán ma trận: hiệp phương sai co rút Ledoit-Wolf,
+biến động danh mục, VaR/CVaR lịch sử và tham số, đóng góp rủi ro biên / thành phần, tương quan.
+"""
+
+import time
+import logging
+from statistics import NormalDist
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from src.utils.executors import stage, WorkloadClass
+from src.utils.helpers import risk_metrics_matrix
+from .backtest import TRADING_DAYS
+
+logger = logging.getLogger(__name__)
+
+UNITS = ('shares', 'value', 'weight')
+DEFAULT_LOOKBACK = 252           # số phiên dùng ước lượng
+MIN_OBSERVATIONS = 60            # tối thiểu 60 phiên lợi suất chung
+MAX_HOLDINGS = 200
+TOP_PAIRS = 10
+
+
+def aligned_returns(closes: pd.DataFrame, lookback: int = DEFAULT_LOOKBACK):
+    """Lợi suất ngày đã căn theo ngày chung cho mọi mã (ma trận T x N) + danh sách mã bị loại"""
+    returns = closes.sort_index().ffill(limit=2).pct_change().iloc[1:].tail(lookback)
+    coverage = returns.notna().mean()
+    dropped = sorted(coverage.index[coverage < 0.9])
+    returns = returns.drop(columns=dropped).dropna(how='any')
+    return returns, dropped
+
+
+def ledoit_wolf(returns: np.ndarray):
+    """Hiệp phương sai co rút về ma trận đơn vị có tỉ lệ (Ledoit & Wolf 2004), trả về (cov, shrinkage)"""
+    T, N = returns.shape
+    X = returns - returns.mean(axis=0)
+    sample = X.T @ X / T
+    mu = np.trace(sample) / N
+    target_gap = sample.copy()
+    target_gap[np.diag_indices(N)] -= mu
+    d2 = (target_gap ** 2).sum() / N
+    # sum_t ||x_t x_t' - S||^2 = sum_t ||x_t||^4 - T ||S||^2
+    row_norms = (X ** 2).sum(axis=1)
+    b_bar2 = ((row_norms ** 2).sum() - T * (sample ** 2).sum()) / (T ** 2 * N)
+    shrinkage = float(min(b_bar2, d2) / d2) if d2 > 0 else 1.0
+    cov = (1 - shrinkage) * sample
+    cov[np.diag_indices(N)] += shrinkage * mu
+    return cov, shrinkage
+
+
+def position_weights(holdings: Dict[str, float], prices: pd.Series, unit: str = 'shares'):
+    """Giá trị và tỉ trọng từng vị thế theo đơn vị nhập (số CP, giá trị VND hoặc tỉ trọng)"""
+    if unit not in UNITS:
+        raise ValueError(f"Unknown unit '{unit}', expected one of {UNITS}")
+    symbols = list(prices.index)
+    amounts = np.array([float(holdings[s]) for s in symbols])
+    if unit == 'shares':
+        values = amounts * prices.to_numpy(dtype='float64')
+    else:
+        values = amounts
+    total = values.sum()
+    if total <= 0:
+        raise ValueError("Portfolio value must be positive")
+    return values, values / total
+
+
+def _var_cvar(pnl: np.ndarray, level: float):
+    cutoff = np.quantile(pnl, 1 - level)
+    tail = pnl[pnl <= cutoff]
+    return float(-cutoff), float(-tail.mean()) if len(tail) else float(-cutoff)
+
+
+@stage(WorkloadClass.CPU)
+def compute_portfolio_risk(closes: pd.DataFrame, holdings: Dict[str, float], unit: str = 'shares',
+                           level: float = 0.95, horizon: int = 1,
+                           lookback: int = DEFAULT_LOOKBACK) -> Dict[str, Any]:
+    """Toàn bộ chỉ số rủi ro danh mục từ ma trận giá đóng cửa (ngày x mã, VND)"""
+    started = time.perf_counter()
+    if not 0.5 < level < 1:
+        raise ValueError("level must be between 0.5 and 1")
+    horizon = max(1, int(horizon))
+
+    returns, dropped = aligned_returns(closes[[s for s in closes.columns if s in holdings]], lookback)
+    if returns.shape[1] == 0 or len(returns) < MIN_OBSERVATIONS:
+        raise ValueError(f"Need at least {MIN_OBSERVATIONS} common sessions, got {len(returns)}")
+    symbols = list(returns.columns)
+    prices = closes[symbols].ffill().iloc[-1]
+    values, weights = position_weights(holdings, prices, unit)
+    total_value = float(values.sum())
+
+    R = returns.to_numpy(dtype='float64')
+    cov, shrinkage = ledoit_wolf(R)
+    means = R.mean(axis=0)
+
+    # Biến động & đóng góp rủi ro (Euler): sigma_p = sum_i w_i * (Sigma w)_i / sigma_p
+    sigma_w = cov @ weights
+    port_var = float(weights @ sigma_w)
+    port_vol = np.sqrt(port_var)
+    marginal = sigma_w / port_vol
+    component = weights * marginal
+    asset_vol = np.sqrt(np.diag(cov))
+    scale = np.sqrt(horizon)
+
+    # VaR tham số (chuẩn) và lịch sử (lợi suất danh mục thực tế, chồng theo horizon)
+    z = NormalDist().inv_cdf(level)
+    mu_h = float(means @ weights) * horizon
+    sigma_h = port_vol * scale
+    param_var = z * sigma_h - mu_h
+    param_cvar = sigma_h * NormalDist().pdf(z) / (1 - level) - mu_h
+
+    port_returns = R @ weights
+    if horizon > 1:
+        growth = np.cumprod(1 + port_returns)
+        growth = np.concatenate([[1.0], growth])
+        port_returns_h = growth[horizon:] / growth[:-horizon] - 1
+    else:
+        port_returns_h = port_returns
+    hist_var, hist_cvar = _var_cvar(port_returns_h, level)
+
+    # Tương quan từ hiệp phương sai co rút
+    corr = cov / np.outer(asset_vol, asset_vol)
+    upper = np.triu_indices(len(symbols), k=1)
+    pair_corr = corr[upper]
+    order = np.argsort(pair_corr)[::-1][:TOP_PAIRS]
+    eigenvalues = np.linalg.eigvalsh(corr)
+
+    component_var = component * z * scale
+    # Chỉ số rủi ro riêng của từng mã: một lần gọi kernel trên ma trận (mã x phiên)
+    standalone = risk_metrics_matrix(R.T, confidence_level=1 - level)
+    positions = [
+        {
+            'symbol': s,
+            'value': round(float(values[i]), 0),
+            'weight': round(float(weights[i]) * 100, 2),
+            'volatility': round(float(asset_vol[i] * np.sqrt(TRADING_DAYS) * 100), 2),
+            'marginal_risk': round(float(marginal[i] * np.sqrt(TRADING_DAYS) * 100), 2),
+            'component_risk': round(float(component[i] * np.sqrt(TRADING_DAYS) * 100), 2),
+            'risk_contribution_pct': round(float(component[i] / port_vol * 100), 2),
+            'component_var': round(float(component_var[i] * total_value), 0),
+            'standalone_var_pct': round(float(standalone['var_95'][i]) * 100, 3),
+            'max_drawdown': round(float(standalone['max_drawdown'][i]) * 100, 2)
+        }
+        for i, s in enumerate(symbols)
+    ]
+    positions.sort(key=lambda p: p['risk_contribution_pct'], reverse=True)
+
+    return {
+        'symbols': symbols,
+        'dropped_symbols': dropped,
+        'missing_symbols': sorted(set(holdings) - set(closes.columns)),
+        'observations': int(len(R)),
+        'total_value': round(total_value, 0),
+        'confidence_level': level,
+        'horizon_days': horizon,
+        'volatility': {
+            'daily': round(float(port_vol) * 100, 3),
+            'annualized': round(float(port_vol * np.sqrt(TRADING_DAYS)) * 100, 2),
+            'diversification_ratio': round(float(weights @ asset_vol / port_vol), 3)
+        },
+        'var': {
+            'parametric_pct': round(float(param_var) * 100, 3),
+            'parametric_vnd': round(float(param_var) * total_value, 0),
+            'historical_pct': round(hist_var * 100, 3),
+            'historical_vnd': round(hist_var * total_value, 0)
+        },
+        'cvar': {
+            'parametric_pct': round(float(param_cvar) * 100, 3),
+            'parametric_vnd': round(float(param_cvar) * total_value, 0),
+            'historical_pct': round(hist_cvar * 100, 3),
+            'historical_vnd': round(hist_cvar * total_value, 0)
+        },
+        'positions': positions,
+        'correlation': {
+            'average': round(float(pair_corr.mean()), 3) if len(pair_corr) else None,
+            'max': round(float(pair_corr.max()), 3) if len(pair_corr) else None,
+            'min': round(float(pair_corr.min()), 3) if len(pair_corr) else None,
+            # Tỉ trọng phương sai của thành phần chính lớn nhất: cao = danh mục chạy theo một nhân tố
+            'first_factor_share': round(float(eigenvalues[-1] / eigenvalues.sum()), 3),
+            'top_pairs': [
+                {'pair': [symbols[upper[0][k]], symbols[upper[1][k]]], 'correlation': round(float(pair_corr[k]), 3)}
+                for k in order
+            ],
+            'matrix': np.round(corr, 3).tolist()
+        },
+        'covariance': {
+            'method': 'ledoit_wolf',
+            'shrinkage': round(shrinkage, 4)
+        },
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+__all__ = [
+    'UNITS',
+    'aligned_returns',
+    'compute_portfolio_risk',
+    'ledoit_wolf',
+    'position_weights'
+]
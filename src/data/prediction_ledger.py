@@ -0,0 +1,339 @@
+# src/data/prediction_ledger.py
+"""
+Prediction Ledger
+Ghi lại mọi dự báo đã trả cho người dùng (append-only, ghi theo lô ngoài hot path),
+job nền đối chiếu với giá đóng cửa thực tế từ bảng nến của screener (vector hóa) và giữ
+thống kê độ chính xác / hiệu chuẩn khoảng tin cậy theo phương pháp + horizon.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.utils.trading_calendar import get_trading_calendar
+
+logger = logging.getLogger(__name__)
+
+LEDGER_PATH = os.getenv('PREDICTION_LEDGER_PATH', os.path.join('.cache', 'predictions.jsonl'))
+
+FLUSH_INTERVAL = 5              # giây giữa 2 lần ghi lô
+FLUSH_BATCH = 200               # ghi ngay khi buffer đạt ngưỡng
+SCORE_INTERVAL = 3600           # chấm điểm mỗi giờ (giá đóng cửa chỉ đổi 1 lần/ngày)
+ROLLING_DAYS = 180              # thống kê trên dự báo tạo trong 180 ngày gần nhất
+MIN_SAMPLES = 30                # dưới ngưỡng này confidence vẫn dựa chủ yếu vào heuristic
+FULL_WEIGHT_SAMPLES = 200       # từ ngưỡng này confidence lấy hoàn toàn từ dữ liệu thật
+
+_STAT_COLUMNS = ['samples', 'mae_pct', 'rmse_pct', 'bias_pct', 'direction_hit_rate', 'interval_coverage']
+
+
+def target_date(created: datetime, horizon: int) -> str:
+    """Phiên đáo hạn: horizon phiên giao dịch sau ngày tạo (0 = đóng cửa phiên hôm nay)"""
+    return str(get_trading_calendar().add_sessions(created, horizon, roll='forward'))
+
+
+def _last_closed_session(now: datetime = None) -> np.datetime64:
+    return get_trading_calendar().last_closed_session(now)
+
+
+def extract_forecasts(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Dự báo theo horizon từ kết quả PricePredictor ('predictions' -> 'N_days')"""
+    forecasts = []
+    for period in (result.get('predictions') or {}).values():
+        if not isinstance(period, dict):
+            continue
+        for key, value in period.items():
+            if not (isinstance(value, dict) and key.endswith('_days') and value.get('price')):
+                continue
+            interval = value.get('confidence_interval') or {}
+            forecasts.append({
+                'horizon': int(key.split('_')[0]),
+                'predicted': float(value['price']),
+                'lower': interval.get('lower'),
+                'upper': interval.get('upper')
+            })
+    return forecasts
+
+
+class PredictionLedger:
+    """Sổ dự báo + thống kê độ chính xác cuộn"""
+
+    def __init__(self, path: str = None, bar_source: Callable[[], pd.DataFrame] = None):
+        self.path = path or LEDGER_PATH
+        # Callable trả về ma trận giá đóng cửa (ngày x mã), vd. lambda: screener.closes
+        self.bar_source = bar_source
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pending = pd.DataFrame()
+        self._scored = pd.DataFrame()
+        self._stats = pd.DataFrame(columns=_STAT_COLUMNS)
+        self._counter = 0
+        self.last_scored = None
+        self.stats = {'recorded': 0, 'flushed': 0, 'scored': 0, 'flush_errors': 0}
+        self.load()
+
+    # ---- hot path ----
+    def record(self, symbol: str, horizon: int, predicted: float, base_price: float, method: str,
+               model_version: str = None, lower: float = None, upper: float = None,
+               created: datetime = None) -> str:
+        """Thêm một dự báo vào buffer (không I/O); trả về id"""
+        created = created or datetime.now()
+        with self._buffer_lock:
+            self._counter += 1
+            entry_id = f"{created.strftime('%Y%m%d%H%M%S%f')}-{os.getpid()}-{self._counter}"
+            self._buffer.append({
+                'id': entry_id,
+                'symbol': symbol.upper(),
+                'horizon': int(horizon),
+                'predicted': float(predicted),
+                'base': float(base_price),
+                'lower': float(lower) if lower is not None else None,
+                'upper': float(upper) if upper is not None else None,
+                'method': method,
+                'model_version': model_version,
+                'created_at': created.timestamp(),
+                'target_date': target_date(created, horizon)
+            })
+            full = len(self._buffer) >= FLUSH_BATCH
+        self.stats['recorded'] += 1
+        if full:
+            self._wake.set()
+        return entry_id
+
+    def record_result(self, symbol: str, result: Dict[str, Any], method: str, model_version: str = None,
+                      base_price: float = None) -> int:
+        """Ghi mọi horizon trong một kết quả PricePredictor"""
+        base_price = base_price or result.get('current_price')
+        if not base_price or result.get('error'):
+            return 0
+        forecasts = extract_forecasts(result)
+        for forecast in forecasts:
+            self.record(symbol, forecast['horizon'], forecast['predicted'], base_price, method, model_version,
+                        forecast['lower'], forecast['upper'])
+        return len(forecasts)
+
+    # ---- persistence ----
+    def flush(self) -> int:
+        """Ghi buffer xuống file (append) và đưa vào danh sách chờ chấm"""
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in batch))
+        except OSError as e:
+            self.stats['flush_errors'] += 1
+            logger.warning(f"Prediction ledger flush failed: {e}")
+            with self._buffer_lock:
+                self._buffer = batch + self._buffer
+            return 0
+        with self._lock:
+            self._pending = pd.concat([self._pending, pd.DataFrame(batch)], ignore_index=True)
+        self.stats['flushed'] += len(batch)
+        return len(batch)
+
+    def _outcomes_path(self) -> str:
+        root, ext = os.path.splitext(self.path)
+        return f"{root}_outcomes{ext}"
+
+    def _read_jsonl(self, path: str) -> pd.DataFrame:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Prediction ledger read failed ({path}): {e}")
+            return pd.DataFrame()
+        return pd.DataFrame(rows)
+
+    def load(self):
+        """Nạp dự báo + kết quả đã chấm; phần chưa chấm vào hàng chờ"""
+        ledger = self._read_jsonl(self.path)
+        if ledger.empty:
+            return
+        outcomes = self._read_jsonl(self._outcomes_path())
+        scored_ids = set(outcomes['id']) if not outcomes.empty else set()
+        cutoff = time.time() - ROLLING_DAYS * 86400
+        with self._lock:
+            self._pending = ledger[~ledger['id'].isin(scored_ids)].reset_index(drop=True)
+            if not outcomes.empty:
+                scored = ledger.merge(outcomes[['id', 'actual']], on='id')
+                self._scored = scored[scored['created_at'] >= cutoff].reset_index(drop=True)
+            self._recompute_stats()
+        logger.info(f"📒 Prediction ledger loaded: {len(self._pending)} pending, {len(self._scored)} scored")
+
+    # ---- scoring ----
+    def score(self, closes: pd.DataFrame = None, now: datetime = None) -> int:
+        """Đối chiếu dự báo đã đáo hạn với giá đóng cửa thực tế (vector hóa)"""
+        self.flush()
+        closes = closes if closes is not None else (self.bar_source() if self.bar_source else None)
+        with self._lock:
+            pending = self._pending
+        if closes is None or closes.empty or pending.empty:
+            return 0
+
+        cutoff = _last_closed_session(now)
+        targets = pending['target_date'].to_numpy(dtype='datetime64[D]')
+        dates = closes.index.to_numpy(dtype='datetime64[D]')
+        columns = closes.columns.get_indexer(pending['symbol'])
+        # Phiên đầu tiên >= ngày đáo hạn (ngày lễ -> phiên kế tiếp)
+        rows = np.searchsorted(dates, targets)
+        # Phiên đáo hạn trước nến đầu tiên không có giá thật (searchsorted trả về dòng 0)
+        found = (columns >= 0) & (rows < len(dates)) & (targets >= dates[0])
+        found[found] = dates[rows[found]] <= cutoff
+
+        values = closes.to_numpy(dtype='float64')
+        actual = np.full(len(pending), np.nan)
+        actual[found] = values[rows[found], columns[found]]
+        # Phiên đáo hạn nằm ngoài bảng nến (quá cũ) hoặc mã không còn trong bảng quá 30 ngày -> bỏ
+        expired = (targets < dates[0]) | ((columns < 0) & (targets < cutoff - np.timedelta64(30, 'D')))
+        matched = found & ~np.isnan(actual) & (actual > 0)
+        if not matched.any() and not expired.any():
+            return 0
+
+        scored = pending[matched].assign(actual=actual[matched])
+        if len(scored):
+            try:
+                with open(self._outcomes_path(), 'a', encoding='utf-8') as f:
+                    scored_at = time.time()
+                    f.write(''.join(
+                        json.dumps({'id': i, 'actual': float(a), 'scored_at': scored_at}) + '\n'
+                        for i, a in zip(scored['id'], scored['actual'])
+                    ))
+            except OSError as e:
+                logger.warning(f"Prediction outcomes write failed: {e}")
+                return 0
+
+        cutoff_ts = time.time() - ROLLING_DAYS * 86400
+        with self._lock:
+            done = set(pending['id'][matched | expired])
+            self._pending = self._pending[~self._pending['id'].isin(done)].reset_index(drop=True)
+            combined = pd.concat([self._scored, scored], ignore_index=True)
+            self._scored = combined[combined['created_at'] >= cutoff_ts].reset_index(drop=True)
+            self._recompute_stats()
+        self.last_scored = datetime.now()
+        self.stats['scored'] += len(scored)
+        logger.info(f"📒 Scored {len(scored)} predictions ({len(self._pending)} pending)")
+        return len(scored)
+
+    def _recompute_stats(self):
+        scored = self._scored
+        if scored.empty:
+            self._stats = pd.DataFrame(columns=_STAT_COLUMNS)
+            return
+        error = (scored['predicted'] / scored['actual'] - 1) * 100
+        move = np.sign(scored['predicted'] - scored['base'])
+        hit = (move == np.sign(scored['actual'] - scored['base'])).astype('float64').where(move != 0)
+        lower = pd.to_numeric(scored['lower'], errors='coerce')
+        upper = pd.to_numeric(scored['upper'], errors='coerce')
+        covered = ((scored['actual'] >= lower) & (scored['actual'] <= upper)).astype('float64').where(lower.notna() & upper.notna())
+        frame = pd.DataFrame({
+            'method': scored['method'], 'horizon': scored['horizon'],
+            'abs_error': error.abs(), 'squared_error': error ** 2, 'error': error, 'hit': hit, 'covered': covered
+        })
+        grouped = frame.groupby(['method', 'horizon'])
+        self._stats = pd.DataFrame({
+            'samples': grouped.size(),
+            'mae_pct': grouped['abs_error'].mean(),
+            'rmse_pct': np.sqrt(grouped['squared_error'].mean()),
+            'bias_pct': grouped['error'].mean(),
+            'direction_hit_rate': grouped['hit'].mean(),
+            'interval_coverage': grouped['covered'].mean()
+        })
+
+    # ---- read ----
+    def get_accuracy(self, method: str = None, horizon: int = None) -> List[Dict[str, Any]]:
+        """Thống kê cuộn theo (method, horizon)"""
+        if self._stats.empty:
+            return []
+        stats = self._stats.reset_index()
+        if method:
+            stats = stats[stats['method'] == method]
+        if horizon is not None:
+            stats = stats[stats['horizon'] == horizon]
+        stats = stats.astype(object).where(stats.notna(), None)
+        return [
+            {k: round(v, 4) if isinstance(v, float) else v for k, v in row.items()}
+            for row in stats.to_dict(orient='records')
+        ]
+
+    def blend_confidence(self, method: str, horizon: int, heuristic: float) -> float:
+        """Confidence = tỷ lệ đúng hướng thực tế, trộn với heuristic theo số mẫu"""
+        try:
+            row = self._stats.loc[(method, horizon)]
+        except KeyError:
+            return heuristic
+        samples, hit_rate = row['samples'], row['direction_hit_rate']
+        if samples < MIN_SAMPLES or hit_rate != hit_rate:
+            return heuristic
+        weight = min(1.0, samples / FULL_WEIGHT_SAMPLES)
+        return round(weight * hit_rate * 100 + (1 - weight) * heuristic, 1)
+
+    # ---- background ----
+    def _run(self):
+        last_score = 0.0
+        while not self._stop.is_set():
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.time() - last_score >= SCORE_INTERVAL:
+                    last_score = time.time()
+                    self.score()
+            except Exception as e:
+                logger.warning(f"Prediction ledger job failed: {e}")
+        self.flush()
+
+    def start(self):
+        """Chạy flush + chấm điểm trên thread nền (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='prediction-ledger', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            buffered=len(self._buffer),
+            pending=len(self._pending),
+            rolling_scored=len(self._scored),
+            last_scored=self.last_scored.isoformat() if self.last_scored else None
+        )
+
+
+# Singleton instance
+_prediction_ledger = None
+_prediction_ledger_lock = threading.Lock()
+
+def get_prediction_ledger() -> PredictionLedger:
+    global _prediction_ledger
+    if _prediction_ledger is None:
+        with _prediction_ledger_lock:
+            if _prediction_ledger is None:
+                _prediction_ledger = PredictionLedger()
+    return _prediction_ledger
+
+
+__all__ = [
+    'PredictionLedger',
+    'extract_forecasts',
+    'get_prediction_ledger',
+    'target_date'
+]
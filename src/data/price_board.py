@@ -0,0 +1,246 @@
+# src/data/price_board.py
+"""
+Price Board Snapshot
+Snapshot bảng giá toàn thị trường: lấy bulk vài request, lưu dạng bảng cột
+(symbol, last, change, volume, foreign flow) và tính top movers / ngành / watchlist bằng vector
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .vnstock_gateway import PRICE_UNIT
+
+logger = logging.getLogger(__name__)
+
+# Số mã mỗi request price_board
+BOARD_CHUNK_SIZE = 400
+
+# Chu kỳ refresh khi đang giao dịch (giây); ngoài giờ dùng cache_duration của market_schedule
+BOARD_REFRESH_OPEN = int(os.getenv('PRICE_BOARD_REFRESH', 30))
+
+BOARD_COLUMNS = [
+    'exchange', 'sector', 'ref_price', 'last', 'change', 'change_percent',
+    'volume', 'value', 'foreign_buy', 'foreign_sell', 'foreign_net'
+]
+
+# Tên cột có thể gặp trong price_board của vnstock (sau khi flatten MultiIndex)
+_FIELD_CANDIDATES = {
+    'symbol': ['listing_symbol', 'symbol', 'ticker'],
+    'exchange': ['listing_exchange', 'exchange', 'listing_board', 'board'],
+    'ref_price': ['listing_ref_price', 'ref_price', 'match_reference_price', 'reference_price', 'ref'],
+    'last': ['match_match_price', 'match_price', 'last_price', 'price', 'close'],
+    'volume': ['match_accumulated_volume', 'accumulated_volume', 'total_volume', 'volume'],
+    'value': ['match_accumulated_value', 'accumulated_value', 'total_value', 'value'],
+    'foreign_buy': ['match_foreign_buy_volume', 'foreign_buy_volume', 'foreign_buy'],
+    'foreign_sell': ['match_foreign_sell_volume', 'foreign_sell_volume', 'foreign_sell']
+}
+
+
+def _flatten_columns(frame):
+    """MultiIndex ('match', 'match_price') -> 'match_match_price'"""
+    if getattr(frame.columns, 'nlevels', 1) > 1:
+        frame.columns = ['_'.join(str(part) for part in col if str(part)).lower() for col in frame.columns]
+    else:
+        frame.columns = [str(col).lower() for col in frame.columns]
+    return frame
+
+
+def _pick(frame, field: str):
+    for name in _FIELD_CANDIDATES[field]:
+        if name in frame.columns:
+            return frame[name]
+    return None
+
+
+def normalize_board(raw, sector_map: Dict[str, str] = None):
+    """Chuẩn hóa price_board thô thành bảng cột index theo symbol.
+    Giá bảng điện (đồng) đổi về đơn vị nến lịch sử (nghìn đồng) để ghép chung với nến"""
+    import numpy as np
+    import pandas as pd
+
+    frame = _flatten_columns(raw.copy())
+    symbols = _pick(frame, 'symbol')
+    if symbols is None:
+        raise ValueError("Price board missing symbol column")
+
+    board = pd.DataFrame(index=pd.Index(symbols.astype(str).str.upper().values, name='symbol'))
+    for field in ('ref_price', 'last', 'volume', 'value', 'foreign_buy', 'foreign_sell'):
+        column = _pick(frame, field)
+        board[field] = pd.to_numeric(column, errors='coerce').values if column is not None else np.nan
+    board[['ref_price', 'last']] = board[['ref_price', 'last']] / PRICE_UNIT
+    exchange = _pick(frame, 'exchange')
+    board['exchange'] = exchange.astype(str).values if exchange is not None else 'HOSE'
+
+    # Chưa khớp lệnh -> giá tham chiếu
+    board['last'] = board['last'].where(board['last'] > 0, board['ref_price'])
+    board['change'] = board['last'] - board['ref_price']
+    board['change_percent'] = (board['change'] / board['ref_price'].where(board['ref_price'] > 0)) * 100
+    board['foreign_net'] = board['foreign_buy'].fillna(0) - board['foreign_sell'].fillna(0)
+    board['sector'] = board.index.map(lambda s: (sector_map or {}).get(s, 'Unknown'))
+
+    board = board[~board.index.duplicated(keep='last')]
+    return board[BOARD_COLUMNS]
+
+
+class PriceBoardService:
+    """Snapshot bảng giá toàn thị trường, refresh theo phiên giao dịch"""
+
+    def __init__(self, gateway, universe_provider: Callable[[], List[Dict[str, str]]]):
+        self.gateway = gateway
+        self.universe_provider = universe_provider
+        self.board = None
+        self.timestamp = 0.0
+        self._refresh_lock = threading.Lock()
+        self._subscribers: List[Callable] = []
+        self.stats = {'refreshes': 0, 'requests': 0, 'errors': 0, 'last_refresh_ms': None}
+
+    def subscribe(self, callback: Callable):
+        """Đăng ký callback(board) sau mỗi lần refresh (vd. sector index engine)"""
+        self._subscribers.append(callback)
+
+    def _refresh_interval(self) -> int:
+        try:
+            from src.utils.market_schedule import market_schedule
+            if market_schedule.is_market_open()['is_open']:
+                return BOARD_REFRESH_OPEN
+            return int(market_schedule.get_data_freshness_expectation().get('cache_duration', 300))
+        except Exception:
+            return BOARD_REFRESH_OPEN
+
+    def is_fresh(self) -> bool:
+        return self.board is not None and (time.time() - self.timestamp) < self._refresh_interval()
+
+    def _universe(self):
+        universe = self.universe_provider() or []
+        symbols = sorted({item['symbol'].upper() for item in universe if item.get('symbol')})
+        sector_map = {item['symbol'].upper(): item.get('sector', 'Unknown') for item in universe if item.get('symbol')}
+        return symbols, sector_map
+
+    def _fetch_board_chunk(self, symbols: List[str]):
+        return self.gateway.stock(symbols[0], 'VCI').trading.price_board(symbols_list=symbols)
+
+    async def refresh(self):
+        """Tải lại toàn bộ bảng giá bằng vài request bulk song song"""
+        import pandas as pd
+
+        symbols, sector_map = self._universe()
+        if not symbols:
+            return self.board
+
+        started = time.perf_counter()
+        chunks = [symbols[i:i + BOARD_CHUNK_SIZE] for i in range(0, len(symbols), BOARD_CHUNK_SIZE)]
+        results = await asyncio.gather(
+            *(self.gateway.run('VCI', self._fetch_board_chunk, chunk) for chunk in chunks),
+            return_exceptions=True
+        )
+        self.stats['requests'] += len(chunks)
+
+        frames = []
+        for result in results:
+            if isinstance(result, Exception):
+                self.stats['errors'] += 1
+                logger.warning(f"Price board chunk failed: {result}")
+                continue
+            try:
+                frames.append(normalize_board(result, sector_map))
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning(f"Price board normalize failed: {e}")
+
+        if frames:
+            board = pd.concat(frames)
+            self.board = board[~board.index.duplicated(keep='last')]
+            self.timestamp = time.time()
+            self.stats['refreshes'] += 1
+            self.stats['last_refresh_ms'] = round((time.perf_counter() - started) * 1000)
+            logger.info(f"📊 Price board refreshed: {len(self.board)} symbols in {len(chunks)} requests")
+            # Subscriber tính lại bảng pandas (vài trăm ms) -> chạy trên thread, không chặn event loop
+            await asyncio.get_running_loop().run_in_executor(None, self._notify, self.board)
+        return self.board
+
+    def _notify(self, board):
+        for callback in self._subscribers:
+            try:
+                callback(board)
+            except Exception as e:
+                logger.warning(f"Price board subscriber failed: {e}")
+
+    async def snapshot(self, force_refresh: bool = False):
+        """Bảng giá hiện tại (refresh nếu quá hạn); None nếu không lấy được"""
+        if not force_refresh and self.is_fresh():
+            return self.board
+        # Chỉ một request refresh tại một thời điểm, các request khác dùng bản cũ
+        if not self._refresh_lock.acquire(blocking=False):
+            return self.board
+        try:
+            return await self.refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def peek(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Dòng của symbol nếu snapshot còn hạn (không trigger refresh)"""
+        if not self.is_fresh() or symbol.upper() not in self.board.index:
+            return None
+        row = self.board.loc[symbol.upper()]
+        if row['last'] != row['last']:
+            return None
+        return dict(row, symbol=symbol.upper())
+
+    # ---- vectorized queries ----
+    async def top_movers(self, n: int = 3, min_volume: int = 0) -> Optional[tuple]:
+        """Top tăng / giảm theo % thay đổi"""
+        board = await self.snapshot()
+        if board is None or board.empty:
+            return None
+        traded = board[(board['volume'].fillna(0) > min_volume) & board['change_percent'].notna()]
+        gainers = traded[traded['change_percent'] > 0].nlargest(n, 'change_percent')
+        losers = traded[traded['change_percent'] < 0].nsmallest(n, 'change_percent')
+        return self._to_movers(gainers), self._to_movers(losers)
+
+    @staticmethod
+    def _to_movers(frame) -> List[Dict[str, Any]]:
+        return [
+            {
+                'symbol': symbol,
+                'price': float(last),
+                'change_percent': round(float(pct), 2),
+                'volume': int(volume) if volume == volume else 0
+            }
+            for symbol, last, pct, volume in zip(frame.index, frame['last'], frame['change_percent'], frame['volume'])
+        ]
+
+    async def sector_performance(self) -> Optional[Dict[str, float]]:
+        """% thay đổi trung bình theo ngành"""
+        board = await self.snapshot()
+        if board is None or board.empty:
+            return None
+        known = board[(board['sector'] != 'Unknown') & board['change_percent'].notna()]
+        return known.groupby('sector')['change_percent'].mean().round(2).to_dict()
+
+    async def quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Giá watchlist từ snapshot (mã không có trong bảng bị bỏ qua)"""
+        board = await self.snapshot()
+        if board is None or board.empty:
+            return {}
+        rows = board.reindex([s.upper() for s in symbols]).dropna(subset=['last'])
+        rows = rows.astype(object).where(rows.notna(), None)
+        return {symbol: dict(row, symbol=symbol) for symbol, row in zip(rows.index, rows.to_dict('records'))}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            symbols=0 if self.board is None else len(self.board),
+            as_of=datetime.fromtimestamp(self.timestamp).isoformat() if self.timestamp else None
+        )
+
+
+__all__ = [
+    'BOARD_COLUMNS',
+    'PriceBoardService',
+    'normalize_board'
+]
@@ -0,0 +1,388 @@
+# src/data/screener.py
+"""
+Stock Screener
+Bảng cột chỉ báo + fundamentals mới nhất cho toàn bộ universe (mỗi mã một dòng),
+duy trì bằng refresh cuối ngày (nến lịch sử) + trong phiên (snapshot bảng giá).
+Filter / sort chạy vector trên bảng có sẵn, không tính lại theo request.
+"""
+
+import os
+import re
+import time
+import asyncio
+import logging
+import operator
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.utils.trading_calendar import get_trading_calendar
+from .sector_index import MAX_SESSIONS
+from .forecaster import forecast_universe
+
+logger = logging.getLogger(__name__)
+
+# Giờ chạy refresh cuối ngày (sau ATC + đối soát dữ liệu)
+NIGHTLY_HOUR = int(os.getenv('SCREENER_NIGHTLY_HOUR', 18))
+# Số ngày lịch sử tải lại mỗi đêm (~1 năm giao dịch + đệm)
+HISTORY_DAYS = 400
+# Chu kỳ kiểm tra của scheduler nền (giây)
+SCHEDULER_TICK = 60
+# Số mã tải song song khi refresh đêm (bằng tổng giới hạn VCI + TCBS của gateway)
+NIGHTLY_CONCURRENCY = 8
+
+# Chỉ báo tính từ ma trận nến
+INDICATOR_COLUMNS = [
+    'price', 'rsi_14', 'sma_20', 'sma_50', 'price_vs_sma20', 'price_vs_sma50', 'volume_ratio_20',
+    'return_1w', 'return_1m', 'return_3m', 'volatility_20', 'high_52w', 'low_52w', 'from_high_52w'
+]
+FUNDAMENTAL_COLUMNS = ['pe', 'pb', 'eps', 'bvps', 'roe', 'roa', 'dividend_yield']
+BOARD_FIELDS = ['change_percent', 'volume', 'value', 'foreign_net']
+# % thay đổi dự báo heuristic (tính lại mỗi đêm cho cả universe)
+FORECAST_HORIZONS = [7, 30, 90]
+FORECAST_COLUMNS = [f'forecast_{h}d' for h in FORECAST_HORIZONS]
+
+# Cột số có thể filter / sort
+NUMERIC_COLUMNS = INDICATOR_COLUMNS + BOARD_FIELDS + ['market_cap'] + FUNDAMENTAL_COLUMNS + FORECAST_COLUMNS
+TEXT_COLUMNS = ['exchange', 'sector']
+
+_OPERATORS = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+    '==': operator.eq, '=': operator.eq, '!=': operator.ne
+}
+_CONDITION_RE = re.compile(r'^\s*([a-z_0-9]+)\s*(<=|>=|==|!=|<|>|=|\s+in\s+)\s*(.+?)\s*$', re.IGNORECASE)
+_SPLIT_RE = re.compile(r'\s+and\s+|\s*;\s*', re.IGNORECASE)
+
+
+def compute_indicator_table(closes: pd.DataFrame, volumes: pd.DataFrame) -> pd.DataFrame:
+    """Chỉ báo phiên mới nhất cho mọi mã cùng lúc (closes/volumes: ngày x symbol)"""
+    if closes.empty:
+        return pd.DataFrame(columns=INDICATOR_COLUMNS, index=pd.Index([], name='symbol'))
+
+    filled = closes.ffill()
+    last = filled.iloc[-1]
+    returns = filled.pct_change(fill_method=None)
+
+    # RSI Wilder 14 trên toàn bộ ma trận
+    delta = filled.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean().iloc[-1]
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean().iloc[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + gain / loss)
+    rsi = rsi.where(loss > 0, 100.0).where(gain.notna())
+
+    def tail_mean(frame, n):
+        tail = frame.iloc[-n:]
+        return tail.mean().where(tail.count() == n)
+
+    def change_over(n):
+        if len(filled) <= n:
+            return pd.Series(np.nan, index=filled.columns)
+        return last / filled.iloc[-1 - n] - 1
+
+    sma_20 = tail_mean(filled, 20)
+    sma_50 = tail_mean(filled, 50)
+    # KL phiên hiện tại so với TB 20 phiên trước đó
+    prior_volume = volumes.iloc[-21:-1]
+    avg_volume = prior_volume.mean().where(prior_volume.count() >= 10)
+    high = filled.max()
+
+    table = pd.DataFrame({
+        'price': last,
+        'rsi_14': rsi,
+        'sma_20': sma_20,
+        'sma_50': sma_50,
+        'price_vs_sma20': (last / sma_20 - 1) * 100,
+        'price_vs_sma50': (last / sma_50 - 1) * 100,
+        'volume_ratio_20': volumes.iloc[-1] / avg_volume.where(avg_volume > 0),
+        'return_1w': change_over(5) * 100,
+        'return_1m': change_over(21) * 100,
+        'return_3m': change_over(63) * 100,
+        'volatility_20': returns.iloc[-20:].std() * np.sqrt(252) * 100,
+        'high_52w': high,
+        'low_52w': filled.min(),
+        'from_high_52w': (last / high - 1) * 100
+    })
+    table.index.name = 'symbol'
+    return table
+
+
+def parse_conditions(where: str) -> List[tuple]:
+    """'exchange == HOSE and rsi_14 < 30 and pe < 10' -> [(field, op, value)]"""
+    conditions = []
+    for part in _SPLIT_RE.split(where or ''):
+        if not part.strip():
+            continue
+        match = _CONDITION_RE.match(part)
+        if not match:
+            raise ValueError(f"Invalid condition: '{part.strip()}'")
+        field, op, raw = match.group(1).lower(), match.group(2).strip().lower(), match.group(3)
+        if field in TEXT_COLUMNS:
+            values = [v.strip().strip('\'"') for v in re.split(r'[,|]', raw) if v.strip()]
+            if op not in ('in', '==', '=', '!='):
+                raise ValueError(f"Operator '{op}' not supported for '{field}'")
+            conditions.append((field, op, values))
+        elif field in NUMERIC_COLUMNS:
+            if op == 'in':
+                raise ValueError(f"Operator 'in' not supported for '{field}'")
+            try:
+                conditions.append((field, op, float(raw)))
+            except ValueError:
+                raise ValueError(f"Invalid number for '{field}': '{raw}'")
+        else:
+            raise ValueError(f"Unknown field '{field}'")
+    return conditions
+
+
+def apply_screen(table: pd.DataFrame, conditions: List[tuple]) -> np.ndarray:
+    """Mask boolean cho các điều kiện (NaN không thỏa điều kiện nào)"""
+    mask = np.ones(len(table), dtype=bool)
+    for field, op, value in conditions:
+        if field in TEXT_COLUMNS:
+            # 'sector == banking' khớp 'Banking' (so sánh không phân biệt hoa thường)
+            hit = table[field].astype(str).str.casefold().isin([v.casefold() for v in value]).to_numpy()
+            mask &= ~hit if op == '!=' else hit
+        else:
+            column = table[field].to_numpy(dtype='float64')
+            with np.errstate(invalid='ignore'):
+                mask &= _OPERATORS[op](column, value) & ~np.isnan(column)
+    return mask
+
+
+class ScreenerService:
+    """Bảng screener toàn thị trường + scheduler refresh nền"""
+
+    def __init__(self, gateway, price_board, symbol_master, fundamentals):
+        self.gateway = gateway
+        self.price_board = price_board
+        self.symbol_master = symbol_master
+        self.fundamentals = fundamentals
+        self.closes = pd.DataFrame(dtype='float64')
+        self.volumes = pd.DataFrame(dtype='float64')
+        self.table = pd.DataFrame(columns=TEXT_COLUMNS + NUMERIC_COLUMNS)
+        self.forecasts = None
+        self._lock = threading.RLock()
+        self._board = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_nightly = None
+        self.as_of = None
+        self.stats = {'nightly_runs': 0, 'intraday_updates': 0, 'screens': 0, 'last_build_ms': None,
+                      'last_forecast_ms': None}
+        price_board.subscribe(self.update_from_board)
+
+    # ---- bar ingestion ----
+    def ingest_bars(self, bars_by_symbol: Dict[str, pd.DataFrame]):
+        """Nạp nến ngày (schema normalize_bars) của nhiều mã rồi build lại bảng"""
+        closes, volumes = {}, {}
+        for symbol, bars in bars_by_symbol.items():
+            if bars is None or bars.empty:
+                continue
+            index = pd.DatetimeIndex(bars.index).normalize()
+            closes[symbol] = pd.Series(bars['close'].to_numpy(dtype='float64'), index=index)
+            volumes[symbol] = pd.Series(bars['volume'].to_numpy(dtype='float64'), index=index)
+        if not closes:
+            return
+        with self._lock:
+            self.closes = self._combine(self.closes, pd.DataFrame(closes))
+            self.volumes = self._combine(self.volumes, pd.DataFrame(volumes))
+            self.refresh_forecasts()
+            self.rebuild()
+
+    def refresh_forecasts(self):
+        """Dự báo heuristic cho cả universe trong một lần gọi (lưới mã x horizon)"""
+        try:
+            self.forecasts = forecast_universe(self.closes, self.volumes, FORECAST_HORIZONS)
+            self.stats['last_forecast_ms'] = self.forecasts['elapsed_ms']
+        except Exception as e:
+            logger.warning(f"Universe forecast failed: {e}")
+
+    def _combine(self, current: pd.DataFrame, update: pd.DataFrame) -> pd.DataFrame:
+        update = update[~update.index.duplicated(keep='last')]
+        combined = update.combine_first(current) if not current.empty else update
+        return combined.sort_index().iloc[-MAX_SESSIONS:]
+
+    def update_from_board(self, board: pd.DataFrame, as_of: datetime = None):
+        """Subscriber bảng giá: giá khớp + KL lũy kế làm nến phiên hôm nay
+        (ngoài ngày có phiên chỉ giữ snapshot, không thêm dòng)"""
+        if board is None or board.empty:
+            return
+        today = pd.Timestamp(as_of or datetime.now()).normalize()
+        traded = board[board['last'] > 0]
+        with self._lock:
+            self._board = board
+            if self.closes.empty or today < self.closes.index[-1]:
+                return
+            if not get_trading_calendar().is_session(today):
+                return
+            if today != self.closes.index[-1]:
+                # Phiên mới: cấp phát dòng hôm nay một lần, các tick sau ghi đè tại chỗ
+                self.closes = self._append_row(self.closes, today)
+                self.volumes = self._append_row(self.volumes, today)
+            # Mã chưa có nến lịch sử không có chỉ báo -> bỏ qua
+            columns = self.closes.columns.get_indexer(traded.index)
+            known = columns >= 0
+            self.closes.iloc[-1, columns[known]] = traded['last'].to_numpy(dtype='float64')[known]
+            columns = self.volumes.columns.get_indexer(traded.index)
+            known = columns >= 0
+            self.volumes.iloc[-1, columns[known]] = traded['volume'].fillna(0).to_numpy(dtype='float64')[known]
+            self.stats['intraday_updates'] += 1
+            self.rebuild()
+
+    @staticmethod
+    def _append_row(frame: pd.DataFrame, date: pd.Timestamp) -> pd.DataFrame:
+        row = pd.DataFrame(np.nan, index=pd.DatetimeIndex([date]), columns=frame.columns)
+        return pd.concat([frame.iloc[-(MAX_SESSIONS - 1):], row])
+
+    # ---- table ----
+    def rebuild(self):
+        """Tính lại bảng screener (vector) từ ma trận nến + metadata + fundamentals"""
+        started = time.perf_counter()
+        with self._lock:
+            table = compute_indicator_table(self.closes, self.volumes)
+            symbols = table.index
+            table['exchange'] = [self.symbol_master.exchange_of(s, 'Unknown') for s in symbols]
+            table['sector'] = [self.symbol_master.sector_of(s) for s in symbols]
+
+            fundamentals = pd.DataFrame.from_dict(
+                {s: self.fundamentals.get_cached(s) or {} for s in symbols}, orient='index'
+            ).reindex(index=symbols, columns=FUNDAMENTAL_COLUMNS + ['shares'])
+            for column in FUNDAMENTAL_COLUMNS:
+                table[column] = pd.to_numeric(fundamentals[column], errors='coerce')
+            table['market_cap'] = pd.to_numeric(fundamentals['shares'], errors='coerce') * table['price'] / 1e9
+
+            board = self._board
+            for column in BOARD_FIELDS:
+                table[column] = board[column].reindex(symbols) if board is not None else np.nan
+            forecasts = self.forecasts
+            for h, column in zip(FORECAST_HORIZONS, FORECAST_COLUMNS):
+                table[column] = forecasts['change_percent'][h].reindex(symbols) if forecasts else np.nan
+            if board is None:
+                table['change_percent'] = (self.closes.ffill().pct_change(fill_method=None).iloc[-1] * 100).reindex(symbols)
+                table['volume'] = self.volumes.iloc[-1].reindex(symbols) if len(self.volumes) else np.nan
+
+            self.table = table[TEXT_COLUMNS + NUMERIC_COLUMNS]
+            self.as_of = self.closes.index[-1] if len(self.closes.index) else None
+        self.stats['last_build_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    def screen(self, where: str = '', sort: str = None, limit: int = 50,
+               columns: List[str] = None) -> Dict[str, Any]:
+        """Lọc + sắp xếp bảng screener. sort: '-volume_ratio_20,pe' (dấu - giảm dần)"""
+        started = time.perf_counter()
+        conditions = parse_conditions(where)
+        sort_keys = [key.strip() for key in (sort or '').split(',') if key.strip()]
+        for key in sort_keys:
+            if key.lstrip('-+') not in NUMERIC_COLUMNS + TEXT_COLUMNS:
+                raise ValueError(f"Unknown sort field '{key.lstrip('-+')}'")
+        columns = [c for c in (columns or []) if c in NUMERIC_COLUMNS + TEXT_COLUMNS] or None
+
+        table = self.table
+        matched = table[apply_screen(table, conditions)]
+        if sort_keys:
+            matched = matched.sort_values(
+                [key.lstrip('-+') for key in sort_keys],
+                ascending=[not key.startswith('-') for key in sort_keys],
+                na_position='last'
+            )
+        rows = matched.head(limit)
+        output_columns = [c for c in TEXT_COLUMNS if c not in columns] + columns if columns else list(table.columns)
+        results = []
+        for symbol, values in zip(rows.index, rows[output_columns].to_numpy(dtype=object)):
+            record = {'symbol': symbol}
+            for column, value in zip(output_columns, values):
+                if isinstance(value, float):
+                    value = None if value != value else round(value, 2)
+                record[column] = value
+            results.append(record)
+
+        self.stats['screens'] += 1
+        return {
+            'results': results,
+            'matched': int(len(matched)),
+            'universe': int(len(table)),
+            'as_of': self.as_of.date().isoformat() if self.as_of is not None else None,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    # ---- refresh ----
+    async def nightly_refresh(self, symbols: List[str] = None):
+        """Tải lại nến ~1 năm + fundamentals cho cả universe rồi build bảng"""
+        symbols = symbols or [r['symbol'] for r in self.symbol_master.records()]
+        end = datetime.now().strftime('%Y-%m-%d')
+        start = (datetime.now() - timedelta(days=HISTORY_DAYS)).strftime('%Y-%m-%d')
+        # Giới hạn số task đang chờ để hedge delay không bị tính cả thời gian xếp hàng
+        limit = asyncio.Semaphore(NIGHTLY_CONCURRENCY)
+        started = time.perf_counter()
+
+        async def load(symbol):
+            async with limit:
+                try:
+                    bars = await self.gateway.fetch_history(symbol, start, end)
+                except Exception as e:
+                    logger.debug(f"Screener history failed for {symbol}: {e}")
+                    bars = None
+                try:
+                    await self.fundamentals.get(symbol)
+                except Exception as e:
+                    logger.debug(f"Screener fundamentals failed for {symbol}: {e}")
+                return symbol, bars
+
+        results = await asyncio.gather(*(load(s) for s in symbols))
+        self.fundamentals.flush()
+        self.ingest_bars(dict(results))
+        self.last_nightly = datetime.now().date()
+        self.stats['nightly_runs'] += 1
+        loaded = sum(1 for _, bars in results if bars is not None and not bars.empty)
+        logger.info(f"🔍 Screener nightly refresh: {loaded}/{len(symbols)} symbols "
+                    f"in {time.perf_counter() - started:.1f}s")
+
+    def _tick(self):
+        from src.utils.market_schedule import market_schedule
+        now = datetime.now()
+        after_close = now.weekday() < 5 and now.hour >= NIGHTLY_HOUR and self.last_nightly != now.date()
+        if self.last_nightly is None or after_close:
+            # Lần đầu (warm-up) hoặc sau giờ đóng cửa: nạp lại lịch sử
+            asyncio.run(self.nightly_refresh())
+        elif market_schedule.is_market_open()['is_open'] and not self.price_board.is_fresh():
+            # Snapshot quá hạn -> refresh; subscriber update_from_board cập nhật bảng
+            asyncio.run(self.price_board.snapshot())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._tick()
+            except Exception as e:
+                logger.warning(f"Screener refresh failed: {e}")
+            self._stop.wait(SCHEDULER_TICK)
+
+    def start(self):
+        """Chạy scheduler refresh trên thread nền (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='screener-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            symbols=len(self.table),
+            sessions=len(self.closes.index),
+            last_nightly=self.last_nightly.isoformat() if self.last_nightly else None
+        )
+
+
+__all__ = [
+    'INDICATOR_COLUMNS',
+    'NUMERIC_COLUMNS',
+    'ScreenerService',
+    'apply_screen',
+    'compute_indicator_table',
+    'parse_conditions'
+]
@@ -0,0 +1,188 @@
+# src/data/search_index.py
+"""
+Company Search Index
+Index tìm kiếm công ty build một lần: bỏ dấu tiếng Việt, posting theo prefix và trigram,
+xếp hạng mã khớp chính xác > prefix mã > prefix từ trong tên > độ tương đồng trigram
+"""
+
+import re
+import heapq
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Prefix dài hơn không cần index (autocomplete thường dừng trước đó)
+PREFIX_MAX_LEN = 10
+
+# Độ tương đồng trigram tối thiểu để trả về kết quả mờ
+MIN_SIMILARITY = 0.3
+
+# Từ pháp lý lặp lại ở hầu hết tên công ty -> bỏ khỏi trigram để posting không phình
+_STOPWORDS = {
+    'cong', 'ty', 'co', 'phan', 'ctcp', 'cp', 'tnhh', 'tmcp', 'jsc',
+    'inc', 'corp', 'corporation', 'company', 'joint', 'stock', 'ltd', 'the'
+}
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Tier điểm (cộng thêm độ tương đồng 0..1 để xếp trong cùng tier)
+_SCORE_SYMBOL = 4.0
+_SCORE_SYMBOL_PREFIX = 3.0
+_SCORE_WORD_PREFIX = 2.0
+
+
+def fold_text(text: Any) -> str:
+    """Bỏ dấu + lowercase + chỉ giữ chữ số: 'Tập đoàn Hòa Phát' -> 'tap doan hoa phat'"""
+    text = str(text or '').replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+def _words(folded: str) -> List[str]:
+    words = [w for w in folded.split() if w not in _STOPWORDS]
+    return words or folded.split()
+
+
+def trigrams(folded: str) -> set:
+    """Trigram theo từ, pad 2 space đầu + 1 space cuối (kiểu pg_trgm)"""
+    grams = set()
+    for word in _words(folded):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class CompanySearchIndex:
+    """Index tĩnh trên danh mục công ty; build lại khi danh mục đổi"""
+
+    def __init__(self, documents: Iterable[Dict[str, Any]] = ()):
+        self._docs: List[Dict[str, Any]] = []
+        self._by_symbol: Dict[str, int] = {}
+        self._symbol_prefix: Dict[str, List[int]] = {}
+        self._word_prefix: Dict[str, set] = {}
+        self._grams: Dict[str, List[int]] = {}
+        for doc in documents:
+            self.add(doc)
+        self.build()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, doc: Dict[str, Any], aliases: Iterable[str] = ()):
+        """Thêm công ty (cần 'symbol', 'name'); mã đã có -> gộp alias/thông tin"""
+        symbol = str(doc.get('symbol', '')).upper().strip()
+        if not symbol:
+            return
+        if symbol in self._by_symbol:
+            doc_id = self._by_symbol[symbol]
+            self._docs[doc_id].update({k: v for k, v in doc.items() if v not in (None, '')})
+        else:
+            doc_id = len(self._docs)
+            self._by_symbol[symbol] = doc_id
+            self._docs.append(dict(doc, symbol=symbol))
+            for n in range(1, min(len(symbol), PREFIX_MAX_LEN) + 1):
+                self._symbol_prefix.setdefault(symbol[:n].lower(), []).append(doc_id)
+
+        texts = self._docs[doc_id].setdefault('_texts', [])
+        for text in [doc.get('name')] + list(aliases):
+            folded = fold_text(text)
+            if not folded or folded in texts:
+                continue
+            texts.append(folded)
+            for word in folded.split():
+                for n in range(1, min(len(word), PREFIX_MAX_LEN) + 1):
+                    self._word_prefix.setdefault(word[:n], set()).add(doc_id)
+
+    def build(self):
+        """Tạo posting trigram (numpy) sau khi add xong.
+        Mỗi tên/alias là một entry riêng để alias ngắn không bị tên dài làm loãng"""
+        postings: Dict[str, List[int]] = {}
+        entry_docs, gram_counts = [], []
+        for doc_id, doc in enumerate(self._docs):
+            for text in doc.get('_texts', ()):
+                grams = trigrams(text)
+                entry_id = len(entry_docs)
+                entry_docs.append(doc_id)
+                gram_counts.append(len(grams))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(entry_id)
+        self._grams = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._entry_docs = np.asarray(entry_docs, dtype=np.int32)
+        self._gram_counts = np.asarray(gram_counts, dtype=np.int32)
+        self._symbol_arr = np.array([doc['symbol'] for doc in self._docs], dtype=object)
+
+    # ---- lookups ----
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        doc_id = self._by_symbol.get(str(symbol or '').upper().strip())
+        return None if doc_id is None else self._public(doc_id)
+
+    def _public(self, doc_id: int) -> Dict[str, Any]:
+        return {k: v for k, v in self._docs[doc_id].items() if not k.startswith('_')}
+
+    def _similarity(self, folded: str) -> np.ndarray:
+        """Jaccard trigram giữa query và mọi tài liệu (max theo tên/alias, vector)"""
+        query_grams = trigrams(folded)
+        scores = np.zeros(len(self._docs), dtype=np.float32)
+        hits = [self._grams[g] for g in query_grams if g in self._grams]
+        if not hits:
+            return scores
+        common = np.bincount(np.concatenate(hits), minlength=len(self._entry_docs))
+        union = len(query_grams) + self._gram_counts - common
+        entry_scores = np.zeros(len(self._entry_docs), dtype=np.float32)
+        np.divide(common, union, out=entry_scores, where=union > 0)
+        np.maximum.at(scores, self._entry_docs, entry_scores)
+        return scores
+
+    def search(self, query: str, limit: int = 10, market: str = None,
+               min_similarity: float = MIN_SIMILARITY) -> List[Dict[str, Any]]:
+        """Tìm theo mã hoặc tên (không dấu vẫn khớp); kết quả có 'score' và 'match'"""
+        folded = fold_text(query)
+        if not folded or not self._docs:
+            return []
+
+        similarity = self._similarity(folded)
+        tiers: Dict[int, tuple] = {}
+
+        def offer(doc_id, score, match):
+            if doc_id not in tiers or tiers[doc_id][0] < score:
+                tiers[doc_id] = (score, match)
+
+        # Mã: 'vcb' / 'v c b' -> VCB
+        key = folded.replace(' ', '')
+        if key.upper() in self._by_symbol:
+            offer(self._by_symbol[key.upper()], _SCORE_SYMBOL, 'symbol')
+        if len(key) <= PREFIX_MAX_LEN:
+            for doc_id in self._symbol_prefix.get(key, ()):
+                offer(doc_id, _SCORE_SYMBOL_PREFIX + len(key) / len(self._docs[doc_id]['symbol']) * 0.5, 'prefix')
+
+        # Tên: mọi từ trong query là prefix của một từ trong tên ('hoa ph' -> Hòa Phát)
+        words = folded.split()
+        candidates = None
+        for word in words:
+            postings = self._word_prefix.get(word[:PREFIX_MAX_LEN], set())
+            candidates = postings if candidates is None else candidates & postings
+            if not candidates:
+                break
+        for doc_id in candidates or ():
+            offer(doc_id, _SCORE_WORD_PREFIX + float(similarity[doc_id]) * 0.5, 'name')
+
+        # Trigram cho lỗi chính tả / thiếu chữ
+        for doc_id in np.flatnonzero(similarity >= min_similarity):
+            offer(int(doc_id), float(similarity[doc_id]), 'fuzzy')
+
+        if market:
+            tiers = {doc_id: tier for doc_id, tier in tiers.items() if self._docs[doc_id].get('market') == market}
+        ranked = heapq.nsmallest(limit, tiers.items(), key=lambda item: (-item[1][0], self._symbol_arr[item[0]]))
+        return [
+            dict(self._public(doc_id), score=round(score, 3), match=match)
+            for doc_id, (score, match) in ranked
+        ]
+
+
+__all__ = [
+    'CompanySearchIndex',
+    'fold_text',
+    'trigrams'
+]
@@ -0,0 +1,316 @@
+# src/data/sector_index.py
+"""
+Sector Index Engine
+Chỉ số ngành cap-weighted / equal-weighted tính từ nến của các mã thành phần đã cache,
+cập nhật tăng dần khi có nến mới; return, breadth, relative strength theo nhiều khung thời gian
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from src.utils.trading_calendar import get_trading_calendar
+
+logger = logging.getLogger(__name__)
+
+# Số phiên giữ lại trong bộ nhớ (~1 năm giao dịch)
+MAX_SESSIONS = 260
+
+# Khung thời gian -> số phiên
+TIMEFRAMES = {
+    '1D': 1,
+    '1W': 5,
+    '1M': 21,
+    '3M': 63,
+    '6M': 126
+}
+
+INDEX_BASE = 100.0
+
+
+def _weighted_by_sector(values: np.ndarray, weights: np.ndarray, membership: np.ndarray) -> np.ndarray:
+    """Trung bình có trọng số theo ngành cho nhiều hàng cùng lúc.
+    values/weights: (rows, symbols), membership: (symbols, sectors) -> (rows, sectors)"""
+    weights = np.where(np.isfinite(values) & np.isfinite(weights), weights, 0.0)
+    numerator = np.nan_to_num(values * weights) @ membership
+    denominator = weights @ membership
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+class SectorIndexEngine:
+    """Engine chỉ số ngành, vector hóa trên toàn bộ ngành"""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.closes = pd.DataFrame(dtype='float64')  # index: ngày giao dịch, columns: symbol
+        self.sectors: Dict[str, str] = {}
+        self.shares: Dict[str, float] = {}
+        self._levels = None  # {'cap': ndarray(rows, sectors), 'equal': ...}
+        self._level_columns: List[str] = []
+        self._lock = threading.RLock()
+        self.stats = {'bar_updates': 0, 'incremental_updates': 0, 'full_rebuilds': 0}
+
+    # ---- metadata ----
+    def set_universe(self, universe: Iterable[Dict[str, Any]]):
+        """Cập nhật ngành + số cổ phiếu lưu hành từ danh sách mã"""
+        with self._lock:
+            changed = False
+            for item in universe:
+                symbol = str(item.get('symbol', '')).upper()
+                if not symbol:
+                    continue
+                sector = item.get('sector') or 'Unknown'
+                if self.sectors.get(symbol) != sector:
+                    self.sectors[symbol] = sector
+                    changed = True
+                shares = item.get('shares') or item.get('issue_share')
+                if shares:
+                    changed |= self._set_shares(symbol, shares)
+            if changed:
+                self._levels = None
+
+    def set_shares(self, symbol: str, shares: float):
+        with self._lock:
+            if self._set_shares(symbol.upper(), shares):
+                self._levels = None
+
+    def _set_shares(self, symbol: str, shares) -> bool:
+        try:
+            shares = float(shares)
+        except (TypeError, ValueError):
+            return False
+        if shares <= 0 or self.shares.get(symbol) == shares:
+            return False
+        self.shares[symbol] = shares
+        return True
+
+    # ---- bar ingestion ----
+    def ingest_bars(self, symbol: str, bars: pd.DataFrame):
+        """Nạp nến ngày (DatetimeIndex, cột close) của một mã thành phần"""
+        symbol = symbol.upper()
+        if symbol not in self.sectors or bars is None or bars.empty or 'close' not in bars:
+            return
+        series = pd.to_numeric(bars['close'], errors='coerce').dropna()
+        series.index = pd.DatetimeIndex(series.index).normalize()
+        series = series[~series.index.duplicated(keep='last')]
+        if series.empty:
+            return
+        with self._lock:
+            self._merge(pd.DataFrame({symbol: series}))
+
+    def update_from_board(self, board: pd.DataFrame, as_of: datetime = None):
+        """Nạp giá khớp hiện tại của cả thị trường (snapshot bảng giá) làm nến phiên hôm nay
+        (bỏ qua nếu hôm nay không có phiên). Giá tham chiếu điền phiên trước cho mã chưa có lịch sử. Bảng giá phải đi qua
+        normalize_board (cùng đơn vị nghìn đồng với nến lịch sử)."""
+        if board is None or board.empty:
+            return
+        board = board[board.index.isin(list(self.sectors))]
+        if board.empty:
+            return
+        today = pd.Timestamp(as_of or datetime.now()).normalize()
+        calendar = get_trading_calendar()
+        if not calendar.is_session(today):
+            # Cuối tuần / nghỉ lễ: snapshot chỉ lặp lại phiên trước, không tạo phiên giả
+            return
+        previous = pd.Timestamp(calendar.add_sessions(today, -1))
+        with self._lock:
+            frame = pd.DataFrame(
+                [board['ref_price'].where(board['ref_price'] > 0), board['last'].where(board['last'] > 0)],
+                index=pd.DatetimeIndex([previous, today])
+            )
+            self._merge(frame, fill_only_rows=[previous])
+
+    def _merge(self, frame: pd.DataFrame, fill_only_rows: List[pd.Timestamp] = ()):
+        """Gộp nến mới; cập nhật chỉ số tăng dần nếu chỉ chạm phiên cuối"""
+        self.stats['bar_updates'] += 1
+        frame = frame.astype('float64')
+        last_date = self.closes.index[-1] if len(self.closes.index) else None
+
+        new_columns = [c for c in frame.columns if c not in self.closes.columns]
+        if new_columns:
+            self.closes = self.closes.reindex(columns=list(self.closes.columns) + new_columns)
+        new_rows = frame.index.difference(self.closes.index)
+        if len(new_rows):
+            self.closes = self.closes.reindex(self.closes.index.union(new_rows))
+
+        changed_dates = []
+        for date, row in frame.iterrows():
+            row = row.dropna()
+            if date in fill_only_rows:
+                # Chỉ điền ô trống (nến thật được ưu tiên hơn giá tham chiếu)
+                row = row[self.closes.loc[date, row.index].isna().values]
+            if row.empty:
+                continue
+            self.closes.loc[date, row.index] = row.values
+            changed_dates.append(date)
+
+        if len(self.closes.index) > self.max_sessions:
+            self.closes = self.closes.iloc[-self.max_sessions:]
+
+        # Chỉ sửa phiên cuối hoặc thêm đúng một phiên mới ở cuối -> cập nhật tăng dần
+        appended = [d for d in new_rows if last_date is None or d > last_date]
+        incremental = (
+            self._levels is not None and not new_columns and last_date is not None
+            and len(new_rows) == len(appended) <= 1
+            and all(d >= last_date for d in changed_dates)
+        )
+        if not changed_dates and not len(new_rows):
+            return
+        if incremental:
+            self._extend_levels(appended=bool(appended))
+        else:
+            self._levels = None
+
+    # ---- vectorized core ----
+    def _matrices(self):
+        """closes đã forward-fill, trọng số cổ phiếu và ma trận thành viên ngành"""
+        symbols = list(self.closes.columns)
+        sector_names = sorted({self.sectors.get(s, 'Unknown') for s in symbols})
+        sector_codes = np.array([sector_names.index(self.sectors.get(s, 'Unknown')) for s in symbols], dtype=np.int32)
+        membership = np.zeros((len(symbols), len(sector_names)))
+        membership[np.arange(len(symbols)), sector_codes] = 1.0
+        shares = np.array([self.shares.get(s, np.nan) for s in symbols])
+        closes = self.closes.ffill().to_numpy()
+        return closes, shares, membership, sector_names
+
+    def _daily_sector_returns(self, closes, shares, membership, start: int = 1):
+        prev, curr = closes[start - 1:-1], closes[start:]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = curr / prev - 1.0
+        equal = _weighted_by_sector(returns, np.ones_like(returns), membership)
+        cap_weights = np.where(np.isfinite(shares), shares, 0.0) * np.nan_to_num(prev)
+        cap = _weighted_by_sector(returns, cap_weights, membership)
+        # Ngành chưa có số cổ phiếu -> dùng equal-weight
+        cap = np.where(np.isfinite(cap), cap, equal)
+        return cap, equal
+
+    def _rebuild_levels(self):
+        closes, shares, membership, sector_names = self._matrices()
+        self.stats['full_rebuilds'] += 1
+        if len(closes) < 2:
+            self._levels = {'cap': np.full((len(closes), len(sector_names)), INDEX_BASE),
+                            'equal': np.full((len(closes), len(sector_names)), INDEX_BASE)}
+        else:
+            cap, equal = self._daily_sector_returns(closes, shares, membership)
+            base = np.full((1, len(sector_names)), INDEX_BASE)
+            self._levels = {
+                'cap': np.vstack([base, INDEX_BASE * np.cumprod(1 + np.nan_to_num(cap), axis=0)]),
+                'equal': np.vstack([base, INDEX_BASE * np.cumprod(1 + np.nan_to_num(equal), axis=0)])
+            }
+        self._level_columns = sector_names
+
+    def _extend_levels(self, appended: bool):
+        """Tính lại bước cuối của chỉ số (O(symbols)) thay vì toàn bộ lịch sử"""
+        closes, shares, membership, sector_names = self._matrices()
+        if sector_names != self._level_columns or len(closes) < 2:
+            self._levels = None
+            return
+        cap, equal = self._daily_sector_returns(closes[-2:], shares, membership)
+        for key, step in (('cap', cap[-1]), ('equal', equal[-1])):
+            levels = self._levels[key] if appended else self._levels[key][:-1]
+            self._levels[key] = np.vstack([levels, levels[-1] * (1 + np.nan_to_num(step))])[-len(closes):]
+        self.stats['incremental_updates'] += 1
+
+    def _ensure_levels(self):
+        if self._levels is None:
+            self._rebuild_levels()
+
+    # ---- queries ----
+    def get_sector_summary(self, timeframes: Iterable[str] = ('1D', '1W', '1M', '3M')) -> Dict[str, Any]:
+        """Return cap/equal-weighted, breadth và relative strength của mọi ngành, mọi khung thời gian"""
+        with self._lock:
+            if self.closes.empty:
+                return {}
+            self._ensure_levels()
+            closes, shares, membership, sector_names = self._matrices()
+            timeframes = [tf for tf in timeframes if tf in TIMEFRAMES and TIMEFRAMES[tf] < len(closes)]
+            if not timeframes:
+                return {}
+
+            last = closes[-1]
+            starts = np.vstack([closes[-1 - TIMEFRAMES[tf]] for tf in timeframes])  # (tf, symbols)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                returns = last[None, :] / starts - 1.0
+            valid = np.isfinite(returns)
+
+            equal = _weighted_by_sector(returns, np.ones_like(returns), membership)
+            cap_weights = np.where(np.isfinite(shares), shares, 0.0)[None, :] * np.nan_to_num(starts)
+            cap = _weighted_by_sector(returns, cap_weights, membership)
+            cap = np.where(np.isfinite(cap), cap, equal)
+            advancers = (valid & (returns > 0)).astype(float) @ membership
+            decliners = (valid & (returns < 0)).astype(float) @ membership
+            covered = valid.astype(float) @ membership
+
+            # Thị trường: cap-weighted nếu đủ số cổ phiếu lưu hành, ngược lại equal-weighted
+            all_members = np.ones((membership.shape[0], 1))
+            share_coverage = (valid & np.isfinite(shares)[None, :]).sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+            market_cap = _weighted_by_sector(returns, cap_weights, all_members)[:, 0]
+            market_equal = _weighted_by_sector(returns, np.ones_like(returns), all_members)[:, 0]
+            market = np.where((share_coverage >= 0.8) & np.isfinite(market_cap), market_cap, market_equal)
+
+            constituents = membership.sum(axis=0)
+            summary = {}
+            for s_idx, sector in enumerate(sector_names):
+                if sector == 'Unknown' or not covered[:, s_idx].any():
+                    continue
+                entry = {
+                    'constituents': int(constituents[s_idx]),
+                    'index_cap': round(float(self._levels['cap'][-1, s_idx]), 2),
+                    'index_equal': round(float(self._levels['equal'][-1, s_idx]), 2)
+                }
+                for t_idx, tf in enumerate(timeframes):
+                    if not covered[t_idx, s_idx]:
+                        continue
+                    entry[tf] = {
+                        'return_cap': round(float(cap[t_idx, s_idx]) * 100, 2),
+                        'return_equal': round(float(equal[t_idx, s_idx]) * 100, 2),
+                        'breadth': round(float(advancers[t_idx, s_idx] / covered[t_idx, s_idx]) * 100, 1),
+                        'advancers': int(advancers[t_idx, s_idx]),
+                        'decliners': int(decliners[t_idx, s_idx]),
+                        'relative_strength': round(float(cap[t_idx, s_idx] - market[t_idx]) * 100, 2)
+                    }
+                summary[sector] = entry
+            return summary
+
+    def get_sector_performance(self, timeframe: str = '1D', weighting: str = 'cap') -> Dict[str, float]:
+        """% thay đổi của từng ngành theo khung thời gian"""
+        key = 'return_cap' if weighting == 'cap' else 'return_equal'
+        return {
+            sector: data[timeframe][key]
+            for sector, data in self.get_sector_summary((timeframe,)).items()
+            if timeframe in data
+        }
+
+    def get_index_levels(self, sector: str, weighting: str = 'cap') -> List[Dict[str, Any]]:
+        """Chuỗi điểm chỉ số ngành (base 100)"""
+        with self._lock:
+            if self.closes.empty:
+                return []
+            self._ensure_levels()
+            if sector not in self._level_columns:
+                return []
+            column = self._level_columns.index(sector)
+            levels = self._levels['cap' if weighting == 'cap' else 'equal'][:, column]
+            return [
+                {'date': date.strftime('%Y-%m-%d'), 'value': round(float(value), 2)}
+                for date, value in zip(self.closes.index[-len(levels):], levels)
+            ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            sessions=len(self.closes.index),
+            symbols_with_bars=int(self.closes.notna().any().sum()) if not self.closes.empty else 0,
+            symbols_with_shares=len(self.shares)
+        )
+
+
+__all__ = [
+    'SectorIndexEngine',
+    'TIMEFRAMES'
+]
@@ -0,0 +1,339 @@
+# src/data/symbol_master.py
+"""
+Symbol Master
+Danh mục mã chứng khoán VN nạp một lần vào mảng gọn + hash index:
+symbol -> exchange, sector, shares outstanding, ISIN, market (tra cứu O(1))
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SYMBOL_MASTER_PATH = os.getenv('SYMBOL_MASTER_PATH', os.path.join('.cache', 'symbol_master.json'))
+
+# Danh mục đã đồng bộ đủ sàn (HOSE+HNX+UPCOM) -> phân loại chặt, mã lạ không phải cổ phiếu VN
+COMPLETE_UNIVERSE_SIZE = 500
+
+# Chỉ số thị trường
+INDEX_SYMBOLS = {'VNINDEX', 'VN30', 'HNXINDEX', 'HNX30', 'UPCOMINDEX'}
+
+# Danh mục khởi tạo khi chưa có listing đồng bộ
+SEED_SYMBOLS = [
+    # Banking (10 stocks)
+    {'symbol': 'VCB', 'name': 'Ngân hàng TMCP Ngoại thương Việt Nam', 'sector': 'Banking', 'exchange': 'HOSE'},
+    {'symbol': 'BID', 'name': 'Ngân hàng TMCP Đầu tư và Phát triển VN', 'sector': 'Banking', 'exchange': 'HOSE'},
+    {'symbol': 'CTG', 'name': 'Ngân hàng TMCP Công thương Việt Nam', 'sector': 'Banking', 'exchange': 'HOSE'},
+    {'symbol': 'TCB', 'name': 'Ngân hàng TMCP Kỹ thương Việt Nam', 'sector': 'Banking', 'exchange': 'HOSE'},
+    {'symbol': 'ACB', 'name': 'Ngân hàng TMCP Á Châu', 'sector': 'Banking', 'exchange': 'HOSE'},
+    {'symbol': 'MBB', 'name': 'Ngân hàng TMCP Quân đội', 'sector': 'Banking', 'exchange': 'HOSE'},
+    {'symbol': 'VPB', 'name': 'Ngân hàng TMCP Việt Nam Thịnh Vượng', 'sector': 'Banking', 'exchange': 'HOSE'},
+    {'symbol': 'TPB', 'name': 'Ngân hàng TMCP Tiên Phong', 'sector': 'Banking', 'exchange': 'HOSE'},
+    {'symbol': 'STB', 'name': 'Ngân hàng TMCP Sài Gòn Thương Tín', 'sector': 'Banking', 'exchange': 'HOSE'},
+    {'symbol': 'EIB', 'name': 'Ngân hàng TMCP Xuất Nhập khẩu Việt Nam', 'sector': 'Banking', 'exchange': 'HOSE'},
+    
+    # Real Estate (8 stocks)
+    {'symbol': 'VIC', 'name': 'Tập đoàn Vingroup', 'sector': 'Real Estate', 'exchange': 'HOSE'},
+    {'symbol': 'VHM', 'name': 'Công ty CP Vinhomes', 'sector': 'Real Estate', 'exchange': 'HOSE'},
+    {'symbol': 'VRE', 'name': 'Công ty CP Vincom Retail', 'sector': 'Real Estate', 'exchange': 'HOSE'},
+    {'symbol': 'DXG', 'name': 'Tập đoàn Đất Xanh', 'sector': 'Real Estate', 'exchange': 'HOSE'},
+    {'symbol': 'NVL', 'name': 'Công ty CP Tập đoàn Đầu tư Địa ốc No Va', 'sector': 'Real Estate', 'exchange': 'HOSE'},
+    {'symbol': 'PDR', 'name': 'Công ty CP Phát triển Bất động sản Phát Đạt', 'sector': 'Real Estate', 'exchange': 'HOSE'},
+    {'symbol': 'KDH', 'name': 'Công ty CP Đầu tư và Kinh doanh Nhà Khang Điền', 'sector': 'Real Estate', 'exchange': 'HOSE'},
+    {'symbol': 'BCM', 'name': 'Tổng Công ty Đầu tư và Phát triển Công nghiệp', 'sector': 'Real Estate', 'exchange': 'HOSE'},
+    
+    # Consumer & Retail (8 stocks)
+    {'symbol': 'MSN', 'name': 'Tập đoàn Masan', 'sector': 'Consumer', 'exchange': 'HOSE'},
+    {'symbol': 'MWG', 'name': 'Công ty CP Đầu tư Thế Giới Di Động', 'sector': 'Consumer', 'exchange': 'HOSE'},
+    {'symbol': 'VNM', 'name': 'Công ty CP Sữa Việt Nam', 'sector': 'Consumer', 'exchange': 'HOSE'},
+    {'symbol': 'SAB', 'name': 'Tổng Công ty CP Bia - Rượu - NGK Sài Gòn', 'sector': 'Consumer', 'exchange': 'HOSE'},
+    {'symbol': 'PNJ', 'name': 'Công ty CP Vàng bạc Đá quý Phú Nhuận', 'sector': 'Consumer', 'exchange': 'HOSE'},
+    {'symbol': 'FRT', 'name': 'Công ty CP Bán lẻ Kỹ thuật số FPT', 'sector': 'Consumer', 'exchange': 'HOSE'},
+    {'symbol': 'VGC', 'name': 'Công ty CP Xuất nhập khẩu Viglacera', 'sector': 'Consumer', 'exchange': 'HOSE'},
+    {'symbol': 'MCH', 'name': 'Công ty CP Hàng tiêu dùng Masan', 'sector': 'Consumer', 'exchange': 'HOSE'},
+    
+    # Industrial & Materials (7 stocks)
+    {'symbol': 'HPG', 'name': 'Tập đoàn Hòa Phát', 'sector': 'Industrial', 'exchange': 'HOSE'},
+    {'symbol': 'HSG', 'name': 'Tập đoàn Hoa Sen', 'sector': 'Industrial', 'exchange': 'HOSE'},
+    {'symbol': 'NKG', 'name': 'Công ty CP Thép Nam Kim', 'sector': 'Industrial', 'exchange': 'HOSE'},
+    {'symbol': 'SMC', 'name': 'Công ty CP Đầu tư Thương mại SMC', 'sector': 'Industrial', 'exchange': 'HOSE'},
+    {'symbol': 'TLG', 'name': 'Tập đoàn Thiên Long', 'sector': 'Industrial', 'exchange': 'HOSE'},
+    {'symbol': 'DGC', 'name': 'Tập đoàn Hóa chất Đức Giang', 'sector': 'Industrial', 'exchange': 'HOSE'},
+    {'symbol': 'BMP', 'name': 'Công ty CP Nhựa Bình Minh', 'sector': 'Industrial', 'exchange': 'HOSE'},
+    {'symbol': 'VCS', 'name': 'Công ty CP Vicostone', 'sector': 'Industrial & Materials', 'exchange': 'HNX'},
+    # Utilities & Energy (6 stocks)
+    {'symbol': 'GAS', 'name': 'Tổng Công ty Khí Việt Nam', 'sector': 'Utilities', 'exchange': 'HOSE'},
+    {'symbol': 'PLX', 'name': 'Tập đoàn Xăng dầu Việt Nam', 'sector': 'Utilities', 'exchange': 'HOSE'},
+    {'symbol': 'POW', 'name': 'Tổng Công ty Điện lực Dầu khí Việt Nam', 'sector': 'Utilities', 'exchange': 'HOSE'},
+    {'symbol': 'NT2', 'name': 'Công ty CP Điện lực Dầu khí Nhơn Trạch 2', 'sector': 'Utilities', 'exchange': 'HOSE'},
+    {'symbol': 'REE', 'name': 'Công ty CP Cơ Điện Lạnh', 'sector': 'Utilities', 'exchange': 'HOSE'},
+    {'symbol': 'PC1', 'name': 'Tổng Công ty Điện lực Dầu khí Việt Nam - CTCP', 'sector': 'Utilities', 'exchange': 'HOSE'},
+    
+    # Technology (4 stocks)
+    {'symbol': 'FPT', 'name': 'Công ty CP FPT', 'sector': 'Technology', 'exchange': 'HOSE'},
+    {'symbol': 'CMG', 'name': 'Công ty CP Tin học CMC', 'sector': 'Technology', 'exchange': 'HOSE'},
+    {'symbol': 'ITD', 'name': 'Công ty CP Đầu tư và Phát triển Công nghệ', 'sector': 'Technology', 'exchange': 'HOSE'},
+    {'symbol': 'ELC', 'name': 'Công ty CP Điện tử Elcom', 'sector': 'Technology', 'exchange': 'HOSE'},
+    
+    # Transportation & Logistics (5 stocks)
+    {'symbol': 'VJC', 'name': 'Công ty CP Hàng không VietJet', 'sector': 'Transportation', 'exchange': 'HOSE'},
+    {'symbol': 'HVN', 'name': 'Tổng Công ty Hàng không Việt Nam', 'sector': 'Transportation', 'exchange': 'HOSE'},
+    {'symbol': 'GMD', 'name': 'Công ty CP Cảng Gemadept', 'sector': 'Transportation', 'exchange': 'HOSE'},
+    {'symbol': 'VSC', 'name': 'Tổng Công ty Vận tải Sài Gòn', 'sector': 'Transportation', 'exchange': 'HOSE'},
+    {'symbol': 'TCO', 'name': 'Công ty CP Vận tải Transimex', 'sector': 'Transportation', 'exchange': 'HOSE'},
+    
+    # Healthcare & Pharma (4 stocks)
+    {'symbol': 'DHG', 'name': 'Công ty CP Dược Hậu Giang', 'sector': 'Healthcare', 'exchange': 'HOSE'},
+    {'symbol': 'IMP', 'name': 'Công ty CP Dược phẩm Imexpharm', 'sector': 'Healthcare', 'exchange': 'HOSE'},
+    {'symbol': 'DBD', 'name': 'Công ty CP Dược Đồng Bình Dương', 'sector': 'Healthcare', 'exchange': 'HOSE'},
+    {'symbol': 'PME', 'name': 'Công ty CP Dược phẩm Mediplantex', 'sector': 'Healthcare', 'exchange': 'HOSE'},
+    
+    # Food & Beverage (3 stocks)
+    {'symbol': 'VHC', 'name': 'Công ty CP Vĩnh Hoàn', 'sector': 'Food & Beverage', 'exchange': 'HOSE'},
+    {'symbol': 'KDC', 'name': 'Công ty CP Kinh Đô', 'sector': 'Food & Beverage', 'exchange': 'HOSE'},
+    {'symbol': 'QNS', 'name': 'Công ty CP Đường Quảng Ngãi', 'sector': 'Food & Beverage', 'exchange': 'HOSE'},
+    
+    # Textiles & Apparel (3 stocks)
+    {'symbol': 'VGT', 'name': 'Tập đoàn Dệt May Việt Nam', 'sector': 'Textiles', 'exchange': 'UPCOM'},
+    {'symbol': 'STK', 'name': 'Công ty CP Sợi Thế Kỷ', 'sector': 'Textiles', 'exchange': 'HOSE'},
+    {'symbol': 'MSH', 'name': 'Công ty CP May Sông Hồng', 'sector': 'Textiles', 'exchange': 'HOSE'},
+    
+    # Agriculture & Fisheries (3 stocks)
+    {'symbol': 'BAF', 'name': 'Công ty CP BAFCO', 'sector': 'Agriculture', 'exchange': 'HOSE'},
+    {'symbol': 'VNF', 'name': 'Công ty CP Vinafor', 'sector': 'Agriculture', 'exchange': 'HOSE'},
+    {'symbol': 'FMC', 'name': 'Công ty CP Thực phẩm Sao Ta', 'sector': 'Agriculture', 'exchange': 'HOSE'},
+    
+    # Mining & Resources (2 stocks)
+    {'symbol': 'KSB', 'name': 'Công ty CP Khoáng sản Bình Định', 'sector': 'Mining', 'exchange': 'HOSE'},
+    {'symbol': 'NBC', 'name': 'Công ty CP Than Núi Béo', 'sector': 'Mining', 'exchange': 'HOSE'},
+    
+    # Telecommunications (3 stocks)
+    {'symbol': 'VGI', 'name': 'Tổng Công ty CP Đầu tư Quốc tế Viettel', 'sector': 'Telecommunications', 'exchange': 'UPCOM'},
+    {'symbol': 'SGT', 'name': 'Công ty CP Công nghệ Viễn thông Sài Gòn', 'sector': 'Telecommunications', 'exchange': 'HOSE'},
+    {'symbol': 'SPT', 'name': 'Công ty CP Dịch vụ Bưu chính Viễn thông Sài Gòn', 'sector': 'Telecommunications', 'exchange': 'HOSE'},
+    
+    # Education (2 stocks)
+    {'symbol': 'GDT', 'name': 'Công ty CP Giáo dục và Đào tạo GDT', 'sector': 'Education', 'exchange': 'HOSE'},
+    {'symbol': 'SED', 'name': 'Công ty CP Giáo dục Sách thiết bị TP.HCM', 'sector': 'Education', 'exchange': 'HOSE'},
+]
+
+FIELDS = ('symbol', 'name', 'exchange', 'sector', 'shares', 'isin', 'market')
+
+
+class SymbolMaster:
+    """Danh mục mã dạng cột: chuỗi lặp lại (sàn, ngành) lưu bằng mã số, tra cứu qua dict index"""
+
+    def __init__(self, path: str = None):
+        self.path = path or SYMBOL_MASTER_PATH
+        self._lock = threading.RLock()
+        self.source = 'Static'
+        self.updated_at = None
+        self.version = 0  # tăng mỗi lần build lại (search index dựa vào đây để rebuild)
+        self._build(SEED_SYMBOLS)
+        self.load()
+
+    # ---- build ----
+    def _build(self, records: Iterable[Dict[str, Any]]):
+        rows = {}
+        for record in records:
+            symbol = str(record.get('symbol', '')).upper().strip()
+            if symbol:
+                rows[symbol] = record
+
+        symbols = sorted(rows)
+        exchanges, sectors = [], []
+        exchange_codes, sector_codes = {}, {}
+
+        def encode(value, table, codes):
+            if value not in codes:
+                codes[value] = len(table)
+                table.append(value)
+            return codes[value]
+
+        n = len(symbols)
+        exchange_arr = np.empty(n, dtype=np.int8)
+        sector_arr = np.empty(n, dtype=np.int16)
+        shares_arr = np.full(n, np.nan, dtype=np.float64)
+        names, isins, markets = [], [], []
+        for i, symbol in enumerate(symbols):
+            record = rows[symbol]
+            exchange_arr[i] = encode(str(record.get('exchange') or 'HOSE').upper(), exchanges, exchange_codes)
+            sector_arr[i] = encode(record.get('sector') or 'Unknown', sectors, sector_codes)
+            try:
+                shares = float(record.get('shares') or 'nan')
+            except (TypeError, ValueError):
+                shares = float('nan')
+            shares_arr[i] = shares if shares > 0 else np.nan
+            names.append(record.get('name') or symbol)
+            isins.append(record.get('isin') or '')
+            markets.append(record.get('market') or 'VN')
+
+        with self._lock:
+            self._symbols = symbols
+            self._index = {symbol: i for i, symbol in enumerate(symbols)}
+            self._names = names
+            self._isins = isins
+            self._markets = markets
+            self._exchanges = exchanges
+            self._sectors = sectors
+            self._exchange_codes = exchange_arr
+            self._sector_codes = sector_arr
+            self._shares = shares_arr
+            self._records_cache = None
+            self.version += 1
+
+    # ---- lookups ----
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return bool(symbol) and symbol.upper().strip() in self._index
+
+    @property
+    def is_complete(self) -> bool:
+        """Đã có listing đồng bộ đầy đủ từ nguồn dữ liệu"""
+        return len(self._symbols) >= COMPLETE_UNIVERSE_SIZE
+
+    def is_vn_symbol(self, symbol: str) -> bool:
+        """Phân loại mã VN bằng hash index. Mã chưa có trong danh mục coi là mã quốc tế
+        (định dạng 3 ký tự không phân biệt được IBM/AMD với mã VN); listing sync bổ sung mã còn thiếu"""
+        if not symbol:
+            return False
+        symbol = symbol.upper().strip()
+        return symbol in self._index or symbol in INDEX_SYMBOLS
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Metadata của mã, None nếu không có"""
+        i = self._index.get((symbol or '').upper().strip())
+        if i is None:
+            return None
+        return self._record(i)
+
+    def _record(self, i: int) -> Dict[str, Any]:
+        shares = self._shares[i]
+        return {
+            'symbol': self._symbols[i],
+            'name': self._names[i],
+            'exchange': self._exchanges[self._exchange_codes[i]],
+            'sector': self._sectors[self._sector_codes[i]],
+            'shares': None if np.isnan(shares) else float(shares),
+            'isin': self._isins[i] or None,
+            'market': self._markets[i],
+            'data_source': self.source
+        }
+
+    def exchange_of(self, symbol: str, default: str = 'HOSE') -> str:
+        i = self._index.get((symbol or '').upper().strip())
+        return default if i is None else self._exchanges[self._exchange_codes[i]]
+
+    def sector_of(self, symbol: str, default: str = 'Unknown') -> str:
+        i = self._index.get((symbol or '').upper().strip())
+        return default if i is None else self._sectors[self._sector_codes[i]]
+
+    def symbols_in_sector(self, sector: str) -> List[str]:
+        if sector not in self._sectors:
+            return []
+        mask = self._sector_codes == self._sectors.index(sector)
+        return [self._symbols[i] for i in np.flatnonzero(mask)]
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Toàn bộ danh mục dạng list dict (cache; không sửa trực tiếp)"""
+        with self._lock:
+            if self._records_cache is None:
+                self._records_cache = [self._record(i) for i in range(len(self._symbols))]
+            return self._records_cache
+
+    # ---- updates ----
+    def set_shares(self, symbol: str, shares: float):
+        """Cập nhật số cổ phiếu lưu hành (từ company overview)"""
+        i = self._index.get((symbol or '').upper().strip())
+        try:
+            shares = float(shares)
+        except (TypeError, ValueError):
+            return
+        if i is None or shares <= 0 or self._shares[i] == shares:
+            return
+        with self._lock:
+            self._shares[i] = shares
+            self._records_cache = None
+
+    def replace(self, records: Iterable[Dict[str, Any]], source: str = 'Listing', persist: bool = True):
+        """Thay toàn bộ danh mục (listing sync)"""
+        self._build(records)
+        self.source = source
+        self.updated_at = time.time()
+        logger.info(f"📋 Symbol master updated: {len(self)} symbols from {source}")
+        if persist:
+            self.save()
+
+    # ---- persistence ----
+    def load(self) -> bool:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return False
+        records = payload.get('symbols') or []
+        if not records:
+            return False
+        self._build(records)
+        self.source = payload.get('source', 'Listing')
+        self.updated_at = payload.get('updated_at')
+        logger.info(f"📋 Symbol master loaded: {len(self)} symbols ({self.source})")
+        return True
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            payload = {
+                'source': self.source,
+                'updated_at': self.updated_at,
+                'symbols': [
+                    {k: v for k, v in record.items() if k in FIELDS and v is not None}
+                    for record in self.records()
+                ]
+            }
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Symbol master save failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'symbols': len(self),
+            'source': self.source,
+            'complete': self.is_complete,
+            'exchanges': len(self._exchanges),
+            'sectors': len(self._sectors),
+            'with_shares': int(np.isfinite(self._shares).sum()),
+            'updated_at': self.updated_at
+        }
+
+
+# Singleton instance
+_symbol_master = None
+_symbol_master_lock = threading.Lock()
+
+def get_symbol_master() -> SymbolMaster:
+    global _symbol_master
+    if _symbol_master is None:
+        with _symbol_master_lock:
+            if _symbol_master is None:
+                _symbol_master = SymbolMaster()
+    return _symbol_master
+
+
+__all__ = [
+    'INDEX_SYMBOLS',
+    'SEED_SYMBOLS',
+    'SymbolMaster',
+    'get_symbol_master'
+]
@@ -33,6 +33,16 @@ except ImportError:
     print("WARNING: vnstock not available. Install with: pip install vnstock")
     Vnstock = None
 
+from .vnstock_gateway import get_vnstock_gateway
+from .price_board import PriceBoardService
+from .sector_index import SectorIndexEngine
+from .symbol_master import get_symbol_master
+from .listing_sync import ListingSync
+from .fundamentals_store import get_fundamentals_store
+from .screener import ScreenerService
+from .prediction_ledger import get_prediction_ledger
+from .intraday import get_intraday_buffers
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -58,6 +68,27 @@ class VNStockAPI:
     def __init__(self, gemini_api_key: str = None, serper_api_key: str = None):
         # Initialize vnstock
         self.stock = Vnstock() if Vnstock else None
+        # Gateway offload vnstock HTTP + giới hạn đồng thời theo nguồn VCI/TCBS
+        self.gateway = get_vnstock_gateway()
+        # Danh mục mã (phân loại + metadata tra cứu O(1))
+        self.symbol_master = get_symbol_master()
+        # Đồng bộ danh mục từ listing sàn (chạy nền; CrewAI chỉ bổ sung khi bật LISTING_SYNC_LLM)
+        self.listing_sync = ListingSync(self.gateway, self.symbol_master, lambda: self.crewai_collector)
+        # Chỉ số cơ bản (ratio + overview) cache theo mùa báo cáo
+        self.fundamentals = get_fundamentals_store()
+        # Snapshot bảng giá toàn thị trường (top movers, ngành, watchlist)
+        self.price_board = PriceBoardService(self.gateway, self._board_universe)
+        # Bảng screener toàn thị trường (refresh đêm + trong phiên qua subscriber bảng giá)
+        self.screener = ScreenerService(self.gateway, self.price_board, self.symbol_master, self.fundamentals)
+        # Sổ dự báo: chấm điểm bằng giá đóng cửa trong bảng nến của screener
+        self.prediction_ledger = get_prediction_ledger()
+        self.prediction_ledger.bar_source = lambda: self.screener.closes
+        # Chỉ số ngành từ nến đã cache + snapshot bảng giá (không gọi thêm vendor)
+        self.sector_index = SectorIndexEngine()
+        self.price_board.subscribe(self.sector_index.update_from_board)
+        # Nến trong phiên của watchlist (ring buffer) cho dự báo giá đóng cửa hôm nay
+        self.intraday = get_intraday_buffers()
+        self.price_board.subscribe(self.intraday.update_from_board)
         
         # Cache để avoid quá nhiều API calls
         self.cache = {}
@@ -71,69 +102,12 @@ class VNStockAPI:
             self.crewai_collector = None
             logger.info("⚠️ CrewAI integration disabled")
         
-        # Vietnamese stock symbols mapping
-        self.vn_stocks = {
-            # Banking
-            'VCB': {'name': 'Vietcombank', 'sector': 'Banking', 'exchange': 'HOSE'},
-            'BID': {'name': 'BIDV', 'sector': 'Banking', 'exchange': 'HOSE'},
-            'CTG': {'name': 'VietinBank', 'sector': 'Banking', 'exchange': 'HOSE'},
-            'TCB': {'name': 'Techcombank', 'sector': 'Banking', 'exchange': 'HOSE'},
-            'ACB': {'name': 'ACB', 'sector': 'Banking', 'exchange': 'HOSE'},
-            
-            # Real Estate
-            'VIC': {'name': 'Vingroup', 'sector': 'Real Estate', 'exchange': 'HOSE'},
-            'VHM': {'name': 'Vinhomes', 'sector': 'Real Estate', 'exchange': 'HOSE'},
-            'VRE': {'name': 'Vincom Retail', 'sector': 'Real Estate', 'exchange': 'HOSE'},
-            'DXG': {'name': 'Dat Xanh Group', 'sector': 'Real Estate', 'exchange': 'HOSE'},
-            
-            # Consumer
-            'MSN': {'name': 'Masan Group', 'sector': 'Consumer', 'exchange': 'HOSE'},
-            'MWG': {'name': 'Mobile World', 'sector': 'Consumer', 'exchange': 'HOSE'},
-            'VNM': {'name': 'Vinamilk', 'sector': 'Consumer', 'exchange': 'HOSE'},
-            'SAB': {'name': 'Sabeco', 'sector': 'Consumer', 'exchange': 'HOSE'},
-            
-            # Industrial
-            'HPG': {'name': 'Hoa Phat Group', 'sector': 'Industrial', 'exchange': 'HOSE'},
-            'GAS': {'name': 'PetroVietnam Gas', 'sector': 'Utilities', 'exchange': 'HOSE'},
-            'PLX': {'name': 'Petrolimex', 'sector': 'Utilities', 'exchange': 'HOSE'},
-            
-            # Technology
-            'FPT': {'name': 'FPT Corporation', 'sector': 'Technology', 'exchange': 'HOSE'},
-        }
+        # Nạp ngành cho sector index engine (nến fetch trước lần refresh bảng giá đầu tiên vẫn được dùng)
+        self._board_universe()
     
     def is_vn_stock(self, symbol: str) -> bool:
-        """Kiểm tra xem một mã có phải là cổ phiếu VN không"""
-        if not symbol:
-            return False
-        
-        symbol = symbol.upper().strip()
-        
-        # Kiểm tra trong danh sách VN stocks từ available symbols
-        try:
-            # Try to get from cache first
-            if hasattr(self, '_available_symbols_cache') and self._available_symbols_cache:
-                available_symbols = [s['symbol'] for s in self._available_symbols_cache]
-                if symbol in available_symbols:
-                    return True
-        except:
-            pass
-        
-        # Kiểm tra trong danh sách VN stocks static
-        if symbol in self.vn_stocks:
-            return True
-        
-        # Kiểm tra pattern VN stock (3-4 ký tự, không chứa số ở cuối)
-        if len(symbol) >= 3 and len(symbol) <= 4 and symbol.isalpha():
-            # Các pattern thường gặp của VN stocks
-            vn_patterns = ['VCB', 'BID', 'CTG', 'TCB', 'ACB', 'VIC', 'VHM', 'HPG', 'FPT', 'MSN', 'DHG']
-            if any(symbol.startswith(p[:2]) for p in vn_patterns):
-                return True
-            
-            # Nếu không có dấu chấm hoặc số thì có thể là VN stock
-            if '.' not in symbol and not any(char.isdigit() for char in symbol):
-                return True
-        
-        return False
+        """Kiểm tra xem một mã có phải là cổ phiếu VN không (hash lookup trong symbol master)"""
+        return self.symbol_master.is_vn_symbol(symbol)
 
     async def get_stock_data(self, symbol: str, force_refresh: bool = False) -> Optional[VNStockData]:
         """
@@ -169,21 +143,25 @@ class VNStockAPI:
     async def _fetch_vnstock_data(self, symbol: str) -> Optional[VNStockData]:
         """Fetch real data từ vnstock với fallback"""
         try:
-            # Import vnstock trực tiếp
-            from vnstock import Vnstock
-            from datetime import datetime, timedelta
-            import logging
-            
-            # Tắt logging của vnstock để tránh spam
-            vnstock_logger = logging.getLogger('vnstock')
-            vnstock_logger.setLevel(logging.ERROR)
+            if not self.gateway.available:
+                return None
             
             if not self.is_vn_stock(symbol):
                 logger.warning(f"Symbol {symbol} not in supported VN stocks list")
                 return None
             
-            # Sử dụng vnstock với error handling
-            stock_obj = Vnstock().stock(symbol=symbol, source='VCI')
+            # Fundamentals (cache theo mùa báo cáo) không phụ thuộc giá -> chạy song song với history
+            fundamentals_task = asyncio.ensure_future(self.fundamentals.get(symbol))
+            
+            # Snapshot bảng giá còn hạn -> không cần tải history để lấy giá hiện tại
+            board_quote = self.price_board.peek(symbol)
+            if board_quote:
+                fundamentals = (await asyncio.gather(fundamentals_task, return_exceptions=True))[0]
+                return self._build_stock_data(
+                    symbol, float(board_quote['last']), float(board_quote['change'] or 0),
+                    float(board_quote['change_percent'] or 0), int(board_quote['volume'] or 0),
+                    fundamentals
+                )
             
             # Lấy dữ liệu lịch sử với retry
             hist_data = None
@@ -192,13 +170,16 @@ class VNStockAPI:
                     end_date = datetime.now().strftime('%Y-%m-%d')
                     start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
                     
-                    hist_data = stock_obj.quote.history(start=start_date, end=end_date, interval='1D')
+                    hist_data = await self.gateway.fetch_history(symbol, start_date, end_date)
                     if not hist_data.empty:
+                        self.sector_index.ingest_bars(symbol, hist_data)
                         break
                 except Exception as e:
                     logger.debug(f"Failed to get {days} days data for {symbol}: {e}")
                     continue
             
+            fundamentals = (await asyncio.gather(fundamentals_task, return_exceptions=True))[0]
+            
             if hist_data is None or hist_data.empty:
                 logger.warning(f"No price history available for {symbol}")
                 return None
@@ -211,54 +192,50 @@ class VNStockAPI:
             change = float(latest['close'] - prev_day['close'])
             change_percent = float((latest['close'] - prev_day['close']) / prev_day['close'] * 100) if prev_day['close'] != 0 else 0
             
-            # Lấy thông tin công ty với error handling
-            market_cap = 0
-            try:
-                overview = stock_obj.company.overview()
-                if not overview.empty:
-                    overview_data = overview.iloc[0]
-                    issue_share = overview_data.get('issue_share', 0)
-                    if issue_share and issue_share > 0:
-                        market_cap = issue_share * current_price / 1_000_000_000
-            except Exception as e:
-                logger.debug(f"Could not get company overview for {symbol}: {e}")
-            
-            # Lấy chỉ số tài chính với error handling
-            pe_ratio = pb_ratio = None
-            try:
-                ratios = stock_obj.finance.ratio(period='quarter', lang='vi', dropna=True)
-                if not ratios.empty:
-                    latest_ratio = ratios.iloc[-1]
-                    pe_ratio = latest_ratio.get('pe', None)
-                    pb_ratio = latest_ratio.get('pb', None)
-            except Exception as e:
-                logger.debug(f"Could not get financial ratios for {symbol}: {e}")
-            
-            stock_info = self.vn_stocks.get(symbol, {})
-            
-            logger.info(f"Successfully fetched real data for {symbol}: {current_price:,.0f} VND")
-            
-            return VNStockData(
-                symbol=symbol,
-                price=current_price,
-                change=change,
-                change_percent=change_percent,
-                volume=int(latest['volume']),
-                market_cap=float(market_cap) if market_cap else 0,
-                pe_ratio=float(pe_ratio) if pe_ratio and pe_ratio > 0 else None,
-                pb_ratio=float(pb_ratio) if pb_ratio and pb_ratio > 0 else None,
-                sector=stock_info.get('sector', 'Unknown'),
-                exchange=stock_info.get('exchange', 'HOSE')
-            )
+            return self._build_stock_data(symbol, current_price, change, change_percent, int(latest['volume']), fundamentals)
             
         except Exception as e:
             logger.error(f"Error fetching real data for {symbol}: {e}")
             return None
     
+    def _build_stock_data(self, symbol: str, current_price: float, change: float, change_percent: float,
+                          volume: int, fundamentals) -> VNStockData:
+        """Ghép giá + fundamentals (P/E, P/B, số CP lưu hành) thành VNStockData"""
+        if isinstance(fundamentals, Exception) or not fundamentals:
+            logger.debug(f"No fundamentals for {symbol}: {fundamentals}")
+            fundamentals = {}
+        
+        market_cap = 0
+        shares = fundamentals.get('shares')
+        if shares and shares > 0:
+            market_cap = shares * current_price / 1_000_000_000
+            self.sector_index.set_shares(symbol, shares)
+            self.symbol_master.set_shares(symbol, shares)
+        
+        pe_ratio = fundamentals.get('pe')
+        pb_ratio = fundamentals.get('pb')
+        
+        stock_info = self.symbol_master.get(symbol) or {}
+        
+        logger.info(f"Successfully fetched real data for {symbol}: {current_price:,.0f} VND")
+        
+        return VNStockData(
+            symbol=symbol,
+            price=current_price,
+            change=change,
+            change_percent=change_percent,
+            volume=int(volume),
+            market_cap=float(market_cap) if market_cap else 0,
+            pe_ratio=float(pe_ratio) if pe_ratio and pe_ratio > 0 else None,
+            pb_ratio=float(pb_ratio) if pb_ratio and pb_ratio > 0 else None,
+            sector=stock_info.get('sector', 'Unknown'),
+            exchange=stock_info.get('exchange', 'HOSE')
+        )
+    
     def _generate_mock_data(self, symbol: str) -> VNStockData:
         """Fallback mock data với cảnh báo rõ ràng"""
         import random
-        stock_info = self.vn_stocks.get(symbol, {'name': symbol, 'sector': 'Unknown', 'exchange': 'HOSE'})
+        stock_info = self.symbol_master.get(symbol) or {'name': symbol, 'sector': 'Unknown', 'exchange': 'HOSE'}
         
         # Giá gần thật hơn cho các mã chính
         real_prices = {
@@ -298,21 +275,16 @@ class VNStockAPI:
                 return self.cache[cache_key]['data']
             
             if self.stock:
-                # Lấy dữ liệu các chỉ số
-                vn_index_data = await self._fetch_vnindex_vnstock()
-                vn30_index_data = await self._fetch_vn30index_vnstock()
-                hn_index_data = await self._fetch_hnindex_vnstock()
-                
-                # Lấy top movers
-                top_gainers, top_losers = await self._fetch_top_movers_vnstock()
-                
-                # Lấy market news từ CrewAI nếu có
-                market_news = None
-                if self.crewai_collector and self.crewai_collector.enabled:
-                    try:
-                        market_news = await self.crewai_collector.get_market_overview_news()
-                    except Exception as e:
-                        logger.error(f"CrewAI market news failed: {e}")
+                # Các chỉ số, top movers và market news độc lập -> fan-out song song
+                (vn_index_data, vn30_index_data, hn_index_data,
+                 (top_gainers, top_losers), sector_performance, market_news) = await asyncio.gather(
+                    self._fetch_vnindex_vnstock(),
+                    self._fetch_vn30index_vnstock(),
+                    self._fetch_hnindex_vnstock(),
+                    self._fetch_top_movers_vnstock(),
+                    self._fetch_sector_performance(),
+                    self._fetch_market_news()
+                )
                 
                 overview = {
                     'vn_index': vn_index_data,
@@ -320,6 +292,8 @@ class VNStockAPI:
                     'hn_index': hn_index_data,
                     'top_gainers': top_gainers,
                     'top_losers': top_losers,
+                    'sector_performance': sector_performance,
+                    'sector_indices': self.sector_index.get_sector_summary(),
                     'market_news': market_news or {
                         'overview': 'Thị trường ổn định với thanh khoản trung bình',
                         'source': 'Mock',
@@ -342,50 +316,27 @@ class VNStockAPI:
             logger.error(f"❌ Error fetching market overview: {e}")
             return self._generate_mock_market_overview()
     
-    async def _fetch_vnindex_vnstock(self) -> Dict[str, Any]:
-        """Fetch VN-Index data từ VCI"""
+    async def _fetch_market_news(self) -> Optional[Dict[str, Any]]:
+        """Lấy market news từ CrewAI nếu có"""
+        if not (self.crewai_collector and self.crewai_collector.enabled):
+            return None
         try:
-            from vnstock import Vnstock
-            from datetime import datetime, timedelta
-            
-            stock_obj = Vnstock().stock(symbol='VNINDEX', source='VCI')
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            start_date = (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')
-            
-            vnindex_data = stock_obj.quote.history(start=start_date, end=end_date, interval='1D')
-            
-            if not vnindex_data.empty:
-                latest = vnindex_data.iloc[-1]
-                prev_day = vnindex_data.iloc[-2] if len(vnindex_data) > 1 else latest
-                
-                return {
-                    'value': round(float(latest['close']), 2),
-                    'change': round(float(latest['close'] - prev_day['close']), 2),
-                    'change_percent': round(float((latest['close'] - prev_day['close']) / prev_day['close'] * 100), 2),
-                    'volume': int(latest.get('volume', 0))
-                }
-            
-            return {'value': 1200, 'change': 0, 'change_percent': 0}
-            
+            return await self.crewai_collector.get_market_overview_news()
         except Exception as e:
-            logger.error(f"❌ Error fetching VN-Index: {e}")
-            return {'value': 1200, 'change': 0, 'change_percent': 0}
+            logger.error(f"CrewAI market news failed: {e}")
+            return None
     
-    async def _fetch_vn30index_vnstock(self) -> Dict[str, Any]:
-        """Fetch VN30-Index data từ VCI"""
+    async def _fetch_index_vnstock(self, index_symbol: str, default_value: float, label: str) -> Dict[str, Any]:
+        """Fetch dữ liệu chỉ số từ VCI qua gateway"""
         try:
-            from vnstock import Vnstock
-            from datetime import datetime, timedelta
-            
-            stock_obj = Vnstock().stock(symbol='VN30', source='VCI')
             end_date = datetime.now().strftime('%Y-%m-%d')
             start_date = (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')
             
-            vn30_data = stock_obj.quote.history(start=start_date, end=end_date, interval='1D')
+            index_data = await self.gateway.fetch_history(index_symbol, start_date, end_date)
             
-            if not vn30_data.empty:
-                latest = vn30_data.iloc[-1]
-                prev_day = vn30_data.iloc[-2] if len(vn30_data) > 1 else latest
+            if not index_data.empty:
+                latest = index_data.iloc[-1]
+                prev_day = index_data.iloc[-2] if len(index_data) > 1 else latest
                 
                 return {
                     'value': round(float(latest['close']), 2),
@@ -394,78 +345,83 @@ class VNStockAPI:
                     'volume': int(latest.get('volume', 0))
                 }
             
-            return {'value': 1500, 'change': 0, 'change_percent': 0}
+            return {'value': default_value, 'change': 0, 'change_percent': 0}
             
         except Exception as e:
-            logger.error(f"❌ Error fetching VN30-Index: {e}")
-            return {'value': 1500, 'change': 0, 'change_percent': 0}
+            logger.error(f"❌ Error fetching {label}: {e}")
+            return {'value': default_value, 'change': 0, 'change_percent': 0}
+    
+    async def _fetch_vnindex_vnstock(self) -> Dict[str, Any]:
+        """Fetch VN-Index data từ VCI"""
+        return await self._fetch_index_vnstock('VNINDEX', 1200, 'VN-Index')
+    
+    async def _fetch_vn30index_vnstock(self) -> Dict[str, Any]:
+        """Fetch VN30-Index data từ VCI"""
+        return await self._fetch_index_vnstock('VN30', 1500, 'VN30-Index')
     
     async def _fetch_hnindex_vnstock(self) -> Dict[str, Any]:
         """Fetch HN-Index data từ VCI"""
-        try:
-            from vnstock import Vnstock
-            from datetime import datetime, timedelta
-            
-            stock_obj = Vnstock().stock(symbol='HNXINDEX', source='VCI')
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            start_date = (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')
-            
-            hnx_data = stock_obj.quote.history(start=start_date, end=end_date, interval='1D')
-            
-            if not hnx_data.empty:
-                latest = hnx_data.iloc[-1]
-                prev_day = hnx_data.iloc[-2] if len(hnx_data) > 1 else latest
-                
-                return {
-                    'value': round(float(latest['close']), 2),
-                    'change': round(float(latest['close'] - prev_day['close']), 2),
-                    'change_percent': round(float((latest['close'] - prev_day['close']) / prev_day['close'] * 100), 2),
-                    'volume': int(latest.get('volume', 0))
-                }
-            
-            return {'value': 230, 'change': 0, 'change_percent': 0}
-            
-        except Exception as e:
-            logger.error(f"❌ Error fetching HN-Index: {e}")
-            return {'value': 230, 'change': 0, 'change_percent': 0}
+        return await self._fetch_index_vnstock('HNXINDEX', 230, 'HN-Index')
+    
+    def _board_universe(self) -> List[Dict[str, str]]:
+        """Danh sách mã cho snapshot bảng giá (symbol master)"""
+        universe = self.symbol_master.records()
+        self.sector_index.set_universe(universe)
+        return universe
     
     async def _fetch_sector_performance(self) -> Dict[str, float]:
-        """Fetch sector performance"""
-        import random
-        
-        sectors = ['Banking', 'Real Estate', 'Consumer', 'Industrial', 'Technology', 'Utilities']
-        performance = {}
-        
-        for sector in sectors:
-            performance[sector] = round(random.uniform(-3, 3), 2)  # ±3% change
-        
-        return performance
+        """Fetch sector performance từ sector index engine (cap-weighted, 1D)"""
+        try:
+            # Refresh snapshot nếu quá hạn -> engine nhận giá mới qua subscriber
+            await self.price_board.snapshot()
+            performance = self.sector_index.get_sector_performance('1D', weighting='cap')
+            if not performance:
+                performance = await self.price_board.sector_performance()
+            return performance or {}
+        except Exception as e:
+            logger.error(f"❌ Error fetching sector performance: {e}")
+            return {}
     
     async def _fetch_top_movers_vnstock(self) -> tuple:
-        """Fetch top gainers và losers"""
+        """Fetch top gainers và losers từ snapshot bảng giá"""
         try:
-            import random
-            main_symbols = ['VCB', 'BID', 'VIC', 'VHM', 'HPG', 'FPT', 'MSN', 'TCB']
-            
-            performances = []
-            for symbol in main_symbols:
-                change_pct = random.uniform(-5, 5)
-                performances.append({
-                    'symbol': symbol,
-                    'change_percent': round(change_pct, 2)
-                })
-            
-            performances.sort(key=lambda x: x['change_percent'], reverse=True)
-            
-            top_gainers = [p for p in performances if p['change_percent'] > 0][:3]
-            top_losers = [p for p in performances if p['change_percent'] < 0][-3:]
-            
-            return top_gainers, top_losers
+            movers = await self.price_board.top_movers(n=3)
+            if movers:
+                return movers
+            return self._generate_mock_top_movers()
             
         except Exception as e:
             logger.error(f"❌ Error fetching top movers: {e}")
             return self._generate_mock_top_movers()
     
+    async def get_watchlist_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Giá hiện tại cho watchlist từ snapshot bảng giá (một lần refresh cho cả danh sách)
+        Mã không có trong bảng giá fallback sang get_stock_data
+        """
+        symbols = [s.upper().strip() for s in symbols if s and s.strip()]
+        quotes = {}
+        try:
+            quotes = await self.price_board.quotes(symbols)
+        except Exception as e:
+            logger.error(f"❌ Price board quotes failed: {e}")
+        
+        missing = [s for s in symbols if s not in quotes]
+        if missing:
+            results = await asyncio.gather(*(self.get_stock_data(s) for s in missing), return_exceptions=True)
+            for symbol, result in zip(missing, results):
+                if isinstance(result, VNStockData):
+                    quotes[symbol] = {
+                        'symbol': symbol,
+                        'exchange': result.exchange,
+                        'sector': result.sector,
+                        'last': result.price,
+                        'change': result.change,
+                        'change_percent': result.change_percent,
+                        'volume': result.volume
+                    }
+        return quotes
+    
     def _generate_mock_top_movers(self) -> tuple:
         import random
         symbols = ['VCB', 'BID', 'VIC', 'HPG', 'FPT']
@@ -515,9 +471,6 @@ class VNStockAPI:
             crewai_module._collector_instance = None
             self.crewai_collector = get_crewai_collector(gemini_api_key, serper_api_key)
             
-            # Clear cache to force fresh data
-            self.clear_symbols_cache()
-            
             logger.info(f"✅ CrewAI keys updated - Enabled: {self.crewai_collector.enabled}")
             return self.crewai_collector.enabled
         return False
@@ -542,18 +495,16 @@ class VNStockAPI:
             List of price history data
         """
         try:
-            from vnstock import Vnstock
-            from datetime import datetime, timedelta
             import pandas as pd
             
-            stock_obj = Vnstock().stock(symbol=symbol, source='VCI')
             end_date = datetime.now().strftime('%Y-%m-%d')
             start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
             
-            hist_data = stock_obj.quote.history(start=start_date, end=end_date, interval='1D')
+            hist_data = await self.gateway.fetch_history(symbol, start_date, end_date)
             
             if hist_data.empty:
                 return self._generate_mock_price_history(symbol, days)
+            self.sector_index.ingest_bars(symbol, hist_data)
             price_history = []
             
             for idx, row in hist_data.iterrows():
@@ -617,18 +568,17 @@ class VNStockAPI:
                 end_date = datetime.now().strftime('%Y-%m-%d')
                 start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
                 
-                hist_data = self.stock.stock(symbol=symbol, source='TCBS').quote.history(
-                    start=start_date, 
-                    end=end_date
-                )
+                # VCI chính, TCBS hedge/failover - schema nến đã chuẩn hóa
+                hist_data = await self.gateway.fetch_history(symbol, start_date, end_date)
                 
                 if hist_data.empty:
                     return []
+                self.sector_index.ingest_bars(symbol, hist_data)
                 
                 historical_data = []
-                for idx, row in hist_data.iterrows():
+                prev_closes = hist_data['close'].shift(1).fillna(hist_data['open'])
+                for (idx, row), prev_close in zip(hist_data.iterrows(), prev_closes):
                     # Tính change_percent
-                    prev_close = hist_data.iloc[max(0, idx-1)]['close'] if idx > 0 else row['open']
                     change_percent = ((row['close'] - prev_close) / prev_close * 100) if prev_close != 0 else 0
                     
                     historical_data.append({
@@ -676,121 +626,27 @@ class VNStockAPI:
     
     async def get_available_symbols(self) -> List[Dict[str, str]]:
         """
-        Lấy danh sách symbols từ CrewAI real data thay vì vnstock
+        Lấy danh sách symbols từ symbol master (trả về ngay).
+        Danh mục cũ -> listing sync chạy nền, page load không chờ.
         """
-        try:
-            # Use CrewAI for real symbols if available
-            if self.crewai_collector and self.crewai_collector.enabled:
-                logger.info("🤖 Getting stock symbols from CrewAI real data")
-                try:
-                    symbols = await self.crewai_collector.get_available_symbols()
-                    if symbols and len(symbols) >= 10:  # Lower threshold
-                        logger.info(f"✅ Loaded {len(symbols)} symbols from CrewAI")
-                        # Mark as real data
-                        for symbol in symbols:
-                            symbol['data_source'] = 'CrewAI'
-                        # Cache the result
-                        self._available_symbols_cache = symbols
-                        return symbols
-                    else:
-                        logger.warning(f"⚠️ CrewAI returned {len(symbols) if symbols else 0} symbols, using fallback")
-                except Exception as crewai_error:
-                    logger.error(f"❌ CrewAI symbols failed: {crewai_error}")
-            else:
-                logger.info("📋 CrewAI not available, using static symbols")
-            
-            # Fallback to enhanced static list
-            logger.info("📋 Using enhanced static symbols list")
-            static_symbols = self._get_static_symbols()
-            # Mark as static data
-            for symbol in static_symbols:
-                symbol['data_source'] = 'Static'
-            # Cache the result
-            self._available_symbols_cache = static_symbols
-            return static_symbols
-            
-        except Exception as e:
-            logger.error(f"❌ Error loading symbols: {e}")
-            static_symbols = self._get_static_symbols()
-            for symbol in static_symbols:
-                symbol['data_source'] = 'Static'
-            # Cache the result
-            self._available_symbols_cache = static_symbols
-            return static_symbols
+        self.listing_sync.schedule()
+        symbols = self._get_static_symbols()
+        self._available_symbols_cache = symbols
+        return symbols
     
     def is_using_real_data(self) -> bool:
-        """Check if using real CrewAI data"""
-        if not (self.crewai_collector and self.crewai_collector.enabled):
-            return False
-        
-        # Check if we have cached symbols from CrewAI
-        if hasattr(self, '_available_symbols_cache') and self._available_symbols_cache:
-            return any(s.get('data_source') == 'CrewAI' for s in self._available_symbols_cache)
-        
-        return False
+        """Danh mục đã đồng bộ từ listing sàn"""
+        return self.symbol_master.source == 'Listing'
     
     def clear_symbols_cache(self):
-        """Clear symbols cache to force refresh"""
-        if hasattr(self, '_available_symbols_cache'):
-            self._available_symbols_cache = None
+        """Clear symbols cache và sync lại listing (nền)"""
+        self._available_symbols_cache = None
+        self.listing_sync.schedule(force=True)
         logger.info("🔄 Symbols cache cleared")
     
     def _get_static_symbols(self) -> List[Dict[str, str]]:
-        """Enhanced static symbols list with more VN stocks"""
-        return [
-            # Banking
-            {'symbol': 'VCB', 'name': 'Ngân hàng TMCP Ngoại thương Việt Nam', 'sector': 'Banking', 'exchange': 'HOSE'},
-            {'symbol': 'BID', 'name': 'Ngân hàng TMCP Đầu tư và Phát triển VN', 'sector': 'Banking', 'exchange': 'HOSE'},
-            {'symbol': 'CTG', 'name': 'Ngân hàng TMCP Công thương Việt Nam', 'sector': 'Banking', 'exchange': 'HOSE'},
-            {'symbol': 'TCB', 'name': 'Ngân hàng TMCP Kỹ thương Việt Nam', 'sector': 'Banking', 'exchange': 'HOSE'},
-            {'symbol': 'ACB', 'name': 'Ngân hàng TMCP Á Châu', 'sector': 'Banking', 'exchange': 'HOSE'},
-            {'symbol': 'MBB', 'name': 'Ngân hàng TMCP Quân đội', 'sector': 'Banking', 'exchange': 'HOSE'},
-            {'symbol': 'VPB', 'name': 'Ngân hàng TMCP Việt Nam Thịnh Vượng', 'sector': 'Banking', 'exchange': 'HOSE'},
-            {'symbol': 'STB', 'name': 'Ngân hàng TMCP Sài Gòn Thương Tín', 'sector': 'Banking', 'exchange': 'HOSE'},
-            
-            # Real Estate
-            {'symbol': 'VIC', 'name': 'Tập đoàn Vingroup', 'sector': 'Real Estate', 'exchange': 'HOSE'},
-            {'symbol': 'VHM', 'name': 'Công ty CP Vinhomes', 'sector': 'Real Estate', 'exchange': 'HOSE'},
-            {'symbol': 'VRE', 'name': 'Công ty CP Vincom Retail', 'sector': 'Real Estate', 'exchange': 'HOSE'},
-            {'symbol': 'DXG', 'name': 'Tập đoàn Đất Xanh', 'sector': 'Real Estate', 'exchange': 'HOSE'},
-            {'symbol': 'NVL', 'name': 'Công ty CP Tập đoàn Đầu tư Địa ốc No Va', 'sector': 'Real Estate', 'exchange': 'HOSE'},
-            {'symbol': 'KDH', 'name': 'Công ty CP Đầu tư và Kinh doanh Nhà Khang Điền', 'sector': 'Real Estate', 'exchange': 'HOSE'},
-            
-            # Consumer & Retail
-            {'symbol': 'MSN', 'name': 'Tập đoàn Masan', 'sector': 'Consumer', 'exchange': 'HOSE'},
-            {'symbol': 'MWG', 'name': 'Công ty CP Đầu tư Thế Giới Di Động', 'sector': 'Consumer', 'exchange': 'HOSE'},
-            {'symbol': 'VNM', 'name': 'Công ty CP Sữa Việt Nam', 'sector': 'Consumer', 'exchange': 'HOSE'},
-            {'symbol': 'SAB', 'name': 'Tổng Công ty CP Bia - Rượu - NGK Sài Gòn', 'sector': 'Consumer', 'exchange': 'HOSE'},
-            {'symbol': 'PNJ', 'name': 'Công ty CP Vàng bạc Đá quý Phú Nhuận', 'sector': 'Consumer', 'exchange': 'HOSE'},
-            {'symbol': 'FRT', 'name': 'Công ty CP Bán lẻ Kỹ thuật số FPT', 'sector': 'Consumer', 'exchange': 'HOSE'},
-            
-            # Industrial & Materials
-            {'symbol': 'HPG', 'name': 'Tập đoàn Hòa Phát', 'sector': 'Industrial', 'exchange': 'HOSE'},
-            {'symbol': 'HSG', 'name': 'Tập đoàn Hoa Sen', 'sector': 'Industrial', 'exchange': 'HOSE'},
-            {'symbol': 'NKG', 'name': 'Công ty CP Thép Nam Kim', 'sector': 'Industrial', 'exchange': 'HOSE'},
-            {'symbol': 'SMC', 'name': 'Công ty CP Đầu tư Thương mại SMC', 'sector': 'Industrial', 'exchange': 'HOSE'},
-            
-            # Utilities & Energy
-            {'symbol': 'GAS', 'name': 'Tổng Công ty Khí Việt Nam', 'sector': 'Utilities', 'exchange': 'HOSE'},
-            {'symbol': 'PLX', 'name': 'Tập đoàn Xăng dầu Việt Nam', 'sector': 'Utilities', 'exchange': 'HOSE'},
-            {'symbol': 'POW', 'name': 'Tổng Công ty Điện lực Dầu khí Việt Nam', 'sector': 'Utilities', 'exchange': 'HOSE'},
-            {'symbol': 'NT2', 'name': 'Công ty CP Điện lực Dầu khí Nhơn Trạch 2', 'sector': 'Utilities', 'exchange': 'HOSE'},
-            
-            # Technology
-            {'symbol': 'FPT', 'name': 'Công ty CP FPT', 'sector': 'Technology', 'exchange': 'HOSE'},
-            {'symbol': 'CMG', 'name': 'Công ty CP Tin học CMC', 'sector': 'Technology', 'exchange': 'HOSE'},
-            {'symbol': 'ELC', 'name': 'Công ty CP Điện tử Elcom', 'sector': 'Technology', 'exchange': 'HOSE'},
-            
-            # Transportation
-            {'symbol': 'VJC', 'name': 'Công ty CP Hàng không VietJet', 'sector': 'Transportation', 'exchange': 'HOSE'},
-            {'symbol': 'HVN', 'name': 'Tổng Công ty Hàng không Việt Nam', 'sector': 'Transportation', 'exchange': 'HOSE'},
-            {'symbol': 'GMD', 'name': 'Công ty CP Cảng Gemadept', 'sector': 'Transportation', 'exchange': 'HOSE'},
-            
-            # Healthcare & Pharma
-            {'symbol': 'DHG', 'name': 'Công ty CP Dược Hậu Giang', 'sector': 'Healthcare', 'exchange': 'HOSE'},
-            {'symbol': 'IMP', 'name': 'Công ty CP Dược phẩm Imexpharm', 'sector': 'Healthcare', 'exchange': 'HOSE'},
-            {'symbol': 'DBD', 'name': 'Công ty CP Dược Đồng Bình Dương', 'sector': 'Healthcare', 'exchange': 'HOSE'},
-        ]
+        """Danh sách mã từ symbol master (nạp một lần, không dựng lại mỗi lần gọi)"""
+        return self.symbol_master.records()
     
     async def get_news_sentiment(self, symbol: str) -> Dict[str, Any]:
         """
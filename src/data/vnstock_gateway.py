@@ -0,0 +1,335 @@
+# src/data/vnstock_gateway.py
+"""
+VNStock Gateway
+Lớp truy cập vnstock: chạy call đồng bộ của vendor trên executor riêng,
+giới hạn số request đồng thời theo từng nguồn (VCI, TCBS),
+hedged request + failover giữa các nguồn, chuẩn hóa dữ liệu nến về một schema
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from vnstock import Vnstock
+except ImportError:
+    Vnstock = None
+
+logger = logging.getLogger(__name__)
+
+# Số request đồng thời tối đa cho mỗi nguồn (tránh bị vendor rate-limit)
+DEFAULT_SOURCE_LIMITS = {
+    'VCI': 4,
+    'TCBS': 4
+}
+
+# Thứ tự nguồn khi failover
+SOURCE_PRIORITY = ['VCI', 'TCBS']
+
+# Hedge sau p95 latency của nguồn chính (giới hạn trong khoảng này, giây)
+HEDGE_MIN_DELAY = 0.3
+HEDGE_MAX_DELAY = 5.0
+HEDGE_DEFAULT_DELAY = 1.5  # khi chưa đủ mẫu latency
+MIN_LATENCY_SAMPLES = 20
+
+# Số stock object vnstock giữ lại (LRU theo symbol + nguồn)
+DEFAULT_STOCK_OBJECT_CACHE = 512
+
+# Thời gian chờ tối đa cho cả lượt fetch_history (kể cả hedge/failover), giây
+DEFAULT_HISTORY_TIMEOUT = 30.0
+
+# Đơn vị giá chuẩn của hệ thống = đơn vị nến vnstock: nghìn đồng (23.5 = 23,500đ).
+# Nguồn tính theo đồng (bảng giá VCI) chia cho hệ số này ngay khi chuẩn hóa
+PRICE_UNIT = 1000
+
+# Schema nến chuẩn: DatetimeIndex 'time' + các cột dưới
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+_COLUMN_ALIASES = {
+    'tradingdate': 'time', 'trading_date': 'time', 'date': 'time', 'datetime': 'time',
+    'o': 'open', 'h': 'high', 'l': 'low', 'c': 'close', 'v': 'volume',
+    'openprice': 'open', 'highprice': 'high', 'lowprice': 'low', 'closeprice': 'close',
+    'totalvolume': 'volume', 'vol': 'volume'
+}
+
+
+def _source_limit(source: str) -> int:
+    try:
+        return max(1, int(os.getenv(f"{source}_CONCURRENCY", DEFAULT_SOURCE_LIMITS.get(source, 2))))
+    except ValueError:
+        return DEFAULT_SOURCE_LIMITS.get(source, 2)
+
+
+def _stock_object_cache() -> int:
+    try:
+        return max(1, int(os.getenv('STOCK_OBJECT_CACHE', DEFAULT_STOCK_OBJECT_CACHE)))
+    except ValueError:
+        return DEFAULT_STOCK_OBJECT_CACHE
+
+
+def _history_timeout() -> float:
+    try:
+        return max(1.0, float(os.getenv('HISTORY_TIMEOUT', DEFAULT_HISTORY_TIMEOUT)))
+    except ValueError:
+        return DEFAULT_HISTORY_TIMEOUT
+
+
+def normalize_bars(data, source: str = None):
+    """Chuẩn hóa DataFrame nến của VCI/TCBS về cùng schema:
+    index DatetimeIndex 'time' tăng dần, cột open/high/low/close (float), volume (int)"""
+    import pandas as pd
+
+    if data is None or len(data) == 0:
+        frame = pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name='time'))
+        frame.attrs['source'] = source
+        return frame
+
+    frame = data.copy()
+    frame.columns = [_COLUMN_ALIASES.get(str(col).lower(), str(col).lower()) for col in frame.columns]
+
+    if 'time' in frame.columns:
+        frame['time'] = pd.to_datetime(frame['time'], errors='coerce')
+        frame = frame.dropna(subset=['time']).set_index('time')
+    elif not isinstance(frame.index, pd.DatetimeIndex):
+        frame.index = pd.to_datetime(frame.index, errors='coerce')
+    frame.index.name = 'time'
+    if getattr(frame.index, 'tz', None) is not None:
+        frame.index = frame.index.tz_localize(None)
+
+    missing = [col for col in BAR_COLUMNS if col not in frame.columns]
+    if missing:
+        raise ValueError(f"Bar data from {source} missing columns: {missing}")
+
+    frame = frame[BAR_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    frame = frame.dropna(subset=['close'])
+    frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+    frame[['open', 'high', 'low', 'close']] = frame[['open', 'high', 'low', 'close']].astype('float64')
+    frame['volume'] = frame['volume'].fillna(0).astype('int64')
+    frame.attrs['source'] = source
+    return frame
+
+
+class VNStockGateway:
+    """Offload vnstock HTTP ra khỏi event loop với semaphore theo nguồn"""
+
+    def __init__(self, source_limits: Dict[str, int] = None):
+        limits = source_limits or {source: _source_limit(source) for source in DEFAULT_SOURCE_LIMITS}
+        # threading semaphore: agent tạo event loop riêng trong thread nên không dùng asyncio.Semaphore
+        self._semaphores = {source: threading.BoundedSemaphore(limit) for source, limit in limits.items()}
+        self._limits = dict(limits)
+        # Pool riêng cho vendor (không dùng chung IO pool của agent để tránh deadlock khi pool đầy)
+        self._executor = ThreadPoolExecutor(max_workers=sum(limits.values()), thread_name_prefix='vnstock')
+        self._stock_objects = OrderedDict()
+        self._max_stock_objects = _stock_object_cache()
+        self._lock = threading.Lock()
+        self.stats = {source: self._new_stats() for source in limits}
+        self._latencies = {source: deque(maxlen=200) for source in limits}
+
+        # Tắt logging của vnstock để tránh spam
+        logging.getLogger('vnstock').setLevel(logging.ERROR)
+
+    @property
+    def available(self) -> bool:
+        return Vnstock is not None
+
+    def _semaphore(self, source: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if source not in self._semaphores:
+                limit = _source_limit(source)
+                self._semaphores[source] = threading.BoundedSemaphore(limit)
+                self._limits[source] = limit
+                self.stats[source] = self._new_stats()
+                self._latencies[source] = deque(maxlen=200)
+            return self._semaphores[source]
+
+    @staticmethod
+    def _new_stats() -> Dict[str, int]:
+        return {'calls': 0, 'errors': 0, 'in_flight': 0, 'hedged': 0, 'wins': 0}
+
+    def stock(self, symbol: str, source: str = 'VCI'):
+        """Stock object của vnstock (tái sử dụng theo symbol + source, LRU STOCK_OBJECT_CACHE)"""
+        if Vnstock is None:
+            raise RuntimeError("vnstock not available")
+        key = (symbol.upper(), source)
+        with self._lock:
+            stock_obj = self._stock_objects.get(key)
+            if stock_obj is not None:
+                self._stock_objects.move_to_end(key)
+        if stock_obj is None:
+            stock_obj = Vnstock().stock(symbol=symbol.upper(), source=source)
+            with self._lock:
+                self._stock_objects[key] = stock_obj
+                while len(self._stock_objects) > self._max_stock_objects:
+                    self._stock_objects.popitem(last=False)
+        return stock_obj
+
+    # ---- sync / async call ----
+    def call(self, source: str, fn: Callable, *args, **kwargs) -> Any:
+        """Gọi vendor đồng bộ trong giới hạn đồng thời của nguồn"""
+        semaphore = self._semaphore(source)
+        with semaphore:
+            stats = self.stats[source]
+            stats['calls'] += 1
+            stats['in_flight'] += 1
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+                self._latencies[source].append(time.perf_counter() - started)
+                return result
+            except Exception:
+                stats['errors'] += 1
+                raise
+            finally:
+                stats['in_flight'] -= 1
+
+    async def run(self, source: str, fn: Callable, *args, **kwargs) -> Any:
+        """Chạy call vendor trên executor, không chặn event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self.call, source, fn, *args, **kwargs))
+
+    # ---- vnstock endpoints ----
+    def _history(self, symbol: str, start: str, end: str, source: str, interval: str):
+        return self.stock(symbol, source).quote.history(start=start, end=end, interval=interval)
+
+    def _ratio(self, symbol: str, source: str):
+        return self.stock(symbol, source).finance.ratio(period='quarter', lang='vi', dropna=True)
+
+    def _overview(self, symbol: str, source: str):
+        return self.stock(symbol, source).company.overview()
+
+    async def history(self, symbol: str, start: str, end: str, source: str = 'VCI', interval: str = '1D'):
+        """quote.history(...) offload"""
+        return await self.run(source, self._history, symbol, start, end, source, interval)
+
+    async def ratio(self, symbol: str, source: str = 'VCI'):
+        """finance.ratio(period='quarter') offload"""
+        return await self.run(source, self._ratio, symbol, source)
+
+    async def overview(self, symbol: str, source: str = 'VCI'):
+        """company.overview() offload"""
+        return await self.run(source, self._overview, symbol, source)
+
+    # ---- latency / hedging ----
+    def latency_percentile(self, source: str, percentile: float = 95) -> Optional[float]:
+        """Latency percentile (giây) của các call thành công gần đây, None nếu chưa đủ mẫu"""
+        samples = sorted(self._latencies.get(source, ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def hedge_delay(self, source: str) -> float:
+        """Thời gian chờ nguồn chính trước khi gửi request dự phòng (= p95)"""
+        p95 = self.latency_percentile(source)
+        if p95 is None:
+            return HEDGE_DEFAULT_DELAY
+        return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, p95))
+
+    async def _fetch_bars(self, symbol: str, start: str, end: str, source: str, interval: str):
+        raw = await self.history(symbol, start, end, source=source, interval=interval)
+        return normalize_bars(raw, source)
+
+    async def fetch_history(self, symbol: str, start: str, end: str, interval: str = '1D',
+                            primary: str = 'VCI', timeout: float = None):
+        """Lấy nến đã chuẩn hóa với hedged request:
+        nguồn chính chậm hơn p95 -> gửi thêm request sang nguồn còn lại, lấy kết quả về trước;
+        nguồn chính lỗi/rỗng -> failover ngay; quá timeout (mặc định HISTORY_TIMEOUT) -> TimeoutError"""
+        timeout = timeout or _history_timeout()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        sources = [primary] + [s for s in SOURCE_PRIORITY if s != primary]
+        tasks = {asyncio.ensure_future(self._fetch_bars(symbol, start, end, primary, interval)): primary}
+        next_source = 1
+        hedge_delay = self.hedge_delay(primary)
+        last_error, empty_result = None, None
+
+        try:
+            while tasks:
+                can_hedge = next_source < len(sources)
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    # Call vendor đang chạy trong thread không hủy được; bỏ chờ để caller fallback
+                    raise TimeoutError(f"History for {symbol} timed out after {timeout:.0f}s")
+                done, _ = await asyncio.wait(
+                    tasks, timeout=min(hedge_delay, remaining) if can_hedge else remaining,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    if not can_hedge or loop.time() >= deadline:
+                        continue
+                    # Nguồn chính vượt p95 -> hedge
+                    alternate = sources[next_source]
+                    next_source += 1
+                    self.stats[alternate]['hedged'] += 1
+                    logger.debug(f"Hedging {symbol} history to {alternate} after {hedge_delay:.2f}s")
+                    tasks[asyncio.ensure_future(self._fetch_bars(symbol, start, end, alternate, interval))] = alternate
+                    continue
+
+                for task in done:
+                    source = tasks.pop(task)
+                    try:
+                        bars = task.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.debug(f"{source} history failed for {symbol}: {e}")
+                        continue
+                    if bars.empty:
+                        empty_result = bars
+                        continue
+                    self.stats[source]['wins'] += 1
+                    return bars
+
+                # Lỗi hoặc rỗng -> failover sang nguồn tiếp theo nếu chưa gửi
+                if not tasks and next_source < len(sources):
+                    alternate = sources[next_source]
+                    next_source += 1
+                    tasks[asyncio.ensure_future(self._fetch_bars(symbol, start, end, alternate, interval))] = alternate
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if empty_result is not None:
+            return empty_result
+        raise last_error or RuntimeError(f"No history for {symbol}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {}
+        for source, source_stats in self.stats.items():
+            p95 = self.latency_percentile(source)
+            stats[source] = dict(
+                source_stats,
+                limit=self._limits.get(source),
+                p95_ms=round(p95 * 1000) if p95 is not None else None
+            )
+        return stats
+
+
+# Singleton instance
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def get_vnstock_gateway() -> VNStockGateway:
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = VNStockGateway()
+    return _gateway
+
+
+__all__ = [
+    'BAR_COLUMNS',
+    'DEFAULT_HISTORY_TIMEOUT',
+    'DEFAULT_SOURCE_LIMITS',
+    'DEFAULT_STOCK_OBJECT_CACHE',
+    'PRICE_UNIT',
+    'SOURCE_PRIORITY',
+    'VNStockGateway',
+    'get_vnstock_gateway',
+    'normalize_bars'
+]
@@ -0,0 +1,310 @@
+# src/data/walk_forward.py
+"""
+Walk-forward Evaluation
+Đánh giá dự báo giá trên các cửa sổ cuộn: fit lại LSTM theo cửa sổ train (chạy song song trong
+worker process, model trung gian cache ra đĩa), tính dự báo heuristic của PricePredictor
+vector hóa, rồi tổng hợp sai số theo horizon và theo mã. Chạy qua đêm cho toàn universe:
+
+    python -m src.data.walk_forward --symbols VCB,FPT --methods naive,traditional,lstm
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .backtest import compute_signal_panel, predicted_change, load_history
+
+logger = logging.getLogger(__name__)
+
+HORIZONS = (1, 3, 7, 14, 30, 60, 90)
+METHODS = ('naive', 'traditional', 'lstm')
+
+TRAIN_SESSIONS = 500        # ~2 năm giao dịch mỗi cửa sổ train
+STEP_SESSIONS = 21          # điểm dự báo mỗi tháng
+REFIT_SESSIONS = 63         # LSTM fit lại mỗi quý, giữa 2 lần fit dùng lại model
+LOOK_BACK = 60              # như LSTMPricePredictor.look_back
+LSTM_EPOCHS = 30            # EarlyStopping thường dừng sớm hơn
+MODEL_CACHE_DIR = os.getenv('WALK_FORWARD_CACHE', os.path.join('.cache', 'walk_forward'))
+MODEL_VERSION = 'lstm-2x50-v1'
+
+_ROW_COLUMNS = ['symbol', 'method', 'origin', 'horizon', 'base', 'predicted', 'actual']
+
+
+def make_origins(n_sessions: int, train: int = TRAIN_SESSIONS, step: int = STEP_SESSIONS,
+                 min_horizon: int = 1) -> List[int]:
+    """Chỉ số phiên cuối của mỗi cửa sổ train (dự báo từ giá đóng cửa phiên đó)"""
+    return list(range(train - 1, n_sessions - min_horizon, step))
+
+
+def _rows(symbol, method, origins, horizons, closes: np.ndarray, predicted: np.ndarray) -> List[tuple]:
+    """predicted: (len(origins), len(horizons)); actual lấy sau h phiên (NaN nếu chưa tới)"""
+    rows = []
+    n = len(closes)
+    for i, origin in enumerate(origins):
+        for j, h in enumerate(horizons):
+            actual = closes[origin + h] if origin + h < n else np.nan
+            rows.append((symbol, method, origin, h, closes[origin], float(predicted[i, j]), actual))
+    return rows
+
+
+# ---- forecaster heuristic / baseline (vector, không cần fit) ----
+def naive_forecasts(closes: pd.DataFrame, origins: Sequence[int], horizons: Sequence[int]) -> List[tuple]:
+    """Random walk: giá tương lai = giá hiện tại (mốc để tính skill)"""
+    rows = []
+    for symbol in closes.columns:
+        series = closes[symbol].to_numpy(dtype='float64')
+        predicted = np.repeat(series[list(origins)][:, None], len(horizons), axis=1)
+        rows.extend(_rows(symbol, 'naive', origins, horizons, series, predicted))
+    return rows
+
+
+def traditional_forecasts(closes: pd.DataFrame, volumes: pd.DataFrame, origins: Sequence[int],
+                          horizons: Sequence[int]) -> List[tuple]:
+    """_generate_multi_timeframe_predictions cho mọi mã + mọi origin trong một lượt.
+    Chỉ báo là rolling nên giá trị tại origin chỉ dùng dữ liệu đến origin (không nhìn trước)"""
+    panel = compute_signal_panel(closes, volumes)
+    index = list(origins)
+    changes = predicted_change(panel, list(horizons), rows=index)
+    filled = panel['close'].to_numpy(dtype='float64')
+    rows = []
+    for k, symbol in enumerate(closes.columns):
+        predicted = filled[index, k][:, None] * (1 + changes[:, k, :] / 100)
+        rows.extend(_rows(symbol, 'traditional', index, horizons, filled[:, k], predicted))
+    return rows
+
+
+# ---- LSTM (mỗi task = một mã + một lần fit, chạy trong worker process) ----
+def _model_path(cache_dir: str, symbol: str, train: np.ndarray, look_back: int, epochs: int) -> str:
+    digest = hashlib.sha1(train.tobytes() + f"{look_back}:{epochs}:{MODEL_VERSION}".encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, symbol, f"{digest}.keras")
+
+
+def _lstm_task(symbol: str, series: np.ndarray, fit_origin: int, origins: List[int], horizons: List[int],
+               train: int, look_back: int, epochs: int, cache_dir: str) -> List[tuple]:
+    """Fit LSTM trên cửa sổ kết thúc tại fit_origin (hoặc nạp model đã cache),
+    rồi dự báo đệ quy từ từng origin trong đoạn tới lần fit sau"""
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.callbacks import EarlyStopping
+    from agents.lstm_price_predictor import LSTMPricePredictor
+
+    window = series[fit_origin - train + 1: fit_origin + 1].astype('float32')
+    low, high = float(window.min()), float(window.max())
+    span = (high - low) or 1.0
+    scaled = ((window - low) / span).reshape(-1, 1)
+
+    path = _model_path(cache_dir, symbol, window, look_back, epochs)
+    if os.path.exists(path):
+        model = load_model(path)
+    else:
+        predictor = LSTMPricePredictor()
+        trainX, trainY = predictor.create_dataset(scaled, look_back)
+        trainX = trainX.reshape((trainX.shape[0], trainX.shape[1], 1))
+        model = predictor.build_lstm_model((look_back, 1))
+        model.fit(trainX, trainY, epochs=epochs, batch_size=32, validation_split=0.2, verbose=0,
+                  callbacks=[EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        model.save(path)
+
+    # Dự báo đệ quy cho mọi origin cùng lúc (batch theo origin)
+    steps = max(horizons)
+    sequences = np.stack([(series[o - look_back + 1: o + 1] - low) / span for o in origins]).astype('float32')
+    outputs = np.empty((len(origins), steps), dtype='float32')
+    x = sequences[:, :, None]
+    for step in range(steps):
+        next_value = model(x, training=False).numpy()[:, 0]
+        outputs[:, step] = next_value
+        x = np.concatenate([x[:, 1:, :], next_value[:, None, None]], axis=1)
+    predicted = outputs[:, [h - 1 for h in horizons]] * span + low
+    return _rows(symbol, 'lstm', origins, horizons, series, predicted)
+
+
+def lstm_tasks(closes: pd.DataFrame, origins: Sequence[int], horizons: Sequence[int], train: int,
+               refit: int, look_back: int, epochs: int, cache_dir: str) -> List[tuple]:
+    """Chia origins thành nhóm theo lần fit: (symbol, series, fit_origin, origins...)"""
+    tasks = []
+    for symbol in closes.columns:
+        series = closes[symbol].ffill().to_numpy(dtype='float64')
+        valid = np.flatnonzero(~np.isnan(series))
+        if not len(valid):
+            continue
+        first = valid[0]
+        usable = [o for o in origins if o - train + 1 >= first]
+        groups: Dict[int, List[int]] = {}
+        for origin in usable:
+            fit_origin = usable[0] + (origin - usable[0]) // refit * refit
+            groups.setdefault(fit_origin, []).append(origin)
+        for fit_origin, group in groups.items():
+            tasks.append((symbol, series, fit_origin, group, list(horizons), train, look_back, epochs, cache_dir))
+    return tasks
+
+
+def _run_tasks(tasks: List[tuple], workers: int) -> List[tuple]:
+    rows, failed = [], 0
+    if workers <= 0:
+        for task in tasks:
+            try:
+                rows.extend(_lstm_task(*task))
+            except Exception as e:
+                failed += 1
+                logger.debug(f"LSTM window failed for {task[0]}: {e}")
+    else:
+        # spawn: TensorFlow không an toàn khi fork
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {pool.submit(_lstm_task, *task): task[0] for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    rows.extend(future.result())
+                except Exception as e:
+                    failed += 1
+                    logger.debug(f"LSTM window failed for {futures[future]}: {e}")
+    if failed:
+        logger.warning(f"⚠️ {failed}/{len(tasks)} LSTM windows failed")
+    return rows
+
+
+# ---- tổng hợp ----
+def score_forecasts(rows: pd.DataFrame) -> pd.DataFrame:
+    """Thêm cột sai số (%) và đúng hướng; bỏ dòng chưa có giá thực tế"""
+    frame = rows.dropna(subset=['actual', 'predicted', 'base'])
+    frame = frame[(frame['actual'] > 0) & (frame['base'] > 0)].copy()
+    frame['error_pct'] = (frame['predicted'] / frame['actual'] - 1) * 100
+    frame['abs_error_pct'] = frame['error_pct'].abs()
+    frame['squared_error'] = frame['error_pct'] ** 2
+    predicted_move = np.sign(frame['predicted'] - frame['base'])
+    hit = (predicted_move == np.sign(frame['actual'] - frame['base'])).astype('float64')
+    # Dự báo đi ngang (naive) không có hướng để chấm
+    frame['direction_hit'] = hit.where(predicted_move != 0)
+    return frame
+
+
+def aggregate_errors(scored: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    """MAE%, RMSE%, bias%, tỷ lệ đúng hướng và skill so với naive (1 - MAE/MAE_naive)"""
+    grouped = scored.groupby(by + ['method'])
+    table = pd.DataFrame({
+        'samples': grouped.size(),
+        'mae_pct': grouped['abs_error_pct'].mean(),
+        'rmse_pct': np.sqrt(grouped['squared_error'].mean()),
+        'bias_pct': grouped['error_pct'].mean(),
+        'direction_hit_rate': grouped['direction_hit'].mean()
+    }).reset_index()
+    naive = table[table['method'] == 'naive'].set_index(by)['mae_pct'].rename('naive_mae')
+    table = table.join(naive, on=by)
+    table['skill'] = 1 - table['mae_pct'] / table['naive_mae']
+    return table.drop(columns='naive_mae').round(4)
+
+
+def run_walk_forward(closes: pd.DataFrame, volumes: pd.DataFrame = None, methods: Sequence[str] = METHODS,
+                     horizons: Sequence[int] = HORIZONS, train: int = TRAIN_SESSIONS, step: int = STEP_SESSIONS,
+                     refit: int = REFIT_SESSIONS, look_back: int = LOOK_BACK, epochs: int = LSTM_EPOCHS,
+                     workers: int = None, cache_dir: str = None) -> Dict[str, Any]:
+    """Chạy walk-forward trên ma trận giá đóng cửa (ngày x mã); horizon tính theo phiên giao dịch"""
+    unknown = set(methods) - set(METHODS)
+    if unknown:
+        raise ValueError(f"Unknown methods: {sorted(unknown)}")
+    started = time.perf_counter()
+    closes = closes.sort_index()
+    volumes = volumes.reindex(index=closes.index, columns=closes.columns) if volumes is not None \
+        else pd.DataFrame(1.0, index=closes.index, columns=closes.columns)
+    horizons = sorted(horizons)
+    origins = make_origins(len(closes), train, step)
+    if not origins:
+        raise ValueError(f"Need more than {train} sessions for walk-forward (got {len(closes)})")
+
+    rows: List[tuple] = []
+    timings = {}
+    # naive luôn chạy để có mốc skill
+    for method in ['naive'] + [m for m in methods if m != 'naive']:
+        method_started = time.perf_counter()
+        if method == 'naive':
+            rows.extend(naive_forecasts(closes.ffill(), origins, horizons))
+        elif method == 'traditional':
+            rows.extend(traditional_forecasts(closes, volumes, origins, horizons))
+        elif method == 'lstm':
+            tasks = lstm_tasks(closes, origins, horizons, train, refit, look_back, epochs,
+                               cache_dir or MODEL_CACHE_DIR)
+            workers = (os.cpu_count() or 1) if workers is None else workers
+            logger.info(f"🧠 Walk-forward LSTM: {len(tasks)} fits on {workers} workers")
+            rows.extend(_run_tasks(tasks, workers))
+        timings[method] = round(time.perf_counter() - method_started, 1)
+
+    frame = pd.DataFrame(rows, columns=_ROW_COLUMNS)
+    scored = score_forecasts(frame)
+    by_horizon = aggregate_errors(scored, ['horizon'])
+    by_symbol = aggregate_errors(scored, ['symbol'])
+    dates = closes.index
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'symbols': int(closes.shape[1]),
+        'windows': len(origins),
+        'first_origin': dates[origins[0]].date().isoformat(),
+        'last_origin': dates[origins[-1]].date().isoformat(),
+        'horizons': horizons,
+        'by_horizon': by_horizon.to_dict(orient='records'),
+        'by_symbol': by_symbol.to_dict(orient='records'),
+        'forecasts': frame.assign(origin=[dates[o].date().isoformat() for o in frame['origin']]),
+        'elapsed_s': dict(timings, total=round(time.perf_counter() - started, 1))
+    }
+
+
+def save_report(report: Dict[str, Any], cache_dir: str = None) -> str:
+    """Lưu báo cáo tổng hợp (JSON) + toàn bộ dự báo (CSV) cạnh cache model"""
+    cache_dir = cache_dir or MODEL_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d')
+    report['forecasts'].to_csv(os.path.join(cache_dir, f"forecasts_{stamp}.csv"), index=False)
+    path = os.path.join(cache_dir, f"report_{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({k: v for k, v in report.items() if k != 'forecasts'}, f, ensure_ascii=False, indent=2, default=str)
+    return path
+
+
+__all__ = [
+    'HORIZONS',
+    'METHODS',
+    'aggregate_errors',
+    'make_origins',
+    'naive_forecasts',
+    'run_walk_forward',
+    'save_report',
+    'score_forecasts',
+    'traditional_forecasts'
+]
+
+
+def main():
+    import argparse
+    from .vnstock_gateway import get_vnstock_gateway
+    from .symbol_master import get_symbol_master
+
+    parser = argparse.ArgumentParser(description="Walk-forward evaluation of price forecasters")
+    parser.add_argument('--symbols', help="Comma-separated symbols (default: whole symbol master)")
+    parser.add_argument('--methods', default=','.join(METHODS))
+    parser.add_argument('--years', type=float, default=3.0)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    symbols = [s.strip().upper() for s in args.symbols.split(',')] if args.symbols else \
+        [r['symbol'] for r in get_symbol_master().records()]
+    end = datetime.now().strftime('%Y-%m-%d')
+    start = (datetime.now() - timedelta(days=int(args.years * 365))).strftime('%Y-%m-%d')
+    panels = asyncio.run(load_history(get_vnstock_gateway(), symbols, start, end))
+    report = run_walk_forward(panels['close'], panels['volume'], methods=args.methods.split(','),
+                              workers=args.workers)
+    path = save_report(report)
+    print(f"✅ Walk-forward report: {path}")
+    print(pd.DataFrame(report['by_horizon']).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
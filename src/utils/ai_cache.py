@@ -0,0 +1,216 @@
+# src/utils/ai_cache.py
+"""
+AI Response Cache
+Cache phản hồi AI theo template prompt + dấu vân tay dữ liệu (content-addressed)
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Số có dạng 1,234,567.89 / -0.0123 / 12.5
+_NUMBER_RE = re.compile(r'-?\d{1,3}(?:,\d{3})+(?:\.\d+)?|-?\d+\.\d+|-?\d+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def quantize_number(value: float, significant_digits: int = 3) -> float:
+    """Làm tròn số theo chữ số có nghĩa để dữ liệu dao động nhỏ vẫn trùng key"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return value
+    if value != value or value in (float('inf'), float('-inf')):
+        return 0.0
+    if value == 0:
+        return 0.0
+    return float(f"{value:.{significant_digits}g}")
+
+
+def quantize_data(data: Any, significant_digits: int = 3) -> Any:
+    """Chuẩn hóa đệ quy dict/list/dataclass thành cấu trúc JSON đã lượng tử hóa"""
+    if isinstance(data, bool) or data is None:
+        return data
+    if isinstance(data, (int, float)):
+        return quantize_number(data, significant_digits)
+    if isinstance(data, str):
+        return normalize_prompt(data, significant_digits)
+    if isinstance(data, dict):
+        return {str(k): quantize_data(v, significant_digits) for k, v in sorted(data.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(data, (list, tuple)):
+        return [quantize_data(v, significant_digits) for v in data]
+    if hasattr(data, '__dict__'):
+        return quantize_data(vars(data), significant_digits)
+    try:
+        # numpy scalar và các kiểu số khác
+        return quantize_number(float(data), significant_digits)
+    except (TypeError, ValueError):
+        return str(data)
+
+
+def normalize_prompt(prompt: str, significant_digits: int = 3) -> str:
+    """Gộp khoảng trắng và lượng tử hóa các con số xuất hiện trong prompt"""
+    def _replace(match):
+        raw = match.group(0).replace(',', '')
+        return repr(quantize_number(raw, significant_digits))
+
+    text = _WHITESPACE_RE.sub(' ', prompt or '').strip()
+    return _NUMBER_RE.sub(_replace, text)
+
+
+class AIResponseCache:
+    """Cache phản hồi AI hai tầng: bộ nhớ + file JSON trên đĩa"""
+
+    def __init__(self, cache_dir: str = None, max_memory_entries: int = 512):
+        self.cache_dir = cache_dir or os.getenv('AI_CACHE_DIR', os.path.join('.cache', 'ai_responses'))
+        self.max_memory_entries = max_memory_entries
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._disk_enabled = True
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"AI cache disk store disabled: {e}")
+            self._disk_enabled = False
+
+    def make_key(self, template_id: str, fingerprint: Any) -> str:
+        """Tạo key sha256 từ template id + fingerprint đã lượng tử hóa"""
+        payload = json.dumps(
+            {'template': template_id, 'data': quantize_data(fingerprint)},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _get_ttl(self) -> int:
+        """TTL theo phiên thị trường (5 phút khi mở cửa, lâu hơn khi đóng cửa)"""
+        try:
+            from src.utils.market_schedule import market_schedule
+            return int(market_schedule.get_data_freshness_expectation().get('cache_duration', 300))
+        except Exception:
+            return 300
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, template_id: str, fingerprint: Any) -> Optional[Dict[str, Any]]:
+        """Lấy phản hồi còn hạn, None nếu không có"""
+        key = self.make_key(template_id, fingerprint)
+        now = time.time()
+
+        with self._lock:
+            entry = self.cache.get(key)
+        if entry is None and self._disk_enabled:
+            entry = self._read_disk(key)
+            if entry is not None:
+                with self._lock:
+                    self.cache[key] = entry
+
+        if entry is None or entry.get('expires_at', 0) <= now:
+            if entry is not None:
+                self._evict(key)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        result = dict(entry['data'])
+        result['cached'] = True
+        return result
+
+    def set(self, template_id: str, fingerprint: Any, result: Dict[str, Any], ttl: int = None):
+        """Lưu phản hồi AI thành công (bỏ qua lỗi và offline fallback)"""
+        if not result or not result.get('success') or result.get('model_used') in (None, 'offline_fallback'):
+            return
+
+        key = self.make_key(template_id, fingerprint)
+        entry = {
+            'template': template_id,
+            'data': {k: v for k, v in result.items() if k != 'cached'},
+            'timestamp': time.time(),
+            'expires_at': time.time() + (ttl if ttl is not None else self._get_ttl())
+        }
+
+        with self._lock:
+            self.cache[key] = entry
+            if len(self.cache) > self.max_memory_entries:
+                oldest = min(self.cache, key=lambda k: self.cache[k]['timestamp'])
+                self.cache.pop(oldest, None)
+
+        if self._disk_enabled:
+            self._write_disk(key, entry)
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, entry: Dict[str, Any]):
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"AI cache write failed: {e}")
+
+    def _evict(self, key: str):
+        with self._lock:
+            self.cache.pop(key, None)
+        if self._disk_enabled:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Xóa toàn bộ cache (bộ nhớ + đĩa)"""
+        with self._lock:
+            self.cache.clear()
+        if self._disk_enabled:
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if name.endswith('.json'):
+                        try:
+                            os.remove(os.path.join(root, name))
+                        except OSError:
+                            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self.cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total * 100, 1) if total else 0,
+            'disk_store': self.cache_dir if self._disk_enabled else None
+        }
+
+
+# Singleton instance
+_ai_cache = None
+
+def get_ai_cache() -> AIResponseCache:
+    global _ai_cache
+    if _ai_cache is None:
+        _ai_cache = AIResponseCache()
+    return _ai_cache
+
+
+__all__ = [
+    'AIResponseCache',
+    'get_ai_cache',
+    'normalize_prompt',
+    'quantize_data',
+    'quantize_number'
+]
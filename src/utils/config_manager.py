@@ -6,7 +6,7 @@ Quản lý cấu hình tập trung cho hệ thống AI Trading
 
 import os
 from typing import Dict, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -29,6 +29,18 @@ class SystemConfig:
     cache_duration: int = 60  # seconds
     max_concurrent_requests: int = 10
     enable_real_data: bool = True
+    # Deadline (giây) cho analyze_stock
+    analysis_timeout: float = 30.0
+    agent_timeout: float = 20.0
+    agent_timeouts: Dict[str, float] = field(default_factory=lambda: {
+        'vn_stock_data': 10.0,
+        'ticker_news': 10.0,
+        'detailed_stock_info': 15.0,
+        'price_prediction': 25.0,
+        'risk_assessment': 20.0,
+        'investment_analysis': 25.0
+    })
+    background_timeout: float = 120.0
 
 @dataclass
 class UIConfig:
@@ -62,6 +74,14 @@ class ConfigManager:
         self.system.cache_duration = int(os.getenv('CACHE_DURATION', '60'))
         self.system.max_concurrent_requests = int(os.getenv('MAX_CONCURRENT_REQUESTS', '10'))
         self.system.enable_real_data = os.getenv('ENABLE_REAL_DATA', 'True').lower() == 'true'
+        self.system.analysis_timeout = float(os.getenv('ANALYSIS_TIMEOUT', '30'))
+        self.system.agent_timeout = float(os.getenv('AGENT_TIMEOUT', '20'))
+        self.system.background_timeout = float(os.getenv('BACKGROUND_TIMEOUT', '120'))
+        for agent_name in self.system.agent_timeouts:
+            # VD: AGENT_TIMEOUT_PRICE_PREDICTION=15
+            env_value = os.getenv(f'AGENT_TIMEOUT_{agent_name.upper()}')
+            if env_value:
+                self.system.agent_timeouts[agent_name] = float(env_value)
         
         # UI Config
         self.ui.page_title = os.getenv('PAGE_TITLE', 'DUONG AI TRADING SIUUUU')
@@ -77,6 +97,10 @@ class ConfigManager:
         """Get system configuration"""
         return self.system
     
+    def get_agent_timeout(self, agent_name: str) -> float:
+        """Get deadline (seconds) for an agent task"""
+        return self.system.agent_timeouts.get(agent_name, self.system.agent_timeout)
+    
     def get_ui_config(self) -> UIConfig:
         """Get UI configuration"""
         return self.ui
@@ -121,7 +145,9 @@ class ConfigManager:
                 'log_level': self.system.log_level,
                 'cache_duration': self.system.cache_duration,
                 'max_concurrent_requests': self.system.max_concurrent_requests,
-                'enable_real_data': self.system.enable_real_data
+                'enable_real_data': self.system.enable_real_data,
+                'analysis_timeout': self.system.analysis_timeout,
+                'agent_timeouts': dict(self.system.agent_timeouts)
             },
             'ui': {
                 'page_title': self.ui.page_title,
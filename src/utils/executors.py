@@ -0,0 +1,214 @@
+# src/utils/executors.py
+"""
+Execution Manager
+Executor riêng theo loại workload: IO (thread pool), CPU (process pool), MODEL (worker suy luận)
+"""
+
+import os
+import asyncio
+import pickle
+import logging
+import threading
+from enum import Enum
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class WorkloadClass(str, Enum):
+    """Loại workload của một stage"""
+    IO = "io"        # HTTP, vnstock, crawl - chờ mạng, nhả GIL
+    CPU = "cpu"      # pandas/numpy indicator, parse HTML - cần nhiều core
+    MODEL = "model"  # LSTM/TensorFlow - model sống lâu, chạy tuần tự
+
+
+def stage(workload: WorkloadClass) -> Callable:
+    """Decorator khai báo loại workload của một stage.
+    Hàm vẫn gọi trực tiếp được; run_stage() đọc thuộc tính này để chọn executor."""
+    def decorator(fn):
+        fn.__workload__ = WorkloadClass(workload)
+        return fn
+    return decorator
+
+
+def get_workload(fn: Callable) -> WorkloadClass:
+    """Loại workload đã khai báo (mặc định IO)"""
+    target = getattr(fn, 'func', fn)  # functools.partial
+    target = getattr(target, '__func__', target)  # bound method
+    return getattr(target, '__workload__', WorkloadClass.IO)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class ExecutionManager:
+    """Quản lý 3 executor: IO threads, CPU processes, MODEL worker đơn luồng"""
+
+    def __init__(self, io_workers: int = None, cpu_workers: int = None):
+        cores = os.cpu_count() or 1
+        self.io_workers = io_workers or _env_int('IO_WORKERS', min(32, cores * 4))
+        # CPU_WORKERS=0: chạy CPU stage ngay trong thread gọi (không fork process)
+        self.cpu_workers = cpu_workers if cpu_workers is not None else _env_int('CPU_WORKERS', cores)
+
+        self._io_threads = set()
+        self._io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix='io',
+                                           initializer=self._mark_io_thread)
+        self._model_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-inference')
+        self._cpu_pool = None
+        self._lock = threading.Lock()
+        self._model_thread_id = None
+        self.stats = {cls.value: 0 for cls in WorkloadClass}
+        self.stats['cpu_inline'] = 0
+
+    # ---- executors ----
+    def _get_cpu_pool(self):
+        """Tạo process pool lười (tránh fork lúc import)"""
+        if self.cpu_workers <= 0:
+            return None
+        with self._lock:
+            if self._cpu_pool is None:
+                self._cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers)
+                logger.info(f"⚙️ CPU process pool started ({self.cpu_workers} workers)")
+            return self._cpu_pool
+
+    def _reset_cpu_pool(self):
+        with self._lock:
+            pool, self._cpu_pool = self._cpu_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def _mark_io_thread(self):
+        self._io_threads.add(threading.get_ident())
+
+    def _in_io_worker(self) -> bool:
+        return threading.get_ident() in self._io_threads
+
+    def _mark_model_thread(self):
+        self._model_thread_id = threading.get_ident()
+
+    def _in_model_worker(self) -> bool:
+        return self._model_thread_id == threading.get_ident()
+
+    # ---- submit ----
+    def run_stage(self, fn: Callable, *args, workload: WorkloadClass = None, **kwargs) -> Any:
+        """Chạy stage (đồng bộ) trên executor tương ứng và chờ kết quả.
+        Dùng trong code chạy ở thread của agent."""
+        workload = WorkloadClass(workload or get_workload(fn))
+        self.stats[workload.value] += 1
+
+        if workload == WorkloadClass.CPU:
+            return self._run_cpu(fn, *args, **kwargs)
+        if workload == WorkloadClass.MODEL:
+            if self._in_model_worker():
+                # Gọi lồng trong model worker -> chạy luôn để tránh deadlock
+                return fn(*args, **kwargs)
+            return self._model_pool.submit(self._call_in_model_worker, fn, args, kwargs).result()
+        if self._in_io_worker():
+            # Đã ở IO thread -> chạy luôn, không chờ slot IO khác (tránh cạn pool khi gọi lồng)
+            return fn(*args, **kwargs)
+        return self._io_pool.submit(fn, *args, **kwargs).result()
+
+    async def run_stage_async(self, fn: Callable, *args, workload: WorkloadClass = None, **kwargs) -> Any:
+        """Phiên bản async của run_stage cho event loop (FastAPI/MainAgent)"""
+        workload = WorkloadClass(workload or get_workload(fn))
+        loop = asyncio.get_running_loop()
+
+        if workload == WorkloadClass.IO:
+            self.stats[workload.value] += 1
+            return await loop.run_in_executor(self._io_pool, partial(fn, *args, **kwargs))
+        if workload == WorkloadClass.MODEL:
+            self.stats[workload.value] += 1
+            return await loop.run_in_executor(self._model_pool, partial(self._call_in_model_worker, fn, args, kwargs))
+        # CPU: chờ trực tiếp future của process pool (không giữ IO thread trong lúc chờ)
+        self.stats[workload.value] += 1
+        pool = self._get_cpu_pool()
+        if pool is not None and self._is_picklable(fn, args, kwargs):
+            try:
+                return await asyncio.wrap_future(pool.submit(fn, *args, **kwargs))
+            except BrokenProcessPool as e:
+                logger.warning(f"CPU process pool broken, running inline: {e}")
+                self._reset_cpu_pool()
+        self.stats['cpu_inline'] += 1
+        if self._in_io_worker():
+            return fn(*args, **kwargs)
+        return await loop.run_in_executor(self._io_pool, partial(fn, *args, **kwargs))
+
+    def _call_in_model_worker(self, fn, args, kwargs):
+        self._mark_model_thread()
+        return fn(*args, **kwargs)
+
+    def _run_cpu(self, fn, *args, **kwargs):
+        pool = self._get_cpu_pool()
+        if pool is None or not self._is_picklable(fn, args, kwargs):
+            self.stats['cpu_inline'] += 1
+            return fn(*args, **kwargs)
+        try:
+            return pool.submit(fn, *args, **kwargs).result()
+        except BrokenProcessPool as e:
+            logger.warning(f"CPU process pool broken, running inline: {e}")
+            self._reset_cpu_pool()
+            self.stats['cpu_inline'] += 1
+            return fn(*args, **kwargs)
+
+    @staticmethod
+    def _is_picklable(fn, args, kwargs) -> bool:
+        """Process pool chỉ nhận hàm module-level và tham số pickle được"""
+        try:
+            pickle.dumps((fn, args, kwargs))
+            return True
+        except Exception:
+            return False
+
+    def get_stats(self):
+        return {
+            'io_workers': self.io_workers,
+            'cpu_workers': self.cpu_workers,
+            'cpu_pool_started': self._cpu_pool is not None,
+            'submitted': dict(self.stats)
+        }
+
+    def shutdown(self, wait: bool = False):
+        self._io_pool.shutdown(wait=wait)
+        self._model_pool.shutdown(wait=wait)
+        self._reset_cpu_pool()
+
+
+# Singleton instance
+_execution_manager = None
+_execution_manager_lock = threading.Lock()
+
+def get_execution_manager() -> ExecutionManager:
+    global _execution_manager
+    if _execution_manager is None:
+        with _execution_manager_lock:
+            if _execution_manager is None:
+                _execution_manager = ExecutionManager()
+    return _execution_manager
+
+
+def run_stage(fn: Callable, *args, **kwargs) -> Any:
+    """Shortcut: get_execution_manager().run_stage(...)"""
+    return get_execution_manager().run_stage(fn, *args, **kwargs)
+
+
+async def run_stage_async(fn: Callable, *args, **kwargs) -> Any:
+    """Shortcut: await get_execution_manager().run_stage_async(...)"""
+    return await get_execution_manager().run_stage_async(fn, *args, **kwargs)
+
+
+__all__ = [
+    'ExecutionManager',
+    'WorkloadClass',
+    'get_execution_manager',
+    'get_workload',
+    'run_stage',
+    'run_stage_async',
+    'stage'
+]
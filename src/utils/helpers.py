@@ -9,7 +9,6 @@ import json
 import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Union
-import pandas as pd
 import numpy as np
 import logging
 import hashlib
@@ -131,10 +130,7 @@ def calculate_compound_return(returns: List[float]) -> float:
         float: Compound return
     """
     try:
-        compound = 1.0
-        for r in returns:
-            compound *= (1 + r)
-        return compound - 1
+        return float(compound_returns(returns)[0])
     except:
         return 0
 
@@ -152,15 +148,7 @@ def calculate_sharpe_ratio(returns: List[float], risk_free_rate: float = 0.02) -
     try:
         if len(returns) < 2:
             return 0
-        
-        excess_returns = [r - risk_free_rate/252 for r in returns]  # Daily risk-free rate
-        mean_excess = np.mean(excess_returns)
-        std_excess = np.std(excess_returns)
-        
-        if std_excess == 0:
-            return 0
-        
-        return (mean_excess / std_excess) * np.sqrt(252)  # Annualized
+        return float(np.nan_to_num(sharpe_ratios(returns, risk_free_rate)[0]))
     except:
         return 0
 
@@ -177,18 +165,7 @@ def calculate_max_drawdown(values: List[float]) -> float:
     try:
         if len(values) < 2:
             return 0
-        
-        peak = values[0]
-        max_dd = 0
-        
-        for value in values[1:]:
-            if value > peak:
-                peak = value
-            else:
-                drawdown = (peak - value) / peak
-                max_dd = max(max_dd, drawdown)
-        
-        return max_dd
+        return float(max_drawdowns(values)[0])
     except:
         return 0
 
@@ -206,13 +183,7 @@ def calculate_volatility(returns: List[float], annualized: bool = True) -> float
     try:
         if len(returns) < 2:
             return 0
-        
-        std = np.std(returns)
-        
-        if annualized:
-            return std * np.sqrt(252)  # Assuming daily returns
-        
-        return std
+        return float(volatilities(returns, annualized)[0])
     except:
         return 0
 
@@ -230,20 +201,146 @@ def calculate_beta(stock_returns: List[float], market_returns: List[float]) -> f
     try:
         if len(stock_returns) != len(market_returns) or len(stock_returns) < 2:
             return 1.0
-        
-        stock_returns = np.array(stock_returns)
-        market_returns = np.array(market_returns)
-        
-        covariance = np.cov(stock_returns, market_returns)[0][1]
-        market_variance = np.var(market_returns)
-        
-        if market_variance == 0:
-            return 1.0
-        
-        return covariance / market_variance
+        beta = betas(stock_returns, market_returns)[0]
+        return float(beta) if np.isfinite(beta) else 1.0
     except:
         return 1.0
 
+# ============================================================================
+# RISK METRIC KERNELS (2-D: symbols x time)
+# ============================================================================
+
+TRADING_DAYS_PER_YEAR = 252
+
+def _as_matrix(values) -> np.ndarray:
+    """List / 1-D / 2-D -> ma trận float (số chuỗi x thời gian); NaN = không có dữ liệu"""
+    matrix = np.asarray(values, dtype='float64')
+    return matrix[np.newaxis, :] if matrix.ndim == 1 else matrix
+
+def returns_from_prices(prices) -> np.ndarray:
+    """Lợi suất đơn theo kỳ cho mọi chuỗi giá (N x T -> N x T-1)"""
+    prices = _as_matrix(prices)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return prices[:, 1:] / prices[:, :-1] - 1
+
+def compound_returns(returns) -> np.ndarray:
+    """Lợi suất gộp của từng chuỗi (bỏ qua NaN)"""
+    return np.nanprod(1 + _as_matrix(returns), axis=1) - 1
+
+def volatilities(returns, annualized: bool = True) -> np.ndarray:
+    """Độ lệch chuẩn lợi suất của từng chuỗi, annualized theo 252 phiên"""
+    std = np.nanstd(_as_matrix(returns), axis=1, ddof=1)
+    return std * np.sqrt(TRADING_DAYS_PER_YEAR) if annualized else std
+
+def sharpe_ratios(returns, risk_free_rate: float = 0.02) -> np.ndarray:
+    """Sharpe annualized của từng chuỗi (risk-free theo năm); NaN nếu độ lệch chuẩn = 0"""
+    excess = _as_matrix(returns) - risk_free_rate / TRADING_DAYS_PER_YEAR
+    std = np.nanstd(excess, axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(std > 0, np.nanmean(excess, axis=1) / std, np.nan) * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+def max_drawdowns(values) -> np.ndarray:
+    """Mức sụt giảm lớn nhất từ đỉnh (số dương, dạng thập phân) của từng chuỗi giá trị"""
+    values = _as_matrix(values)
+    # NaN giữ giá trị trước đó để không phá đỉnh chạy
+    filled = np.where(np.isnan(values), -np.inf, values)
+    peaks = np.maximum.accumulate(filled, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = np.where((peaks > 0) & ~np.isnan(values), (peaks - values) / peaks, 0.0)
+    return drawdown.max(axis=1)
+
+def max_drawdowns_from_returns(returns) -> np.ndarray:
+    """Max drawdown trên đường tài sản gộp (1 + r).cumprod() của từng chuỗi lợi suất"""
+    return max_drawdowns(np.cumprod(1 + np.nan_to_num(_as_matrix(returns)), axis=1))
+
+def betas(stock_returns, market_returns) -> np.ndarray:
+    """Beta của mọi chuỗi so với một chuỗi thị trường (cùng trục thời gian, bỏ cặp có NaN)"""
+    stocks = _as_matrix(stock_returns)
+    market = np.broadcast_to(np.asarray(market_returns, dtype='float64'), stocks.shape)
+    valid = ~(np.isnan(stocks) | np.isnan(market))
+    count = valid.sum(axis=1)
+    stocks = np.where(valid, stocks, 0.0)
+    market = np.where(valid, market, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stock_mean = stocks.sum(axis=1) / count
+        market_mean = market.sum(axis=1) / count
+        covariance = ((stocks - stock_mean[:, None]) * (market - market_mean[:, None]) * valid).sum(axis=1) / (count - 1)
+        market_var = (((market - market_mean[:, None]) * valid) ** 2).sum(axis=1) / (count - 1)
+        return np.where((count > 1) & (market_var > 0), covariance / market_var, np.nan)
+
+def values_at_risk(returns, confidence_level: float = 0.05) -> np.ndarray:
+    """VaR lịch sử (số dương) của từng chuỗi: -phân vị confidence_level của lợi suất"""
+    returns = _as_matrix(returns)
+    # Sort một lần (NaN dồn về cuối) rồi nội suy tuyến tính theo số quan sát của từng chuỗi,
+    # nhanh hơn nhiều so với nanquantile trên ma trận có NaN
+    ordered = np.sort(returns, axis=1)
+    count = np.sum(~np.isnan(returns), axis=1)
+    position = confidence_level * np.maximum(count - 1, 0)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, np.maximum(count - 1, 0))
+    rows = np.arange(len(returns))
+    quantile = ordered[rows, lower] + (ordered[rows, upper] - ordered[rows, lower]) * (position - lower)
+    return np.where(count > 0, -quantile, np.nan)
+
+def _moments(returns: np.ndarray):
+    count = np.sum(~np.isnan(returns), axis=1)
+    centered = returns - np.nanmean(returns, axis=1, keepdims=True)
+    squared = centered * centered
+    m2 = np.nanmean(squared, axis=1)
+    m3 = np.nanmean(squared * centered, axis=1)
+    m4 = np.nanmean(squared * squared, axis=1)
+    return count, m2, m3, m4
+
+def _skewness(n, m2, m3):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g1 = m3 / m2 ** 1.5
+        return np.where((n > 2) & (m2 > 0), np.sqrt(n * (n - 1)) / (n - 2) * g1, 0.0)
+
+def _excess_kurtosis(n, m2, m4):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g2 = m4 / m2 ** 2 - 3
+        return np.where((n > 3) & (m2 > 0), ((n + 1) * g2 + 6) * (n - 1) / ((n - 2) * (n - 3)), 0.0)
+
+def skewness(returns) -> np.ndarray:
+    """Độ lệch (hiệu chỉnh mẫu, giống pandas.Series.skew) của từng chuỗi"""
+    n, m2, m3, _ = _moments(_as_matrix(returns))
+    return _skewness(n, m2, m3)
+
+def excess_kurtosis(returns) -> np.ndarray:
+    """Độ nhọn vượt chuẩn (hiệu chỉnh mẫu, giống pandas.Series.kurtosis) của từng chuỗi"""
+    n, m2, _, m4 = _moments(_as_matrix(returns))
+    return _excess_kurtosis(n, m2, m4)
+
+def risk_metrics_matrix(returns, market_returns=None, risk_free_rate: float = 0.02,
+                        confidence_level: float = 0.05) -> Dict[str, np.ndarray]:
+    """
+    Tính mọi chỉ số rủi ro cho nhiều chuỗi cùng lúc
+    
+    Args:
+        returns: Ma trận lợi suất (số mã x thời gian), NaN cho phiên thiếu
+        market_returns: Chuỗi lợi suất thị trường cùng trục thời gian (để tính beta)
+        risk_free_rate: Risk-free rate (annual)
+        confidence_level: Mức VaR (0.05 = VaR 95%)
+        
+    Returns:
+        Dict[str, np.ndarray]: Mỗi chỉ số là một vector theo chuỗi (dạng thập phân)
+    """
+    returns = _as_matrix(returns)
+    n, m2, m3, m4 = _moments(returns)
+    metrics = {
+        'compound_return': compound_returns(returns),
+        'volatility': volatilities(returns),
+        'sharpe_ratio': sharpe_ratios(returns, risk_free_rate),
+        'max_drawdown': max_drawdowns_from_returns(returns),
+        'var_95': values_at_risk(returns, confidence_level),
+        'skewness': _skewness(n, m2, m3),
+        'kurtosis': _excess_kurtosis(n, m2, m4),
+        'observations': n
+    }
+    if market_returns is not None:
+        metrics['beta'] = betas(returns, market_returns)
+    return metrics
+
 # ============================================================================
 # RISK MANAGEMENT UTILITIES
 # ============================================================================
@@ -297,11 +394,7 @@ def calculate_var(returns: List[float], confidence_level: float = 0.05) -> float
     try:
         if len(returns) < 10:
             return 0
-        
-        sorted_returns = sorted(returns)
-        index = int(confidence_level * len(sorted_returns))
-        
-        return abs(sorted_returns[index])
+        return abs(float(values_at_risk(returns, confidence_level)[0]))
     except:
         return 0
 
@@ -326,18 +419,15 @@ def calculate_risk_metrics(returns: List[float]) -> Dict[str, float]:
                 'kurtosis': 0
             }
         
-        returns_array = np.array(returns)
-        
-        metrics = {
-            'volatility': calculate_volatility(returns),
-            'sharpe_ratio': calculate_sharpe_ratio(returns),
-            'max_drawdown': calculate_max_drawdown([sum(returns[:i+1]) for i in range(len(returns))]),
-            'var_95': calculate_var(returns, 0.05),
-            'skewness': float(pd.Series(returns).skew()),
-            'kurtosis': float(pd.Series(returns).kurtosis())
+        metrics = risk_metrics_matrix(returns)
+        return {
+            'volatility': float(metrics['volatility'][0]),
+            'sharpe_ratio': float(np.nan_to_num(metrics['sharpe_ratio'][0])),
+            'max_drawdown': float(metrics['max_drawdown'][0]),
+            'var_95': abs(float(metrics['var_95'][0])) if len(returns) >= 10 else 0,
+            'skewness': float(metrics['skewness'][0]),
+            'kurtosis': float(metrics['kurtosis'][0])
         }
-        
-        return metrics
     except:
         return {}
 
@@ -681,8 +771,9 @@ def is_trading_day(date: datetime) -> bool:
         bool: True if trading day
     """
     try:
-        # Basic check: Monday to Friday
-        return date.weekday() < 5
+        # Lịch phiên dùng chung: cuối tuần + Tết và các ngày nghỉ lễ
+        from src.utils.trading_calendar import get_trading_calendar
+        return bool(get_trading_calendar().is_session(date))
     except:
         return False
 
@@ -800,6 +891,10 @@ __all__ = [
     'format_vnd', 'format_percentage', 'format_number', 'format_market_cap',
     'calculate_change_percentage', 'calculate_sharpe_ratio', 'calculate_max_drawdown',
     'calculate_position_size_kelly', 'calculate_var', 'calculate_risk_metrics',
+    'calculate_compound_return', 'calculate_volatility', 'calculate_beta',
+    'returns_from_prices', 'compound_returns', 'volatilities', 'sharpe_ratios', 'max_drawdowns',
+    'max_drawdowns_from_returns', 'betas', 'values_at_risk', 'skewness', 'excess_kurtosis',
+    'risk_metrics_matrix',
     'clean_text', 'extract_numbers_from_text', 'normalize_stock_symbol',
     'validate_stock_symbol', 'validate_price', 'validate_api_key',
     'safe_divide', 'safe_float', 'safe_percentage',
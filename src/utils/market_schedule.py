@@ -4,10 +4,12 @@ Market Schedule Utility for Vietnamese Stock Market
 Handles trading hours, holidays, and weekend detection
 """
 
-from datetime import datetime, time, timedelta
+from datetime import datetime, time
 from typing import Dict, Any, List
 import logging
 
+from src.utils.trading_calendar import get_trading_calendar
+
 logger = logging.getLogger(__name__)
 
 class VNMarketSchedule:
@@ -18,19 +20,8 @@ class VNMarketSchedule:
         self.market_open = time(9, 0)   # 9:00 AM
         self.market_close = time(15, 0)  # 3:00 PM
         
-        # Vietnamese holidays (approximate - should be updated yearly)
-        self.holidays_2024 = [
-            "2024-01-01",  # New Year
-            "2024-02-10",  # Tet Holiday start
-            "2024-02-11",  # Tet Holiday
-            "2024-02-12",  # Tet Holiday
-            "2024-02-13",  # Tet Holiday
-            "2024-02-14",  # Tet Holiday
-            "2024-04-18",  # Hung Kings Day
-            "2024-04-30",  # Liberation Day
-            "2024-05-01",  # Labor Day
-            "2024-09-02",  # National Day
-        ]
+        # Lịch phiên dùng chung (cuối tuần, Tết và các ngày nghỉ lễ nhiều năm)
+        self.calendar = get_trading_calendar()
     
     def is_market_open(self, check_time: datetime = None) -> Dict[str, Any]:
         """Check if Vietnamese stock market is currently open"""
@@ -41,8 +32,7 @@ class VNMarketSchedule:
         is_weekend = check_time.weekday() >= 5  # Saturday (5) or Sunday (6)
         
         # Check if holiday
-        date_str = check_time.strftime("%Y-%m-%d")
-        is_holiday = date_str in self.holidays_2024
+        is_holiday = bool(self.calendar.is_holiday(check_time))
         
         # Check trading hours
         current_time = check_time.time()
@@ -64,32 +54,9 @@ class VNMarketSchedule:
     
     def _get_next_market_open(self, current_time: datetime) -> str:
         """Get next market opening time"""
-        # If it's weekend, next open is Monday 9AM
-        if current_time.weekday() >= 5:
-            days_until_monday = 7 - current_time.weekday()
-            next_monday = current_time + timedelta(days=days_until_monday)
-            next_open = datetime.combine(next_monday.date(), self.market_open)
-            return next_open.strftime("%Y-%m-%d %H:%M:%S")
-        
-        # If it's after market hours on weekday, next open is tomorrow 9AM
-        if current_time.time() > self.market_close:
-            next_day = current_time + timedelta(days=1)
-            # Skip weekend
-            if next_day.weekday() >= 5:
-                days_until_monday = 7 - next_day.weekday()
-                next_monday = next_day + timedelta(days=days_until_monday)
-                next_open = datetime.combine(next_monday.date(), self.market_open)
-            else:
-                next_open = datetime.combine(next_day.date(), self.market_open)
-            return next_open.strftime("%Y-%m-%d %H:%M:%S")
-        
-        # If it's before market hours on weekday, next open is today 9AM
-        if current_time.time() < self.market_open:
-            next_open = datetime.combine(current_time.date(), self.market_open)
-            return next_open.strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Market is currently open
-        return "Market is currently open"
+        if self.calendar.is_session(current_time) and self.market_open <= current_time.time() <= self.market_close:
+            return "Market is currently open"
+        return self.calendar.next_open(current_time).strftime("%Y-%m-%d %H:%M:%S")
     
     def _get_closure_reason(self, is_weekend: bool, is_holiday: bool, is_trading_hours: bool) -> str:
         """Get reason why market is closed"""
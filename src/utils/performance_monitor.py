@@ -52,6 +52,7 @@ class PerformanceMonitor:
     
     def __init__(self):
         self.metrics = defaultdict(list)
+        self.prompt_tokens = defaultdict(lambda: deque(maxlen=1000))
         self.rate_limiter = RateLimiter()
         self.circuit_breaker = CircuitBreaker()
     
@@ -85,6 +86,23 @@ class PerformanceMonitor:
             'success_rate': round(success_rate * 100, 1)
         }
 
+    def record_prompt_tokens(self, task_type: str, tokens: int):
+        """Ghi lại số token của prompt AI theo task type"""
+        self.prompt_tokens[task_type].append(tokens)
+    
+    def get_prompt_token_stats(self) -> Dict:
+        """Thống kê token prompt theo task type"""
+        stats = {}
+        for task_type, counts in self.prompt_tokens.items():
+            if counts:
+                stats[task_type] = {
+                    'prompts': len(counts),
+                    'avg_tokens': round(sum(counts) / len(counts), 1),
+                    'max_tokens': max(counts),
+                    'last_tokens': counts[-1]
+                }
+        return stats
+
 class CircuitBreaker:
     """Circuit breaker pattern cho API calls"""
     
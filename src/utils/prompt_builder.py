@@ -0,0 +1,151 @@
+# src/utils/prompt_builder.py
+"""
+Token-budgeted Prompt Builder
+Xây prompt gọn theo ngân sách token: xếp hạng field, lượng tử hóa số, tóm tắt tin tức top-k
+"""
+
+import logging
+from typing import Any, List
+
+logger = logging.getLogger(__name__)
+
+# Ngân sách token cho phần dữ liệu của prompt theo task type
+TOKEN_BUDGETS = {
+    'financial_advice': 700,
+    'comprehensive_analysis': 500,
+    'investment_analysis': 350,
+    'risk_assessment': 350,
+    'price_prediction': 200,
+    'market_analysis': 400,
+    'international_analysis': 400,
+    'default': 400
+}
+
+# Mức ưu tiên field (số nhỏ = quan trọng hơn, bị cắt sau cùng)
+PRIORITY_CRITICAL = 0
+PRIORITY_HIGH = 1
+PRIORITY_MEDIUM = 2
+PRIORITY_LOW = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Ước lượng số token (~4 ký tự ASCII/token, tiếng Việt có dấu tốn hơn)"""
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return max(1, int((len(text) - non_ascii) / 4 + non_ascii / 2))
+
+
+def format_value(value: Any) -> str:
+    """Lượng tử hóa số cho prompt: 3 chữ số có nghĩa, số lớn dạng 1,234,000"""
+    if value is None or value == '':
+        return 'N/A'
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, (int, float)):
+        if value != value:
+            return 'N/A'
+        abs_value = abs(value)
+        if abs_value >= 1000:
+            return f"{float(f'{value:.3g}'):,.0f}"
+        if abs_value >= 100 or float(value).is_integer():
+            return f"{value:.0f}"
+        if abs_value >= 1:
+            return f"{value:.2f}".rstrip('0').rstrip('.')
+        return f"{value:.3g}"
+    text = str(value).strip()
+    return text[:160] + '…' if len(text) > 160 else text
+
+
+class PromptBuilder:
+    """Builder prompt có ngân sách token theo task type"""
+
+    def __init__(self, task_type: str = 'default', budget: int = None):
+        self.task_type = task_type
+        self.budget = budget or TOKEN_BUDGETS.get(task_type, TOKEN_BUDGETS['default'])
+        self.sections = []  # [(order, title, [(priority, line)])]
+
+    def add_section(self, title: str, fields: List[tuple]) -> 'PromptBuilder':
+        """fields: [(label, value, priority)] - bỏ qua value rỗng/N/A"""
+        lines = []
+        for field in fields:
+            label, value = field[0], field[1]
+            priority = field[2] if len(field) > 2 else PRIORITY_MEDIUM
+            if value is None or value == '' or value == 'N/A':
+                continue
+            lines.append((priority, f"- {label}: {format_value(value)}"))
+        if lines:
+            self.sections.append((len(self.sections), title, lines))
+        return self
+
+    def add_news(self, title: str, news_items: List[Any], top_k: int = 5,
+                 priority: int = PRIORITY_LOW) -> 'PromptBuilder':
+        """Tóm tắt danh sách tin thành top-k dòng tiêu đề (đã loại trùng)"""
+        lines, seen = [], set()
+        for item in news_items or []:
+            headline = item.get('title', '') if isinstance(item, dict) else str(item)
+            headline = ' '.join(str(headline).split())
+            key = headline.lower()
+            if not headline or key in seen:
+                continue
+            seen.add(key)
+            # Tin đầu tiên quan trọng hơn các tin sau
+            line_priority = priority if len(lines) < 2 else priority + 1
+            lines.append((line_priority, f"- {headline[:120]}"))
+            if len(lines) >= top_k:
+                break
+        if lines:
+            self.sections.append((len(self.sections), title, lines))
+        return self
+
+    def build(self) -> str:
+        """Ghép prompt, cắt dần field ưu tiên thấp đến khi vừa ngân sách token"""
+        kept = {(s_idx, l_idx) for s_idx, _, lines in self.sections for l_idx in range(len(lines))}
+        # Thứ tự cắt: priority thấp nhất trước, trong cùng priority cắt dòng cuối trước
+        drop_order = sorted(
+            ((priority, s_idx, l_idx) for s_idx, _, lines in self.sections
+             for l_idx, (priority, _) in enumerate(lines)),
+            key=lambda x: (-x[0], -x[1], -x[2])
+        )
+
+        text = self._render(kept)
+        for priority, s_idx, l_idx in drop_order:
+            if estimate_tokens(text) <= self.budget or priority <= PRIORITY_CRITICAL:
+                break
+            kept.discard((s_idx, l_idx))
+            text = self._render(kept)
+        return text
+
+    def _render(self, kept: set) -> str:
+        parts = []
+        for s_idx, title, lines in self.sections:
+            body = [line for l_idx, (_, line) in enumerate(lines) if (s_idx, l_idx) in kept]
+            if body:
+                if title:
+                    parts.append(title)
+                parts.extend(body)
+        return "\n".join(parts)
+
+
+def record_prompt_tokens(task_type: str, prompt: str) -> int:
+    """Đếm token prompt và ghi vào performance monitor"""
+    tokens = estimate_tokens(prompt)
+    try:
+        from src.utils.performance_monitor import get_performance_monitor
+        get_performance_monitor().record_prompt_tokens(task_type, tokens)
+    except Exception as e:
+        logger.debug(f"Prompt token metrics unavailable: {e}")
+    return tokens
+
+
+__all__ = [
+    'PromptBuilder',
+    'TOKEN_BUDGETS',
+    'PRIORITY_CRITICAL',
+    'PRIORITY_HIGH',
+    'PRIORITY_MEDIUM',
+    'PRIORITY_LOW',
+    'estimate_tokens',
+    'format_value',
+    'record_prompt_tokens'
+]
@@ -0,0 +1,168 @@
+# src/utils/trading_calendar.py
+"""
+Trading Calendar
+Lịch phiên giao dịch HOSE/HNX/UPCOM tính sẵn nhiều năm (cuối tuần + Tết Dương lịch, Tết Nguyên đán,
+Giỗ Tổ, 30/4-1/5, Quốc khánh và ngày nghỉ bù). Mọi phép tính ngày (cộng N phiên, đếm phiên,
+phiên mở kế tiếp) dùng chung lịch này, vector hóa qua numpy busdaycalendar.
+"""
+
+import logging
+from datetime import datetime, time, date
+from typing import Iterable, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MARKET_OPEN = time(9, 0)
+MARKET_CLOSE = time(15, 0)
+CALENDAR_START = '2020-01-01'
+CALENDAR_END = '2028-01-01'
+
+# Ngày thường sàn đóng cửa (theo thông báo lịch nghỉ của HOSE/HNX; năm chưa công bố là dự kiến
+# theo lịch âm, cần đối chiếu khi sở công bố chính thức)
+VN_HOLIDAYS = {
+    2020: ['2020-01-01',
+           '2020-01-23', '2020-01-24', '2020-01-27', '2020-01-28', '2020-01-29',  # Tết Canh Tý
+           '2020-04-02',  # Giỗ Tổ Hùng Vương
+           '2020-04-30', '2020-05-01',
+           '2020-09-02'],
+    2021: ['2021-01-01',
+           '2021-02-10', '2021-02-11', '2021-02-12', '2021-02-15', '2021-02-16',  # Tết Tân Sửu
+           '2021-04-21',
+           '2021-04-30', '2021-05-03',
+           '2021-09-02', '2021-09-03'],
+    2022: ['2022-01-03',
+           '2022-01-31', '2022-02-01', '2022-02-02', '2022-02-03', '2022-02-04',  # Tết Nhâm Dần
+           '2022-04-11',
+           '2022-05-02', '2022-05-03',
+           '2022-09-01', '2022-09-02'],
+    2023: ['2023-01-02',
+           '2023-01-20', '2023-01-23', '2023-01-24', '2023-01-25', '2023-01-26',  # Tết Quý Mão
+           '2023-05-01', '2023-05-02', '2023-05-03',  # Giỗ Tổ (29/4) + 30/4-1/5 nghỉ bù
+           '2023-09-01', '2023-09-04'],
+    2024: ['2024-01-01',
+           '2024-02-08', '2024-02-09', '2024-02-12', '2024-02-13', '2024-02-14',  # Tết Giáp Thìn
+           '2024-04-18',
+           '2024-04-29', '2024-04-30', '2024-05-01',
+           '2024-09-02', '2024-09-03'],
+    2025: ['2025-01-01',
+           '2025-01-27', '2025-01-28', '2025-01-29', '2025-01-30', '2025-01-31',  # Tết Ất Tỵ
+           '2025-04-07',
+           '2025-04-30', '2025-05-01', '2025-05-02',
+           '2025-09-01', '2025-09-02'],
+    2026: ['2026-01-01',
+           '2026-02-16', '2026-02-17', '2026-02-18', '2026-02-19', '2026-02-20',  # Tết Bính Ngọ
+           '2026-04-27',  # Giỗ Tổ rơi Chủ nhật, nghỉ bù
+           '2026-04-30', '2026-05-01',
+           '2026-09-01', '2026-09-02'],
+    2027: ['2027-01-01',
+           '2027-02-04', '2027-02-05', '2027-02-08', '2027-02-09', '2027-02-10',  # Tết Đinh Mùi
+           '2027-04-16',
+           '2027-04-30', '2027-05-03',
+           '2027-09-02', '2027-09-03']
+}
+
+DateLike = Union[str, date, datetime, np.datetime64]
+
+
+def to_day(value):
+    """date / datetime / str / pandas / mảng -> np.datetime64[D] (vô hướng giữ vô hướng)"""
+    if isinstance(value, datetime):
+        value = value.date()
+    elif hasattr(value, 'to_numpy'):
+        value = value.to_numpy()
+    return np.asarray(value).astype('datetime64[D]')[()]
+
+
+class TradingCalendar:
+    """Lịch phiên tính sẵn + phép toán ngày làm việc vector hóa"""
+
+    def __init__(self, holidays: Iterable[DateLike] = None, start: str = CALENDAR_START, end: str = CALENDAR_END):
+        if holidays is None:
+            holidays = [d for days in VN_HOLIDAYS.values() for d in days]
+        self.holidays = np.unique(np.asarray(list(holidays), dtype='datetime64[D]'))
+        self.busdaycal = np.busdaycalendar(holidays=self.holidays)
+        days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D'))
+        self.sessions = days[np.is_busday(days, busdaycal=self.busdaycal)]
+
+    # ---------------- Membership ----------------
+
+    def is_session(self, dates: DateLike):
+        """Ngày có phiên giao dịch (không cuối tuần, không nghỉ lễ)"""
+        return np.is_busday(to_day(dates), busdaycal=self.busdaycal)
+
+    def is_holiday(self, dates: DateLike):
+        """Ngày thường nhưng sàn nghỉ lễ"""
+        days = to_day(dates)
+        return np.is_busday(days) & ~np.is_busday(days, busdaycal=self.busdaycal)
+
+    # ---------------- Arithmetic ----------------
+
+    def add_sessions(self, dates: DateLike, n, roll: str = 'backward'):
+        """Cộng n phiên (n âm = lùi). Ngày không có phiên được cuộn về phiên trước (roll='backward')
+        hoặc phiên sau (roll='forward') trước khi cộng."""
+        return np.busday_offset(to_day(dates), n, roll=roll, busdaycal=self.busdaycal)
+
+    def sessions_between(self, start: DateLike, end: DateLike):
+        """Số phiên trong [start, end)"""
+        return np.busday_count(to_day(start), to_day(end), busdaycal=self.busdaycal)
+
+    def previous_session(self, dates: DateLike):
+        """Phiên gần nhất <= ngày"""
+        return self.add_sessions(dates, 0, roll='backward')
+
+    def next_session(self, dates: DateLike):
+        """Phiên đầu tiên > ngày"""
+        return self.add_sessions(dates, 1, roll='backward')
+
+    def session_range(self, start: DateLike, end: DateLike) -> np.ndarray:
+        """Các phiên trong [start, end] (cắt từ mảng tính sẵn)"""
+        lo, hi = np.searchsorted(self.sessions, [to_day(start), to_day(end)], side='left')
+        if to_day(end) in self.sessions[hi:hi + 1]:
+            hi += 1
+        return self.sessions[lo:hi]
+
+    def session_dates(self, origin: DateLike, count: int) -> np.ndarray:
+        """Phiên 0..count-1 tính từ origin (phiên 0 = phiên gần nhất <= origin)"""
+        return self.add_sessions(origin, np.arange(count))
+
+    # ---------------- Market open / close ----------------
+
+    def last_closed_session(self, now: datetime = None) -> np.datetime64:
+        """Phiên gần nhất đã có giá đóng cửa (hôm nay chỉ tính sau giờ đóng cửa)"""
+        now = now or datetime.now()
+        today = to_day(now)
+        if now.time() >= MARKET_CLOSE and self.is_session(today):
+            return today
+        return self.add_sessions(today, -1, roll='forward')
+
+    def next_open(self, now: datetime = None) -> datetime:
+        """Thời điểm mở cửa kế tiếp (hôm nay nếu chưa tới 9h và là ngày có phiên)"""
+        now = now or datetime.now()
+        today = to_day(now)
+        if self.is_session(today) and now.time() < MARKET_OPEN:
+            day = today
+        else:
+            day = self.next_session(today)
+        return datetime.combine(day.astype(object), MARKET_OPEN)
+
+
+# Singleton instance
+_trading_calendar = None
+
+def get_trading_calendar() -> TradingCalendar:
+    global _trading_calendar
+    if _trading_calendar is None:
+        _trading_calendar = TradingCalendar()
+    return _trading_calendar
+
+
+__all__ = [
+    'MARKET_CLOSE',
+    'MARKET_OPEN',
+    'TradingCalendar',
+    'VN_HOLIDAYS',
+    'get_trading_calendar',
+    'to_day'
+]
@@ -0,0 +1,36 @@
+"""AI response cache: key lượng tử hóa, TTL, bỏ qua offline fallback"""
+
+from src.utils.ai_cache import AIResponseCache, normalize_prompt, quantize_number
+
+
+def _cache(tmp_path, monkeypatch):
+    cache = AIResponseCache(cache_dir=str(tmp_path / 'ai'))
+    monkeypatch.setattr(cache, '_get_ttl', lambda: 300)
+    return cache
+
+
+def test_small_data_changes_share_a_key():
+    assert quantize_number(23456.7) == 23500.0
+    assert normalize_prompt('Giá  VCB: 1,234,567 đ') == normalize_prompt('Giá VCB: 1,234,890 đ')
+    cache = AIResponseCache.__new__(AIResponseCache)
+    assert cache.make_key('t', {'price': 23.51}) == cache.make_key('t', {'price': 23.52})
+    assert cache.make_key('t', {'price': 23.5}) != cache.make_key('u', {'price': 23.5})
+
+
+def test_round_trip_through_disk(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch)
+    cache.set('advice', 'prompt', {'response': 'ok', 'model_used': 'gemini', 'success': True})
+    reloaded = _cache(tmp_path, monkeypatch)
+    result = reloaded.get('advice', 'prompt')
+    assert result == {'response': 'ok', 'model_used': 'gemini', 'success': True, 'cached': True}
+
+
+def test_expired_and_fallback_entries_are_not_served(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch)
+    cache.set('advice', 'offline', {'response': 'x', 'model_used': 'offline_fallback', 'success': True})
+    cache.set('advice', 'failed', {'response': 'x', 'model_used': None, 'success': False})
+    cache.set('advice', 'old', {'response': 'x', 'model_used': 'gemini', 'success': True}, ttl=-1)
+    assert cache.get('advice', 'offline') is None
+    assert cache.get('advice', 'failed') is None
+    assert cache.get('advice', 'old') is None
+    assert cache.get_stats()['misses'] == 3
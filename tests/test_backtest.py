@@ -0,0 +1,61 @@
+"""Backtest: tín hiệu dùng đúng forecaster đang phục vụ + quy tắc khớp lệnh HOSE"""
+
+import numpy as np
+import pandas as pd
+
+from src.data.backtest import (
+    COMMISSION, LOT_SIZE, compute_signal_panel, predicted_change, round_to_tick, simulate, tick_size
+)
+from src.data.forecaster import forecast_grid, latest_indicators
+
+
+def _panel(sessions=300, symbols=20, seed=1):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end='2026-10-16', periods=sessions)
+    closes = pd.DataFrame(25 * np.exp(np.cumsum(rng.normal(0, 0.02, (sessions, symbols)), axis=0)), index=index)
+    volumes = pd.DataFrame(rng.integers(100_000, 1_000_000, (sessions, symbols)).astype(float), index=index)
+    return compute_signal_panel(closes, volumes)
+
+
+def test_predicted_change_is_the_served_forecaster():
+    panel = _panel()
+    served = forecast_grid(latest_indicators(panel), panel['close'].iloc[-1].to_numpy(), [7, 30],
+                           deterministic=True)
+    assert np.allclose(predicted_change(panel, 7)[-1], served['change'][:, 0] * 100)
+    assert np.allclose(predicted_change(panel, [7, 30], rows=[len(panel['close']) - 1])[0],
+                       served['change'] * 100)
+
+
+def _flat(days, close=20.0, open_=20.123):
+    index = pd.bdate_range(end='2026-10-16', periods=days)
+    closes = pd.DataFrame({'VCB': np.full(days, close)}, index=index)
+    opens = pd.DataFrame({'VCB': np.full(days, open_)}, index=index)
+    code = np.full((days, 1), -1, dtype=np.int8)
+    code[0] = 1
+    return {'code': code, 'score': np.ones((days, 1))}, closes, opens
+
+
+def test_tick_size_and_adverse_rounding():
+    assert tick_size(np.array([9_990, 20_000, 50_000])).tolist() == [10, 50, 100]
+    assert tick_size(np.array([9_990]), 'HNX').tolist() == [100]
+    assert round_to_tick(np.array([20_123.0]), 50.0, 'buy')[0] == 20_150
+    assert round_to_tick(np.array([20_123.0]), 50.0, 'sell')[0] == 20_100
+
+
+def test_simulate_buys_whole_lots_at_the_next_open():
+    signals, closes, opens = _flat(3)
+    result = simulate(signals, closes, opens, capital=1e9, max_positions=1)
+    quantity = np.floor(1e9 / (20_150 * (1 + COMMISSION)) / LOT_SIZE) * LOT_SIZE
+    assert result['trades'] == 1
+    assert result['traded_value'] == quantity * 20_150
+    assert result['traded_value'] / 20_150 % LOT_SIZE == 0
+
+
+def test_simulate_holds_shares_until_t_plus_2():
+    # Mua phiên 1, tín hiệu bán từ phiên 1 -> CP về phiên 3 mới bán được
+    signals, closes, opens = _flat(3)
+    assert simulate(signals, closes, opens, max_positions=1)['open_positions'] == 1
+    signals, closes, opens = _flat(4)
+    result = simulate(signals, closes, opens, max_positions=1)
+    assert result['open_positions'] == 0
+    assert result['trades'] == 2
@@ -0,0 +1,54 @@
+"""ExecutionManager: chọn executor theo workload, không cạn pool khi gọi lồng"""
+
+import asyncio
+import threading
+
+from src.utils.executors import ExecutionManager, WorkloadClass, stage
+
+
+@stage(WorkloadClass.CPU)
+def _square_sum(n):
+    return sum(i * i for i in range(n))
+
+
+@stage(WorkloadClass.MODEL)
+def _model_thread_name():
+    return threading.current_thread().name
+
+
+def test_nested_io_stage_runs_inline_on_a_full_pool():
+    manager = ExecutionManager(io_workers=1, cpu_workers=0)
+    try:
+        outer = lambda: manager.run_stage(lambda: threading.current_thread().name)
+        assert manager.run_stage(outer).startswith('io')
+    finally:
+        manager.shutdown()
+
+
+def test_cpu_stage_awaits_process_pool_without_io_thread():
+    manager = ExecutionManager(io_workers=1, cpu_workers=1)
+    release = threading.Event()
+    try:
+        async def scenario():
+            # IO pool bận -> CPU stage vẫn phải hoàn thành (không đi qua IO thread)
+            blocker = asyncio.get_running_loop().run_in_executor(manager._io_pool, release.wait, 10)
+            result = await asyncio.wait_for(manager.run_stage_async(_square_sum, 1000), 30)
+            release.set()
+            await blocker
+            return result
+
+        assert asyncio.run(scenario()) == _square_sum(1000)
+        assert manager.stats['cpu_inline'] == 0
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_model_stage_runs_on_model_worker_and_nests_inline():
+    manager = ExecutionManager(io_workers=2, cpu_workers=0)
+    try:
+        assert manager.run_stage(_model_thread_name).startswith('model-inference')
+        nested = lambda: manager.run_stage(_model_thread_name)
+        assert manager.run_stage(nested, workload=WorkloadClass.MODEL).startswith('model-inference')
+    finally:
+        manager.shutdown()
@@ -0,0 +1,47 @@
+"""ForecastPath: mốc theo phiên, tra cứu theo ngày lịch"""
+
+from datetime import datetime
+
+import numpy as np
+
+from src.data.forecast_path import ForecastPath
+
+ORIGIN = datetime(2026, 10, 16, 15, 30)  # Thứ Sáu
+
+
+def _nested():
+    return {
+        'short_term': {'1_days': {'price': 101.0}, '7_days': {'price': 104.0}},
+        'medium_term': {'30_days': {'price': 115.0}},
+        'long_term': {'90_days': {'price': 135.0,
+                                  'confidence_interval': {'lower': 120.0, 'upper': 150.0, 'method': 'monte_carlo'}}}
+    }
+
+
+def test_bucket_offsets_round_trip():
+    path = ForecastPath.from_nested(ORIGIN, 100.0, _nested())
+    assert path.horizon == 90
+    # Thẻ '1 tháng' / '3 tháng' của app đọc đúng mốc '30_days' / '90_days' của API
+    assert path.entry(30)['price'] == 115.0
+    assert path.entry(90)['price'] == 135.0
+    assert path.interval_method == 'monte_carlo'
+    nested = path.to_nested({'medium_term': [30], 'long_term': [90, 180]})
+    assert nested == {'medium_term': {'30_days': path.entry(30)}}
+
+
+def test_calendar_lookup_uses_previous_session():
+    path = ForecastPath.from_nested(ORIGIN, 100.0, _nested())
+    # Thứ Bảy / Chủ nhật -> giá phiên Thứ Sáu (offset 0), Thứ Hai -> offset 1
+    assert path.price_at(datetime(2026, 10, 17)) == 100.0
+    assert path.price_at(datetime(2026, 10, 18)) == 100.0
+    assert path.offset_of(datetime(2026, 10, 19)) == 1
+    assert path.at(datetime(2026, 10, 19))['session'] == '2026-10-19'
+    assert path.price_at(datetime(2027, 6, 1), default=-1) == -1
+
+
+def test_payload_round_trip():
+    path = ForecastPath.from_nested(ORIGIN, 100.0, _nested())
+    restored = ForecastPath.from_payload(path.to_payload())
+    assert restored.origin == path.origin
+    assert np.allclose(restored.prices, path.prices, atol=0.01)
+    assert restored.entry(7) == path.entry(7)
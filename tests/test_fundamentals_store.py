@@ -0,0 +1,56 @@
+"""Fundamentals store: tải lại theo lịch công bố BCTC"""
+
+import json
+from datetime import datetime
+
+import pandas as pd
+
+from src.data.fundamentals_store import FundamentalsStore, is_stale
+
+
+def _entry(fetched: datetime, period: str = None):
+    return {'fetched_at': fetched.timestamp(), 'period': period}
+
+
+def test_missing_entry_is_stale():
+    assert is_stale(None)
+    assert is_stale({})
+
+
+def test_fresh_between_seasons():
+    # Mùa Q1 (15/4 - 20/5) đã qua, chưa tới mùa Q2
+    assert not is_stale(_entry(datetime(2026, 6, 1)), now=datetime(2026, 6, 10))
+
+
+def test_new_season_invalidates_older_fetch():
+    # Mùa Q2 bắt đầu 15/7
+    assert is_stale(_entry(datetime(2026, 7, 1), '2026-Q1'), now=datetime(2026, 7, 20))
+
+
+def test_in_season_waits_for_expected_period():
+    fetched = datetime(2026, 7, 16, 9)
+    assert not is_stale(_entry(fetched, '2026-Q2'), now=datetime(2026, 7, 25))
+    assert not is_stale(_entry(fetched, '2026-Q1'), now=datetime(2026, 7, 16, 20))
+    assert is_stale(_entry(fetched, '2026-Q1'), now=datetime(2026, 7, 18))
+
+
+
+def _overview(shares: int) -> pd.DataFrame:
+    return pd.DataFrame([{'issue_share': shares}])
+
+
+def test_batch_refresh_writes_file_once(tmp_path):
+    path = tmp_path / 'fundamentals.json'
+    store = FundamentalsStore(gateway=None, path=str(path))
+    for i in range(50):
+        store._update(f'S{i:02d}', None, _overview(1_000_000 + i))
+    # Lần đầu ghi ngay, các lần sau chỉ đánh dấu dirty
+    assert store.stats['saves'] == 1
+    assert len(json.loads(path.read_text())['symbols']) == 1
+
+    store.flush()
+    assert store.stats['saves'] == 2
+    assert len(json.loads(path.read_text())['symbols']) == 50
+
+    store.flush()  # không còn thay đổi -> không ghi lại
+    assert store.stats['saves'] == 2
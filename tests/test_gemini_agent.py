@@ -0,0 +1,31 @@
+"""GeminiAgent.generate_stream: fallback ghi token một lần và được cache"""
+
+import pytest
+
+pytest.importorskip('google.generativeai')
+gemini_agent = pytest.importorskip('gemini_agent')
+
+
+class _Cache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, template_id, fingerprint):
+        return self.entries.get((template_id, fingerprint))
+
+    def set(self, template_id, fingerprint, result):
+        self.entries[(template_id, fingerprint)] = result
+
+
+def test_stream_fallback_records_once_and_caches(monkeypatch):
+    cache, recorded = _Cache(), []
+    monkeypatch.setattr(gemini_agent, 'get_ai_cache', lambda: cache)
+    monkeypatch.setattr(gemini_agent, 'record_prompt_tokens', lambda task, prompt: recorded.append(task))
+    agent = gemini_agent.UnifiedAIAgent.__new__(gemini_agent.UnifiedAIAgent)
+    agent.available_models = {}
+    monkeypatch.setattr(agent, 'generate_with_model', lambda *a, **k: 'ok', raising=False)
+
+    events = list(agent.generate_stream('prompt', 'general_query'))
+    assert events[-1]['result']['success']
+    assert recorded == ['general_query']
+    assert cache.get('general_query', 'prompt') is events[-1]['result']
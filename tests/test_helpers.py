@@ -0,0 +1,33 @@
+"""Risk kernels 2-D khớp pandas từng chuỗi (kể cả chuỗi có NaN)"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.helpers import TRADING_DAYS_PER_YEAR, risk_metrics_matrix
+
+
+def _returns(seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.02, (6, 200))
+    returns[1, :30] = np.nan    # mã mới niêm yết
+    returns[2, 50:55] = np.nan  # tạm ngừng giao dịch
+    return returns, rng.normal(0.0004, 0.015, 200)
+
+
+def test_risk_kernels_match_pandas():
+    returns, market = _returns()
+    metrics = risk_metrics_matrix(returns, market, risk_free_rate=0.02)
+    for i, row in enumerate(returns):
+        series = pd.Series(row)
+        clean = series.dropna()
+        excess = series - 0.02 / TRADING_DAYS_PER_YEAR
+        wealth = (1 + series.fillna(0)).cumprod()
+        assert np.isclose(metrics['compound_return'][i], (1 + clean).prod() - 1)
+        assert np.isclose(metrics['volatility'][i], series.std() * np.sqrt(TRADING_DAYS_PER_YEAR))
+        assert np.isclose(metrics['sharpe_ratio'][i], excess.mean() / excess.std() * np.sqrt(TRADING_DAYS_PER_YEAR))
+        assert np.isclose(metrics['max_drawdown'][i], (1 - wealth / wealth.cummax()).max())
+        assert np.isclose(metrics['var_95'][i], -clean.quantile(0.05))
+        assert np.isclose(metrics['skewness'][i], series.skew())
+        assert np.isclose(metrics['kurtosis'][i], series.kurt())
+        assert np.isclose(metrics['beta'][i], series.cov(pd.Series(market)) / pd.Series(market)[series.notna()].var())
+        assert metrics['observations'][i] == len(clean)
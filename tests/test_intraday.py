@@ -0,0 +1,72 @@
+"""Intraday ring buffer: ghi nến, thay nến đang chạy, ghép snapshot bảng giá"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.data.intraday import IntradayBuffers, elapsed_minutes, minutes_to_close
+from src.data.price_board import normalize_board
+
+DAY = datetime(2026, 10, 19)
+
+
+def _bars(n=30, price=25.0):
+    index = pd.date_range(DAY.replace(hour=9), periods=n, freq='1min', name='time')
+    close = price + 0.05 * np.sin(np.arange(n))
+    return pd.DataFrame({'open': close, 'high': close + 0.05, 'low': close - 0.05,
+                         'close': close, 'volume': np.full(n, 1000.0)}, index=index)
+
+
+def test_session_minutes_skip_lunch():
+    assert elapsed_minutes(DAY.replace(hour=12)) == 150
+    assert elapsed_minutes(DAY.replace(hour=13, minute=29)) == 180
+    assert minutes_to_close(DAY.replace(hour=14, minute=45)) == 0
+    assert minutes_to_close(datetime(2026, 10, 18, 10)) == 0  # Chủ nhật
+
+
+def test_replacing_running_bar_matches_recompute():
+    buffers = IntradayBuffers(max_symbols=4)
+    bars = _bars()
+    buffers.ingest_bars('VCB', bars, ref_price=25.0)
+    last = bars.index[-1].to_pydatetime()
+    # Bản cập nhật của nến cuối thay thế, không cộng thêm
+    buffers.update_bar('VCB', last, 25.0, 25.3, 24.9, 25.2, 4000.0)
+
+    assert buffers.stats['replaced'] == 1
+    assert len(buffers.bars('VCB')) == len(bars)
+    expected = bars.copy()
+    expected.iloc[-1] = [25.0, 25.3, 24.9, 25.2, 4000.0]
+    typical = (expected['high'] + expected['low'] + expected['close']) / 3
+    vwap = (typical * expected['volume']).sum() / expected['volume'].sum()
+    features = buffers.features('VCB', now=last)
+    assert abs(features['vwap'] - vwap) < 1e-3
+    assert features['volume'] == expected['volume'].sum()
+    returns = np.log(expected['close']).diff().dropna()
+    assert abs(features['volatility_per_bar_pct'] - returns.std() * 100) < 1e-3
+
+
+def test_ring_keeps_latest_bars_when_full():
+    buffers = IntradayBuffers(max_symbols=2, capacity=10)
+    buffers.ingest_bars('VCB', _bars(25))
+    frame = buffers.bars('VCB')
+    assert len(frame) == 10
+    assert frame.index[-1] == _bars(25).index[-1]
+
+
+def test_board_tick_uses_bar_units():
+    buffers = IntradayBuffers(max_symbols=4)
+    buffers.watch(['VCB'])
+    bars = _bars()
+    buffers.ingest_bars('VCB', bars, ref_price=25.0)
+    raw = pd.DataFrame({'symbol': ['VCB'], 'ref_price': [25_000], 'match_price': [25_100],
+                        'accumulated_volume': [40_000]})
+    buffers.update_from_board(normalize_board(raw), as_of=DAY.replace(hour=9, minute=45))
+
+    features = buffers.features('VCB')
+    assert features['last'] == 25.1
+    assert abs(features['vwap_gap_pct']) < 1
+    assert buffers.bars('VCB')['close'].max() < 26
+    # Nến đã nạp 30,000 CP; bảng giá lũy kế 40,000 -> chỉ cộng phần chênh
+    assert features['volume'] == 40_000
+    assert buffers.bars('VCB')['volume'].sum() == 40_000
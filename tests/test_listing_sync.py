@@ -0,0 +1,67 @@
+"""Listing sync: lọc cổ phiếu, chuẩn hóa sàn, giữ metadata đã biết, không xóa mã khi listing thiếu"""
+
+import pandas as pd
+
+from src.data import listing_sync
+from src.data.listing_sync import ListingSync, diff_listing, parse_listing
+from src.data.symbol_master import SymbolMaster
+
+
+def _by_exchange():
+    return pd.DataFrame({
+        'symbol': ['VCB', 'HPG', 'NEWCO', 'E1VFVN30', 'CVCB2401', 'XYZ'],
+        'organ_name': ['Vietcombank', 'Hòa Phát', 'Công ty Mới', 'ETF VN30', 'CW VCB', 'Sàn lạ'],
+        'type': ['STOCK', 'STOCK', 'STOCK', 'FUND', 'CW', 'STOCK'],
+        'exchange': ['HSX', 'HSX', 'UPCOM', 'HSX', 'HSX', 'OTC']
+    })
+
+
+def _by_industry():
+    return pd.DataFrame({
+        'symbol': ['VCB', 'HPG', 'NEWCO'],
+        'en_icb_name2': ['Banks', 'Basic Resources', 'Retail']
+    })
+
+
+def test_parse_listing_keeps_stocks_and_maps_exchanges():
+    records = {r['symbol']: r for r in parse_listing(_by_exchange(), _by_industry())}
+    assert sorted(records) == ['HPG', 'NEWCO', 'VCB']
+    assert records['VCB']['exchange'] == 'HOSE'
+    assert records['VCB']['sector'] == 'Banking'
+    assert records['NEWCO'] == {'symbol': 'NEWCO', 'name': 'Công ty Mới', 'exchange': 'UPCOM',
+                                'sector': 'Consumer', 'market': 'VN'}
+    assert parse_listing(_by_exchange())[0]['sector'] == 'Unknown'
+
+
+def test_diff_listing():
+    current = [{'symbol': 'VCB', 'name': 'A', 'exchange': 'HOSE'}, {'symbol': 'OLD', 'name': 'B', 'exchange': 'HNX'}]
+    incoming = [{'symbol': 'VCB', 'name': 'A2', 'exchange': 'HNX'}, {'symbol': 'NEW', 'name': 'C', 'exchange': 'HOSE'}]
+    assert diff_listing(current, incoming) == {'added': ['NEW'], 'removed': ['OLD'],
+                                               'renamed': ['VCB'], 'moved': ['VCB']}
+
+
+def test_partial_listing_keeps_known_metadata_and_symbols(tmp_path, monkeypatch):
+    master = SymbolMaster(path=str(tmp_path / 'symbols.json'))
+    master.set_shares('VCB', 5.6e9)
+    before = set(master._symbols)
+    sync = ListingSync(gateway=None, master=master)
+    monkeypatch.setattr(sync, '_fetch_listing', lambda: parse_listing(_by_exchange(), _by_industry()))
+
+    diff = sync.sync(force=True)
+
+    assert diff['added'] == ['NEWCO'] and diff['removed'] == []
+    assert before <= set(master._symbols)
+    assert master.get('HPG')['sector'] == 'Industrial'      # ngành tự đặt không bị ICB ghi đè
+    assert master.get('VCB')['shares'] == 5.6e9
+    assert master.get('VCB')['name'] == 'Vietcombank'
+    assert master.source != 'Listing'                         # chưa đủ universe -> chưa "complete"
+
+
+def test_complete_listing_drops_delisted_symbols(tmp_path, monkeypatch):
+    monkeypatch.setattr(listing_sync, 'COMPLETE_UNIVERSE_SIZE', 3)
+    master = SymbolMaster(path=str(tmp_path / 'symbols.json'))
+    sync = ListingSync(gateway=None, master=master)
+    monkeypatch.setattr(sync, '_fetch_listing', lambda: parse_listing(_by_exchange(), _by_industry()))
+    sync.sync(force=True)
+    assert sorted(master._symbols) == ['HPG', 'NEWCO', 'VCB']
+    assert master.source == 'Listing'
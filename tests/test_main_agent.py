@@ -0,0 +1,106 @@
+"""MainAgent: cache kết quả agent hoàn thành sau deadline"""
+
+import json
+import time
+
+import pytest
+
+main_agent = pytest.importorskip('main_agent')
+
+
+def _agent():
+    agent = main_agent.MainAgent.__new__(main_agent.MainAgent)
+    agent._background_results = {}
+    return agent
+
+
+def test_background_results_are_bounded(monkeypatch):
+    monkeypatch.setattr(main_agent, 'BACKGROUND_RESULTS_MAX', 3)
+    agent = _agent()
+    for i in range(5):
+        agent._store_background_result(f"price_prediction:{i}", {'i': i})
+    assert list(agent._background_results) == ['price_prediction:2', 'price_prediction:3', 'price_prediction:4']
+
+
+def test_expired_results_are_swept_on_store():
+    agent = _agent()
+    agent._store_background_result('risk_assessment:a', {'x': 1})
+    agent._background_results['risk_assessment:a']['timestamp'] = time.time() - 10 ** 6
+    agent._store_background_result('risk_assessment:b', {'x': 2})
+    assert list(agent._background_results) == ['risk_assessment:b']
+
+
+def test_cached_result_is_a_deep_copy():
+    agent = _agent()
+    agent._store_background_result('price_prediction:p', {'trend_analysis': {'direction': 'up'}})
+    first = agent._get_background_result('price_prediction:p')
+    first['trend_analysis']['direction'] = 'mutated'
+    assert agent._get_background_result('price_prediction:p')['trend_analysis']['direction'] == 'up'
+
+
+class _Gemini:
+    def __init__(self, response):
+        self.response = response
+
+    def generate_cached(self, prompt, task_type, max_tokens=1000, template_id=None):
+        return {'response': self.response, 'model_used': 'gemini', 'success': True}
+
+
+class _RiskExpert:
+    def _apply_ai_risk_adjustments(self, base, adjustments):
+        return {}
+
+
+def _fused_agent(response):
+    agent = _agent()
+    agent.gemini_agent = _Gemini(response)
+    agent.risk_expert = _RiskExpert()
+    agent.fallbacks = []
+    agent._fallback_agent_enrichment = lambda key, symbol, base, profile: agent.fallbacks.append(key)
+    return agent
+
+
+def _results():
+    return {
+        'price_prediction': {'current_price': 25.0, 'trend_analysis': {'direction': 'up'}},
+        'risk_assessment': {'risk_level': 'HIGH', 'volatility': 30},
+        'investment_analysis': {'recommendation': 'HOLD'},
+        'investment_profile': {'risk_tolerance': 50}
+    }
+
+
+def test_parse_fused_response_accepts_fenced_json():
+    agent = _agent()
+    assert agent._parse_fused_ai_response('```json\n{"a": {"advice": "x"}}\n```') == {'a': {'advice': 'x'}}
+    assert agent._parse_fused_ai_response('không có JSON') is None
+    assert agent._parse_fused_ai_response('[1, 2]') is None
+
+
+def test_fused_sections_dispatch_and_missing_ones_fall_back():
+    response = '```json\n' + json.dumps({
+        'price_prediction': {'advice': 'Giữ vị thế, chờ vượt kháng cự', 'reasoning': 'RSI trung tính',
+                             'trend': 'Bullish'},
+        'risk_assessment': {'advice': 'ngắn'}
+    }) + '\n```'
+    agent = _fused_agent(response)
+    results = _results()
+    agent._run_fused_ai_enrichment('VCB', results)
+
+    price = results['price_prediction']
+    assert price['ai_fused'] and price['ai_advice'].startswith('Giữ vị thế')
+    assert price['trend_analysis']['ai_direction'] == 'bullish'
+    # Section quá ngắn hoặc thiếu -> enrichment riêng của agent
+    assert agent.fallbacks == ['risk_assessment', 'investment_analysis']
+
+
+def test_placeholder_risk_level_keeps_the_agent_level():
+    section = {'advice': 'Giảm tỷ trọng khi biến động tăng', 'risk_level': 'LOW|MEDIUM|HIGH|VERY_HIGH'}
+    agent = _fused_agent(json.dumps({'risk_assessment': section}))
+    results = _results()
+    agent._run_fused_ai_enrichment('VCB', results)
+    assert results['risk_assessment']['enhanced_risk_level'] == 'HIGH'
+
+    section['risk_level'] = 'very_high'
+    results = _results()
+    _fused_agent(json.dumps({'risk_assessment': section}))._run_fused_ai_enrichment('VCB', results)
+    assert results['risk_assessment']['enhanced_risk_level'] == 'VERY_HIGH'
@@ -0,0 +1,38 @@
+"""Monte Carlo: đường giá chặn theo biên độ sàn"""
+
+import numpy as np
+import pytest
+
+from src.data.monte_carlo import MODELS, simulate_paths
+
+
+def _closes(n=250, sigma=0.12, seed=3):
+    rng = np.random.default_rng(seed)
+    return 20 * np.exp(np.cumsum(rng.normal(0, sigma, n)))
+
+
+def _daily_moves(paths, spot):
+    prices = np.hstack([np.full((len(paths), 1), spot), paths])
+    return prices[:, 1:] / prices[:, :-1] - 1
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_hose_paths_respect_the_7_percent_limit(model):
+    closes = _closes()
+    paths = simulate_paths(closes, n_paths=500, horizon=20, model=model, exchange='HOSE', seed=1)
+    moves = _daily_moves(paths, closes[-1])
+    assert moves.max() <= 0.07 + 1e-12 and moves.min() >= -0.07 - 1e-12
+    assert np.isclose(np.abs(moves).max(), 0.07)
+
+
+def test_international_paths_are_not_clipped():
+    closes = _closes()
+    moves = _daily_moves(simulate_paths(closes, n_paths=500, horizon=20, exchange=None, seed=1), closes[-1])
+    assert np.abs(moves).max() > 0.07
+
+
+def test_seed_is_reproducible_and_short_history_rejected():
+    closes = _closes()
+    assert np.array_equal(simulate_paths(closes, 50, 5, seed=7), simulate_paths(closes, 50, 5, seed=7))
+    with pytest.raises(ValueError):
+        simulate_paths(closes[:10], 50, 5)
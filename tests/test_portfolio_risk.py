@@ -0,0 +1,35 @@
+"""Portfolio risk: Ledoit-Wolf co rút khớp công thức gốc"""
+
+import numpy as np
+
+from src.data.portfolio_risk import ledoit_wolf
+
+
+def _reference(returns):
+    # Ledoit & Wolf (2004), chuẩn Frobenius chia N, tính từng quan sát
+    T, N = returns.shape
+    X = returns - returns.mean(axis=0)
+    S = X.T @ X / T
+    mu = np.trace(S) / N
+    F = mu * np.eye(N)
+    d2 = ((S - F) ** 2).sum() / N
+    b_bar2 = sum(((np.outer(x, x) - S) ** 2).sum() / N for x in X) / T ** 2
+    shrinkage = min(b_bar2, d2) / d2
+    return shrinkage * F + (1 - shrinkage) * S, shrinkage
+
+
+def test_matches_the_reference_estimator():
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0, 0.02, (120, 30)) @ (np.eye(30) + rng.normal(0, 0.2, (30, 30)))
+    cov, shrinkage = ledoit_wolf(returns)
+    expected_cov, expected_shrinkage = _reference(returns)
+    assert np.isclose(shrinkage, expected_shrinkage)
+    assert np.allclose(cov, expected_cov)
+    assert 0 < shrinkage < 1
+
+
+def test_shrunk_covariance_is_positive_definite_when_n_exceeds_t():
+    returns = np.random.default_rng(1).normal(0, 0.02, (40, 60))
+    cov, _ = ledoit_wolf(returns)
+    assert np.allclose(cov, cov.T)
+    assert np.linalg.eigvalsh(cov).min() > 0
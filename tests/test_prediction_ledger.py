@@ -0,0 +1,99 @@
+"""Prediction ledger: ghi theo lô, chấm điểm theo phiên, nạp lại, trộn confidence"""
+
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data import prediction_ledger
+from src.data.prediction_ledger import PredictionLedger, target_date
+
+NOW = datetime(2026, 10, 16, 16, 0)
+
+
+@pytest.fixture(autouse=True)
+def _keep_all_scored(monkeypatch):
+    monkeypatch.setattr(prediction_ledger, 'ROLLING_DAYS', 10 ** 5)
+
+
+def _ledger(tmp_path):
+    return PredictionLedger(path=str(tmp_path / 'predictions.jsonl'))
+
+
+def _closes():
+    # Không có nến 15/10 (sàn nghỉ đột xuất) -> dự báo đáo hạn 15/10 chấm bằng phiên 16/10
+    index = pd.DatetimeIndex(['2026-10-12', '2026-10-13', '2026-10-14', '2026-10-16'])
+    return pd.DataFrame({'VCB': [10.0, 10.5, 12.0, 11.0], 'ACB': [20.0, 20.0, 20.0, 21.0]}, index=index)
+
+
+def test_target_date_counts_sessions():
+    assert target_date(datetime(2026, 2, 13, 10), 1) == '2026-02-23'   # qua Tết
+    assert target_date(datetime(2026, 10, 17, 10), 0) == '2026-10-19'  # Thứ Bảy -> Thứ Hai
+
+
+def test_record_buffers_until_flush(tmp_path, monkeypatch):
+    ledger = _ledger(tmp_path)
+    ledger.record('vcb', 7, 11.0, 10.0, 'traditional', created=NOW)
+    assert not (tmp_path / 'predictions.jsonl').exists()
+    assert ledger.flush() == 1 and ledger.flush() == 0
+    rows = [json.loads(line) for line in (tmp_path / 'predictions.jsonl').read_text().splitlines()]
+    assert rows[0]['symbol'] == 'VCB' and rows[0]['target_date'] == '2026-10-27'
+    assert ledger.get_stats()['pending'] == 1
+
+    monkeypatch.setattr(prediction_ledger, 'FLUSH_BATCH', 2)
+    ledger.record('VCB', 1, 11.0, 10.0, 'traditional', created=NOW)
+    assert not ledger._wake.is_set()
+    ledger.record('VCB', 2, 11.0, 10.0, 'traditional', created=NOW)
+    assert ledger._wake.is_set()
+
+
+def test_score_matches_sessions_and_expires_stale(tmp_path):
+    ledger = _ledger(tmp_path)
+    hit = ledger.record('VCB', 2, 11.0, 10.0, 'traditional', created=datetime(2026, 10, 12, 10))
+    rolled = ledger.record('ACB', 3, 20.5, 20.0, 'traditional', created=datetime(2026, 10, 12, 10))
+    future = ledger.record('VCB', 10, 11.0, 10.0, 'traditional', created=datetime(2026, 10, 12, 10))
+    ledger.record('XYZ', 1, 5.0, 5.0, 'traditional', created=datetime(2026, 8, 3, 10))
+    ledger.record('VCB', 1, 9.0, 10.0, 'traditional', created=datetime(2026, 9, 1, 10))
+
+    assert ledger.score(_closes(), now=NOW) == 2
+    assert list(ledger._pending['id']) == [future]
+    actual = ledger._scored.set_index('id')['actual']
+    assert actual[hit] == 12.0
+    assert actual[rolled] == 21.0
+    stats = ledger.get_accuracy('traditional', 2)[0]
+    assert stats['samples'] == 1 and stats['direction_hit_rate'] == 1.0
+
+
+def test_load_restores_pending_and_scored(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.record('VCB', 2, 11.0, 10.0, 'lstm', created=datetime(2026, 10, 12, 10))
+    pending = ledger.record('VCB', 10, 11.0, 10.0, 'lstm', created=datetime(2026, 10, 12, 10))
+    ledger.score(_closes(), now=NOW)
+
+    reloaded = _ledger(tmp_path)
+    assert list(reloaded._pending['id']) == [pending]
+    assert len(reloaded._scored) == 1
+    assert reloaded.get_accuracy('lstm')[0]['samples'] == 1
+
+
+def _with_stats(ledger, samples, hits):
+    base = np.full(samples, 10.0)
+    ledger._scored = pd.DataFrame({
+        'method': 'lstm', 'horizon': 7, 'base': base, 'predicted': base + 1,
+        'actual': np.where(np.arange(samples) < hits, 11.0, 9.0), 'lower': None, 'upper': None
+    })
+    ledger._recompute_stats()
+
+
+def test_blend_confidence_thresholds(tmp_path):
+    ledger = _ledger(tmp_path)
+    assert ledger.blend_confidence('lstm', 7, 50.0) == 50.0
+    _with_stats(ledger, 20, 20)
+    assert ledger.blend_confidence('lstm', 7, 50.0) == 50.0    # dưới MIN_SAMPLES
+    _with_stats(ledger, 100, 60)
+    assert ledger.blend_confidence('lstm', 7, 50.0) == 55.0    # trọng số 0.5
+    _with_stats(ledger, 400, 240)
+    assert ledger.blend_confidence('lstm', 7, 50.0) == 60.0    # toàn bộ từ dữ liệu thật
+    assert ledger.blend_confidence('traditional', 7, 50.0) == 50.0
@@ -0,0 +1,23 @@
+"""PricePredictor: confidence tra ledger theo model thực sự phục vụ"""
+
+import pytest
+
+price_predictor = pytest.importorskip('agents.price_predictor')
+
+
+class _Ledger:
+    def __init__(self):
+        self.methods = set()
+
+    def blend_confidence(self, method, horizon, heuristic):
+        self.methods.add(method)
+        return heuristic
+
+
+def test_lstm_confidence_uses_lstm_accuracy(monkeypatch):
+    ledger = _Ledger()
+    monkeypatch.setattr(price_predictor, 'get_prediction_ledger', lambda: ledger)
+    predictor = price_predictor.PricePredictor.__new__(price_predictor.PricePredictor)
+    scores = predictor._combine_confidence_scores(70, {'short_term': 60, 'medium_term': 55, 'long_term': 50})
+    assert ledger.methods == {'lstm'}
+    assert scores['combined_method']
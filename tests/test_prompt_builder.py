@@ -0,0 +1,30 @@
+"""Prompt builder: lượng tử hóa số + cắt field theo ngân sách token"""
+
+from src.utils.prompt_builder import (
+    PRIORITY_CRITICAL, PRIORITY_LOW, PromptBuilder, estimate_tokens, format_value
+)
+
+
+def test_format_value_quantizes_numbers():
+    assert format_value(1234567) == '1,230,000'
+    assert format_value(23.456) == '23.46'
+    assert format_value(0.012345) == '0.0123'
+    assert format_value(float('nan')) == 'N/A'
+    assert format_value(None) == 'N/A'
+
+
+def test_build_drops_low_priority_fields_first():
+    builder = PromptBuilder(budget=20)
+    builder.add_section('GIÁ:', [('Mã', 'VCB', PRIORITY_CRITICAL), ('Giá', 91.5, PRIORITY_CRITICAL),
+                                 ('Ghi chú', 'x' * 200, PRIORITY_LOW), ('Trống', None)])
+    builder.add_news('TIN:', [{'title': 'VCB lãi kỷ lục'}, {'title': 'vcb lãi kỷ lục'}, 'Tin khác'])
+    text = builder.build()
+    assert '- Mã: VCB' in text and '- Giá: 91.5' in text
+    assert 'Ghi chú' not in text and 'Trống' not in text
+    assert estimate_tokens(text) <= 20
+
+
+def test_critical_fields_survive_a_tiny_budget():
+    builder = PromptBuilder(budget=1)
+    builder.add_section('', [('Mã', 'VCB', PRIORITY_CRITICAL), ('PE', 12.3)])
+    assert builder.build() == '- Mã: VCB'
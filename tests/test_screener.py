@@ -0,0 +1,121 @@
+"""Screener: ghép snapshot bảng giá vào ma trận nến + filter"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+import pandas as pd
+
+from src.data.price_board import normalize_board
+from src.data.screener import ScreenerService, apply_screen, parse_conditions
+
+
+class _Board:
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+
+class _Master:
+    def exchange_of(self, symbol, default=None):
+        return 'HOSE'
+
+    def sector_of(self, symbol):
+        return 'Banking'
+
+
+class _Fundamentals:
+    def get_cached(self, symbol):
+        return None
+
+
+def _history(symbols, sessions=60, price=25.0):
+    """Nến ngày theo đơn vị vnstock (nghìn đồng)"""
+    index = pd.bdate_range(end='2026-10-16', periods=sessions, name='time')
+    bars = {}
+    for i, symbol in enumerate(symbols):
+        close = price + i + np.sin(np.arange(sessions) / 3)
+        bars[symbol] = pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close,
+                                     'volume': np.full(sessions, 1_000_000)}, index=index)
+    return bars
+
+
+def _raw_board(prices):
+    """price_board thô của VCI (giá theo đồng)"""
+    return pd.DataFrame({
+        'symbol': list(prices),
+        'exchange': ['HOSE'] * len(prices),
+        'ref_price': [p * 1000 for p in prices.values()],
+        'match_price': [p * 1010 for p in prices.values()],
+        'accumulated_volume': [500_000] * len(prices)
+    })
+
+
+def _screener():
+    return ScreenerService(None, _Board(), _Master(), _Fundamentals())
+
+
+def test_board_tick_keeps_history_units():
+    screener = _screener()
+    screener.ingest_bars(_history(['VCB', 'ACB']))
+    yesterday = screener.closes.iloc[-1]
+
+    board = normalize_board(_raw_board(yesterday.to_dict()))
+    screener.update_from_board(board, as_of=datetime(2026, 10, 19, 10, 30))
+
+    today = screener.closes.iloc[-1]
+    assert np.allclose(today / yesterday, 1.01)
+    assert screener.table['return_1w'].abs().max() < 10
+    assert screener.table['rsi_14'].max() < 99
+
+
+def test_board_ticks_overwrite_todays_row():
+    screener = _screener()
+    screener.ingest_bars(_history(['VCB', 'ACB']))
+    sessions = len(screener.closes)
+    yesterday = screener.closes.iloc[-1]
+
+    for minute, move in ((0, 1.01), (5, 1.02)):
+        raw = _raw_board(yesterday.to_dict())
+        raw['match_price'] = raw['ref_price'] * move
+        screener.update_from_board(normalize_board(raw), as_of=datetime(2026, 10, 19, 10, minute))
+
+    assert len(screener.closes) == sessions + 1
+    assert np.allclose(screener.closes.iloc[-1] / yesterday, 1.02)
+    assert screener.closes.index[-1] == pd.Timestamp('2026-10-19')
+
+
+def test_off_session_board_does_not_add_a_row():
+    screener = _screener()
+    screener.ingest_bars(_history(['VCB', 'ACB']))
+    before = screener.closes.copy()
+
+    board = normalize_board(_raw_board(before.iloc[-1].to_dict()))
+    screener.update_from_board(board, as_of=datetime(2026, 10, 17, 20, 0))  # Thứ Bảy
+
+    assert screener.closes.index[-1] == before.index[-1] == pd.Timestamp('2026-10-16')
+    pd.testing.assert_frame_equal(screener.closes, before)
+
+
+def test_parse_conditions():
+    conditions = parse_conditions("exchange == hose and rsi_14 < 30; sector in Banking, 'Real Estate'")
+    assert conditions == [('exchange', '==', ['hose']), ('rsi_14', '<', 30.0),
+                          ('sector', 'in', ['Banking', 'Real Estate'])]
+    for where in ('pe >> 3', 'unknown < 1', 'pe < cheap', 'sector > Banking', 'pe in 1,2'):
+        with pytest.raises(ValueError):
+            parse_conditions(where)
+
+
+def test_apply_screen_text_is_case_insensitive_and_nan_never_matches():
+    table = pd.DataFrame({
+        'exchange': ['HOSE', 'HNX', 'HOSE'],
+        'sector': ['Banking', 'Banking', 'Steel'],
+        'pe': [8.0, np.nan, 15.0]
+    }, index=['VCB', 'SHB', 'HPG'])
+
+    assert table.index[apply_screen(table, parse_conditions('sector == banking'))].tolist() == ['VCB', 'SHB']
+    assert table.index[apply_screen(table, parse_conditions('exchange != hnx'))].tolist() == ['VCB', 'HPG']
+    assert table.index[apply_screen(table, parse_conditions('pe < 20'))].tolist() == ['VCB', 'HPG']
+    assert table.index[apply_screen(table, parse_conditions('sector = BANKING and pe < 10'))].tolist() == ['VCB']
@@ -0,0 +1,40 @@
+"""Company search index: mã > prefix mã > prefix tên > trigram"""
+
+from src.data.search_index import CompanySearchIndex, fold_text
+
+DOCS = [
+    {'symbol': 'HPG', 'name': 'Công ty CP Tập đoàn Hòa Phát', 'market': 'VN'},
+    {'symbol': 'HPX', 'name': 'Công ty CP Đầu tư Hải Phát', 'market': 'VN'},
+    {'symbol': 'VCB', 'name': 'Ngân hàng TMCP Ngoại thương Việt Nam', 'market': 'VN'},
+    {'symbol': 'AAPL', 'name': 'Apple Inc.', 'market': 'US'}
+]
+
+
+def _index():
+    index = CompanySearchIndex(DOCS)
+    index.add({'symbol': 'VCB'}, aliases=['Vietcombank'])
+    index.build()
+    return index
+
+
+def test_fold_text_strips_vietnamese_marks():
+    assert fold_text('Tập đoàn Hòa Phát') == 'tap doan hoa phat'
+
+
+def test_exact_symbol_outranks_prefix():
+    hits = _index().search('hp')
+    assert [hit['match'] for hit in hits[:2]] == ['prefix', 'prefix']
+    hits = _index().search('hpg')
+    assert hits[0]['symbol'] == 'HPG' and hits[0]['match'] == 'symbol'
+
+
+def test_name_prefix_without_diacritics_and_alias():
+    assert _index().search('hoa ph')[0]['symbol'] == 'HPG'
+    assert _index().search('vietcom')[0]['symbol'] == 'VCB'
+
+
+def test_fuzzy_match_and_market_filter():
+    hits = _index().search('ngoai thuong viet nan')
+    assert hits[0]['symbol'] == 'VCB'
+    assert _index().search('apple', market='VN') == []
+    assert _index().search('apple', market='US')[0]['symbol'] == 'AAPL'
@@ -0,0 +1,60 @@
+"""Sector index: nến lịch sử + snapshot bảng giá"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.data.price_board import normalize_board
+from src.data.sector_index import SectorIndexEngine
+
+
+def _engine():
+    engine = SectorIndexEngine()
+    engine.set_universe([
+        {'symbol': 'VCB', 'sector': 'Banking', 'shares': 5e9},
+        {'symbol': 'ACB', 'sector': 'Banking', 'shares': 4e9},
+        {'symbol': 'HPG', 'sector': 'Steel', 'shares': 6e9}
+    ])
+    index = pd.bdate_range(end='2026-10-16', periods=30)
+    for i, symbol in enumerate(['VCB', 'ACB', 'HPG']):
+        close = 20.0 + 10 * i + np.sin(np.arange(30) / 4)
+        engine.ingest_bars(symbol, pd.DataFrame({'close': close}, index=index))
+    return engine
+
+
+def test_board_update_uses_history_units():
+    engine = _engine()
+    last = engine.closes.iloc[-1]
+    raw = pd.DataFrame({
+        'symbol': list(last.index),
+        'ref_price': (last * 1000).to_numpy(),
+        'match_price': (last * 1020).to_numpy(),
+        'accumulated_volume': 1_000_000
+    })
+    engine.update_from_board(normalize_board(raw), as_of=datetime(2026, 10, 19, 10, 0))
+
+    performance = engine.get_sector_performance('1D')
+    assert performance['Banking'] == 2.0
+    assert performance['Steel'] == 2.0
+
+
+def test_reference_price_only_fills_missing_sessions():
+    engine = _engine()
+    before = engine.closes.iloc[-1].copy()
+    raw = pd.DataFrame({'symbol': ['VCB'], 'ref_price': [99_000], 'match_price': [0]})
+    engine.update_from_board(normalize_board(raw), as_of=datetime(2026, 10, 19, 9, 0))
+    # Phiên 16/10 đã có nến thật -> giá tham chiếu không ghi đè
+    assert engine.closes.loc[pd.Timestamp('2026-10-16'), 'VCB'] == before['VCB']
+
+
+def test_weekend_snapshot_does_not_add_a_session():
+    engine = _engine()
+    before = engine.get_sector_performance('1D')
+    last = engine.closes.iloc[-1]
+    raw = pd.DataFrame({'symbol': list(last.index), 'ref_price': (last * 1000).to_numpy(),
+                        'match_price': (last * 1000).to_numpy()})
+    engine.update_from_board(normalize_board(raw), as_of=datetime(2026, 10, 17, 10, 0))
+    assert engine.closes.index[-1] == pd.Timestamp('2026-10-16')
+    assert engine.get_sector_performance('1D') == before
+    assert before['Banking'] != 0
@@ -0,0 +1,27 @@
+"""Symbol master: danh mục khởi tạo + phân loại mã VN"""
+
+from collections import Counter
+
+from src.data.search_index import CompanySearchIndex
+from src.data.symbol_master import SEED_SYMBOLS, SymbolMaster
+
+
+def test_seed_symbols_are_unique():
+    counts = Counter(record['symbol'] for record in SEED_SYMBOLS)
+    assert [symbol for symbol, n in counts.items() if n > 1] == []
+
+
+def test_vhc_is_not_a_vinhomes_match():
+    index = CompanySearchIndex(SEED_SYMBOLS)
+    hits = index.search('vinhom')
+    assert hits[0]['symbol'] == 'VHM'
+    assert [hit['symbol'] for hit in hits if hit['match'] == 'name'] == ['VHM']
+
+
+def test_unknown_tickers_are_not_vn(tmp_path):
+    master = SymbolMaster(path=str(tmp_path / 'symbols.json'))
+    assert not master.is_complete
+    for symbol in ('IBM', 'AMD', 'JPM', 'AAPL'):
+        assert not master.is_vn_symbol(symbol)
+    assert master.is_vn_symbol('vcb')
+    assert master.is_vn_symbol('VNINDEX')
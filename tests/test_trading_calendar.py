@@ -0,0 +1,44 @@
+"""Trading calendar: cộng/đếm phiên qua Tết và cuối tuần"""
+
+from datetime import datetime
+
+import numpy as np
+
+from src.utils.trading_calendar import TradingCalendar, get_trading_calendar
+
+
+def test_tet_holidays_are_not_sessions():
+    calendar = get_trading_calendar()
+    assert not calendar.is_session('2026-02-17')
+    assert calendar.is_holiday('2026-02-17')
+    assert not calendar.is_holiday('2026-02-14')  # Thứ Bảy: nghỉ cuối tuần, không phải lễ
+
+
+def test_add_sessions_skips_tet():
+    calendar = get_trading_calendar()
+    # Thứ Sáu 13/2 -> phiên kế tiếp là Thứ Hai 23/2 (nghỉ 16-20/2)
+    assert calendar.add_sessions('2026-02-13', 1) == np.datetime64('2026-02-23')
+    assert calendar.add_sessions('2026-02-23', -1) == np.datetime64('2026-02-13')
+    assert calendar.sessions_between('2026-02-13', '2026-02-24') == 2
+    assert calendar.next_session('2026-02-16') == np.datetime64('2026-02-23')
+    assert calendar.previous_session('2026-02-18') == np.datetime64('2026-02-13')
+
+
+def test_session_range_and_dates_agree():
+    calendar = get_trading_calendar()
+    sessions = calendar.session_range('2026-02-10', '2026-02-24')
+    assert [str(d) for d in sessions] == ['2026-02-10', '2026-02-11', '2026-02-12', '2026-02-13',
+                                          '2026-02-23', '2026-02-24']
+    assert np.array_equal(calendar.session_dates('2026-02-10', 6), sessions)
+
+
+def test_market_open_and_close_around_tet():
+    calendar = get_trading_calendar()
+    assert calendar.next_open(datetime(2026, 2, 13, 15, 30)) == datetime(2026, 2, 23, 9, 0)
+    assert calendar.last_closed_session(datetime(2026, 2, 23, 10, 0)) == np.datetime64('2026-02-13')
+    assert calendar.last_closed_session(datetime(2026, 2, 23, 15, 5)) == np.datetime64('2026-02-23')
+
+
+def test_custom_holidays():
+    calendar = TradingCalendar(holidays=['2026-10-19'])
+    assert calendar.add_sessions('2026-10-16', 1) == np.datetime64('2026-10-20')
@@ -0,0 +1,13 @@
+"""VNStockAPI: khởi tạo các service dùng chung"""
+
+from src.data.vn_stock_api import VNStockAPI
+
+
+def test_services_share_one_price_board():
+    api = VNStockAPI()
+    # Screener / sector index / intraday đăng ký vào đúng bảng giá của API
+    assert api.screener.price_board is api.price_board
+    subscribers = api.price_board._subscribers
+    assert api.screener.update_from_board in subscribers
+    assert api.sector_index.update_from_board in subscribers
+    assert api.intraday.update_from_board in subscribers
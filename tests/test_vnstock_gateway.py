@@ -0,0 +1,59 @@
+"""VNStockGateway.fetch_history: hedge + timeout tổng"""
+
+import asyncio
+import time
+
+import pandas as pd
+import pytest
+
+from src.data import vnstock_gateway
+from src.data.vnstock_gateway import VNStockGateway
+
+
+def _bars():
+    return pd.DataFrame({'open': [1.0], 'high': [1.0], 'low': [1.0], 'close': [1.0], 'volume': [1]},
+                        index=pd.DatetimeIndex(['2026-10-16'], name='time'))
+
+
+def test_fetch_history_times_out_when_every_source_hangs(monkeypatch):
+    gateway = VNStockGateway()
+
+    async def hang(symbol, start, end, source, interval):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(gateway, '_fetch_bars', hang)
+    monkeypatch.setattr(gateway, 'hedge_delay', lambda source: 0.1)
+    started = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        asyncio.run(gateway.fetch_history('VCB', '2026-10-01', '2026-10-16', timeout=0.5))
+    assert time.perf_counter() - started < 2
+    assert gateway.stats['TCBS']['hedged'] == 1
+
+
+def test_fetch_history_fails_over_to_next_source(monkeypatch):
+    gateway = VNStockGateway()
+
+    async def fetch(symbol, start, end, source, interval):
+        if source == 'VCI':
+            raise ConnectionError('VCI down')
+        return _bars()
+
+    monkeypatch.setattr(gateway, '_fetch_bars', fetch)
+    bars = asyncio.run(gateway.fetch_history('VCB', '2026-10-01', '2026-10-16', timeout=5))
+    assert len(bars) == 1
+    assert gateway.stats['TCBS']['wins'] == 1
+
+
+def test_stock_objects_are_lru_bounded(monkeypatch):
+    class _Vnstock:
+        def stock(self, symbol, source):
+            return (symbol, source)
+
+    monkeypatch.setattr(vnstock_gateway, 'Vnstock', _Vnstock)
+    monkeypatch.setenv('STOCK_OBJECT_CACHE', '2')
+    gateway = VNStockGateway()
+    gateway.stock('VCB')
+    gateway.stock('ACB')
+    gateway.stock('VCB')
+    gateway.stock('HPG')
+    assert list(gateway._stock_objects) == [('VCB', 'VCI'), ('HPG', 'VCI')]
@@ -0,0 +1,62 @@
+"""Walk-forward: origin, không nhìn trước, chấm hướng, skill so với naive"""
+
+import numpy as np
+import pandas as pd
+
+from src.data.walk_forward import (
+    _ROW_COLUMNS, aggregate_errors, make_origins, naive_forecasts, score_forecasts, traditional_forecasts
+)
+
+
+def _prices(sessions=320, symbols=3, seed=2):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end='2026-10-16', periods=sessions)
+    closes = pd.DataFrame(25 * np.exp(np.cumsum(rng.normal(0, 0.02, (sessions, symbols)), axis=0)),
+                          index=index, columns=['VCB', 'FPT', 'HPG'][:symbols])
+    volumes = pd.DataFrame(rng.integers(100_000, 1_000_000, (sessions, symbols)).astype(float),
+                           index=index, columns=closes.columns)
+    return closes, volumes
+
+
+def test_make_origins():
+    assert make_origins(100, train=50, step=20) == [49, 69, 89]
+    assert make_origins(100, train=50, step=20, min_horizon=12) == [49, 69]
+    assert make_origins(40, train=50) == []
+
+
+def test_traditional_forecasts_do_not_look_ahead():
+    closes, volumes = _prices()
+    origin = 260
+    before = pd.DataFrame(traditional_forecasts(closes, volumes, [origin], [1, 7]), columns=_ROW_COLUMNS)
+    shocked = closes.copy()
+    shocked.iloc[origin + 1:] *= 1.5
+    after = pd.DataFrame(traditional_forecasts(shocked, volumes, [origin], [1, 7]), columns=_ROW_COLUMNS)
+    assert np.allclose(before['predicted'], after['predicted'])
+    assert np.allclose(before['base'], after['base'])
+    assert not np.allclose(before['actual'], after['actual'])
+
+
+def test_score_forecasts_direction():
+    rows = pd.DataFrame([
+        ('VCB', 'traditional', 0, 1, 10.0, 11.0, 12.0),   # dự báo tăng, thực tế tăng
+        ('VCB', 'traditional', 0, 7, 10.0, 11.0, 9.0),    # dự báo tăng, thực tế giảm
+        ('VCB', 'naive', 0, 1, 10.0, 10.0, 12.0),         # đi ngang: không chấm hướng
+        ('VCB', 'naive', 0, 7, 10.0, 10.0, np.nan)        # chưa tới ngày đáo hạn
+    ], columns=_ROW_COLUMNS)
+    scored = score_forecasts(rows)
+    assert len(scored) == 3
+    assert scored['direction_hit'].tolist()[:2] == [1.0, 0.0]
+    assert np.isnan(scored['direction_hit'].iloc[2])
+    assert np.isclose(scored['error_pct'].iloc[0], (11 / 12 - 1) * 100)
+
+
+def test_aggregate_errors_skill_against_naive():
+    closes, _ = _prices()
+    origins = make_origins(len(closes), train=200, step=20, min_horizon=7)
+    naive = pd.DataFrame(naive_forecasts(closes, origins, [7]), columns=_ROW_COLUMNS)
+    perfect = naive.assign(method='oracle', predicted=naive['actual'])
+    table = aggregate_errors(score_forecasts(pd.concat([naive, perfect])), ['horizon']).set_index('method')
+    assert table.loc['naive', 'skill'] == 0
+    assert table.loc['oracle', 'skill'] == 1
+    assert table.loc['oracle', 'direction_hit_rate'] == 1
+    assert table.loc['naive', 'samples'] == len(origins) * closes.shape[1]